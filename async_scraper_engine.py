@@ -0,0 +1,458 @@
+# async_scraper_engine.py - Run all selected platforms on one event loop / one Chromium
+
+"""
+Asyncio Playwright engine for the platform scrapers.
+
+All selected platforms run as coroutines on a single event loop that shares
+one Chromium instance. Each platform gets its own isolated BrowserContext
+loaded from the existing ``<platform>_auth.json`` storage state, and the
+stealth pacing (``stealth_delay`` / ``human_like_scrolling``) is awaited so
+waiting never holds a thread.
+
+This is a separate, opt-in engine (SCRAPER_ENGINE=async); the per-platform
+subprocess scrapers stay the default. It does NOT port their parsing: one
+``page.evaluate`` per page collects profile links matching
+PLATFORM_SPECS[...]['profile_pattern'] plus the text of the surrounding card,
+and _card_to_lead turns that into a lead. Known differences from the sync
+scrapers, so expect fewer and thinner leads:
+
+- name/bio come from the card's link and inner text, not the platform-specific
+  fields (no follower/subscriber counts, headlines, locations or the Instagram
+  profile enrichment)
+- no relevance scoring against the search term (LinkedIn/YouTube)
+- Reddit reads one comment search page instead of walking subreddit posts
+  and their comments
+- no manual-intervention or login-recovery flows
+- leads are tagged ``extraction_method='async_engine'``
+
+After extraction each platform goes through the same steps as its sync
+scraper: the usage limit check before scraping, excluded accounts, the
+Reddit/Medium end-customer classifiers, smart dedup, finalize_scraper_results
+(usage limits + tracking), DMs, and persistence.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, quote_plus
+
+from playwright.async_api import async_playwright
+
+from browser_setup import apply_route_policy_async
+from persistence import save_leads_to_files
+
+CSV_DIR = Path(os.getenv("CSV_DIR", "/app/client_configs"))
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-features=VizDisplayCompositor',
+]
+
+STEALTH_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
+    window.chrome = { runtime: {} };
+"""
+
+# Per-platform search pages and how to recognise a profile link on them.
+# ``profile_pattern`` must capture the handle in group 1.
+PLATFORM_SPECS = {
+    'twitter': {
+        'search_url': lambda term: f"https://twitter.com/search?q={quote(term)}&src=typed_query&f=user",
+        'profile_pattern': r'^https?://(?:www\.)?(?:twitter|x)\.com/([A-Za-z0-9_]{1,15})/?$',
+        'card_selector': '[data-testid="UserCell"], article',
+        'handle_prefix': '@',
+        'delays': (10, 20),
+        'leads_per_scroll': 5,
+    },
+    'facebook': {
+        'search_url': lambda term: f"https://www.facebook.com/search/people/?q={quote(term)}",
+        'profile_pattern': r'^https?://(?:www\.)?facebook\.com/((?:profile\.php\?id=\d+)|[A-Za-z0-9.]{3,})/?$',
+        'card_selector': '[role="article"], [role="listitem"], div[data-visualcompletion]',
+        'handle_prefix': '',
+        'delays': (2, 5),
+        'leads_per_scroll': 12,
+    },
+    'linkedin': {
+        'search_url': lambda term: f"https://www.linkedin.com/search/results/people/?keywords={quote(term)}",
+        'profile_pattern': r'^https?://(?:www\.)?linkedin\.com/in/([A-Za-z0-9_-]+)/?',
+        'card_selector': 'li.reusable-search__result-container, li',
+        'handle_prefix': '',
+        'delays': (3, 6),
+        'leads_per_scroll': 5,
+    },
+    'youtube': {
+        'search_url': lambda term: f"https://www.youtube.com/results?search_query={quote_plus(term)}&sp=EgIQAg%253D%253D",
+        'profile_pattern': r'^https?://(?:www\.)?youtube\.com/(@[A-Za-z0-9_.-]+|channel/[A-Za-z0-9_-]+)/?$',
+        'card_selector': 'ytd-channel-renderer',
+        'handle_prefix': '',
+        'delays': (2, 4),
+        'leads_per_scroll': 12,
+    },
+    'tiktok': {
+        'search_url': lambda term: f"https://www.tiktok.com/search/user?q={quote(term)}",
+        'profile_pattern': r'^https?://(?:www\.)?tiktok\.com/@([A-Za-z0-9_.]+)/?$',
+        'card_selector': '[data-e2e="search-user-container"], div[class*="DivUserContainer"]',
+        'handle_prefix': '@',
+        'delays': (3, 8),
+        'leads_per_scroll': 3,
+    },
+    'instagram': {
+        'search_url': lambda term: f"https://www.instagram.com/explore/tags/{term.replace(' ', '').lower()}/",
+        'profile_pattern': r'^https?://(?:www\.)?instagram\.com/([A-Za-z0-9_.]{1,30})/?$',
+        'card_selector': 'div[role="dialog"] header',
+        'handle_prefix': '@',
+        'delays': (2, 5),
+        'leads_per_scroll': 8,
+    },
+    'medium': {
+        'search_url': lambda term: f"https://medium.com/search?q={quote(term)}",
+        'profile_pattern': r'^https?://(?:www\.)?medium\.com/@([A-Za-z0-9_.-]+)/?(?:\?.*)?$',
+        'card_selector': 'article, div[data-testid="post-preview"]',
+        'handle_prefix': '@',
+        'delays': (3, 5),
+        'leads_per_scroll': 3,
+    },
+    'reddit': {
+        'search_url': lambda term: f"https://www.reddit.com/search/?q={quote(term)}&type=comment",
+        'profile_pattern': r'^https?://(?:www\.)?reddit\.com/user/([A-Za-z0-9_-]{3,20})/?$',
+        'card_selector': 'shreddit-comment, [data-testid="search-comment"], article',
+        'handle_prefix': 'u/',
+        'delays': (5, 12),
+        'leads_per_scroll': 3,
+    },
+}
+
+# Platforms whose sync scrapers keep only classified end customers (keyword_matcher)
+END_CUSTOMER_PLATFORMS = ('reddit', 'medium')
+
+# Generic card collector: one round-trip returns every profile link on the page
+# together with the text of the card that contains it.
+COLLECT_CARDS_JS = """
+({pattern, cardSelector}) => {
+    const re = new RegExp(pattern);
+    const seen = new Set();
+    const out = [];
+    for (const a of document.querySelectorAll('a[href]')) {
+        const href = a.href.split('#')[0];
+        const m = href.match(re);
+        if (!m || seen.has(m[1])) continue;
+        seen.add(m[1]);
+        const card = (cardSelector && a.closest(cardSelector)) || a.parentElement;
+        out.push({
+            handle: m[1],
+            href: href,
+            link_text: (a.innerText || '').trim(),
+            card_text: ((card && card.innerText) || '').trim().slice(0, 1000),
+        });
+    }
+    return out;
+}
+"""
+
+
+def load_storage_state(platform):
+    """Load ``<platform>_auth.json``; returns (storage_state, cookies)"""
+    auth_file = f"{platform}_auth.json"
+    if not os.path.exists(auth_file):
+        return None, None
+    try:
+        with open(auth_file, "r") as f:
+            state = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read {auth_file}: {e}")
+        return None, None
+
+    # Some auth files are a bare cookie list rather than a storage state
+    if isinstance(state, list):
+        return None, state
+    return state, None
+
+
+async def stealth_delay(min_sec, max_sec, reason=""):
+    """Async version of the scrapers' stealth pause"""
+    delay = max(1, random.uniform(min_sec, max_sec) + random.uniform(-1, 2))
+    if reason:
+        print(f"  🕐 Stealth pause: {delay:.1f}s ({reason})")
+    await asyncio.sleep(delay)
+
+
+async def human_like_scrolling(page, max_scrolls, delays=(1, 3), label=""):
+    """Async version of instagram_scraper.human_like_scrolling"""
+    for i in range(max_scrolls):
+        print(f"  🔄 {label} scroll {i + 1}/{max_scrolls}")
+
+        if random.random() < 0.1:
+            await page.mouse.wheel(0, -100)
+            await asyncio.sleep(random.uniform(0.5, 1.0))
+
+        await page.mouse.wheel(0, random.randint(300, 700))
+
+        if random.random() < 0.3:
+            await asyncio.sleep(random.uniform(delays[1], delays[1] * 2))
+        else:
+            await asyncio.sleep(random.uniform(*delays))
+
+        if random.random() < 0.2:
+            await page.mouse.move(random.randint(100, 800), random.randint(100, 600))
+
+
+def _exclude_accounts(platform, leads):
+    """Drop leads whose account is in the platform's excluded_accounts config"""
+    try:
+        from config_loader import config_loader, should_exclude_account
+    except ImportError:
+        return leads
+    prefix = PLATFORM_SPECS[platform]['handle_prefix']
+    kept = [lead for lead in leads
+            if not should_exclude_account(lead['handle'][len(prefix):], platform, config_loader)]
+    if len(kept) != len(leads):
+        print(f"  🚫 [{platform}] Excluded {len(leads) - len(kept)} accounts")
+    return kept
+
+
+def _classify_end_customers(platform, leads):
+    """Keep only end customers, scored like reddit_scraper_ec / medium_scraper_ec"""
+    from keyword_matcher import score_medium_end_customer, score_reddit_end_customer
+    niche = "fitness"
+    try:
+        from config_loader import config_loader
+        niche = config_loader.get_platform_config(platform).get("niche", niche)
+    except Exception:
+        pass
+
+    kept = []
+    for lead in leads:
+        text = f"{lead['name']} {lead['bio']}".lower()
+        if platform == 'reddit':
+            is_customer, score, customer_type = score_reddit_end_customer(text, niche)
+            is_customer = is_customer and score >= 1
+        else:
+            is_customer, score, customer_type, _ = score_medium_end_customer(text)
+        if is_customer:
+            lead.update({'relevance_score': score, 'customer_type': customer_type, 'lead_quality': customer_type})
+            kept.append(lead)
+    print(f"  🎯 [{platform}] {len(kept)}/{len(leads)} classified as {niche} end customers")
+    return kept
+
+
+def _card_to_lead(card, platform, spec, search_term):
+    """Turn one collected card into the lead dict shape the savers expect"""
+    handle = card['handle']
+    if not handle.startswith(spec['handle_prefix']):
+        handle = f"{spec['handle_prefix']}{handle}"
+    lines = [line.strip() for line in card.get('card_text', '').split('\n') if line.strip()]
+    name = card.get('link_text') or (lines[0] if lines else card['handle'])
+    name = name.split('\n')[0].strip() or card['handle']
+    bio_lines = [line for line in lines if line != name and card['handle'] not in line]
+    bio = ' '.join(bio_lines)[:300]
+
+    return {
+        'name': name,
+        'handle': handle,
+        'bio': bio,
+        'url': card['href'],
+        'profile_url': card['href'],
+        'platform': platform,
+        'dm': '',
+        'search_term': search_term,
+        'extraction_method': 'async_engine',
+        'extracted_at': datetime.now().isoformat(),
+    }
+
+
+class AsyncScraperEngine:
+    """Drive several platform scrapes concurrently on one browser"""
+
+    def __init__(self, search_term, max_scrolls, username, headless=True, save_raw=True):
+        self.search_term = search_term
+        self.max_scrolls = int(max_scrolls or 5)
+        self.username = username or "anonymous"
+        self.track_usage = bool(username)
+        self.headless = headless
+        self.save_raw = save_raw
+        self.browser = None
+
+    async def _new_context(self, platform):
+        storage_state, cookies = load_storage_state(platform)
+        context = await self.browser.new_context(
+            storage_state=storage_state,
+            user_agent=DEFAULT_USER_AGENT,
+            viewport={'width': 1366, 'height': 768},
+            locale='en-US',
+        )
+        if cookies:
+            await context.add_cookies(cookies)
+        await context.add_init_script(STEALTH_INIT_SCRIPT)
+        await apply_route_policy_async(context, platform)
+        return context
+
+    async def _collect_cards(self, page, spec):
+        return await page.evaluate(
+            COLLECT_CARDS_JS,
+            {'pattern': spec['profile_pattern'], 'cardSelector': spec['card_selector']},
+        )
+
+    async def _collect_instagram_cards(self, page, spec, max_posts=40):
+        """Instagram hashtag grids only link posts; the owner is in each post modal"""
+        hrefs = await page.eval_on_selector_all(
+            'a[href^="/p/"], a[href^="/reel/"], a[href^="/tv/"]',
+            'els => [...new Set(els.map(e => e.getAttribute("href")))]',
+        )
+        cards = []
+        for href in hrefs[:max_posts]:
+            try:
+                await page.click(f'a[href="{href}"]', timeout=10000)
+                await page.wait_for_selector('div[role="dialog"]', timeout=12000)
+                cards.extend(await self._collect_cards(page, spec))
+            except Exception as e:
+                print(f"    ⚠️ Instagram modal error: {str(e)[:120]}")
+            finally:
+                try:
+                    await page.keyboard.press("Escape")
+                except Exception:
+                    pass
+                await asyncio.sleep(random.uniform(0.6, 1.5))
+        return cards
+
+    def _check_limits(self, platform):
+        """setup_scraper_with_limits for the engine's username: (can_proceed, message)"""
+        if not self.track_usage:
+            return True, "No username - proceeding without limits"
+        from usage_tracker import usage_tracker
+        estimated = self.max_scrolls * PLATFORM_SPECS[platform]['leads_per_scroll']
+        return usage_tracker.check_user_limits(self.username, estimated, platform)
+
+    async def scrape_platform(self, platform):
+        """Scrape one platform inside its own context; returns a runner-style result"""
+        spec = PLATFORM_SPECS[platform]
+        start_time = time.time()
+        can_proceed, message = await asyncio.to_thread(self._check_limits, platform)
+        if not can_proceed:
+            print(f"❌ [{platform}] {message}")
+            return {'platform': platform, 'success': False, 'duration': 0, 'leads': 0, 'error': message}
+        context = await self._new_context(platform)
+        page = await context.new_page()
+
+        try:
+            search_url = spec['search_url'](self.search_term)
+            print(f"🔍 [{platform}] {search_url}")
+            await page.goto(search_url, timeout=60000)
+            await stealth_delay(*spec['delays'], reason=f"{platform} page load")
+
+            await human_like_scrolling(page, self.max_scrolls, spec['delays'], label=platform)
+
+            if platform == 'instagram':
+                cards = await self._collect_instagram_cards(page, spec)
+            else:
+                cards = await self._collect_cards(page, spec)
+
+            raw_leads = [_card_to_lead(card, platform, spec, self.search_term) for card in cards]
+            leads, save_info = await asyncio.to_thread(self._finish_platform, platform, raw_leads)
+
+            duration = time.time() - start_time
+            print(f"✅ [{platform}] {len(leads)} leads in {duration:.1f}s")
+            return {
+                'platform': platform,
+                'success': True,
+                'duration': duration,
+                'leads': len(leads),
+                'raw_leads': len(raw_leads),
+                'files': save_info,
+            }
+        except Exception as e:
+            duration = time.time() - start_time
+            print(f"💥 [{platform}] crashed after {duration:.1f}s: {e}")
+            return {'platform': platform, 'success': False, 'duration': duration, 'leads': 0, 'error': str(e)}
+        finally:
+            await context.close()
+
+    def _finish_platform(self, platform, raw_leads):
+        """Blocking post-processing (exclusions, classifiers, dedup, limits, DMs, CSV) run off the event loop"""
+        raw_leads = _exclude_accounts(platform, raw_leads)
+        if platform in END_CUSTOMER_PLATFORMS:
+            raw_leads = _classify_end_customers(platform, raw_leads)
+        if not raw_leads:
+            return [], []
+
+        try:
+            from smart_duplicate_handler import process_leads_with_smart_deduplication
+            leads, _stats = process_leads_with_smart_deduplication(
+                raw_leads=raw_leads, username=self.username, platform=platform
+            )
+        except ImportError:
+            leads = raw_leads
+
+        if leads and self.track_usage:
+            try:
+                from usage_tracker import finalize_scraper_results
+                leads = finalize_scraper_results(platform, leads, self.search_term, self.username)
+            except Exception as e:
+                print(f"⚠️ [{platform}] Error finalizing results: {e}")
+
+        try:
+            from dm_sequences import generate_dms_for_leads
+            generate_dms_for_leads(leads, platform=platform)
+        except Exception as e:
+            print(f"⚠️ [{platform}] DM generation skipped: {e}")
+
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+        files = save_leads_to_files(
+            leads=leads,
+            raw_leads=raw_leads,
+            username=str(self.username),
+            timestamp=timestamp,
+            platform_name=platform,
+            csv_dir=CSV_DIR,
+            save_raw=self.save_raw,
+        )
+        return leads, files
+
+    async def run(self, platforms):
+        """Run every platform concurrently; returns {platform: result}"""
+        platforms = [p for p in platforms if p in PLATFORM_SPECS]
+        async with async_playwright() as p:
+            self.browser = await p.chromium.launch(headless=self.headless, args=BROWSER_ARGS)
+            try:
+                results = await asyncio.gather(
+                    *(self.scrape_platform(platform) for platform in platforms),
+                    return_exceptions=True,
+                )
+            finally:
+                await self.browser.close()
+                self.browser = None
+
+        out = {}
+        for platform, result in zip(platforms, results):
+            if isinstance(result, Exception):
+                result = {'platform': platform, 'success': False, 'duration': 0, 'leads': 0, 'error': str(result)}
+            out[platform] = result
+        return out
+
+
+def run_async_scrapers(platforms, search_term, max_scrolls, username):
+    """Sync entry point: scrape ``platforms`` concurrently on one browser"""
+    engine = AsyncScraperEngine(search_term, max_scrolls, username)
+    return asyncio.run(engine.run(platforms))
+
+
+def async_engine_enabled():
+    """Opt-in only (SCRAPER_ENGINE=async): lead quality differs from the sync scrapers, see module docstring"""
+    return os.getenv("SCRAPER_ENGINE", "subprocess").lower() == "async"
+
+
+if __name__ == "__main__":
+    term = os.getenv("FRONTEND_SEARCH_TERM", "fitness coach")
+    user = os.getenv("SCRAPER_USERNAME", "anonymous")
+    results = run_async_scrapers(["twitter", "youtube"], term, 3, user)
+    for platform, result in results.items():
+        status = "✅" if result.get("success") else "❌"
+        print(f"  {status} {platform}: {result.get('leads', 0)} leads ({result.get('duration', 0):.1f}s)")
@@ -0,0 +1,273 @@
+# browser_setup.py - Shared Chromium launch/context setup for the scrapers
+
+"""
+One place to launch Chromium and open a scraper context.
+
+launch_browser() merges a scraper's own flags with the common ones, and
+new_scraper_context() accepts any form of ``<platform>_auth.json`` (storage
+state dict, file path, or a bare cookie list) and installs the platform's
+request routing policy:
+
+- the scrapers only read text and hrefs, so images, video and fonts are
+  aborted (per platform, see ROUTE_POLICIES)
+- well-known analytics/ad hosts are aborted everywhere
+- documents, scripts, stylesheets and XHR/fetch (the JSON feeds that fill
+  result pages) always go through
+
+Only URLs that look like a blockable resource (file extension per type, see
+TYPE_URL_PATTERNS, or a tracker host) are routed. Playwright matches a regex
+route in its driver, so everything else - documents, scripts, XHR - never
+waits on the Python side, even while a sync scraper is inside time.sleep().
+Heavy resources served without a recognisable extension are not blocked.
+
+When a routed page or context closes, the blocked requests are printed with
+an estimate of the bytes saved and added to the run's scraper_result
+(``network``). Aborted requests are never downloaded, so their size is
+estimated from typical sizes per resource type (ESTIMATED_BYTES).
+
+Set SCRAPER_BLOCK_RESOURCES=0 to load everything, or
+SCRAPER_BLOCK_TYPES_<PLATFORM>=image,media to override a platform's types.
+"""
+
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+import scraper_result
+
+SCRAPER_BLOCK_RESOURCES = os.getenv("SCRAPER_BLOCK_RESOURCES", "1").lower() not in ("0", "false", "no")
+
+BASE_BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+]
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "scorecardresearch.com", "hotjar.com", "segment.io", "amplitude.com",
+    "branch.io", "quantserve.com", "ads-twitter.com", "analytics.tiktok.com",
+)
+
+HEAVY_TYPES = ("image", "media", "font")
+
+# block_types: Playwright resource types to abort; allow_urls: substrings that
+# are always loaded (captcha/challenge assets the scraper may need to see)
+ROUTE_POLICIES = {
+    "twitter": {"block_types": HEAVY_TYPES},
+    "tiktok": {"block_types": HEAVY_TYPES, "allow_urls": ("captcha", "verify")},
+    "youtube": {"block_types": HEAVY_TYPES},
+    "instagram": {"block_types": HEAVY_TYPES, "allow_urls": ("challenge",)},
+    "facebook": {"block_types": HEAVY_TYPES, "allow_urls": ("checkpoint", "captcha")},
+    "medium": {"block_types": HEAVY_TYPES},
+    "reddit": {"block_types": HEAVY_TYPES},
+    # LinkedIn falls back to a manual mode where someone reads the window, so keep images
+    "linkedin": {"block_types": ("media", "font")},
+}
+
+# URL shapes routed to the policy for each blockable resource type
+TYPE_URL_PATTERNS = {
+    "image": r"\.(?:jpe?g|png|gif|webp|avif|bmp|ico|svg|image)(?:[?#]|$)|[?&]format=(?:jpe?g|png|webp)",
+    "media": r"\.(?:mp4|webm|m4s|m4a|m3u8|mp3|mov|ogg|aac)(?:[?#]|$)|/videoplayback\?",
+    "font": r"\.(?:woff2?|ttf|otf|eot)(?:[?#]|$)",
+    "stylesheet": r"\.css(?:[?#]|$)",
+    "script": r"\.m?js(?:[?#]|$)",
+}
+
+# Rough transfer size of one aborted request, used for the "bytes saved" estimate
+ESTIMATED_BYTES = {"image": 45_000, "media": 750_000, "font": 35_000, "tracker": 25_000}
+
+
+class RoutePolicy:
+    """Which requests a platform's pages abort"""
+
+    def __init__(self, block_types=(), allow_urls=(), block_domains=TRACKER_DOMAINS):
+        self.block_types = frozenset(block_types)
+        self.allow_urls = tuple(allow_urls)
+        self.block_domains = tuple(block_domains)
+
+    def url_pattern(self) -> Optional["re.Pattern"]:
+        """Regex for the URLs worth routing to blocked_as(), None if nothing can match"""
+        parts = [TYPE_URL_PATTERNS[t] for t in sorted(self.block_types) if t in TYPE_URL_PATTERNS]
+        if self.block_domains:
+            hosts = "|".join(re.escape(d) for d in self.block_domains)
+            parts.append(rf"^[a-z]+://(?:[^/?#]*\.)?(?:{hosts})(?:[/:?#]|$)")
+        return re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+    def blocked_as(self, resource_type: str, url: str) -> Optional[str]:
+        """Stats key ('image', 'tracker', ...) if the request should be aborted, else None"""
+        if self.allow_urls and any(part in url for part in self.allow_urls):
+            return None
+        if resource_type in self.block_types:
+            return resource_type
+        host = url.split("://", 1)[-1].split("/", 1)[0]
+        if any(host == d or host.endswith("." + d) for d in self.block_domains):
+            return "tracker"
+        return None
+
+
+def get_route_policy(platform: str) -> RoutePolicy:
+    spec = dict(ROUTE_POLICIES.get(platform, {"block_types": HEAVY_TYPES}))
+    override = os.getenv(f"SCRAPER_BLOCK_TYPES_{platform.upper()}")
+    if override is not None:
+        spec["block_types"] = tuple(t.strip() for t in override.split(",") if t.strip())
+    return RoutePolicy(**spec)
+
+
+def _format_bytes(n: int) -> str:
+    return f"{n / 1_000_000:.1f} MB" if n >= 1_000_000 else f"{n / 1_000:.0f} KB"
+
+
+class RouteStats:
+    """Allowed/blocked request counts for one routed page or context"""
+
+    def __init__(self, platform: str):
+        self.platform = platform
+        self.requests = 0
+        self.blocked = Counter()
+        self.reported = False
+
+    @property
+    def bytes_saved_est(self) -> int:
+        return sum(ESTIMATED_BYTES.get(kind, 0) * n for kind, n in self.blocked.items())
+
+    def summary(self) -> Dict:
+        blocked = sum(self.blocked.values())
+        return {
+            "requests": max(self.requests, blocked),
+            "blocked": blocked,
+            "blocked_by_type": dict(self.blocked),
+            "bytes_saved_est": self.bytes_saved_est,
+        }
+
+    def report(self):
+        """Print once and fold into this process's per-platform totals / scraper_result"""
+        if self.reported:
+            return
+        self.reported = True
+        s = self.summary()
+        if not s["requests"]:
+            return
+        kinds = ", ".join(f"{k} {n}" for k, n in self.blocked.most_common())
+        print(f"🚫 [{self.platform}] Blocked {s['blocked']}/{s['requests']} requests"
+              + (f" ({kinds})" if kinds else "")
+              + f" - ~{_format_bytes(s['bytes_saved_est'])} saved (estimated)")
+        with _totals_lock:
+            totals = _current_totals()
+            total = totals.setdefault(self.platform, {"requests": 0, "blocked": 0, "blocked_by_type": {},
+                                                      "bytes_saved_est": 0})
+            total["requests"] += s["requests"]
+            total["blocked"] += s["blocked"]
+            total["bytes_saved_est"] += s["bytes_saved_est"]
+            for kind, n in self.blocked.items():
+                total["blocked_by_type"][kind] = total["blocked_by_type"].get(kind, 0) + n
+            network = {platform: dict(t) for platform, t in totals.items()}
+        scraper_result.report(network=network)
+
+
+_totals = {"path": None, "platforms": {}}
+_totals_lock = threading.Lock()
+
+
+def _current_totals() -> Dict:
+    """This run's per-platform totals; reset when a new result path is assigned (warm workers reuse the process)"""
+    path = os.getenv(scraper_result.RESULT_FILE_ENV)
+    if path != _totals["path"]:
+        _totals.update(path=path, platforms={})
+    return _totals["platforms"]
+
+
+def apply_route_policy(target, platform: str) -> Optional[RouteStats]:
+    """
+    Route a sync page's or context's blockable-looking requests through the
+    platform policy; stats are reported when ``target`` closes. None when
+    blocking is disabled or the policy blocks nothing.
+    """
+    if not SCRAPER_BLOCK_RESOURCES:
+        return None
+    policy = get_route_policy(platform)
+    pattern = policy.url_pattern()
+    if pattern is None:
+        return None
+    stats = RouteStats(platform)
+
+    def handle(route):
+        request = route.request
+        kind = policy.blocked_as(request.resource_type, request.url)
+        if kind:
+            stats.blocked[kind] += 1
+            route.abort("blockedbyclient")
+        else:
+            route.continue_()
+
+    def count(_):
+        stats.requests += 1
+
+    try:
+        target.route(pattern, handle)
+        target.on("request", count)
+        target.on("close", lambda _: stats.report())
+    except Exception as e:
+        print(f"⚠️ Could not install request routing for {platform}: {e}")
+        return None
+    return stats
+
+
+async def apply_route_policy_async(target, platform: str) -> Optional[RouteStats]:
+    """apply_route_policy for the async API (async_scraper_engine)"""
+    if not SCRAPER_BLOCK_RESOURCES:
+        return None
+    policy = get_route_policy(platform)
+    pattern = policy.url_pattern()
+    if pattern is None:
+        return None
+    stats = RouteStats(platform)
+
+    async def handle(route):
+        request = route.request
+        kind = policy.blocked_as(request.resource_type, request.url)
+        if kind:
+            stats.blocked[kind] += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    def count(_):
+        stats.requests += 1
+
+    try:
+        await target.route(pattern, handle)
+        target.on("request", count)
+        target.on("close", lambda _: stats.report())
+    except Exception as e:
+        print(f"⚠️ Could not install request routing for {platform}: {e}")
+        return None
+    return stats
+
+
+def launch_browser(p, args=None, headless: bool = True):
+    """Launch Chromium with the common flags plus a scraper's own ``args``"""
+    merged = list(dict.fromkeys(BASE_BROWSER_ARGS + list(args or [])))
+    return p.chromium.launch(headless=headless, args=merged)
+
+
+def new_scraper_context(browser, platform: str, storage_state=None, user_agent: str = DEFAULT_USER_AGENT,
+                        **kwargs):
+    """
+    New context with the platform's auth and routing policy. ``storage_state``
+    may be a storage state dict, a file path, or a bare cookie list (some
+    auth files are just the cookies).
+    """
+    cookies = None
+    if isinstance(storage_state, list):
+        cookies, storage_state = storage_state, None
+    if storage_state:
+        kwargs["storage_state"] = storage_state
+    context = browser.new_context(user_agent=user_agent, **kwargs)
+    if cookies:
+        context.add_cookies(cookies)
+    apply_route_policy(context, platform)
+    return context
@@ -153,14 +153,20 @@ def apply_deduplication_strategy(raw_leads, username, platform, mode=None):
         return unique_leads, raw_leads, stats
         
     elif mode == DeduplicationMode.AGGRESSIVE:
-        print("📋 Mode: AGGRESSIVE - Name-based removal (not recommended)")
+        print("📋 Mode: AGGRESSIVE - Identity/name-based removal (not recommended)")
+        from lead_identity import canonical_identity_key
         unique_leads = []
         seen_names = set()
+        seen_identities = set()
         for lead in raw_leads:
             name_key = lead.get('name', '').lower().strip()
-            if name_key not in seen_names and len(name_key) > 1:
-                unique_leads.append(lead)
-                seen_names.add(name_key)
+            identity = canonical_identity_key(lead, platform)
+            if len(name_key) <= 1 or name_key in seen_names or (identity and identity in seen_identities):
+                continue
+            unique_leads.append(lead)
+            seen_names.add(name_key)
+            if identity:
+                seen_identities.add(identity)
         
         stats = {
             "mode": "aggressive",
@@ -0,0 +1,224 @@
+"""
+Persistent, content-addressed cache for generated DMs.
+
+Leads that share a persona, platform, language and (normalized) bio get the
+same prompt apart from their first name, so one OpenAI answer can serve all
+of them. Bodies are stored with the recipient's first name replaced by a
+placeholder and the current lead's name is substituted back on a hit.
+
+Entries live in a small SQLite file with a TTL and LRU size cap, by default
+next to the lead files in CSV_DIR (the persistent volume) so the cache
+survives container restarts.
+Settings: DM_CACHE_ENABLED, DM_CACHE_PATH, DM_CACHE_TTL_HOURS, DM_CACHE_MAX_ENTRIES.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+DM_CACHE_ENABLED = os.getenv("DM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+DM_CACHE_PATH = os.getenv("DM_CACHE_PATH") or os.path.join(os.getenv("CSV_DIR", "client_configs"), "dm_cache.db")
+DM_CACHE_TTL_HOURS = float(os.getenv("DM_CACHE_TTL_HOURS", "168"))
+DM_CACHE_MAX_ENTRIES = int(os.getenv("DM_CACHE_MAX_ENTRIES", "5000"))
+
+NAME_PLACEHOLDER = "{{name}}"
+
+# Names too generic to template out of a cached body
+_GENERIC_NAMES = {"there", "friend", "user", "hi", "hey", "hello"}
+
+
+def normalize_bio(bio: str) -> str:
+    """Lowercase, collapse whitespace and drop punctuation/emoji noise"""
+    bio = str(bio or "").lower()
+    bio = re.sub(r"[^\w\s]", " ", bio)
+    return re.sub(r"\s+", " ", bio).strip()
+
+
+def _first_name(name: str) -> str:
+    parts = str(name or "").split()
+    return parts[0] if parts else ""
+
+
+class DMCache:
+    """SQLite-backed DM cache with TTL, LRU eviction and hit/miss counters"""
+
+    def __init__(self, db_path: str = None, ttl_hours: float = None, max_entries: int = None):
+        self.db_path = db_path or DM_CACHE_PATH
+        self.ttl_seconds = (DM_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours) * 3600
+        self.max_entries = DM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_database(self):
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS dm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    persona TEXT,
+                    platform TEXT,
+                    language TEXT,
+                    body TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hit_count INTEGER DEFAULT 0
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_dm_cache_last_used ON dm_cache(last_used)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(persona: str, platform: str, language: str, bio: str, variant: str = "dm") -> str:
+        """Content address of the prompt inputs (everything except the name)"""
+        raw = "|".join([variant, str(persona or "default"), str(platform or "").lower(),
+                        str(language or "english").lower(), normalize_bio(bio)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def key_lock(self, cache_key: str):
+        """Let only one thread generate a given key; the others then hit the cache"""
+        # [lock, threads holding or waiting]; dropped once nobody needs it so the dict stays small
+        with self._key_locks_lock:
+            entry = self._key_locks.setdefault(cache_key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._key_locks_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[cache_key]
+
+    def _count(self, field: str, n: int = 1):
+        with self._counter_lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def get(self, cache_key: str, name: str) -> Optional[str]:
+        """Cached DM with ``name`` substituted in, or None"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT body, created_at FROM dm_cache WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if not row or now - row[1] > self.ttl_seconds:
+                self._count("misses")
+                return None
+            with conn:
+                conn.execute(
+                    "UPDATE dm_cache SET last_used = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                    (now, cache_key)
+                )
+        finally:
+            conn.close()
+
+        self._count("hits")
+        first_name = _first_name(name) or "there"
+        return row[0].replace(NAME_PLACEHOLDER, first_name)
+
+    def put(self, cache_key: str, dm: str, name: str, persona: str = None, platform: str = None,
+            language: str = None):
+        """Store a generated DM with the recipient's first name templated out"""
+        if not dm:
+            return
+        body = dm
+        first_name = _first_name(name)
+        if len(first_name) >= 2 and first_name.lower() not in _GENERIC_NAMES:
+            body = re.sub(rf"(?<!\w){re.escape(first_name)}(?!\w)", NAME_PLACEHOLDER, dm)
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO dm_cache VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (cache_key, persona, platform, language, body, now, now)
+                )
+            self._count("stores")
+            if self.stores % 50 == 1:
+                self._evict(conn, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn, now: float):
+        """Drop expired rows, then least-recently-used rows beyond max_entries"""
+        with conn:
+            expired = conn.execute(
+                "DELETE FROM dm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            overflow = conn.execute("SELECT COUNT(*) FROM dm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM dm_cache WHERE cache_key IN "
+                    "(SELECT cache_key FROM dm_cache ORDER BY last_used ASC LIMIT ?)", (overflow,)
+                )
+        self._count("evictions", expired + max(overflow, 0))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"🗃️ DM cache: {s['hits']} hits / {s['misses']} misses ({s['hit_rate']}% hit rate), "
+              f"{s['stores']} stored, {s['evictions']} evicted")
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM dm_cache")
+        finally:
+            conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_dm_cache() -> Optional[DMCache]:
+    """Process-wide cache instance, or None when disabled/unavailable"""
+    global _cache
+    if not DM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = DMCache()
+            except Exception as e:
+                print(f"⚠️ DM cache unavailable: {e}")
+                return None
+        return _cache
+
+
+def cache_lock_for(cache: Optional[DMCache], cache_key: Optional[str]):
+    """key_lock when caching is on, otherwise a no-op context"""
+    return cache.key_lock(cache_key) if cache and cache_key else nullcontext()
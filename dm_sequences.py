@@ -3,6 +3,12 @@ from personas import PERSONAS, match_persona
 import json
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dm_cache import get_dm_cache, cache_lock_for
+import scraper_progress
 
 # Import multilingual capabilities
 try:
@@ -30,6 +36,11 @@ PLATFORM_SETTINGS = {
     "default": {"max_length": 200, "style": "professional", "emojis": False}
 }
 
+# Batched DM generation: bounded concurrency and retry/backoff for OpenAI calls
+DM_MAX_CONCURRENCY = int(os.getenv("DM_MAX_CONCURRENCY", "8"))
+DM_MAX_RETRIES = int(os.getenv("DM_MAX_RETRIES", "4"))
+DM_BACKOFF_BASE = float(os.getenv("DM_BACKOFF_BASE", "1.0"))
+
 # Load keyword config once
 try:
     with open("persona_keywords.json", "r") as f:
@@ -102,6 +113,52 @@ def initialize_openai_client():
             print("⚠️ OpenAI library not found")
             return None, None
 
+_client_lock = threading.Lock()
+_shared_client = (None, None)
+
+def get_shared_openai_client():
+    """Return one OpenAI client per process instead of creating one per DM"""
+    global _shared_client
+    with _client_lock:
+        if _shared_client[0] is None:
+            _shared_client = initialize_openai_client()
+        return _shared_client
+
+def _is_retryable_openai_error(e: Exception) -> bool:
+    """Rate limits, timeouts and 5xx responses are worth retrying"""
+    if type(e).__name__ in ("RateLimitError", "APITimeoutError", "APIConnectionError",
+                            "InternalServerError", "ServiceUnavailableError", "Timeout"):
+        return True
+    status = getattr(e, "status_code", None) or getattr(e, "http_status", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+def _retry_after_seconds(e: Exception):
+    """Honour the server's Retry-After header when the error carries one"""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or getattr(e, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+def generate_dm_completion(client, version, messages, max_retries: int = None, **kwargs) -> str:
+    """Call the matching OpenAI API version, backing off on rate limits and transient errors"""
+    max_retries = DM_MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        try:
+            if version == "v1":
+                return generate_dm_with_openai_v1(client, messages, **kwargs)
+            elif version == "v0":
+                return generate_dm_with_openai_v0(client, messages, **kwargs)
+            raise Exception("Unknown OpenAI version")
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable_openai_error(e):
+                raise
+            delay = _retry_after_seconds(e) or min(30.0, DM_BACKOFF_BASE * (2 ** attempt))
+            delay += random.uniform(0, DM_BACKOFF_BASE)
+            print(f"⏳ OpenAI {type(e).__name__}, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
 def generate_dm_with_openai_v1(client, messages, model="gpt-4o-mini", temperature=0.7, max_tokens=200):
     """Generate DM using OpenAI v1.x.x"""
     response = client.chat.completions.create(
@@ -144,7 +201,8 @@ def get_platform_fallback(name: str, platform: str, language: str = "english") -
     
     return fallbacks.get(platform, f"Hi {first_name}, just reaching out to connect with like-minded professionals on {platform.capitalize()}!")
 
-def generate_dm_with_fallback(name: str, bio: str, platform: str, language: str = None, auto_detect_language: bool = True) -> str:
+def generate_dm_with_fallback(name: str, bio: str, platform: str, language: str = None, auto_detect_language: bool = True,
+                              client=None, version: str = None) -> str:
     """
     Generate personalized DM with automatic fallback - Enhanced with multilingual support
     
@@ -154,6 +212,7 @@ def generate_dm_with_fallback(name: str, bio: str, platform: str, language: str
         platform: Platform name
         language: Target language (None for auto-detection)
         auto_detect_language: Whether to auto-detect language from bio/name
+        client, version: OpenAI client to reuse (defaults to the shared client)
     """
     
     # Auto-detect language if enabled and not specified
@@ -166,7 +225,7 @@ def generate_dm_with_fallback(name: str, bio: str, platform: str, language: str
     # Use multilingual generation if available and not English
     if MULTILINGUAL_AVAILABLE and language != "english":
         print(f"🌍 Using multilingual generation for {language}")
-        result = generate_multilingual_dm(name, bio, platform, language)
+        result = generate_multilingual_dm(name, bio, platform, language, client=client, version=version)
         return result["dm"]
     
     # Original English generation logic
@@ -196,34 +255,106 @@ def generate_dm_with_fallback(name: str, bio: str, platform: str, language: str
     print(f"🧠 Using persona: {persona} for {platform} in {language}")
     
     # Try OpenAI API
-    client, version = initialize_openai_client()
+    if client is None:
+        client, version = get_shared_openai_client()
     
     if client is None:
         print("⚠️ OpenAI not available, using platform-specific fallback")
         return get_platform_fallback(name, platform, language)
     
+    # Same persona/platform/language/bio -> reuse a cached body with this lead's name
+    cache = get_dm_cache()
+    cache_key = cache.make_key(persona, platform, language, bio) if cache else None
+    
     try:
-        messages = [
-            {"role": "system", "content": f"You're a social media outreach assistant skilled at writing platform-specific DMs. Adapt your writing style to {platform} culture and audience expectations."},
-            {"role": "user", "content": enhanced_prompt}
-        ]
-        
-        if version == "v1":
-            raw_message = generate_dm_with_openai_v1(client, messages)
-        elif version == "v0":
-            raw_message = generate_dm_with_openai_v0(client, messages)
-        else:
-            raise Exception("Unknown OpenAI version")
-        
-        # Apply platform-specific filters
-        final_message = apply_platform_filters(raw_message, platform)
-        return final_message
+        with cache_lock_for(cache, cache_key):
+            if cache_key:
+                cached = cache.get(cache_key, name)
+                if cached:
+                    return apply_platform_filters(cached, platform)
+            
+            messages = [
+                {"role": "system", "content": f"You're a social media outreach assistant skilled at writing platform-specific DMs. Adapt your writing style to {platform} culture and audience expectations."},
+                {"role": "user", "content": enhanced_prompt}
+            ]
+            
+            raw_message = generate_dm_completion(client, version, messages)
+            
+            # Apply platform-specific filters
+            final_message = apply_platform_filters(raw_message, platform)
+            if cache_key:
+                cache.put(cache_key, final_message, name, persona, platform, language)
+            return final_message
             
     except Exception as e:
         print(f"⚠️ GPT API error: {e}")
         print(f"   Using platform-specific fallback instead")
         return get_platform_fallback(name, platform, language)
 
+def map_dm_jobs(func, items: list, max_workers: int = None) -> list:
+    """
+    Run ``func(item)`` over ``items`` with a bounded thread pool.
+    Results come back in input order; OpenAI calls are I/O bound so threads suffice.
+    """
+    if not items:
+        return []
+    max_workers = max(1, min(max_workers or DM_MAX_CONCURRENCY, len(items)))
+    if max_workers == 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dm") as executor:
+        return list(executor.map(func, items))
+
+def generate_dms_for_leads(leads: list, platform: str = None, language: str = None, auto_detect_language: bool = True,
+                           max_workers: int = None, overwrite: bool = False) -> list:
+    """
+    DM generation stage run after extraction: fills ``lead["dm"]`` in bulk.
+
+    Reuses one OpenAI client and runs requests concurrently (DM_MAX_CONCURRENCY),
+    so scrapers no longer block on one LLM round-trip per lead. Leads that
+    already have a DM are left alone unless ``overwrite`` is set.
+    """
+    pending = [lead for lead in leads if overwrite or not lead.get("dm")]
+    if not pending:
+        return leads
+
+    client, version = get_shared_openai_client()
+    started = time.time()
+    print(f"💬 Generating {len(pending)} DMs ({min(max_workers or DM_MAX_CONCURRENCY, len(pending))} concurrent)...")
+
+    generated = [0]
+    generated_lock = threading.Lock()
+
+    def _generate(lead):
+        lead_platform = platform or lead.get("platform") or "twitter"
+        name = lead.get("name") or "there"
+        try:
+            return generate_dm_with_fallback(
+                name=name,
+                bio=lead.get("bio") or "",
+                platform=lead_platform,
+                language=language,
+                auto_detect_language=auto_detect_language,
+                client=client,
+                version=version
+            )
+        except Exception as e:
+            print(f"⚠️ Error generating DM for {name}: {e}")
+            return get_platform_fallback(name, lead_platform, language or "english")
+        finally:
+            with generated_lock:
+                generated[0] += 1
+                scraper_progress.counts(dms_generated=generated[0])
+
+    for lead, dm in zip(pending, map_dm_jobs(_generate, pending, max_workers)):
+        lead["dm"] = dm
+
+    scraper_progress.counts(final=True, dms_generated=len(pending))
+    print(f"✅ Generated {len(pending)} DMs in {time.time() - started:.1f}s")
+    cache = get_dm_cache()
+    if cache:
+        cache.print_stats()
+    return leads
+
 def test_openai_setup():
     """Test OpenAI setup and return status"""
     client, version = initialize_openai_client()
@@ -247,7 +378,8 @@ def test_openai_setup():
     except Exception as e:
         return False, f"OpenAI {version} error: {str(e)}"
 
-def generate_multiple_dms(contacts: list, platform: str = "twitter", language: str = None, auto_detect_language: bool = True) -> list:
+def generate_multiple_dms(contacts: list, platform: str = "twitter", language: str = None, auto_detect_language: bool = True,
+                          max_workers: int = None) -> list:
     """
     Generate DMs for multiple contacts - Enhanced with multilingual support
     
@@ -256,16 +388,18 @@ def generate_multiple_dms(contacts: list, platform: str = "twitter", language: s
         platform: target platform
         language: target language (None for auto-detection)
         auto_detect_language: whether to auto-detect language per contact
+        max_workers: concurrent OpenAI requests (defaults to DM_MAX_CONCURRENCY)
     """
-    results = []
-    
+
     print(f"🚀 Generating DMs for {platform}...")
     if language:
         print(f"🌍 Target language: {language}")
     elif auto_detect_language:
         print(f"🌍 Auto-detecting language per contact")
     
-    for contact in contacts:
+    client, version = get_shared_openai_client()
+    
+    def _generate(contact):
         try:
             # Determine language for this contact
             contact_language = language
@@ -281,10 +415,12 @@ def generate_multiple_dms(contacts: list, platform: str = "twitter", language: s
                 bio=contact.get("bio", ""),
                 platform=platform,
                 language=contact_language,
-                auto_detect_language=False  # We already detected it
+                auto_detect_language=False,  # We already detected it
+                client=client,
+                version=version
             )
             
-            results.append({
+            return {
                 "name": contact.get("name"),
                 "bio": contact.get("bio"),
                 "dm": dm,
@@ -292,14 +428,14 @@ def generate_multiple_dms(contacts: list, platform: str = "twitter", language: s
                 "platform": platform,
                 "language": contact_language or "english",
                 "length": len(dm)
-            })
+            }
             
         except Exception as e:
             print(f"⚠️ Error generating DM for {contact.get('name')}: {e}")
             fallback_language = language or "english"
             fallback_dm = get_platform_fallback(contact.get("name", "there"), platform, fallback_language)
             
-            results.append({
+            return {
                 "name": contact.get("name"),
                 "bio": contact.get("bio"),
                 "dm": fallback_dm,
@@ -308,9 +444,9 @@ def generate_multiple_dms(contacts: list, platform: str = "twitter", language: s
                 "language": fallback_language,
                 "length": len(fallback_dm),
                 "error": str(e)
-            })
+            }
     
-    return results
+    return map_dm_jobs(_generate, contacts, max_workers)
 
 def test_multilingual_features():
     """Test the multilingual capabilities"""
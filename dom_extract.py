@@ -0,0 +1,126 @@
+"""
+Single-round-trip DOM extraction for the sync scrapers.
+
+Reading cards through ElementHandles costs one CDP round-trip per
+``inner_text()`` / ``query_selector()`` / ``get_attribute()`` call, so a page
+of 200 cards with a handful of nested probes each is thousands of calls.
+collect_cards() runs one ``page.evaluate`` instead: it picks the first card
+selector that matches, and returns every card's text, requested attributes
+and the first matches of each probe selector as plain JSON. The scrapers'
+existing Python parsing then runs on those dicts.
+
+Card shape::
+
+    {"text": "...", "attrs": {"href": "/@someone"},
+     "probes": {"h2": [{"text": "Title", "href": null}], ...}}
+
+Probe matches mirror ``element.query_selector(sel)`` (descendants only, in
+document order); ``href`` is the raw attribute like ``get_attribute('href')``.
+Selectors are plain ``document.querySelectorAll`` CSS, so unlike Playwright
+selectors they don't pierce shadow roots.
+
+count_matches() is the cheap version for scroll loops: just how many cards
+are on the page so far.
+
+With ``platform`` set, the card selectors are tried known-good first and the
+outcome is recorded in selector_stats.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+from selector_stats import ordered_selectors, record_selector_attempt
+
+COLLECT_JS = """
+({selectors, minCount, limit, attrs, probes, probeLimit, textFallback}) => {
+    const textOf = (el) => {
+        let text = el.innerText || '';
+        if (textFallback && text.trim().length <= 5) text = el.textContent || '';
+        return text;
+    };
+    const queryAll = (root, selector) => {
+        try { return root.querySelectorAll(selector); } catch (e) { return []; }
+    };
+    for (const selector of selectors) {
+        const nodes = queryAll(document, selector);
+        if (nodes.length <= minCount) continue;
+        const cards = [];
+        for (const el of Array.from(nodes).slice(0, limit || nodes.length)) {
+            const card = {text: textOf(el), attrs: {}, probes: {}};
+            for (const name of attrs) card.attrs[name] = el.getAttribute(name);
+            for (const probe of probes) {
+                card.probes[probe] = Array.from(queryAll(el, probe)).slice(0, probeLimit).map(p => ({
+                    text: p.innerText || '',
+                    href: p.getAttribute('href'),
+                }));
+            }
+            cards.push(card);
+        }
+        return {selector: selector, count: nodes.length, cards: cards};
+    }
+    return {selector: null, count: 0, cards: []};
+}
+"""
+
+
+def collect_cards(page, selectors: Sequence[str], min_count: int = 0, limit: int = None,
+                  attrs: Sequence[str] = (), probes: Sequence[str] = (), probe_limit: int = 1,
+                  text_fallback: bool = False, platform: str = None, scope: str = "cards") -> Dict:
+    """
+    Cards for the first of ``selectors`` matching more than ``min_count``
+    elements, in one evaluate call. Returns ``{"selector", "count", "cards"}``
+    (``count`` is the full match count, ``cards`` is capped at ``limit``).
+    ``text_fallback`` uses textContent when innerText is (nearly) empty.
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    if platform:
+        selectors = ordered_selectors(platform, scope, selectors)
+    try:
+        found = page.evaluate(COLLECT_JS, {
+            "selectors": list(selectors),
+            "minCount": min_count,
+            "limit": limit or 0,
+            "attrs": list(attrs),
+            "probes": list(probes),
+            "probeLimit": probe_limit,
+            "textFallback": text_fallback,
+        })
+    except Exception as e:
+        print(f"⚠️ Card extraction failed for {list(selectors)}: {str(e)[:120]}")
+        return {"selector": None, "count": 0, "cards": []}
+    if platform:
+        record_selector_attempt(platform, scope, selectors, found["selector"], found["count"])
+    return found
+
+
+COUNT_JS = """
+(selectors) => {
+    for (const selector of selectors) {
+        let n = 0;
+        try { n = document.querySelectorAll(selector).length; } catch (e) { continue; }
+        if (n) return n;
+    }
+    return 0;
+}
+"""
+
+
+def count_matches(page, selectors: Sequence[str]) -> Optional[int]:
+    """Match count of the first of ``selectors`` that matches anything, None if the page can't be read"""
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    try:
+        return page.evaluate(COUNT_JS, list(selectors))
+    except Exception:
+        return None
+
+
+def probe_matches(card: Dict, selector: str) -> List[Dict]:
+    """Collected matches of one probe selector inside a card (``[]`` if none)"""
+    return card.get("probes", {}).get(selector) or []
+
+
+def first_probe(card: Dict, selector: str) -> Optional[Dict]:
+    """First match of a probe selector, like ``element.query_selector(selector)``"""
+    matches = probe_matches(card, selector)
+    return matches[0] if matches else None
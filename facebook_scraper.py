@@ -7,10 +7,14 @@ import csv
 import re
 import random
 from dm_sequences import generate_dm_with_fallback
+import scraper_progress
+import scraper_result
+from browser_setup import launch_browser, new_scraper_context
+from dom_extract import collect_cards, count_matches, probe_matches
 import os
 from pathlib import Path
 
-from persistence import save_leads_to_files
+from persistence import save_leads_to_files, open_lead_stream
 
 
 # Use your app volume mount. If you set CSV_DIR in Railway env, it will override.
@@ -136,12 +140,14 @@ def is_relevant_to_search_term(name, title, location):
     # Lower threshold for higher volume
     return relevance_score >= .05, relevance_score
 
-def extract_facebook_profiles(page):
+def extract_facebook_profiles(page, stream=None):
     """Extract profiles from Facebook search results - PRESERVES ALL RAW LEADS"""
     print("📋 Extracting Facebook profiles (preserving all raw leads)...")
     
     results = []
     excluded_count = 0
+    extraction_start = time.time()
+    dm_seconds = 0.0
     
     # Wait for content to load
     time.sleep(DELAY_MIN)
@@ -153,6 +159,7 @@ def extract_facebook_profiles(page):
         
         if any(indicator in current_url.lower() for indicator in ['login', 'checkpoint', 'help', 'error', 'facebook.com/login']):
             print("🚨 Facebook is blocking access or redirected to login")
+            scraper_progress.status("blocked", "Redirected to login")
             print("💡 Please refresh your facebook_auth.json by logging in again")
             return []
             
@@ -175,43 +182,48 @@ def extract_facebook_profiles(page):
     
     try:
         # Primary selector - divs containing Facebook profile links
-        elements = page.query_selector_all('div:has(a[href*="facebook.com"])')
-        print(f"  Found {len(elements)} potential profile containers")
+        primary_selector = 'div:has(a[href*="facebook.com"])'
+        fallback_selectors = [
+            'div[tabindex="0"]',
+            'div[role="button"]', 
+            'div[role="article"]',
+            'a[href*="facebook.com"]'
+        ]
+        link_selectors = [
+            'a[href*="facebook.com"]',
+            'a[href*="/profile"]',
+            'a[href*="profile.php"]'
+        ]
         
-        if len(elements) == 0:
+        # One evaluate picks the first matching selector and returns up to 500 cards with their links
+        found = collect_cards(page, [primary_selector] + fallback_selectors, limit=500,
+                              probes=link_selectors, text_fallback=True, platform=PLATFORM_NAME)
+        elements = found["cards"]
+        if found["selector"] == primary_selector:
+            print(f"  Found {found['count']} potential profile containers")
+        elif elements:
             print("⚠️ No profile containers found - trying fallback approaches")
-            fallback_selectors = [
-                'div[tabindex="0"]',
-                'div[role="button"]', 
-                'div[role="article"]',
-                'a[href*="facebook.com"]'
-            ]
-            
-            for selector in fallback_selectors:
-                elements = page.query_selector_all(selector)
-                if len(elements) > 0:
-                    print(f"  Fallback selector '{selector}' found {len(elements)} elements")
-                    break
+            print(f"  Fallback selector '{found['selector']}' found {found['count']} elements")
         
+        scraper_progress.counts(final=True, elements_found=found["count"])
         if len(elements) == 0:
             print("❌ No elements found with any approach")
             return []
         
         processed = 0
         errors = 0
-        max_elements = min(500, len(elements))
         max_results = 3000  # Increased target for raw leads
         
-        print(f"📊 Processing up to {max_elements} elements...")
+        print(f"📊 Processing up to {len(elements)} elements...")
         
-        for i, element in enumerate(elements[:max_elements]):
+        for i, element in enumerate(elements):
             if len(results) >= max_results:
                 print(f"🎯 Reached processing limit of {max_results} - stopping")
                 break
                 
             try:
                 # Get text content
-                text_content = safe_get_text(element)
+                text_content = element["text"].strip()
                 if not text_content or len(text_content) < 10:
                     continue
                 
@@ -268,27 +280,17 @@ def extract_facebook_profiles(page):
                 
                 # Extract profile URL
                 profile_url = ""
-                try:
-                    link_selectors = [
-                        'a[href*="facebook.com"]',
-                        'a[href*="/profile"]',
-                        'a[href*="profile.php"]'
-                    ]
-                    
-                    for selector in link_selectors:
-                        links = element.query_selector_all(selector)
-                        for link in links:
-                            href = link.get_attribute('href') or ""
-                            if href and ('facebook.com' in href or 'profile' in href):
-                                if href.startswith('/'):
-                                    profile_url = 'https://facebook.com' + href
-                                else:
-                                    profile_url = href
-                                break
-                        if profile_url:
+                for selector in link_selectors:
+                    for link in probe_matches(element, selector):
+                        href = link["href"] or ""
+                        if href and ('facebook.com' in href or 'profile' in href):
+                            if href.startswith('/'):
+                                profile_url = 'https://facebook.com' + href
+                            else:
+                                profile_url = href
                             break
-                except:
-                    pass
+                    if profile_url:
+                        break
                 
                 # Create raw lead (preserve everything)
                 lead = {
@@ -300,6 +302,7 @@ def extract_facebook_profiles(page):
                 
                 # Add platform and DM
                 lead["platform"] = "facebook"
+                dm_start = time.time()
                 try:
                     lead["dm"] = generate_dm_with_fallback(
                         name=lead["name"],
@@ -308,6 +311,7 @@ def extract_facebook_profiles(page):
                     )
                 except Exception as e:
                     lead["dm"] = f"Hi {name}! I noticed you're interested in {SEARCH_TERM}."
+                dm_seconds += time.time() - dm_start
                 
                 # Add Facebook-specific fields
                 lead.update({
@@ -326,6 +330,11 @@ def extract_facebook_profiles(page):
                 })
                 
                 results.append(lead)
+                if stream:
+                    stream.write(lead)
+                # DMs are generated inline here, one per lead
+                scraper_progress.counts(leads_extracted=len(results), excluded=excluded_count,
+                                        dms_generated=len(results))
                 
                 # Progress updates
                 if len(results) % 50 == 0:
@@ -340,6 +349,12 @@ def extract_facebook_profiles(page):
         print(f"  📥 Raw leads extracted: {len(results)}")
         print(f"  🚫 Excluded accounts: {excluded_count}")
         print(f"  ⚠️ Processing errors: {errors}")
+        # DMs are generated inline, so their time is split out of the extraction phase
+        scraper_result.record_phase("dm_generation", dm_seconds)
+        scraper_result.record_phase("extraction", time.time() - extraction_start - dm_seconds)
+        scraper_result.report(excluded=excluded_count)
+        scraper_progress.counts(final=True, leads_extracted=len(results), excluded=excluded_count,
+                                dms_generated=len(results))
         
         # Return ALL raw leads - deduplication happens later with user context
         return results
@@ -348,85 +363,6 @@ def extract_facebook_profiles(page):
         print(f"🚨 Major extraction error: {str(e)}")
         return []
 
-import csv
-from pathlib import Path
-
-def save_leads_to_files(
-    leads,
-    raw_leads,
-    username: str,
-    timestamp: str,
-    *,
-    platform_name: str = None,
-    csv_dir: Path = None,
-    save_raw: bool = None,
-):
-    """
-    Save processed (and optionally raw) leads into your persistent volume.
-    Returns list of saved file paths (strings).
-
-    - Uses csv_dir (default: CSV_DIR).
-    - Infers platform name from PLATFORM_NAME if not provided.
-    - Uses global SAVE_RAW_LEADS if save_raw not provided.
-    - If username is falsy (backend/cron), we tag files as 'system'.
-    """
-    if csv_dir is None:
-        csv_dir = CSV_DIR
-    csv_dir.mkdir(parents=True, exist_ok=True)
-
-    if save_raw is None:
-        save_raw = bool(globals().get("SAVE_RAW_LEADS", False))
-
-    if not platform_name:
-        platform_name = str(globals().get("PLATFORM_NAME", "platform")).strip() or "platform"
-    platform_key = platform_name.lower().replace(" ", "")
-
-    # backend/cron case: username may be None/empty
-    safe_username = (username or "system").strip()
-    files_saved: list[str] = []
-
-    # unified field list (adapt to your schema as needed)
-    fieldnames = [
-        "name", "handle", "bio", "url", "platform", "dm", "title", "location",
-        "followers", "profile_url", "contact_info", "search_term",
-        "extraction_method", "relevance_score", "raw_text_sample", "extracted_at", "is_verified", "has_email", "has_phone"
-    ]
-
-    # 1) Save processed leads
-    if leads:
-        processed_name = f"{platform_key}_leads_{safe_username}_{timestamp}.csv"
-        processed_path = Path(csv_dir) / processed_name
-        with processed_path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(leads)
-        files_saved.append(str(processed_path))
-        print(f"✅ Processed leads saved: {processed_path}")
-
-        # Optional: record to Postgres so stats show instantly
-        try:
-            credit_system = globals().get("credit_system")
-            if credit_system and hasattr(credit_system, "record_lead_download"):
-                credit_system.record_lead_download(
-                    username=safe_username, platform=platform_key, leads_count=len(leads)
-                )
-        except Exception as e:
-            print(f"ℹ️ Could not record lead_download: {e}")
-
-    # 2) Save raw leads (if enabled and different size)
-    if raw_leads and save_raw and (not leads or len(raw_leads) != len(leads)):
-        raw_name = f"{platform_key}_leads_raw_{safe_username}_{timestamp}.csv"
-        raw_path = Path(csv_dir) / raw_name
-        with raw_path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(raw_leads)
-        files_saved.append(str(raw_path))
-        print(f"📋 Raw leads saved to {raw_path}")
-
-    return files_saved
-
-
 def main():
     """Main function with smart user-aware deduplication"""
     
@@ -441,18 +377,12 @@ def main():
     print(f"👤 Running as: {username}")
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    lead_stream = None
 
     with sync_playwright() as p:
         print("🔐 Launching Facebook scraper...")
-        browser = p.chromium.launch(
-            headless=True,
-            args=['--disable-blink-features=AutomationControlled']
-        )
-        
-        context = browser.new_context(
-            storage_state=storage_state,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-        )
+        browser = launch_browser(p, ['--disable-blink-features=AutomationControlled'])
+        context = new_scraper_context(browser, PLATFORM_NAME, storage_state=storage_state)
         
         page = context.new_page()
         
@@ -476,10 +406,12 @@ def main():
             
             # Enhanced scrolling
             print(f"📜 Scrolling {MAX_SCROLLS} times to load profiles...")
+            phase_start = time.time()
             for i in range(MAX_SCROLLS):
                 for micro_scroll in range(3):
                     page.mouse.wheel(0, 800)
                     time.sleep(0.5)
+                scraper_progress.scroll(i + 1, MAX_SCROLLS, count_matches(page, 'div:has(a[href*="facebook.com"])'))
                 
                 if (i + 1) % 5 == 0:
                     print(f"  🔄 Scroll checkpoint {i + 1}/{MAX_SCROLLS}")
@@ -489,15 +421,21 @@ def main():
             
             print("⏳ Stabilizing content...")
             time.sleep(5)
+            scraper_result.record_phase("scrolling", time.time() - phase_start)
             
-            # Extract ALL raw leads
-            raw_leads = extract_facebook_profiles(page)
+            # Extract ALL raw leads (streamed to disk as they are found)
+            lead_stream = open_lead_stream(PLATFORM_NAME, username, timestamp, CSV_DIR)
+            raw_leads = extract_facebook_profiles(page, stream=lead_stream)
             
             if not raw_leads:
                 print("❌ No raw leads extracted")
+                if lead_stream:
+                    lead_stream.abort("no raw leads")
                 browser.close()
                 return []
             
+            phase_start = time.time()
+            
             # 🚀 APPLY SMART USER-AWARE DEDUPLICATION
             print(f"\n🧠 Applying deduplication strategy: {DEDUP_MODE}")
             print(f"👤 User-specific deduplication for: {username}")
@@ -531,6 +469,7 @@ def main():
                         unique_leads.append(lead)
                         seen_names.add(name_key)
                 dedup_stats = {"basic": True, "kept": len(unique_leads)}
+            scraper_result.record_phase("dedup", time.time() - phase_start)
             
             # Final results summary
             print(f"\n📊 FINAL RESULTS SUMMARY:")
@@ -567,10 +506,11 @@ def main():
                     raw_leads=raw_leads,
                     username=username,
                     timestamp=timestamp,
-                    platform_name="facebook",    # This was missing!
+                    platform_name="facebook",
                     csv_dir=CSV_DIR,
                     save_raw=SAVE_RAW_LEADS,
-                    
+                    record_to_credit_system=True,
+                    stream=lead_stream,
                 )
                 
                 # Upload to Google Sheets and send email
@@ -606,9 +546,13 @@ def main():
                     
             else:
                 print("⚠️ No leads to save")
+                if lead_stream:
+                    lead_stream.complete(keep_raw=False, leads=0, raw_leads=len(raw_leads))
                 
         except Exception as e:
             print(f"🚨 Error: {e}")
+            if lead_stream and not lead_stream.closed:
+                lead_stream.abort(e)
             leads = []
         finally:
             print("🔍 Keeping browser open for 3 seconds...")
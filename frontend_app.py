@@ -5,7 +5,6 @@ import sys
 import smtplib 
 import stripe
 import json
-import subprocess
 import pandas as pd
 import glob
 import os
@@ -161,6 +160,7 @@ from user_auth import (
 
 from postgres_credit_system import credit_system
 from database_setup import setup_purchase_tables
+from scrape_job_queue import JobLimitExceeded
 
 from stripe_integration import handle_payment_flow, show_purchase_buttons
 from package_system import show_package_store, show_my_packages
@@ -267,9 +267,21 @@ except NameError:
     CSV_DIR = Path(os.getenv("CSV_DIR", "client_configs")).resolve()
     
 
+def _lead_catalog(csv_dir=None):
+    """Indexed lead-file catalog for CSV_DIR; None means fall back to globbing."""
+    try:
+        from lead_file_catalog import get_catalog
+        return get_catalog(csv_dir or CSV_DIR)
+    except Exception as e:
+        print(f"[catalog] unavailable: {e}")
+        return None
+
 def get_latest_csv(pattern: str):
     import glob, os
     base = CSV_DIR if isinstance(CSV_DIR, Path) else Path(CSV_DIR)
+    catalog = _lead_catalog(base)
+    if catalog and "/" not in pattern:
+        return catalog.latest(pattern, root=base)
     files = sorted(
         glob.glob(str(base / pattern)),
         key=os.path.getmtime,
@@ -457,6 +469,9 @@ def _auth_snapshot():
 EMPIRE_CACHE_DIR: Path = CSV_DIR
 
 def get_latest_csv(pattern: str) -> str | None:
+    catalog = _lead_catalog(CSV_DIR)
+    if catalog and "/" not in pattern:
+        return catalog.latest(pattern, root=CSV_DIR)
     files = sorted(CSV_DIR.glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
     return str(files[0]) if files else None
 
@@ -465,6 +480,14 @@ CSV_DIR = Path(os.environ.get("CSV_DIR", "client_configs")).resolve()
 def _latest_nonempty_for_user(pattern: str, username: str):
     """Return newest non-empty CSV under CSV_DIR matching pattern & username."""
     import glob, os, re, pandas as pd
+    catalog = _lead_catalog(CSV_DIR)
+    if catalog and "/" not in pattern:
+        # Indexed: row counts are already known, no CSV parsing
+        rx = re.compile(re.escape(username) if username else ".*", re.I)
+        for row in catalog.find(pattern, root=CSV_DIR, min_rows=1, recursive=True):
+            if rx.search(row["path"]):
+                return row["path"]
+        return None
     rx = re.compile(re.escape(username) if username else ".*", re.I)
     candidates = sorted(
         glob.glob(str(CSV_DIR / pattern)) + glob.glob(str(CSV_DIR / "**" / pattern), recursive=True),
@@ -1242,6 +1265,9 @@ def _guess_platform_from_filename(path: str) -> str:
 
 def _files_for_user(u: str, csv_dir: Path | None = None):
     base = str(csv_dir or CSV_DIR)
+    catalog = _lead_catalog(base)
+    if catalog:
+        return [row["path"] for row in catalog.files_for_user(u, root=base)]
     files = []
     for pat in (f"*{u}*leads*.csv", f"*leads*{u}*.csv", f"*{u}*.csv"):
         files += glob.glob(os.path.join(base, pat))
@@ -1251,19 +1277,32 @@ def _files_for_user(u: str, csv_dir: Path | None = None):
             seen.add(f); uniq.append(f)
     return uniq
 
+from lead_file_stats import column_mode, count_csv_rows
+
 @st.cache_data(show_spinner=False)
 def _calc_platforms(files_sig):
     counts, meta = {}, []
-    for f, _, _ in files_sig:
+    catalog = _lead_catalog()
+    known = catalog.stats_for_paths([f for f, _, _ in files_sig]) if catalog else {}
+    for f, mtime, size in files_sig:
+        row = known.get(f)
+        if row and int(row["mtime"]) == mtime and row["size"] == size:
+            # Row count + dominant platform value come from the catalog
+            n = int(row["row_count"])
+            if n == 0:
+                continue
+            cand = row.get("platform_value")
+            plat = PLATFORM_MAP.get(cand, cand) if cand else _guess_platform_from_filename(f)
+            counts[plat] = counts.get(plat, 0) + n
+            meta.append({"file": f, "platform": plat, "leads": n, "mtime": row["mtime"]})
+            continue
         try:
-            df = pd.read_csv(f)
-            n = int(len(df))
+            n = count_csv_rows(f)
             if n == 0:
                 continue
-            plat_col = next((c for c in df.columns if str(c).lower() in ("platform","source","site","network")), None)
-            if plat_col:
-                cand = str(df[plat_col].astype(str).str.lower().mode().iat[0]) if len(df) else "unknown"
-                plat = PLATFORM_MAP.get(cand, cand or "unknown")
+            cand = column_mode(f, ("platform","source","site","network"))
+            if cand:
+                plat = PLATFORM_MAP.get(cand, cand)
             else:
                 plat = _guess_platform_from_filename(f)
             counts[plat] = counts.get(plat, 0) + n
@@ -1274,17 +1313,31 @@ def _calc_platforms(files_sig):
 
 
 
+def _files_signature(files):
+    """(path, int mtime, size) per file; from the catalog when indexed, else stat()"""
+    catalog = _lead_catalog()
+    known = catalog.stats_for_paths(files) if catalog else {}
+    sig = []
+    for f in files:
+        row = known.get(f)
+        if row:
+            sig.append((f, int(row["mtime"]), row["size"]))
+        elif os.path.exists(f):
+            sig.append((f, int(os.path.getmtime(f)), os.path.getsize(f)))
+    return tuple(sig)
+
 def calculate_empire_from_csvs(username: str, csv_dir: Path | None = None):
     files = _files_for_user(username, csv_dir or CSV_DIR)
-    sig = tuple((f, int(os.path.getmtime(f)), os.path.getsize(f)) for f in files)
+    sig = _files_signature(files)
     counts, _ = _calc_platforms(sig)
     return counts
 
 def get_user_csv_files(username: str, csv_dir: Path | None = None):
     from datetime import datetime
     files = _files_for_user(username, csv_dir or CSV_DIR)
-    sig = tuple((f, int(os.path.getmtime(f)), os.path.getsize(f)) for f in files)
+    sig = _files_signature(files)
     _, meta = _calc_platforms(sig)
+    sizes = {f: s for f, _, s in sig}
     out = []
     for m in meta:
         path = m["file"]
@@ -1294,7 +1347,7 @@ def get_user_csv_files(username: str, csv_dir: Path | None = None):
             "platform": m["platform"],
             "leads": int(m["leads"]),
             "date": datetime.fromtimestamp(m["mtime"]).strftime("%m/%d %H:%M"),
-            "size_mb": round(os.path.getsize(path)/(1024*1024), 3),
+            "size_mb": round(sizes.get(path, 0)/(1024*1024), 3),
         })
     return out
 
@@ -1302,8 +1355,9 @@ def get_user_csv_files(username: str, csv_dir: Path | None = None):
 def load_accurate_empire_stats(username: str):
     """
     Load per-platform totals for this user.
-    - First tries a cached json in the volume (survives deploys).
-    - If missing/stale/empty, rebuild from CSV_DIR and rewrite cache.
+    - First reads the Postgres usage_rollup (O(platforms), survives deploys).
+    - Otherwise rebuilds from CSV_DIR and rewrites the json snapshot.
+    - The json snapshot is only a last resort when neither has data.
     """
     import json, os
     from datetime import datetime
@@ -1314,22 +1368,30 @@ def load_accurate_empire_stats(username: str):
 
     cache_file = EMPIRE_CACHE_DIR / f"empire_totals_{u}.json"
 
-    # 1) Try cache
+    # 1) Rollup maintained by consume_credits / record_lead_download
     try:
-        if cache_file.exists():
-            with open(cache_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            platforms = data.get("platforms", {})
-            total_empire = int(data.get("total_empire", 0))
-            if platforms and total_empire >= 0:
-                return platforms, total_empire
-    except Exception:
-        pass
+        if getattr(credit_system, "use_postgres", False):
+            summary = credit_system.get_usage_summary(u, since_days=None)
+            platforms = {p: n for p, n in summary.get("per_platform", {}).items() if n > 0}
+            if platforms:
+                return platforms, sum(platforms.values())
+    except Exception as e:
+        print(f"[stats] usage rollup unavailable for {u}: {e}")
 
     # 2) Rebuild from CSVs (user-only) and cache it
     platforms = calculate_empire_from_csvs(u)
     total_empire = sum(platforms.values())
 
+    if not platforms:
+        try:
+            if cache_file.exists():
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                return data.get("platforms", {}), int(data.get("total_empire", 0))
+        except Exception:
+            pass
+        return {}, 0
+
     try:
         cache_file.parent.mkdir(parents=True, exist_ok=True)
         with open(cache_file, "w", encoding="utf-8") as f:
@@ -1562,6 +1624,9 @@ import streamlit as st
 @st.cache_data(show_spinner=False)
 def _dynamic_perf_signature(username: str):
     """Return a cache-busting signature (files + mtimes + sizes)."""
+    catalog = _lead_catalog()
+    if catalog:
+        return tuple((r["path"], int(r["mtime"]), r["size"]) for r in catalog.files_for_user(username, root=CSV_DIR))
     pats = [
         os.path.join(CSV_DIR, f"*{username}*leads*.csv"),
         os.path.join(CSV_DIR, f"*leads*{username}*.csv"),
@@ -1588,10 +1653,20 @@ def compute_sidebar_performance(username: str, total_leads: int, empire_stats: d
     successes = 0
     mtimes = []
 
+    catalog = _lead_catalog()
+    known = catalog.stats_for_paths(files) if catalog else {}
+
     for f in files:
         attempts += 1
+        row = known.get(f)
+        if row:
+            # Indexed row count, no CSV parsing
+            if row["row_count"] > 0:
+                successes += 1
+                mtimes.append(row["mtime"])
+            continue
         try:
-            n = len(pd.read_csv(f))
+            n = count_csv_rows(f)
             if n > 0:
                 successes += 1
                 mtimes.append(os.path.getmtime(f))
@@ -2897,14 +2972,7 @@ def finalize_scraper_results(username: str, leads: list, platform: str) -> list:
         # Check if demo user
         if user_plan == 'demo':
             # For demo users, consume demo leads instead of credits
-            leads_to_consume = len(leads)
-            
-            consumed_count = 0
-            for _ in range(leads_to_consume):
-                if credit_system.consume_demo_lead(username):
-                    consumed_count += 1
-                else:
-                    break
+            consumed_count = credit_system.consume_demo_leads(username, len(leads))
             
             # Show demo message
             can_demo, remaining = credit_system.can_use_demo(username)
@@ -2971,13 +3039,8 @@ def process_demo_leads(username: str, leads: list, platform: str) -> list:
         user_info = credit_system.get_user_info(username)
         
         if user_info and user_info.get('plan') == 'demo':
-            # Consume demo leads
-            consumed = 0
-            for lead in leads:
-                if credit_system.consume_demo_lead(username):
-                    consumed += 1
-                else:
-                    break
+            # Consume demo leads (one atomic call, capped at the demo limit)
+            consumed = credit_system.consume_demo_leads(username, len(leads))
             
             print(f"📱 Demo consumption: {consumed} demo leads used")
             
@@ -3323,10 +3386,10 @@ def generate_demo_data_in_memory(search_term, selected_platforms, max_scrolls):
 # ADD THIS FUNCTION BEFORE: simple_auth = SimpleCreditAuth()
 
 def run_empire_scraper_fixed(selected_platforms, search_term, max_scrolls, username, user_plan):
-    """FIXED scraper execution with proper Unicode handling for Windows"""
+    """Queue the complete scraper as a background job; returns the job id (None if nothing was queued)"""
     
     try:
-        print(f"🚀 FIXED SCRAPER: Starting launch...")
+        print(f"🚀 FIXED SCRAPER: Queueing launch...")
         print(f"   User: {username} ({user_plan})")
         print(f"   Platforms: {selected_platforms}")
         print(f"   Search: {search_term}")
@@ -3337,136 +3400,195 @@ def run_empire_scraper_fixed(selected_platforms, search_term, max_scrolls, usern
         
         if not instant_platforms:
             print("📧 LinkedIn or Facebook selected - no instant processing needed")
-            return True
-        
-        print(f"⚡ Processing platforms: {instant_platforms}")
+            return None
         
         # Check if scraper file exists
         scraper_file = "run_daily_scraper_complete.py"
         if not os.path.exists(scraper_file):
             print(f"❌ Scraper file not found: {scraper_file}")
-            return False
-        
-        # Set up environment variables with COMPREHENSIVE encoding fixes
-        env = os.environ.copy()
-        
-        # Set PYTHONPATH to current directory if not set
-        current_dir = os.getcwd()
-        existing_pythonpath = env.get('PYTHONPATH', '')
-        if existing_pythonpath:
-            pythonpath = f"{current_dir}{os.pathsep}{existing_pythonpath}"
-        else:
-            pythonpath = current_dir
-        
-        # COMPREHENSIVE UNICODE ENVIRONMENT SETUP
-        env.update({
-            'SCRAPER_USERNAME': username,
-            'USER_PLAN': user_plan,
-            'SELECTED_PLATFORMS': ','.join(instant_platforms),
-            'FRONTEND_SEARCH_TERM': search_term,
-            'MAX_SCROLLS': str(max_scrolls),
-            'PYTHONPATH': pythonpath,
-            'FORCE_AUTHORIZATION': 'true' if user_plan in ['pro', 'ultimate'] else 'false',
-            
-            # CRITICAL UNICODE FIXES FOR WINDOWS:
-            'PYTHONIOENCODING': 'utf-8',           # Force UTF-8 for all I/O
-            'PYTHONUTF8': '1',                     # Enable UTF-8 mode in Python 3.7+
-            'PYTHONLEGACYWINDOWSSTDIO': '0',       # Disable legacy Windows stdio
-            'PYTHONUNBUFFERED': '1',               # Unbuffered output (helps with encoding)
-        })
-        
-        print(f"🔧 Environment set with Unicode support:")
-        print(f"   PYTHONIOENCODING: utf-8")
-        print(f"   PYTHONUTF8: 1")
-        
-        # Try multiple Python executables
-        python_executables = [
-            sys.executable,          # Current Python
-            'python',               # System Python
-            'python3',              # Python 3
-            'py'                    # Windows Python Launcher
-        ]
-        
-        for python_exe in python_executables:
-            try:
-                print(f"🚀 Trying: {python_exe} {scraper_file}")
-                
-                # METHOD 1: Try with explicit UTF-8 encoding
-                try:
-                    result = subprocess.run(
-                        [python_exe, scraper_file],
-                        env=env,
-                        capture_output=True,
-                        text=True,                    
-                        encoding='utf-8',             # ← EXPLICIT UTF-8 ENCODING
-                        errors='replace',             # ← REPLACE BAD CHARACTERS INSTEAD OF CRASHING
-                        timeout=300,                  
-                        cwd=current_dir
-                    )
-                    
-                    # Log output safely
-                    if result.stdout:
-                        print("📊 Scraper Output:")
-                        print(result.stdout)
-                    
-                    if result.stderr:
-                        print("⚠️ Scraper Errors:")
-                        print(result.stderr)
-                    
-                    success = result.returncode == 0
-                    print(f"✅ Scraper completed with return code: {result.returncode}")
-                    return success
-                    
-                except (UnicodeDecodeError, UnicodeError) as unicode_error:
-                    print(f"⚠️ Unicode error, trying bytes mode: {unicode_error}")
-                    
-                    # METHOD 2: FALLBACK - Use bytes mode and decode manually
-                    result = subprocess.run(
-                        [python_exe, scraper_file],
-                        env=env,
-                        capture_output=True,
-                        text=False,              # ← Use bytes mode to avoid encoding issues
-                        timeout=300,
-                        cwd=current_dir
-                    )
-                    
-                    # Manually decode with error handling
-                    try:
-                        stdout_text = result.stdout.decode('utf-8', errors='replace') if result.stdout else ""
-                        stderr_text = result.stderr.decode('utf-8', errors='replace') if result.stderr else ""
-                    except:
-                        stdout_text = str(result.stdout) if result.stdout else ""
-                        stderr_text = str(result.stderr) if result.stderr else ""
-                    
-                    if stdout_text:
-                        print("📊 Scraper Output (safe decode):")
-                        print(stdout_text)
-                    
-                    if stderr_text:
-                        print("⚠️ Scraper Errors (safe decode):")
-                        print(stderr_text)
-                    
-                    success = result.returncode == 0
-                    print(f"✅ Scraper completed (bytes mode) with return code: {result.returncode}")
-                    return success
- 
-            except FileNotFoundError:
-                print(f"❌ {python_exe} not found, trying next...")
-                continue
-            except subprocess.TimeoutExpired:
-                print("⏰ Scraper timeout - but may still be running")
-                return True  # Don't fail for timeout
-            except Exception as e:
-                print(f"❌ Error with {python_exe}: {e}")
-                continue
-        
-        # If we get here, no Python executable worked
-        print("❌ Could not find any working Python executable")
-        return False
+            return None
+        
+        # The worker runs the scraper with sys.executable and UTF-8 I/O (see scrape_job_queue.build_job_env)
+        from scrape_job_queue import enqueue_job
+        job_id = enqueue_job(
+            username, instant_platforms, search_term, max_scrolls,
+            plan=user_plan,
+            entrypoint="daily",
+            env={'FORCE_AUTHORIZATION': 'true' if user_plan in ['pro', 'ultimate'] else 'false'},
+        )
+        st.session_state['scrape_job_id'] = job_id
+        print(f"⚡ Queued job {job_id} for: {instant_platforms}")
+        return job_id
         
     except Exception as e:
         print(f"❌ Scraper function error: {e}")
-        return False
+        return None
+
+
+def save_demo_preview(username, platforms, demo_cap=5):
+    """After a demo run: cache session counts and write the top demo leads for the Lead Results tab"""
+    import csv
+    plan_str = (st.session_state.get("plan") or "demo").lower()
+
+    # 1) load session summaries (optional, drives stats boxes)
+    summary = {}
+    latest  = {}
+    try:
+        if os.path.exists("scraping_session_summary.json"):
+            with open("scraping_session_summary.json", "r", encoding="utf-8") as f:
+                summary = json.load(f)
+        if os.path.exists("latest_session.json"):
+            with open("latest_session.json", "r", encoding="utf-8") as f:
+                latest = json.load(f)
+        # cache for other tabs
+        st.session_state["last_total_leads"] = latest.get("total_leads", summary.get("total_leads", 0))
+        st.session_state["last_platform_counts"] = latest.get("platforms", summary.get("results_by_platform", {}))
+    except Exception as e:
+        st.warning(f"Could not read session summaries: {e}")
+
+    # 2) find the newest CSV per platform and aggregate rows
+    def _latest_csv_for(platform: str):
+        pats = [f"*{platform}*leads*.csv", f"{platform}_leads_*.csv", f"{platform}_unified_leads_*.csv"]
+        files = []
+        for p in pats:
+            files.extend(glob.glob(p))
+        files = sorted(files, key=lambda f: os.path.getmtime(f), reverse=True)
+        return files[0] if files else None
+
+    rows = []
+    for p in (platforms or ["twitter"]):
+        fpath = _latest_csv_for(p)
+        if not fpath:
+            continue
+        try:
+            rows.extend(pd.read_csv(fpath, nrows=demo_cap).to_dict("records"))
+        except Exception:
+            try:
+                with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
+                    rows.extend(list(csv.DictReader(f))[:demo_cap])
+            except Exception:
+                pass
+
+    # 3) clip to demo cap and persist for Lead Results tab
+    rows = rows[:demo_cap]
+    demo_payload = {
+        "username": username,
+        "plan": plan_str,
+        "cap": demo_cap,
+        "generated": len(rows),
+        "platforms": list(platforms or []),
+        "timestamp": datetime.now().isoformat(),
+        "leads": rows,
+    }
+    with open(f"demo_leads_{username}.json", "w", encoding="utf-8") as f:
+        json.dump(demo_payload, f, ensure_ascii=False, indent=2, default=str)
+
+    # 4) refresh user info so “Demo leads left” updates immediately
+    try:
+        info = credit_system.get_user_info(username) or {}
+        st.session_state["user_data"] = info
+        st.session_state["credits"]   = info.get("credits", 0)
+        st.session_state["demo_leads_remaining"] = info.get("demo_leads_remaining", 0)
+    except Exception:
+        pass
+    return demo_payload
+
+
+def _on_scrape_job_finished(username, job):
+    """One-time follow-up when a background job ends: refresh credits, stats and the demo preview"""
+    try:
+        credit_system.invalidate_user(username)
+    except Exception:
+        pass
+    if job["status"] == "done":
+        try:
+            st.session_state["stats"] = load_empire_stats(username)
+            refresh_demo_status(username)
+        except Exception as e:
+            print(f"⚠️ Stats refresh after job {job['job_id']}: {e}")
+        if (job.get("plan") or "demo").lower() == "demo":
+            try:
+                save_demo_preview(username, job["platforms"])
+            except Exception as e:
+                print(f"⚠️ Demo preview after job {job['job_id']}: {e}")
+
+
+def _show_scrape_job(username, job):
+    """Progress bar / ETA for an active job, or the outcome of a finished one"""
+    from scrape_job_queue import cancel_job, tail_job_log
+
+    platforms = ", ".join(p.title() for p in job["platforms"])
+    if job["status"] in ("queued", "running"):
+        eta = job.get("eta_seconds")
+        eta_text = f" • ETA ~{eta // 60}m {eta % 60:02d}s" if eta is not None else ""
+        if job["status"] == "queued":
+            st.info(f"⏳ Scrape queued (position {job.get('queue_position') or 1}) • {platforms}{eta_text}")
+        else:
+            st.progress(min(1.0, float(job["progress"] or 0)))
+            st.caption(f"🚀 {job.get('message') or 'Running'} • {platforms}{eta_text}")
+            # Live per-platform counts streamed by the scrapers (scraper_progress)
+            from scraper_progress import format_snapshot
+            for platform, snap in (job.get("detail") or {}).items():
+                st.caption(format_snapshot(platform, snap))
+        if st.button("⏹️ Cancel scrape", key=f"cancel_job_{job['job_id']}"):
+            if cancel_job(job["job_id"], username):
+                st.warning("⏹️ Cancelling...")
+        return
+
+    handled = st.session_state.setdefault("handled_scrape_jobs", [])
+    if job["job_id"] not in handled:
+        handled.append(job["job_id"])
+        _on_scrape_job_finished(username, job)
+        st.rerun()
+
+    results = job.get("result") or {}
+    if job["status"] == "done":
+        total = sum(int(v or 0) for v in results.values())
+        st.success(f"✅ Scraping completed: {total} leads ({platforms})")
+        for platform, count in results.items():
+            st.markdown(f"  {'✅' if count else '❌'} {platform.title()}: {count} leads")
+        demo_file = f"demo_leads_{username}.json"
+        if (job.get("plan") or "demo").lower() == "demo" and os.path.exists(demo_file):
+            with open(demo_file, "r", encoding="utf-8") as f:
+                demo_payload = json.load(f)
+            st.info(f"Showing {demo_payload.get('generated', 0)} of {st.session_state.get('last_total_leads', 0)} "
+                    f"leads (demo cap {demo_payload.get('cap', 5)}).")
+            if demo_payload.get("leads"):
+                st.dataframe(pd.DataFrame(demo_payload["leads"]))
+        elif total == 0:
+            st.warning("⚠️ No leads generated. Try a different search term.")
+        st.info("📊 Check 'Lead Results' tab to view your leads")
+    elif job["status"] == "cancelled":
+        st.warning(f"⏹️ Scrape cancelled ({platforms})")
+    else:
+        st.error(f"❌ Scrape failed: {job.get('error') or 'unknown error'}")
+
+    tail = tail_job_log(job)
+    if tail:
+        with st.expander("📜 Scraper logs (last ~80 lines)"):
+            st.code(tail, language="text")
+
+
+def render_scrape_job_status(username):
+    """Status of the user's latest background scrape; re-polls every few seconds while it runs"""
+    def _panel():
+        try:
+            from scrape_job_queue import get_job_queue
+            jobs = get_job_queue().list_for_user(username, limit=1)
+        except Exception as e:
+            st.caption(f"⚠️ Job status unavailable: {e}")
+            return
+        if jobs:
+            _show_scrape_job(username, jobs[0])
+
+    # st.fragment reruns only this panel; older Streamlit gets a manual refresh button
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if fragment:
+        fragment(run_every=3)(_panel)()
+    else:
+        _panel()
+        if st.button("🔄 Refresh scrape status", key="refresh_scrape_job"):
+            st.rerun()
 
 def queue_linkedin_request(username, search_term, max_scrolls, user_email):
     """Queue LinkedIn request with email notifications"""
@@ -3711,7 +3833,10 @@ def get_latest_csv(pattern):
             if user_file:
                 return user_file
     
-    # Fallback to original logic
+    # Fallback to original logic (indexed catalog when available)
+    catalog = _lead_catalog(CSV_DIR)
+    if catalog and "/" not in pattern:
+        return catalog.latest(pattern, root=CSV_DIR)
     files = sorted(glob.glob(str(CSV_DIR / pattern)), key=os.path.getmtime, reverse=True)
     return files[0] if files else None
 
@@ -4812,8 +4937,9 @@ with st.sidebar:
             st.subheader("📱 Demo Account")
         
             # ✅ SIMPLE DEMO STATUS (no external functions needed)
-            can_demo, remaining = credit_system.can_use_demo(username)
-            user_info = credit_system.get_user_info(username)
+            with credit_system.unit_of_work():
+                can_demo, remaining = credit_system.can_use_demo(username)
+                user_info = credit_system.get_user_info(username)
             demo_used = user_info.get('demo_leads_used', 0) if user_info else 0
             
             st.metric("🔬 Demo Leads Left", remaining)
@@ -4849,9 +4975,7 @@ with st.sidebar:
         
         else:
             # PAID USER SIDEBAR - Show actual platform stats
-            print(f"📊 Calculating empire stats from CSV files for {username} (CSV_DIR={CSV_DIR})")
-            empire_stats = calculate_empire_from_csvs(username)
-            total_leads = sum(empire_stats.values())
+            empire_stats, total_leads = load_accurate_empire_stats(username)
 
             # 2) Define how to display each platform key with an emoji + label
             DISPLAY_MAP = {
@@ -5759,6 +5883,9 @@ with tab1:
                         st.error("❌ No username found anywhere. Please sign in again.")
                         st.stop()
                 
+                # Background scrape job for this user (progress / ETA / results)
+                render_scrape_job_status(username)
+
                 # Get selected platforms
                 selected_platforms = []
                 if use_twitter: selected_platforms.append("Twitter")
@@ -5899,195 +6026,22 @@ with tab1:
                                         search_term = (st.session_state.get("search_term") or "").strip()   # use your actual text input key
                                         max_scrolls = int(st.session_state.get("max_scrolls", 10))
 
-                                        scraper_env = os.environ.copy()
-                                        scraper_env.update({
-                                            "SCRAPER_USERNAME": username,
-                                            "USER_PLAN": str(plan_str),
-                                            "FRONTEND_SEARCH_TERM": search_term,
-                                            "SELECTED_PLATFORMS": ",".join(selected_final or []),
-                                            "MAX_SCROLLS": str(max_scrolls),
-                                            "PYTHONIOENCODING": "utf-8",
-                                            "PYTHONUTF8": "1",
-                                            "PYTHONLEGACYWINDOWSSTDIO": "0",
-                                        })
-
-                                        st.info(
-                                            f"🧪 Launching scraper • plan={scraper_env['USER_PLAN']}, "
-                                            f"platforms={scraper_env['SELECTED_PLATFORMS'] or '(none)'}, "
-                                            f"term='{scraper_env['FRONTEND_SEARCH_TERM']}'"
+                                        # === QUEUE === (the worker runs run_daily_scraper_complete.py; the panel above polls it)
+                                        from scrape_job_queue import enqueue_job
+                                        job_id = enqueue_job(
+                                            username, selected_final, search_term, max_scrolls,
+                                            plan=str(plan_str), entrypoint="daily",
                                         )
-
-                                        # === RUN ===
-                                        result = subprocess.run(
-                                            [sys.executable, "run_daily_scraper_complete.py"],
-                                            capture_output=True,
-                                            text=True,
-                                            encoding="utf-8",
-                                            errors="replace",
-                                            cwd=os.getcwd(),
-                                            env=scraper_env,
-                                            timeout=300,
+                                        st.session_state["scrape_job_id"] = job_id
+                                        st.info(
+                                            f"🧪 Scraper queued • job={job_id}, plan={plan_str}, "
+                                            f"platforms={','.join(selected_final) or '(none)'}, term='{search_term}'"
                                         )
+                                        st.rerun()
 
-                                        # === HANDLE RESULT ===
-                                        if result.returncode != 0:
-                                            st.error(f"❌ Scraper failed with return code: {result.returncode}")
-                                            if result.stderr: st.code(result.stderr, language="text")
-                                            if result.stdout:
-                                                with st.expander("📄 Scraper output"):
-                                                    st.code(result.stdout, language="text")
-                                        else:
-                                            st.success("✅ Scraping completed successfully!")
-                                            # refresh stats from backend/file so UI updates immediately
-                                            st.session_state["stats"] = load_empire_stats(username)
-                                            refresh_demo_status(username)
-
-                                        # --- READ SUMMARY + SHOW TOP-5 DEMO LEADS ---
-                                        import os, json, glob, csv
-                                        from datetime import datetime
-
-                                        username    = st.session_state.get("username") or "anonymous"
-                                        plan_str    = (st.session_state.get("plan") or "demo").lower()
-                                        demo_cap    = 5
-
-                                        # 1) load session summaries (optional, drives stats boxes)
-                                        summary = {}
-                                        latest  = {}
-                                        try:
-                                            if os.path.exists("scraping_session_summary.json"):
-                                                with open("scraping_session_summary.json", "r", encoding="utf-8") as f:
-                                                    summary = json.load(f)
-                                            if os.path.exists("latest_session.json"):
-                                                with open("latest_session.json", "r", encoding="utf-8") as f:
-                                                    latest = json.load(f)
-                                            # cache for other tabs
-                                            st.session_state["last_total_leads"] = latest.get("total_leads", summary.get("total_leads", 0))
-                                            st.session_state["last_platform_counts"] = latest.get("platforms", summary.get("results_by_platform", {}))
-                                        except Exception as e:
-                                            st.warning(f"Could not read session summaries: {e}")
-
-                                        # 2) find the newest CSV per platform and aggregate rows
-                                        def _latest_csv_for(platform: str):
-                                            pats = [f"*{platform}*leads*.csv", f"{platform}_leads_*.csv", f"{platform}_unified_leads_*.csv"]
-                                            files = []
-                                            for p in pats:
-                                                files.extend(glob.glob(p))
-                                            files = sorted(files, key=lambda f: os.path.getmtime(f), reverse=True)
-                                            return files[0] if files else None
-
-                                        selected_for_run = (st.session_state.get("selected_platforms") or ["twitter"])
-                                        seen = set()
-                                        selected_canon = []
-                                        _alias = {"x":"twitter","tw":"twitter","twitter.com":"twitter",
-                                                "fb":"facebook","facebook.com":"facebook","li":"linkedin","linkedin.com":"linkedin",
-                                                "ig":"instagram","instagram.com":"instagram","tt":"tiktok","tiktok.com":"tiktok",
-                                                "yt":"youtube","youtube.com":"youtube","medium.com":"medium","reddit.com":"reddit"}
-                                        for p in selected_for_run:
-                                            k = _alias.get(str(p).lower().strip(), str(p).lower().strip())
-                                            if k and k not in seen:
-                                                seen.add(k); selected_canon.append(k)
-
-                                        rows = []
-                                        for p in (selected_canon or ["twitter"]):
-                                            fpath = _latest_csv_for(p)
-                                            if not fpath:
-                                                continue
-                                            # Try pandas, fall back to csv module
-                                            try:
-                                                import pandas as pd
-                                                df = pd.read_csv(fpath)
-                                                rows.extend(df.to_dict("records"))
-                                            except Exception:
-                                                try:
-                                                    with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                                                        rdr = csv.DictReader(f)
-                                                        rows.extend(list(rdr))
-                                                except Exception:
-                                                    pass
-
-                                        # 3) clip to demo cap and persist for Lead Results tab
-                                        rows = rows[:demo_cap]
-                                        demo_payload = {
-                                            "username": username,
-                                            "plan": plan_str,
-                                            "cap": demo_cap,
-                                            "generated": len(rows),
-                                            "platforms": selected_canon,
-                                            "timestamp": datetime.now().isoformat(),
-                                            "leads": rows,
-                                        }
-                                        demo_file = f"demo_leads_{username}.json"
-                                        with open(demo_file, "w", encoding="utf-8") as f:
-                                            json.dump(demo_payload, f, ensure_ascii=False, indent=2)
-
-                                        st.info(f"Showing {len(rows)} of {st.session_state.get('last_total_leads', 0)} leads (demo cap {demo_cap}).")
-                                        if rows:
-                                            try:
-                                                import pandas as pd
-                                                st.dataframe(pd.DataFrame(rows))
-                                            except Exception:
-                                                st.json(demo_payload)
-
-                                        # 4) refresh user info so “Demo leads left” updates immediately
-                                        try:
-                                            from postgres_credit_system import credit_system
-                                            info = credit_system.get_user_info(username) or {}
-                                            st.session_state["user_data"] = info
-                                            st.session_state["credits"]   = info.get("credits", 0)
-                                            st.session_state["demo_leads_remaining"] = info.get("demo_leads_remaining", 0)
-                                        except Exception:
-                                            pass
-
-                                            # Always show a short log tail so you can verify what ran
-                                            tail = (result.stdout or "").splitlines()[-80:]
-                                            if tail:
-                                                with st.expander("📜 Scraper logs (last ~80 lines)"):
-                                                    st.code("\n".join(tail), language="text")
-
-                                            # Then your existing summary/credits file handling...
-                                            # (reads scraping_session_summary.json etc.)                                      
-                                            try:
-                                                results_path = "scraping_session_summary.json"
-                                                if os.path.exists(results_path):
-                                                    with open(results_path, "r", encoding="utf-8") as f:
-                                                        summary = json.load(f)
-
-                                                    total_leads = summary.get("total_leads", 0)
-                                                    if total_leads > 0:
-                                                        # (your demo credit consumption + UI updates here)
-                                                        ...
-                                                    else:
-                                                        st.warning("⚠️ No leads generated. Try a different search term.")
-                                                else:
-                                                    st.error("❌ No results file found. Check if scraper completed properly.")
-                                            except Exception as e:
-                                                import traceback
-                                                st.error(f"⚠️ Results processing error: {e}")
-                                                st.code(traceback.format_exc(), language="text")
-                                        
-                                            else:
-                                                st.error(f"❌ Scraper failed with return code: {result.returncode}")
-                                            
-                                            # Provide specific error guidance based on return code
-                                            if result.returncode == 1:
-                                                st.info("💡 This usually means a Python import or configuration error")
-                                            elif result.returncode == 2:
-                                                st.info("💡 This usually means missing files or incorrect arguments")
-                                            elif result.returncode == 126:
-                                                st.info("💡 Permission denied - check file permissions")
-                                            elif result.returncode == 127:
-                                                st.info("💡 Command not found - check Python installation")
-                                            
-                                            # Check if main script exists
-                                            if not os.path.exists('run_daily_scraper_complete.py'):
-                                                st.error("❌ Main scraper file 'run_daily_scraper_complete.py' not found!")
-                                            
-                                            # Check Python version
-                                            #st.info(f"🐍 Python version: {sys.version}")
-                                            
-                                    except subprocess.TimeoutExpired:
-                                        st.error("❌ Scraper timed out after 5 minutes")
-                                        st.info("💡 Try reducing the number of scrolls or platforms")
+                                    except JobLimitExceeded as e:
+                                        st.warning(f"⏳ {e}")
+                                        st.info("💡 Wait for your current scrape to finish, or cancel it above")
                                         
                                     except FileNotFoundError as e:
                                         st.error(f"❌ File not found: {e}")
@@ -6108,161 +6062,30 @@ with tab1:
                                 # Get selected platforms (excluding LinkedIn for instant processing)
                                 instant_platforms = [p.lower() for p in selected_platforms if p.lower() not in ['linkedin', 'facebook']]
                                 
-                                # Show progress
-                                progress_placeholder = st.empty()
-                                status_placeholder = st.empty()
-                                
-                                with progress_placeholder:
-                                    progress_bar = st.progress(0)
-                                    progress_text = st.empty()
-                                
-                                try:
-                                    # ✅ NEW: PARALLEL EXECUTION instead of subprocess
-                                    with status_placeholder:
-                                        st.info(f"🚀 Launching {len(instant_platforms)} platforms")
-                                    
-                                    with progress_placeholder:
-                                        progress_bar.progress(10)
-                                        progress_text.text("Initializing scrapers...")
-                                    
-                                    # Import and run parallel scrapers
-                                    from parallel_scraper_runner import run_parallel_scrapers
-                                    
-                                    # Store user context before long-running operation
-                                    user_context = {
-                                        'username': st.session_state.get('username'),
-                                        'user_data': st.session_state.get('user_data'),
-                                        'authenticated': st.session_state.get('authenticated'),
-                                        'credits': st.session_state.get('credits'),
-                                        'plan': user_plan
-                                    }
-                                    os.environ['USER_PLAN'] = os.environ.get('SCRAPER_USER_PLAN', '')
-
-                                    # Set environment variables for scrapers to use
-                                    os.environ['SCRAPER_USERNAME'] = user_context['username'] or ''
-                                    os.environ['SCRAPER_USER_PLAN'] = user_context['plan'] or ''
-                                    os.environ['SCRAPER_CREDITS'] = str(user_context['credits'] or 0)
-                                    
-                                    # ✅ PARALLEL EXECUTION - Much faster than sequential!
-                                    all_results = run_parallel_scrapers(
-                                        platforms=instant_platforms,    # e.g., ['twitter', 'facebook', 'youtube']
-                                        search_term=search_term,        # From your form input
-                                        max_scrolls=max_scrolls,        # From your slider
-                                        username=username,
-                                        user_plan=user_plan
-                                    )
-                                    
-                                    # Update progress
-                                    with progress_placeholder:
-                                        progress_bar.progress(100)
-                                        st.success("✅ Parallel execution complete!")
-                                    
-                                    # Process and display results
-                                    if all_results:
-                                        total_leads = sum(len(results) if results else 0 for results in all_results.values())
-                                        successful_platforms = sum(1 for results in all_results.values() if results and len(results) > 0)
-
-                                        # ✅ ADD CREDIT REFRESH RIGHT AFTER THIS
-                                        if all_results:
-                                            total_leads = sum(len(results) if results else 0 for results in all_results.values())
-                                            
-                                            if total_leads > 0:
-                                                # Force refresh credits after successful scraping
-                                                try:
-                                                    from postgres_credit_system import credit_system
-                                                    credit_system.load_data()
-                                                    
-                                                    auth = SimpleCreditAuth()
-                                                    updated_credits = auth.get_user_credits()
-                                                    
-                                                    st.info(f"💎 Credits updated: **{updated_credits}** remaining")
-                                                                                                       
-                                                except Exception as e:
-                                                    st.warning(f"⚠️ Credit refresh error: {e}")
-                                        
-                                        with status_placeholder:
-                                            st.success(f"🎉 Generated {total_leads} leads across {successful_platforms} platforms!")
-                                        
-                                        # Show platform breakdown
-                                        st.markdown("**📋 Results by Platform:**")
-                                        for platform, results in all_results.items():
-                                            count = len(results) if results else 0
-                                            if count > 0:
-                                                st.markdown(f"  ✅ {platform.title()}: {count} leads")
-                                            else:
-                                                st.markdown(f"  ❌ {platform.title()}: 0 leads")
-                                        
-                                        # Create summary for compatibility with existing code
-                                        summary = {
-                                            'total_leads': total_leads,
-                                            'successful_platforms': successful_platforms,
-                                            'results_by_platform': {k: len(v) if v else 0 for k, v in all_results.items()},
-                                            'execution_mode': 'parallel'
-                                        }
-                                        
-                                        # Save summary file for compatibility
-                                        try:
-                                            with open('scraping_session_summary.json', 'w') as f:
-                                                json.dump(summary, f, indent=2)
-                                        except:
-                                            pass
-                                        
-                                        st.info("📊 Check 'Lead Results' tab to view your leads")
-                                        st.rerun()
-                                        
-                                    else:
-                                        with status_placeholder:
-                                            st.warning("⚠️ No results generated")
-                                        
-                                        st.info("💡 Try:")
-                                        st.info("  • Different search term (e.g., 'crypto coach')")
-                                        st.info("  • Lower intensity (3-5 scrolls)")
-                                        st.info("  • Fewer platforms")
-                                        
-                                except ImportError:
-                                    # Fallback to original method if parallel runner not available
-                                    with status_placeholder:
-                                        st.warning("⚠️ Parallel runner not available, using sequential method...")
-                                    
-                                    # Your original subprocess code here as fallback
-                                    scraper_env = os.environ.copy()
-                                    scraper_env.update({
-                                        'PYTHONIOENCODING': 'utf-8',
-                                        'PYTHONUTF8': '1', 
-                                        'PYTHONLEGACYWINDOWSSTDIO': '0',
-                                        'SCRAPER_USERNAME': username,
-                                        'USER_PLAN': user_plan,
-                                        'FRONTEND_SEARCH_TERM': search_term,
-                                        'SELECTED_PLATFORMS': ','.join(instant_platforms),
-                                        'FORCE_AUTHORIZATION': 'true',
-                                        'PLAN_OVERRIDE': user_plan
-                                    })
-                                    
-                                    process = subprocess.Popen(
-                                        ['python', 'run_daily_scraper_complete.py'],
-                                        stdout=subprocess.PIPE,
-                                        stderr=subprocess.PIPE,
-                                        text=True,
-                                        encoding='utf-8',        # ✅ ADD THIS LINE
-                                        errors='replace',        # ✅ ADD THIS LINE  
-                                        env=scraper_env
-                                    )
-                                    
-                                    # Your existing timeout monitoring code here...
-                                    st.info("📊 Sequential execution - check results in 10-15 minutes")
-                                    
-                                except Exception as e:
-                                    with status_placeholder:
-                                        st.error(f"❌ Parallel execution error: {str(e)}")
-                                        import traceback, pprint, os
-                                        print("[LAUNCH DEBUG] SELECTED_PLATFORMS_MAP =", os.environ.get("SELECTED_PLATFORMS_MAP"))
-                                        print("[LAUNCH DEBUG] PLATFORM_PARAMS      =", os.environ.get("PLATFORM_PARAMS"))
-                                        print("[LAUNCH DEBUG] EXTRA_ENV            =", st.session_state.get("scraper_env"))
+                                # ✅ Queued as a background job: the worker runs the parallel runner and the
+                                # status panel above shows progress/ETA, so this session isn't blocked
+                                if instant_platforms:
+                                    try:
+                                        from scrape_job_queue import enqueue_job
+                                        job_id = enqueue_job(
+                                            username, instant_platforms, search_term, max_scrolls,
+                                            plan=user_plan,
+                                            entrypoint="parallel",
+                                            env={
+                                                'SCRAPER_USER_PLAN': user_plan or '',
+                                                'SCRAPER_CREDITS': str(st.session_state.get('credits') or 0),
+                                                'FORCE_AUTHORIZATION': 'true',
+                                                'PLAN_OVERRIDE': user_plan or '',
+                                            },
+                                        )
+                                        st.session_state['scrape_job_id'] = job_id
+                                        st.info(f"🚀 Queued {len(instant_platforms)} platforms (job {job_id})")
+                                    except JobLimitExceeded as e:
+                                        st.warning(f"⏳ {e}")
+                                        st.info("💡 Wait for your current scrape to finish, or cancel it above")
+                                    except Exception as e:
+                                        st.error(f"❌ Launch error: {str(e)}")
                                         traceback.print_exc()
-
-                                    
-                                    with progress_placeholder:
-                                        st.empty()
                                 
                                 # Handle LinkedIn separately (unchanged)
                                 if use_linkedin and linkedin_email:
@@ -7026,10 +6849,8 @@ with tab2: # Lead Results
 
             current_username = st.session_state.username
 
-            # Load stats that survive deploys (cache or rebuilt from CSV_DIR)
-            print(f"📊 Calculating empire stats from CSV files for {username} (CSV_DIR={CSV_DIR})")
-            user_empire_stats = calculate_empire_from_csvs(username)
-            user_total_leads = sum(empire_stats.values())
+            # Load stats that survive deploys (usage rollup, or rebuilt from CSV_DIR)
+            user_empire_stats, user_total_leads = load_accurate_empire_stats(username)
             
             if st.session_state.get("_stats_user") != current_username:
                 st.cache_data.clear()
@@ -7156,20 +6977,22 @@ with tab2: # Lead Results
 
                         with c5:
                             try:
-                                if not file_path or not os.path.exists(file_path):
+                                # CSV on disk, or exported on demand from its columnar partition
+                                from lead_columnar_store import export_csv_bytes
+                                payload = export_csv_bytes(file_path) if file_path else None
+                                if payload is None:
                                     st.error("Download failed: missing file")
                                 else:
                                     # unique + stable key for this row/button
                                     uniq = hashlib.md5(file_path.encode()).hexdigest()[:8]
-                                    with open(file_path, "rb") as fh:
-                                        st.download_button(
-                                            label="⬇️",
-                                            data=fh.read(),
-                                            file_name=file_name,
-                                            mime="text/csv",
-                                            key=f"dl_{uniq}",
-                                            help=f"Download {file_name}",
-                                        )
+                                    st.download_button(
+                                        label="⬇️",
+                                        data=payload,
+                                        file_name=file_name,
+                                        mime="text/csv",
+                                        key=f"dl_{uniq}",
+                                        help=f"Download {file_name}",
+                                    )
                             except Exception as e:
                                 st.error(f"Download failed: {e}")
 
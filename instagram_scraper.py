@@ -6,10 +6,15 @@ import json
 import csv
 import re
 import random
-from dm_sequences import generate_dm_with_fallback
+from collections import deque
+from urllib.parse import urlparse
+from dm_sequences import generate_dms_for_leads
 import os
 from pathlib import Path
-from persistence import save_leads_to_files
+from persistence import save_leads_to_files, open_lead_stream
+import scraper_result
+import scraper_progress
+from browser_setup import apply_route_policy, launch_browser, new_scraper_context
 
 # Use your app volume mount. If you set CSV_DIR in Railway env, it will override.
 CSV_DIR = Path(os.getenv("CSV_DIR", "/app/client_configs"))
@@ -56,9 +61,11 @@ DELAY_MAX = config.get("delay_max", 5)
 LEAD_OUTPUT_FILE = config["lead_output_file"]
 EXTRACTION_TIMEOUT = config.get("extraction_timeout", 45000)
 
-ENRICH_PROFILES = True          # turn on/off enrichment
-ENRICH_LIMIT = 40               # cap to avoid rate limits
+ENRICH_PROFILES = os.getenv("INSTAGRAM_ENRICH_PROFILES", "1").lower() not in ("0", "false", "no")  # turn on/off enrichment
+ENRICH_LIMIT = int(os.getenv("INSTAGRAM_ENRICH_LIMIT", "40"))  # cap to avoid rate limits
 ENRICH_DELAY = (1.2, 2.5)       # seconds between profiles
+ENRICH_CONCURRENCY = int(os.getenv("INSTAGRAM_ENRICH_CONCURRENCY", "4"))           # tabs; 1 = one at a time
+ENRICH_MIN_INTERVAL = float(os.getenv("INSTAGRAM_ENRICH_MIN_INTERVAL", "0.8"))     # seconds between profile loads per domain
 
 # 🚀 Deduplication configuration
 DEDUP_MODE = config.get("deduplication_mode", "smart_user_aware")
@@ -151,14 +158,16 @@ def _parse_counts_from_meta(desc: str) -> dict:
         pass
     return out
 
-def extract_instagram_profiles(page, max_posts: int | None = None):
+def extract_instagram_profiles(page, max_posts: int | None = None, stream=None):
     """
     From a hashtag page, open each post modal and extract the owner's profile
     link from the modal header. This avoids scraping UI links.
+    Leads are also appended to ``stream`` (persistence.LeadCSVStream) as found.
     """
     print("Extracting Instagram profiles via post modals…")
     results = []
     seen_usernames = set()
+    excluded_count = 0
     max_posts = max_posts or min(MAX_PAGES * 10, 80)  # conservative upper bound
 
     # 1) Collect post/reel hrefs visible on the page (unique & ordered)
@@ -171,6 +180,7 @@ def extract_instagram_profiles(page, max_posts: int | None = None):
     # make unique in order
     hrefs = list(dict.fromkeys(hrefs))[:max_posts]
     print(f"Found {len(hrefs)} post links to open")
+    scraper_progress.counts(final=True, elements_found=len(hrefs))
 
     # 2) Iterate posts, open modal, read header account, close
     for i, href in enumerate(hrefs, 1):
@@ -201,6 +211,7 @@ def extract_instagram_profiles(page, max_posts: int | None = None):
             if not username:
                 print("    ⚠️ No username found in modal header")
             elif username.lower() in (a.lower() for a in excluded_accounts):
+                excluded_count += 1
                 print(f"    🚫 Excluded @{username}")
             elif username in seen_usernames:
                 print(f"    ↩️ Duplicate @{username}")
@@ -215,7 +226,7 @@ def extract_instagram_profiles(page, max_posts: int | None = None):
                     "bio": f"Instagram user related to {SEARCH_TERM}",
                     "url": url,
                     "platform": "instagram",
-                    "dm": generate_dm_with_fallback(username, "Instagram user", "instagram"),
+                    "dm": "",  # filled in bulk by generate_dms_for_leads after extraction
                     "search_term": SEARCH_TERM,
                     "relevance_score": score,
                     "extraction_method": "modal_profile_from_hashtag",
@@ -227,6 +238,8 @@ def extract_instagram_profiles(page, max_posts: int | None = None):
                     "contact_info": "",
                 }
                 results.append(lead)
+                if stream:
+                    stream.write(lead)
                 print(f"    ✅ @{username}")
 
         except Exception as e:
@@ -242,68 +255,170 @@ def extract_instagram_profiles(page, max_posts: int | None = None):
 
             # Human-ish pacing
             time.sleep(random.uniform(0.6, 1.5))
+            scraper_progress.counts(leads_extracted=len(results), excluded=excluded_count)
 
     print(f"Extracted {len(results)} actual profiles")
+    scraper_result.report(excluded=excluded_count)
+    scraper_progress.counts(final=True, leads_extracted=len(results), excluded=excluded_count)
     return results
 
-def enrich_instagram_profiles(page, leads: list[dict], limit: int | None = None):
+def _read_profile_into_lead(p, lead: dict, prof_url: str):
+    """Read og:title/og:description and a best-effort bio from a loaded profile page into ``lead``"""
+    # OG tags are the most stable selectors on IG
+    og_title = p.query_selector('head meta[property="og:title"]')
+    og_desc  = p.query_selector('head meta[property="og:description"]')
+    title = og_title.get_attribute("content") if og_title else ""
+    desc  = og_desc.get_attribute("content") if og_desc else ""
+
+    # Display name from og:title:  'Name (@username) • Instagram photos and videos'
+    display_name = None
+    if title and "(" in title:
+        display_name = title.split("(")[0].strip() or None
+
+    counts = _parse_counts_from_meta(desc)
+
+    # Bio (best-effort; IG changes often). Try a few common containers:
+    bio = None
+    for sel in [
+        'header section div[role="button"] ~ div',            # some builds
+        'header section h1 + div',                            # older layout
+        'header + div [data-testid="user-bio"]',              # experimental
+        'article header ~ div span',                          # fallback
+    ]:
+        el = p.query_selector(sel)
+        if el:
+            txt = (el.inner_text() or "").strip()
+            if txt and len(txt) >= 3:
+                bio = txt
+                break
+
+    # Update lead in place (don’t overwrite if you already have richer fields)
+    lead["profile_url"] = prof_url
+    if display_name: lead["name"] = display_name
+    if bio:          lead["bio"] = bio
+    if counts.get("followers") is not None: lead["followers"] = counts["followers"]
+    if counts.get("following") is not None: lead["following"] = counts["following"]
+    if counts.get("posts")     is not None: lead["posts"]     = counts["posts"]
+
+    print(f"     ✅ followers={lead.get('followers')} name={lead.get('name')!s}")
+
+
+def _enrich_jobs(leads: list[dict], total: int):
+    """(index, lead, handle, profile url) for the leads that can be enriched"""
+    jobs = []
+    for i, lead in enumerate(leads[:total], 1):
+        handle = (lead.get("handle") or "").lstrip("@")
+        if not handle:
+            continue
+        jobs.append((i, lead, handle, lead.get("profile_url") or f"https://www.instagram.com/{handle}/"))
+    return jobs
+
+
+class _DomainRateLimiter:
+    """Minimum spacing between page loads on the same domain, shared by every tab in the pool"""
+
+    def __init__(self, min_interval: float, wait):
+        self.min_interval = min_interval
+        self.wait = wait  # must keep Playwright's event loop running (page.wait_for_timeout)
+        self.next_allowed = {}
+
+    def acquire(self, url: str):
+        domain = urlparse(url).netloc
+        delay = self.next_allowed.get(domain, 0) - time.time()
+        if delay > 0:
+            self.wait(delay * 1000)
+        self.next_allowed[domain] = time.time() + self.min_interval
+
+
+def _enrich_concurrently(ctx, jobs, total: int, concurrency: int):
+    """
+    Keep up to ``concurrency`` profile loads in flight on a pool of tabs in the
+    same context. The sync API is single-threaded, so a navigation is started
+    without waiting (location assignment) and the oldest one is read first.
+    """
+    pool = []
+    try:
+        for _ in range(min(concurrency, len(jobs))):
+            tab = ctx.new_page()
+            apply_route_policy(tab, PLATFORM_NAME)  # only <head> meta and header text are read
+            pool.append(tab)
+        limiter = _DomainRateLimiter(ENRICH_MIN_INTERVAL, pool[0].wait_for_timeout)
+        pending = deque(jobs)
+        in_flight = deque()  # (tab, job) in start order
+        idle = list(pool)
+
+        while pending or in_flight:
+            while idle and pending:
+                tab, job = idle.pop(), pending.popleft()
+                i, _lead, handle, prof_url = job
+                print(f"  [{i}/{total}] @{handle}")
+                limiter.acquire(prof_url)
+                try:
+                    tab.evaluate("url => { window.location.href = url; }", prof_url)
+                except Exception as e:
+                    print(f"     ⚠️ enrich error: {str(e)[:140]}")
+                    idle.append(tab)
+                    continue
+                in_flight.append((tab, job))
+            if not in_flight:
+                continue
+
+            tab, (i, lead, handle, prof_url) = in_flight.popleft()
+            try:
+                tab.wait_for_url(lambda url: url != "about:blank", wait_until="domcontentloaded", timeout=20000)
+                _read_profile_into_lead(tab, lead, prof_url)
+            except Exception as e:
+                print(f"     ⚠️ enrich error: {str(e)[:140]}")
+            try:
+                tab.goto("about:blank")  # so the next wait_for_url sees the new navigation
+                idle.append(tab)
+            except Exception:
+                try:
+                    tab.close()
+                except Exception:
+                    pass
+                replacement = ctx.new_page()
+                apply_route_policy(replacement, PLATFORM_NAME)
+                pool.append(replacement)
+                idle.append(replacement)
+    finally:
+        for tab in pool:
+            try:
+                tab.close()
+            except Exception:
+                pass
+
+
+def enrich_instagram_profiles(page, leads: list[dict], limit: int | None = None,
+                              concurrency: int | None = None):
     """
     Open each profile in a NEW tab, read og:title/og:description and a best-effort bio,
     then update the lead in-place. Non-fatal on any error.
+    With ``concurrency`` > 1 (default ENRICH_CONCURRENCY) profiles load on a pool of
+    tabs that skip images/media/fonts (browser_setup policy), rate limited per domain.
     """
     ctx = page.context
     total = min(limit or ENRICH_LIMIT, len(leads))
-    print(f"🔎 Enriching {total} Instagram profiles…")
+    concurrency = concurrency or ENRICH_CONCURRENCY
+    jobs = _enrich_jobs(leads, total)
+    print(f"🔎 Enriching {total} Instagram profiles…" + (f" ({concurrency} tabs)" if concurrency > 1 else ""))
 
-    for i, lead in enumerate(leads[:total], 1):
-        handle = (lead.get("handle") or "").lstrip("@")
-        if not handle:
-            continue
-        prof_url = lead.get("profile_url") or f"https://www.instagram.com/{handle}/"
+    if concurrency > 1 and jobs:
+        try:
+            _enrich_concurrently(ctx, jobs, total, concurrency)
+        except Exception as e:
+            print(f"     ⚠️ enrich error: {str(e)[:140]}")
+        print("✅ Enrichment complete.")
+        return leads
+
+    for i, lead, handle, prof_url in jobs:
         print(f"  [{i}/{total}] @{handle}")
 
         p = None
         try:
             p = ctx.new_page()
             p.goto(prof_url, wait_until="domcontentloaded", timeout=20000)
-
-            # OG tags are the most stable selectors on IG
-            og_title = p.query_selector('head meta[property="og:title"]')
-            og_desc  = p.query_selector('head meta[property="og:description"]')
-            title = og_title.get_attribute("content") if og_title else ""
-            desc  = og_desc.get_attribute("content") if og_desc else ""
-
-            # Display name from og:title:  'Name (@username) • Instagram photos and videos'
-            display_name = None
-            if title and "(" in title:
-                display_name = title.split("(")[0].strip() or None
-
-            counts = _parse_counts_from_meta(desc)
-
-            # Bio (best-effort; IG changes often). Try a few common containers:
-            bio = None
-            for sel in [
-                'header section div[role="button"] ~ div',            # some builds
-                'header section h1 + div',                            # older layout
-                'header + div [data-testid="user-bio"]',              # experimental
-                'article header ~ div span',                          # fallback
-            ]:
-                el = p.query_selector(sel)
-                if el:
-                    txt = (el.inner_text() or "").strip()
-                    if txt and len(txt) >= 3:
-                        bio = txt
-                        break
-
-            # Update lead in place (don’t overwrite if you already have richer fields)
-            lead["profile_url"] = prof_url
-            if display_name: lead["name"] = display_name
-            if bio:          lead["bio"] = bio
-            if counts.get("followers") is not None: lead["followers"] = counts["followers"]
-            if counts.get("following") is not None: lead["following"] = counts["following"]
-            if counts.get("posts")     is not None: lead["posts"]     = counts["posts"]
-
-            print(f"     ✅ followers={lead.get('followers')} name={lead.get('name')!s}")
+            _read_profile_into_lead(p, lead, prof_url)
 
         except Exception as e:
             print(f"     ⚠️ enrich error: {str(e)[:140]}")
@@ -474,17 +589,14 @@ def save_and_validate_csv(leads, output_file):
 
 def improved_browser_setup(p):
     """Enhanced browser setup to avoid detection"""
-    return p.chromium.launch(
-        headless=True,
-        args=[
-            '--disable-blink-features=AutomationControlled',
-            '--disable-dev-shm-usage',
-            '--no-sandbox',
-            '--disable-setuid-sandbox',
-            '--disable-web-security',
-            '--disable-features=VizDisplayCompositor'
-        ]
-    )
+    return launch_browser(p, [
+        '--disable-blink-features=AutomationControlled',
+        '--disable-dev-shm-usage',
+        '--no-sandbox',
+        '--disable-setuid-sandbox',
+        '--disable-web-security',
+        '--disable-features=VizDisplayCompositor'
+    ])
 
 def stealth_page_setup(page):
     """Add stealth properties to avoid detection"""
@@ -575,6 +687,8 @@ def human_like_scrolling(page, max_scrolls):
             x = random.randint(100, 800)
             y = random.randint(100, 600)
             page.mouse.move(x, y)
+
+        scraper_progress.scroll(i + 1, max_scrolls)
             
 
 
@@ -593,28 +707,18 @@ def main():
     print(f"👤 Running as: {username}")
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    lead_stream = None
 
     with sync_playwright() as p:
         print("🎯 Launching Instagram scraper with ULTRA-PERMISSIVE detection...")
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor'
-            ]
-        )
+        browser = launch_browser(p, [
+            '--disable-blink-features=AutomationControlled',
+            '--disable-web-security',
+            '--disable-features=VizDisplayCompositor'
+        ])
         
-        if isinstance(storage_state, list):
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
-            context.add_cookies(storage_state)
-        else:
-            context = browser.new_context(
-                storage_state=storage_state,
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
+        # Auth (storage state or bare cookie list) + media/font blocking
+        context = new_scraper_context(browser, PLATFORM_NAME, storage_state=storage_state)
         
         page = context.new_page()
         
@@ -632,6 +736,7 @@ def main():
             # Check login
             if any(indicator in page.url.lower() for indicator in ['login', 'challenge', 'accounts']):
                 print("🚨 Authentication issue detected!")
+                scraper_progress.status("blocked", "Authentication issue")
                 browser.close()
                 return []
             
@@ -639,11 +744,13 @@ def main():
             
             # Enhanced scrolling with error handling
             print(f"📜 Scrolling to load more posts...")
+            phase_start = time.time()
             for i in range(5):
                 try:
                     print(f"   Scroll {i+1}/5")
                     page.mouse.wheel(0, 800)
                     time.sleep(random.uniform(2, 4))
+                    scraper_progress.scroll(i + 1, 5)
                     
                 except Exception as e:
                     print(f"   ⚠️ Scroll error: {str(e)[:30]}")
@@ -652,13 +759,20 @@ def main():
             time.sleep(random.uniform(3, 5))
             
             # Extract profiles (raw leads)
-            raw_leads = extract_instagram_profiles(page)
+            scraper_result.record_phase("scrolling", time.time() - phase_start)
+            lead_stream = open_lead_stream(PLATFORM_NAME, username, timestamp, CSV_DIR)
+            with scraper_result.phase("extraction"):
+                raw_leads = extract_instagram_profiles(page, stream=lead_stream)
             
             if not raw_leads:
                 print("❌ No raw leads extracted")
+                if lead_stream:
+                    lead_stream.abort("no raw leads")
                 browser.close()
                 return []
             
+            phase_start = time.time()
+            
             # 🚀 APPLY SMART USER-AWARE DEDUPLICATION
             print(f"\n🧠 Applying deduplication strategy: {DEDUP_MODE}")
             print(f"👤 User-specific deduplication for: {username}")
@@ -692,6 +806,7 @@ def main():
                         unique_leads.append(lead)
                         seen_handles.add(handle_key)
                 dedup_stats = {"basic": True, "kept": len(unique_leads)}
+            scraper_result.record_phase("dedup", time.time() - phase_start)
             
             # Final results summary
             print(f"\n📊 FINAL RESULTS SUMMARY:")
@@ -722,6 +837,16 @@ def main():
                 except Exception as e:
                     print(f"⚠️ Error finalizing results: {e}")
             
+            # 🔎 Fill in bios from the profile pages before the DMs are written from them
+            if ENRICH_PROFILES and leads:
+                with scraper_result.phase("enrichment"):
+                    enrich_instagram_profiles(page, leads, limit=ENRICH_LIMIT)
+            
+            # 💬 Batched DM generation for the leads that survived dedup and limits
+            # (concurrent, one shared OpenAI client)
+            with scraper_result.phase("dm_generation"):
+                generate_dms_for_leads(leads, platform=PLATFORM_NAME)
+            
             # Save results to multiple files (into persistent volume)
             if leads or (raw_leads and SAVE_RAW_LEADS):
                 output_file = f"instagram_leads_{username}_{timestamp}.csv"
@@ -739,6 +864,7 @@ def main():
                     platform_name=PLATFORM_NAME,
                     csv_dir=CSV_DIR,           # ← use YOUR existing per-scraper CSV_DIR
                     save_raw=SAVE_RAW_LEADS,   # ← if you have this flag
+                    stream=lead_stream,
                 )
 
                 if leads:
@@ -811,6 +937,8 @@ def main():
                     
             else:
                 print("⚠️ No profiles extracted")
+                if lead_stream:
+                    lead_stream.complete(keep_raw=False, leads=0, raw_leads=len(raw_leads))
                 print("🔍 Check instagram_extraction_debug.png to see what was on the page")
                 print("💡 You may need to:")
                 print("   - Refresh your Instagram authentication")
@@ -821,6 +949,8 @@ def main():
             print(f"🚨 Error: {e}")
             import traceback
             traceback.print_exc()
+            if lead_stream and not lead_stream.closed:
+                lead_stream.abort(e)
             
         finally:
             # Keep browser open briefly to see final state
@@ -0,0 +1,313 @@
+"""
+Precompiled keyword matching for the end-customer classifiers.
+
+The Reddit and Medium scrapers score every post/comment against a few
+hundred keywords. With pyahocorasick installed, each niche's keyword sets
+are compiled once into an Aho-Corasick automaton and the text is scanned in
+one pass; without it every distinct keyword is checked once with ``in``
+(keywords shared between groups are no longer scanned twice). Matching keeps
+the original substring semantics exactly (overlapping and nested keywords
+all count), so the classifiers return the same
+``(is_customer, score, customer_type)`` tuples.
+
+Benchmark: python tools/bench_keyword_matcher.py
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+try:
+    import ahocorasick  # optional: pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """Compiled set of keyword groups scanned in a single pass"""
+
+    def __init__(self, groups: Dict[str, List[str]]):
+        self.groups = {name: list(words) for name, words in groups.items()}
+        self._keywords = sorted({w for words in self.groups.values() for w in words if w})
+
+        # Which groups each keyword counts towards (with list multiplicity)
+        self._keyword_groups = {kw: [] for kw in self._keywords}
+        for name, words in self.groups.items():
+            for word in words:
+                if word:
+                    self._keyword_groups[word].append(name)
+
+        self._automaton = None
+        if ahocorasick is not None and self._keywords:
+            automaton = ahocorasick.Automaton()
+            for kw in self._keywords:
+                automaton.add_word(kw, kw)
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def matched_keywords(self, text: str) -> set:
+        """Every keyword that occurs as a substring of ``text``"""
+        if not text:
+            return set()
+        if self._automaton is not None:
+            return {kw for _, kw in self._automaton.iter(text)}
+        return {kw for kw in self._keywords if kw in text}
+
+    def group_counts(self, text: str) -> Dict[str, int]:
+        """Per group, how many of its keyword entries occur in ``text``"""
+        counts = dict.fromkeys(self.groups, 0)
+        for keyword in self.matched_keywords(text):
+            for name in self._keyword_groups[keyword]:
+                counts[name] += 1
+        return counts
+
+
+# ---------------------------------------------------------------------------
+# Reddit end-customer classifier
+# ---------------------------------------------------------------------------
+
+REDDIT_END_CUSTOMER_SIGNALS = {
+    # Premium Leads ($50-200 each) - High intent help seeking
+    'help_seeking': [
+        'need help', 'please help', 'advice needed', 'what should i do',
+        'how do i', 'can someone help', 'desperate', 'stuck', 'lost',
+        'dont know', 'confused', 'guidance', 'suggestions', 'tips'
+    ],
+
+    # Premium Leads - Transformation sharing/documenting
+    'transformation_sharing': [
+        'progress', 'before and after', 'transformation', 'lost',
+        'finally', 'achievement', 'goal', 'success', 'journey',
+        'update', 'pics', 'photo', 'my story', 'my experience'
+    ],
+
+    # Premium Leads - Struggle/plateau content
+    'struggle_plateau': [
+        'plateau', 'stuck', 'not losing', 'not working', 'frustrated',
+        'tried everything', 'months', 'nothing works', 'same',
+        'discouraged', 'giving up', 'failed', 'struggling'
+    ],
+
+    # Standard Leads ($20-50 each) - Beginner questions
+    'beginner_questions': [
+        'beginner', 'new to', 'first time', 'never done', 'start',
+        'where to begin', 'newbie', 'noob', 'just started', 'day 1',
+        'week 1', 'complete beginner', 'total beginner'
+    ],
+
+    # Standard Leads - Goal setting
+    'goal_oriented': [
+        'goal', 'trying to', 'want to', 'hoping to', 'plan to',
+        'working towards', 'target', 'aiming for', 'my plan'
+    ],
+
+    # Volume Leads ($10-30 each) - Product/equipment questions
+    'product_interest': [
+        'recommend', 'best', 'should i buy', 'worth it', 'review',
+        'equipment', 'app', 'supplement', 'product', 'gear',
+        'what do you think', 'opinions', 'experiences'
+    ],
+
+    # Volume Leads - General motivation/support
+    'motivation_support': [
+        'motivation', 'support', 'accountability', 'encourage',
+        'keep going', 'anyone else', 'same boat', 'relate',
+        'similar experience', 'community'
+    ],
+
+    # Common Reddit customer language
+    'reddit_language': [
+        'guys', 'everyone', 'people', 'anyone', 'somebody',
+        'this sub', 'reddit', 'community', 'posted', 'sharing',
+        'update', 'rant', 'confession', 'honest', 'real talk'
+    ]
+}
+
+REDDIT_NICHE_KEYWORDS = {
+    'fitness': ['weight', 'lose', 'gain', 'muscle', 'gym', 'workout', 'exercise', 'diet', 'fitness', 'health'],
+    'health': ['health', 'anxiety', 'depression', 'chronic', 'pain', 'recovery', 'healing', 'wellness'],
+    'business': ['business', 'startup', 'entrepreneur', 'money', 'income', 'career', 'job', 'freelance'],
+    'tech': ['coding', 'programming', 'tech', 'software', 'development', 'career', 'job', 'bootcamp'],
+    'beauty': ['skin', 'makeup', 'beauty', 'hair', 'acne', 'skincare', 'cosmetics', 'appearance'],
+    'finance': ['money', 'debt', 'budget', 'invest', 'financial', 'save', 'credit', 'income'],
+    'real_estate': ['house', 'home', 'property', 'real estate', 'mortgage', 'rent', 'buy', 'invest'],
+    'relationships': ['relationship', 'dating', 'marriage', 'love', 'partner', 'boyfriend', 'girlfriend']
+}
+
+REDDIT_PREMIUM_CATEGORIES = ('help_seeking', 'transformation_sharing', 'struggle_plateau')
+REDDIT_STANDARD_CATEGORIES = ('beginner_questions', 'goal_oriented')
+
+
+def reddit_professional_indicators(niche: str) -> List[str]:
+    return [
+        f'{niche} coach', f'{niche} trainer', f'{niche} consultant',
+        'personal trainer', 'certified trainer', 'coaching services',
+        'dm for coaching', 'trainer here', 'professional', 'expert',
+        'check out my program', 'my coaching business', 'offering training',
+        'i coach', 'i train clients', 'as a trainer', 'as a coach',
+        'my services', 'contact me for', 'consultation available'
+    ]
+
+
+@lru_cache(maxsize=None)
+def reddit_matcher(niche: str) -> KeywordMatcher:
+    """Compiled Reddit keyword groups for one niche (built once per niche)"""
+    return KeywordMatcher({
+        '_professional': reddit_professional_indicators(niche),
+        '_niche': REDDIT_NICHE_KEYWORDS.get(niche, REDDIT_NICHE_KEYWORDS['fitness']),
+        **REDDIT_END_CUSTOMER_SIGNALS,
+    })
+
+
+def score_reddit_end_customer(analysis_text: str, niche: str) -> Tuple[bool, float, str]:
+    """Single-pass scoring for reddit_scraper_ec.is_niche_end_customer_reddit"""
+    counts = reddit_matcher(niche).group_counts(analysis_text)
+
+    # Only exclude if multiple professional indicators (be less strict)
+    if counts['_professional'] >= 2:
+        return False, 0, "professional"
+
+    total_score = 0
+    customer_type = "volume"
+    for signal_type in REDDIT_END_CUSTOMER_SIGNALS:
+        category_score = counts[signal_type]
+        if category_score <= 0:
+            continue
+        if signal_type in REDDIT_PREMIUM_CATEGORIES:
+            total_score += category_score * 3
+            customer_type = "premium"
+        elif signal_type in REDDIT_STANDARD_CATEGORIES:
+            total_score += category_score * 2
+            if customer_type != "premium":
+                customer_type = "standard"
+        else:
+            total_score += category_score
+
+    is_customer = total_score >= 1
+
+    niche_context_bonus = counts['_niche'] * 0.5
+    total_score += niche_context_bonus
+
+    # If we have niche context but low score, still consider as end customer
+    if niche_context_bonus >= 2 and total_score >= 1:
+        is_customer = True
+        if customer_type == "volume" and total_score < 3:
+            customer_type = "standard"
+
+    return is_customer, total_score, customer_type
+
+
+# ---------------------------------------------------------------------------
+# Medium end-customer classifier
+# ---------------------------------------------------------------------------
+
+MEDIUM_PROFESSIONAL_INDICATORS = [
+    # Only exclude clear business/service language
+    'coaching services', 'personal training', 'nutrition plans',
+    'transformation programs', 'coaching programs', 'wellness programs',
+    'book a consultation', 'dm for coaching', 'custom plans',
+    'coaching business', 'my course', 'my program', 'my method',
+    'contact me for', 'services available', 'consultation available',
+    'hire me', 'work with me', 'dm for services'
+]
+
+MEDIUM_END_CUSTOMER_SIGNALS = {
+    # Premium Leads ($80-250 each) - High intent/transformation
+    'transformation_sharing': [
+        'my journey', 'my transformation', 'my story', 'my experience',
+        'lost weight', 'gained muscle', 'changed my life', 'transformation',
+        'before and after', 'progress update', 'documenting my',
+        'sharing my experience', 'this is my story', 'my recovery',
+        'my healing', 'my success', 'my failure', 'learned from'
+    ],
+
+    # Premium Leads - Problem/struggle documentation
+    'struggle_documentation': [
+        'struggling with', 'can\'t lose weight', 'plateau', 'stuck',
+        'not seeing results', 'frustrated with', 'tired of',
+        'nothing works', 'tried everything', 'desperate for help',
+        'at my wit\'s end', 'need help', 'seeking advice',
+        'overwhelmed', 'confused', 'lost', 'failed'
+    ],
+
+    # Premium Leads - Medical/urgent motivation
+    'health_motivated': [
+        'doctor told me', 'health scare', 'medical advice', 'diagnosis',
+        'prescribed', 'treatment', 'therapy', 'recovery',
+        'medical condition', 'health concerns', 'doctor recommended',
+        'urgent', 'emergency', 'crisis', 'breaking point'
+    ],
+
+    # Standard Leads ($40-100 each) - Goal-oriented content
+    'goal_oriented': [
+        'my goal is', 'trying to', 'want to', 'working towards',
+        'new year resolution', 'target', 'objective', 'plan to',
+        'hoping to', 'aiming for', 'striving to', 'dream of',
+        'aspire to', 'desire to', 'wish to'
+    ],
+
+    # Standard Leads - Beginner seeking guidance
+    'beginner_guidance': [
+        'new to', 'beginner', 'just started', 'where to start',
+        'complete beginner', 'never done', 'first time',
+        'don\'t know how', 'need guidance', 'learning about',
+        'trying to understand', 'researching', 'exploring'
+    ],
+
+    # Volume Leads ($30-80 each) - Product/service research
+    'product_research': [
+        'best apps', 'equipment review', 'worth the money',
+        'should i buy', 'recommendations', 'anyone tried',
+        'thinking of getting', 'looking for', 'shopping for',
+        'comparing', 'reviews', 'experiences with',
+        'worth it', 'good investment', 'value for money'
+    ],
+
+    # Volume Leads - Lifestyle integration
+    'lifestyle_focus': [
+        'busy mom', 'working parent', 'busy professional', 'no time',
+        'work life balance', 'fitting in', 'quick solutions',
+        'efficient', 'time-saving', 'busy schedule',
+        'juggling', 'multitasking', 'overwhelmed'
+    ]
+}
+
+MEDIUM_PREMIUM_CATEGORIES = ('transformation_sharing', 'struggle_documentation', 'health_motivated')
+MEDIUM_STANDARD_CATEGORIES = ('goal_oriented', 'beginner_guidance')
+
+
+@lru_cache(maxsize=None)
+def medium_matcher() -> KeywordMatcher:
+    """Compiled Medium keyword groups (niche-independent)"""
+    return KeywordMatcher({'_professional': MEDIUM_PROFESSIONAL_INDICATORS, **MEDIUM_END_CUSTOMER_SIGNALS})
+
+
+def score_medium_end_customer(analysis_text: str) -> Tuple[bool, float, str, List[str]]:
+    """
+    Single-pass scoring for medium_scraper_ec.is_niche_end_customer_medium.
+    Also returns the matched categories for the scraper's debug output.
+    """
+    counts = medium_matcher().group_counts(analysis_text)
+
+    if counts['_professional'] > 0:
+        return False, 0, "professional", []
+
+    total_score = 0
+    customer_type = "volume"
+    matched_categories = []
+    for signal_type in MEDIUM_END_CUSTOMER_SIGNALS:
+        category_score = counts[signal_type]
+        if category_score <= 0:
+            continue
+        matched_categories.append(signal_type)
+        if signal_type in MEDIUM_PREMIUM_CATEGORIES:
+            total_score += category_score * 4
+            customer_type = "premium"
+        elif signal_type in MEDIUM_STANDARD_CATEGORIES:
+            total_score += category_score * 2
+            if customer_type != "premium":
+                customer_type = "standard"
+        else:
+            total_score += category_score
+
+    is_customer = total_score >= 0.3
+    return is_customer, total_score, customer_type, matched_categories
@@ -0,0 +1,228 @@
+"""
+Columnar (Parquet) storage for saved leads.
+
+Every lead file written by persistence.save_leads_to_files also gets a Parquet
+partition next to it:
+
+    <csv dir>/columnar/user=<username>/platform=<platform>/<csv stem>.parquet
+
+A partition has the same columns and dtypes pandas.read_csv gives for the CSV:
+the rows are parsed through read_csv once at write time, so numeric columns
+(followers, relevance_score, ...) are stored typed and the columns that are
+empty for a platform are all-null (next to free in Parquet). The
+low-cardinality ``platform``, ``search_term`` and ``lead_quality`` columns are
+dictionary encoded on disk. Readers ask for just the columns they need; CSV
+becomes an export produced on download via export_csv().
+
+pyarrow is optional. Without it nothing is written and read_lead_frame()
+falls back to pandas.read_csv, so CSV files stay the source of truth.
+Set LEAD_COLUMNAR_ENABLED=0 to turn the partitions off.
+"""
+
+import csv
+import io
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    COLUMNAR_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    COLUMNAR_AVAILABLE = False
+
+LEAD_COLUMNAR_ENABLED = os.getenv("LEAD_COLUMNAR_ENABLED", "1").lower() not in ("0", "false", "no")
+
+COLUMNAR_DIR_NAME = "columnar"
+DICTIONARY_COLUMNS = ("platform", "search_term", "lead_quality")
+PARQUET_COMPRESSION = os.getenv("LEAD_COLUMNAR_COMPRESSION", "zstd")
+
+# {platform}_leads[_raw]_{user}_{YYYY-MM-DD_HH-MM}.csv as written by persistence
+_LEAD_FILE_RE = re.compile(
+    r"^(?P<platform>[a-z]+)_leads(?:_raw)?_(?P<user>.+?)_(?:\d{8}_\d{4,6}|\d{4}-\d{2}-\d{2}_\d{2}-\d{2})$"
+)
+
+
+def columnar_enabled() -> bool:
+    return COLUMNAR_AVAILABLE and LEAD_COLUMNAR_ENABLED
+
+
+def _csv_frame(leads: List[Dict], fieldnames: List[str]) -> pd.DataFrame:
+    """The frame pandas.read_csv would return for these rows written as a lead CSV"""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(leads)
+    buf.seek(0)
+    return pd.read_csv(buf)
+
+
+class LeadColumnarStore:
+    """Per-user, per-platform Parquet partitions under ``<base_dir>/columnar``"""
+
+    def __init__(self, base_dir=None):
+        self.base_dir = Path(base_dir or os.getenv("CSV_DIR", "client_configs"))
+        self.root = self.base_dir / COLUMNAR_DIR_NAME
+
+    def _user_dir(self, username: str) -> Path:
+        return self.root / f"user={username}"
+
+    def partition_path(self, username: str, platform: str, stem: str) -> Path:
+        return self._user_dir(username) / f"platform={platform}" / f"{stem}.parquet"
+
+    # ------------------------------------------------------------------ writes
+
+    def write_partition(self, leads: List[Dict], username: str, platform: str, stem: str,
+                        fieldnames: List[str] = None) -> Optional[str]:
+        """Write one saved lead file as a Parquet partition; returns its path"""
+        if not columnar_enabled() or not leads:
+            return None
+
+        # Same columns as the CSV: the given fieldnames, else every key seen
+        names = list(fieldnames or [])
+        if not names:
+            for lead in leads:
+                for key in lead:
+                    if key not in names:
+                        names.append(key)
+
+        df = _csv_frame(leads, names)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        path = self.partition_path(username, platform, stem)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        pq.write_table(table, tmp, compression=PARQUET_COMPRESSION,
+                       use_dictionary=[c for c in DICTIONARY_COLUMNS if c in df.columns])
+        os.replace(tmp, path)
+        return str(path)
+
+    # ----------------------------------------------------------------- queries
+
+    def partitions(self, username: str, platform: str = None) -> List[Path]:
+        """Partition files for a user (optionally one platform), newest first"""
+        user_dir = self._user_dir(username)
+        if not user_dir.exists():
+            return []
+        pattern = f"platform={platform}/*.parquet" if platform else "platform=*/*.parquet"
+        files = list(user_dir.glob(pattern))
+        return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)
+
+    def platforms_for_user(self, username: str) -> List[str]:
+        user_dir = self._user_dir(username)
+        if not user_dir.exists():
+            return []
+        return sorted(p.name.split("=", 1)[1] for p in user_dir.glob("platform=*") if p.is_dir())
+
+    def read(self, username: str, platform: str = None, columns: List[str] = None,
+             latest_only: bool = False) -> pd.DataFrame:
+        """Leads for a user as a DataFrame, reading only ``columns`` when given"""
+        if not COLUMNAR_AVAILABLE:
+            return pd.DataFrame()
+        files = self.partitions(username, platform)
+        if latest_only:
+            files = files[:1]
+        frames = [read_partition(f, columns) for f in files]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        return pd.concat(frames, ignore_index=True)
+
+    def export_csv(self, username: str, platform: str = None, columns: List[str] = None) -> str:
+        """CSV text for a download button, produced from the partitions on demand"""
+        return self.read(username, platform, columns).to_csv(index=False)
+
+
+def read_partition(path, columns: List[str] = None) -> pd.DataFrame:
+    """Read one partition; requested columns that were never stored come back empty"""
+    if columns:
+        present = set(pq.read_schema(path).names)
+        table = pq.read_table(path, columns=[c for c in columns if c in present])
+        df = table.to_pandas()
+        for col in columns:
+            if col not in df.columns:
+                df[col] = None
+        return df[list(columns)]
+    return pq.read_table(path).to_pandas()
+
+
+def partition_for_csv(csv_path) -> Optional[Path]:
+    """Parquet twin of a lead CSV, if one exists and is at least as new"""
+    if not COLUMNAR_AVAILABLE:
+        return None
+    csv_path = Path(csv_path)
+    match = _LEAD_FILE_RE.match(csv_path.stem)
+    if not match:
+        return None
+    store = get_columnar_store(csv_path.parent)
+    path = store.partition_path(match.group("user"), match.group("platform"), csv_path.stem)
+    try:
+        if path.stat().st_mtime >= csv_path.stat().st_mtime:
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def read_lead_frame(csv_path, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Load a lead file as a DataFrame: from its Parquet partition when there is
+    one, otherwise from the CSV itself. With ``columns`` only those are read;
+    ones the file doesn't have are left out, as with read_csv(usecols=...).
+    """
+    part = partition_for_csv(csv_path)
+    if part is not None:
+        try:
+            if columns:
+                # File column order, like read_csv(usecols=...)
+                wanted = set(columns)
+                names = [c for c in pq.read_schema(part).names if c in wanted]
+                df = pq.read_table(part, columns=names).to_pandas()
+            else:
+                df = read_partition(part)
+            # Callers were written against read_csv frames; don't hand them categoricals
+            for col in df.columns:
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype(object)
+            return df
+        except Exception as e:
+            print(f"⚠️ Columnar read failed for {part}, using CSV: {e}")
+    if columns:
+        wanted = set(columns)
+        return pd.read_csv(csv_path, usecols=lambda c: c in wanted)
+    return pd.read_csv(csv_path)
+
+
+def export_csv_bytes(csv_path) -> Optional[bytes]:
+    """Download payload for a lead file: the CSV if present, else exported from its partition"""
+    csv_path = Path(csv_path)
+    if csv_path.exists():
+        return csv_path.read_bytes()
+    match = _LEAD_FILE_RE.match(csv_path.stem)
+    if not match or not COLUMNAR_AVAILABLE:
+        return None
+    store = get_columnar_store(csv_path.parent)
+    path = store.partition_path(match.group("user"), match.group("platform"), csv_path.stem)
+    if not path.exists():
+        return None
+    return read_partition(path).to_csv(index=False).encode("utf-8")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_columnar_store(base_dir=None) -> LeadColumnarStore:
+    """Shared store for a CSV directory"""
+    key = str(Path(base_dir or os.getenv("CSV_DIR", "client_configs")).resolve())
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = LeadColumnarStore(key)
+        return _stores[key]
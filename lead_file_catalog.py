@@ -0,0 +1,276 @@
+"""
+Indexed catalog of lead CSV files.
+
+persistence.save_leads_to_files records every file it writes (user,
+platform, search term, row count, mtime, size), and files written by other
+code paths are picked up by an incremental reconcile that only re-reads a
+CSV when its mtime or size changed. Dashboard lookups ("newest file for this
+user", "leads per platform") then become indexed SQLite queries instead of
+globbing CSV_DIR and parsing every file on each Streamlit rerun.
+
+The database lives next to the CSVs (``<CSV_DIR>/lead_catalog.db``) so it
+survives deploys on the same volume.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lead_file_stats import column_mode, count_csv_rows
+
+CATALOG_DB_NAME = "lead_catalog.db"
+RECONCILE_INTERVAL = float(os.getenv("LEAD_CATALOG_RECONCILE_SECONDS", "30"))
+
+KNOWN_PLATFORMS = ("twitter", "facebook", "linkedin", "tiktok", "instagram", "youtube", "medium", "reddit")
+PLATFORM_COLUMNS = ("platform", "source", "site", "network")
+
+# {platform}_leads[_raw]_{user}_{YYYY-MM-DD_HH-MM}.csv as written by persistence
+_LEAD_FILE_RE = re.compile(
+    r"^(?P<platform>[a-z]+)_leads(?P<raw>_raw)?_(?P<user>.+?)_(?P<ts>\d{8}_\d{4,6}|\d{4}-\d{2}-\d{2}_\d{2}-\d{2})\.csv$"
+)
+
+def _platform_from_name(name: str) -> str:
+    lower = name.lower()
+    for platform in KNOWN_PLATFORMS:
+        if platform in lower:
+            return platform
+    return "unknown"
+
+
+def scan_csv(path) -> Dict:
+    """Data rows (mmap newline scan) and the dominant platform value (from a head sample)"""
+    return {"rows": count_csv_rows(path), "platform_value": column_mode(path, PLATFORM_COLUMNS)}
+
+
+class LeadFileCatalog:
+    """SQLite index of lead CSV files under one or more directories"""
+
+    def __init__(self, base_dir=None):
+        self.base_dir = Path(base_dir or os.getenv("CSV_DIR", "client_configs"))
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = os.getenv("LEAD_CATALOG_DB") or str(self.base_dir / CATALOG_DB_NAME)
+        self._last_reconcile = {}
+        self._reconcile_lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS lead_files (
+                    path TEXT PRIMARY KEY,
+                    dir TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    username TEXT,
+                    platform TEXT,
+                    platform_value TEXT,
+                    search_term TEXT,
+                    kind TEXT,
+                    row_count INTEGER NOT NULL DEFAULT 0,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    recorded_at TIMESTAMP
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_lead_files_dir_mtime ON lead_files(dir, mtime)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_lead_files_user_platform ON lead_files(username, platform)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ writes
+
+    def record_file(self, path, username: str = None, platform: str = None, search_term: str = None,
+                    row_count: int = None, kind: str = "leads", platform_value: str = None):
+        """Record a file at write time (row count already known, no re-read)"""
+        p = Path(path).resolve()
+        try:
+            st = p.stat()
+        except OSError:
+            return
+        if row_count is None:
+            scanned = scan_csv(p)
+            row_count = scanned["rows"]
+            platform_value = platform_value or scanned["platform_value"]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO lead_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (str(p), str(p.parent), p.name, username, platform or _platform_from_name(p.name),
+                     platform_value, search_term, kind, int(row_count), st.st_mtime, st.st_size,
+                     datetime.now().isoformat())
+                )
+        finally:
+            conn.close()
+
+    def reconcile(self, root=None, recursive: bool = False, force: bool = False) -> int:
+        """
+        Bring the catalog in line with the files on disk under ``root``.
+        Unchanged files (same mtime and size) are skipped; runs at most once per
+        RECONCILE_INTERVAL per root unless ``force``. Returns files (re)scanned.
+        """
+        root = Path(root or self.base_dir).resolve()
+        key = (str(root), recursive)
+        now = time.time()
+        with self._reconcile_lock:
+            if not force and now - self._last_reconcile.get(key, 0) < RECONCILE_INTERVAL:
+                return 0
+            self._last_reconcile[key] = now
+
+        on_disk = {}
+        walker = os.walk(root) if recursive else [(str(root), [], os.listdir(root) if root.exists() else [])]
+        for dirpath, _dirs, filenames in walker:
+            for filename in filenames:
+                if not filename.lower().endswith(".csv"):
+                    continue
+                full = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                on_disk[str(Path(full).resolve())] = st
+
+        conn = self._connect()
+        try:
+            if recursive:
+                known_rows = conn.execute(
+                    "SELECT path, mtime, size FROM lead_files WHERE dir = ? OR dir LIKE ?",
+                    (str(root), str(root) + os.sep + "%")
+                ).fetchall()
+            else:
+                known_rows = conn.execute(
+                    "SELECT path, mtime, size FROM lead_files WHERE dir = ?", (str(root),)
+                ).fetchall()
+            known = {r["path"]: (r["mtime"], r["size"]) for r in known_rows}
+
+            removed = [(path,) for path in known if path not in on_disk]
+            changed = [path for path, st in on_disk.items()
+                       if known.get(path) != (st.st_mtime, st.st_size)]
+
+            updates = []
+            for path in changed:
+                st = on_disk[path]
+                try:
+                    scanned = scan_csv(path)
+                except Exception as e:
+                    print(f"[catalog] skip {path}: {e}")
+                    continue
+                p = Path(path)
+                match = _LEAD_FILE_RE.match(p.name)
+                updates.append((
+                    path, str(p.parent), p.name,
+                    match.group("user") if match else None,
+                    match.group("platform") if match else _platform_from_name(p.name),
+                    scanned["platform_value"], None,
+                    ("raw" if match.group("raw") else "leads") if match else None,
+                    scanned["rows"], st.st_mtime, st.st_size, datetime.now().isoformat()
+                ))
+
+            with conn:
+                if removed:
+                    conn.executemany("DELETE FROM lead_files WHERE path = ?", removed)
+                if updates:
+                    # Keep user/search term recorded at write time if the file was rewritten in place
+                    conn.executemany('''
+                        INSERT INTO lead_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(path) DO UPDATE SET
+                            username = COALESCE(lead_files.username, excluded.username),
+                            platform_value = excluded.platform_value,
+                            row_count = excluded.row_count,
+                            mtime = excluded.mtime,
+                            size = excluded.size,
+                            recorded_at = excluded.recorded_at
+                    ''', updates)
+            return len(updates)
+        finally:
+            conn.close()
+
+    # ----------------------------------------------------------------- queries
+
+    def find(self, pattern: str = "*.csv", root=None, username: str = None, min_rows: int = 0,
+             recursive: bool = False, reconcile: bool = True) -> List[Dict]:
+        """
+        Catalogued files matching a glob ``pattern`` (on the file name), newest
+        first. ``username`` keeps files whose name contains it, like the old
+        ``*{username}*.csv`` globs.
+        """
+        root = Path(root or self.base_dir).resolve()
+        if reconcile:
+            self.reconcile(root, recursive=recursive)
+
+        sql = "SELECT * FROM lead_files WHERE row_count >= ?"
+        params = [min_rows]
+        if recursive:
+            sql += " AND (dir = ? OR dir LIKE ?)"
+            params += [str(root), str(root) + os.sep + "%"]
+        else:
+            sql += " AND dir = ?"
+            params.append(str(root))
+        if username:
+            sql += " AND instr(name, ?) > 0"
+            params.append(username)
+        sql += " ORDER BY mtime DESC"
+
+        conn = self._connect()
+        try:
+            rows = [dict(r) for r in conn.execute(sql, params)]
+        finally:
+            conn.close()
+        return [r for r in rows if fnmatchcase(r["name"], pattern)]
+
+    def latest(self, pattern: str, root=None, username: str = None, min_rows: int = 0,
+               recursive: bool = False) -> Optional[str]:
+        """Path of the newest matching file, or None"""
+        rows = self.find(pattern, root=root, username=username, min_rows=min_rows, recursive=recursive)
+        return rows[0]["path"] if rows else None
+
+    def files_for_user(self, username: str, root=None) -> List[Dict]:
+        return self.find("*.csv", root=root, username=username)
+
+    def stats_for_paths(self, paths) -> Dict[str, Dict]:
+        """Catalog rows for specific files, keyed by path as given"""
+        resolved = {str(Path(p).resolve()): p for p in paths}
+        if not resolved:
+            return {}
+        conn = self._connect()
+        try:
+            out = {}
+            items = list(resolved)
+            for start in range(0, len(items), 500):
+                batch = items[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for r in conn.execute(f"SELECT * FROM lead_files WHERE path IN ({placeholders})", batch):
+                    out[resolved[r["path"]]] = dict(r)
+            return out
+        finally:
+            conn.close()
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(base_dir=None) -> Optional[LeadFileCatalog]:
+    """Shared catalog for a CSV directory, or None if it can't be opened"""
+    key = str(Path(base_dir or os.getenv("CSV_DIR", "client_configs")).resolve())
+    with _catalogs_lock:
+        if key not in _catalogs:
+            try:
+                _catalogs[key] = LeadFileCatalog(key)
+            except Exception as e:
+                print(f"[catalog] unavailable for {key}: {e}")
+                return None
+        return _catalogs[key]
@@ -0,0 +1,121 @@
+"""
+Cheap row counts and header peeks for lead CSV files.
+
+count_csv_rows() memory-maps the file and counts record-ending newlines,
+skipping newlines inside quoted fields (multi-line bios and DMs), so it
+agrees with csv.reader / len(pd.read_csv(...)) without parsing any values.
+read_csv_head() returns the header and first N rows through the csv module
+without loading the rest of the file.
+
+Both results are cached per (path, mtime, size), so an unchanged file is
+never read twice by the same process.
+"""
+
+import csv
+import mmap
+import os
+import re
+import sys
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+CACHE_MAX_ENTRIES = 4096
+_CHUNK = 1 << 20
+
+# A complete quoted field; "" escapes inside it are just two adjacent matches
+_QUOTED_FIELD = re.compile(rb'"[^"]*"')
+
+try:
+    csv.field_size_limit(sys.maxsize)
+except OverflowError:
+    csv.field_size_limit(2 ** 31 - 1)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _file_key(path) -> Tuple[str, int, int]:
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def _cached(kind: str, path, compute):
+    key = (kind,) + _file_key(path)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    value = compute(key[3])
+    with _cache_lock:
+        _cache[key] = value
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return value
+
+
+def _count_newlines(mm, start: int, end: int) -> int:
+    total = 0
+    for pos in range(start, end, _CHUNK):
+        total += mm[pos:min(pos + _CHUNK, end)].count(b"\n")
+    return total
+
+
+def _count_records(mm, size: int) -> int:
+    """Records (header included) in a mapped CSV"""
+    newlines = _count_newlines(mm, 0, size)
+    if mm.find(b'"') != -1:
+        # Newlines inside quoted fields don't end a record
+        newlines -= sum(m.group().count(b"\n") for m in _QUOTED_FIELD.finditer(mm))
+    # Last record without a trailing newline
+    if mm[size - 1:size] != b"\n":
+        newlines += 1
+    return newlines
+
+
+def count_csv_rows(path) -> int:
+    """Data rows in a CSV (header excluded); quoted multi-line fields count once"""
+    def compute(size):
+        if size == 0:
+            return 0
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return max(0, _count_records(mm, size) - 1)
+    return _cached("rows", path, compute)
+
+
+def read_csv_head(path, n: int = 5) -> Tuple[List[str], List[Dict[str, str]]]:
+    """(header, first ``n`` rows as dicts) without reading the rest of the file"""
+    def compute(_size):
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            rows = []
+            for row in reader:
+                if not row:
+                    continue
+                rows.append(dict(zip(header, row)))
+                if len(rows) >= n:
+                    break
+        return header, rows
+    header, rows = _cached(f"head:{n}", path, compute)
+    return list(header), [dict(r) for r in rows]
+
+
+def read_csv_header(path) -> List[str]:
+    return read_csv_head(path, 0)[0]
+
+
+def column_mode(path, columns, sample: int = 200) -> Optional[str]:
+    """Most common lowercased value of the first present column in ``columns`` (from a head sample)"""
+    header, rows = read_csv_head(path, sample)
+    lowered = {str(h).strip().lower(): h for h in header}
+    col = next((lowered[c] for c in columns if c in lowered), None)
+    if col is None:
+        return None
+    values = Counter(str(r.get(col, "")).strip().lower() for r in rows if r.get(col))
+    return values.most_common(1)[0][0] if values else None
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,184 @@
+"""
+Indexed, append-only lead history for user-aware deduplication.
+
+Each user gets one SQLite file holding the hash of every lead they have
+already received, keyed by (platform, hash). Membership checks are primary-key
+lookups and new leads are plain INSERTs, so the cost of a scrape no longer
+grows with the size of the user's history.
+
+The legacy ``user_leads_{username}_{platform}.json`` files are imported once
+on first use and then renamed to ``*.json.migrated``.
+"""
+
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+LEAD_HISTORY_DIR = os.getenv("LEAD_HISTORY_DIR", ".")
+
+# SQLite limits host parameters per statement; stay well below it
+_IN_BATCH = 500
+
+
+def _safe_username(username) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", str(username or "anon"))
+
+
+class LeadHistoryStore:
+    """Per-user hash index of previously delivered leads"""
+
+    def __init__(self, username: str, platform: str, base_dir: str = None):
+        self.username = username
+        self.platform = platform
+        self.base_dir = base_dir or LEAD_HISTORY_DIR
+        self.db_file = os.path.join(self.base_dir, f"user_leads_{_safe_username(username)}.db")
+        self.legacy_json_file = os.path.join(self.base_dir, f"user_leads_{username}_{platform}.json")
+        self._init_database()
+        self._migrate_legacy_json()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_database(self):
+        """Create the hash table if needed"""
+        os.makedirs(self.base_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS lead_hashes (
+                    platform TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    name TEXT,
+                    profile_url TEXT,
+                    search_term TEXT,
+                    date_added TIMESTAMP,
+                    PRIMARY KEY (platform, hash)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS migrations (
+                    source TEXT PRIMARY KEY,
+                    migrated_at TIMESTAMP,
+                    rows INTEGER
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _migrate_legacy_json(self):
+        """One-time import of user_leads_{user}_{platform}.json"""
+        if not os.path.exists(self.legacy_json_file):
+            return
+
+        source = os.path.basename(self.legacy_json_file)
+        conn = self._connect()
+        try:
+            already = conn.execute("SELECT 1 FROM migrations WHERE source = ?", (source,)).fetchone()
+            if already:
+                return
+
+            with open(self.legacy_json_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+
+            rows = {}
+            for lead in legacy.get("leads", []):
+                lead_hash = lead.get("hash")
+                if lead_hash:
+                    rows[lead_hash] = (
+                        self.platform, lead_hash, lead.get("name"), lead.get("profile_url"),
+                        lead.get("search_term", ""), lead.get("date_added"),
+                    )
+            # Hashes without a matching lead entry still count as history
+            for lead_hash in legacy.get("lead_hashes", []):
+                rows.setdefault(lead_hash, (self.platform, lead_hash, None, None, "", None))
+
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO lead_hashes VALUES (?, ?, ?, ?, ?, ?)", rows.values()
+                )
+                conn.execute(
+                    "INSERT INTO migrations (source, migrated_at, rows) VALUES (?, ?, ?)",
+                    (source, datetime.now().isoformat(), len(rows)),
+                )
+
+            os.replace(self.legacy_json_file, self.legacy_json_file + ".migrated")
+            print(f"📦 Migrated {len(rows)} historical leads from {source}")
+        except Exception as e:
+            print(f"⚠️ Error migrating historical leads from {source}: {e}")
+        finally:
+            conn.close()
+
+    def contains(self, lead_hash: str) -> bool:
+        """O(1) primary-key lookup for a single hash"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM lead_hashes WHERE platform = ? AND hash = ?", (self.platform, lead_hash)
+            ).fetchone()
+            return row is not None
+        finally:
+            conn.close()
+
+    def contains_many(self, lead_hashes: Iterable[str]) -> Set[str]:
+        """Return the subset of ``lead_hashes`` already in the user's history"""
+        lead_hashes = [h for h in dict.fromkeys(lead_hashes) if h]
+        found = set()
+        if not lead_hashes:
+            return found
+
+        conn = self._connect()
+        try:
+            for start in range(0, len(lead_hashes), _IN_BATCH):
+                batch = lead_hashes[start:start + _IN_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                cursor = conn.execute(
+                    f"SELECT hash FROM lead_hashes WHERE platform = ? AND hash IN ({placeholders})",
+                    [self.platform, *batch],
+                )
+                found.update(row[0] for row in cursor)
+            return found
+        finally:
+            conn.close()
+
+    def add_many(self, entries: List[Dict]) -> int:
+        """Append new history entries (dicts with hash/name/profile_url/search_term)"""
+        if not entries:
+            return 0
+        now = datetime.now().isoformat()
+        rows = [
+            (self.platform, e['hash'], e.get('name'), e.get('profile_url'), e.get('search_term', ''), now)
+            for e in entries if e.get('hash')
+        ]
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.executemany("INSERT OR IGNORE INTO lead_hashes VALUES (?, ?, ?, ?, ?, ?)", rows)
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        """Number of historical leads for this user/platform"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM lead_hashes WHERE platform = ?", (self.platform,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def clear(self):
+        """Remove this platform's history for the user"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM lead_hashes WHERE platform = ?", (self.platform,))
+        finally:
+            conn.close()
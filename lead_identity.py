@@ -0,0 +1,186 @@
+"""
+Canonical identity keys for leads across platforms.
+
+Turns a profile URL (or, failing that, a platform handle) into a stable,
+compact key such as ``twitter:jack`` or ``youtube:channel/UCxyz``. Two rows
+for the same account produce the same key no matter how their name or bio
+changed between scrapes, so dedup and credit accounting can treat them as the
+same person.
+
+Shared by SmartDuplicateHandler, deduplication_config and
+OrganizedLeadAnalyzer.
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# First path segments that are site pages, not accounts
+_RESERVED_PATHS = {
+    'twitter': {'search', 'home', 'explore', 'i', 'hashtag', 'intent', 'share', 'settings',
+                'notifications', 'messages', 'login', 'signup', 'tos', 'privacy', 'compose'},
+    'instagram': {'p', 'reel', 'reels', 'tv', 'explore', 'accounts', 'stories', 'direct', 'about',
+                  'developer', 'legal', 'web'},
+    'facebook': {'search', 'groups', 'pages', 'events', 'watch', 'marketplace', 'gaming', 'login',
+                 'help', 'policies', 'privacy', 'hashtag', 'photo', 'photo.php', 'story.php',
+                 'permalink.php', 'sharer', 'sharer.php', 'home.php'},
+}
+
+_HANDLE_RE = re.compile(r'^[A-Za-z0-9_.\-]+$')
+
+
+def _first_segment(path: str) -> str:
+    return path.strip('/').split('/')[0] if path.strip('/') else ''
+
+
+def _parse_twitter(parsed) -> Optional[str]:
+    handle = _first_segment(parsed.path)
+    if handle and handle.lower() not in _RESERVED_PATHS['twitter'] and re.match(r'^[A-Za-z0-9_]{1,15}$', handle):
+        return handle.lower()
+    return None
+
+
+def _parse_instagram(parsed) -> Optional[str]:
+    handle = _first_segment(parsed.path)
+    if handle and handle.lower() not in _RESERVED_PATHS['instagram'] and re.match(r'^[A-Za-z0-9_.]{1,30}$', handle):
+        return handle.lower()
+    return None
+
+
+def _parse_tiktok(parsed) -> Optional[str]:
+    segment = _first_segment(parsed.path)
+    if segment.startswith('@') and len(segment) > 1:
+        return segment[1:].lower()
+    return None
+
+
+def _parse_youtube(parsed) -> Optional[str]:
+    parts = parsed.path.strip('/').split('/')
+    if not parts or not parts[0]:
+        return None
+    if parts[0].startswith('@') and len(parts[0]) > 1:
+        return parts[0].lower()
+    if parts[0] == 'channel' and len(parts) > 1:
+        # Channel IDs are case-sensitive
+        return f"channel/{parts[1]}"
+    if parts[0] in ('c', 'user') and len(parts) > 1:
+        return f"{parts[0]}/{parts[1].lower()}"
+    return None
+
+
+def _parse_reddit(parsed) -> Optional[str]:
+    parts = parsed.path.strip('/').split('/')
+    if len(parts) > 1 and parts[0] in ('user', 'u') and parts[1]:
+        return parts[1].lower()
+    return None
+
+
+def _parse_medium(parsed) -> Optional[str]:
+    host = parsed.netloc.lower()
+    segment = _first_segment(parsed.path)
+    if segment.startswith('@') and len(segment) > 1:
+        return segment[1:].lower()
+    # Custom subdomain blogs: https://<user>.medium.com/...
+    if host.endswith('.medium.com') and host not in ('www.medium.com', 'help.medium.com', 'policy.medium.com'):
+        return host[:-len('.medium.com')]
+    return None
+
+
+def _parse_facebook(parsed) -> Optional[str]:
+    segment = _first_segment(parsed.path)
+    if segment == 'profile.php':
+        profile_id = parse_qs(parsed.query).get('id', [''])[0]
+        return f"id/{profile_id}" if profile_id else None
+    if segment == 'people':
+        # /people/<Name>/<numeric id>
+        parts = parsed.path.strip('/').split('/')
+        return f"id/{parts[2]}" if len(parts) > 2 else None
+    if segment and segment.lower() not in _RESERVED_PATHS['facebook']:
+        return segment.lower()
+    return None
+
+
+def _parse_linkedin(parsed) -> Optional[str]:
+    parts = parsed.path.strip('/').split('/')
+    if len(parts) > 1 and parts[0] == 'in' and parts[1]:
+        return parts[1].lower()
+    return None
+
+
+# host suffix -> (platform, parser)
+PLATFORM_URL_PARSERS = {
+    'twitter.com': ('twitter', _parse_twitter),
+    'x.com': ('twitter', _parse_twitter),
+    'instagram.com': ('instagram', _parse_instagram),
+    'tiktok.com': ('tiktok', _parse_tiktok),
+    'youtube.com': ('youtube', _parse_youtube),
+    'reddit.com': ('reddit', _parse_reddit),
+    'medium.com': ('medium', _parse_medium),
+    'facebook.com': ('facebook', _parse_facebook),
+    'linkedin.com': ('linkedin', _parse_linkedin),
+}
+
+
+def parse_profile_url(url: str) -> Optional[Tuple[str, str]]:
+    """Return (platform, account_id) for a profile URL, or None if it isn't one"""
+    if not url or not isinstance(url, str):
+        return None
+    url = url.strip()
+    if not url or url == 'URL not found':
+        return None
+    if '://' not in url:
+        url = f"https://{url}"
+
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+
+    host = parsed.netloc.lower().split(':')[0]
+    for suffix, (platform, parser) in PLATFORM_URL_PARSERS.items():
+        if host == suffix or host.endswith('.' + suffix):
+            account_id = parser(parsed)
+            return (platform, account_id) if account_id else None
+    return None
+
+
+# Platforms whose ``handle`` column holds a real account handle ("@x" / "u/x");
+# Facebook and LinkedIn store display names there.
+HANDLE_PLATFORMS = {'twitter', 'instagram', 'tiktok', 'youtube', 'reddit', 'medium'}
+
+
+def _handle_identity(handle: str, platform: str) -> Optional[str]:
+    """Fallback identity from a handle like '@jack' or 'u/jack'"""
+    handle = (handle or '').strip()
+    if handle.lower().startswith('u/'):
+        handle = handle[2:]
+    elif handle.startswith('@'):
+        handle = handle[1:]
+    else:
+        return None
+    if not handle or ' ' in handle or not _HANDLE_RE.match(handle):
+        return None
+    if platform == 'youtube':
+        return f"@{handle.lower()}"
+    return handle.lower()
+
+
+def canonical_identity_key(lead: Dict, platform: str = None) -> Optional[str]:
+    """
+    Stable ``platform:account`` key for a lead, or None if the lead carries
+    no account identifier (only a name/bio).
+    """
+    if not isinstance(lead, dict):
+        return None
+
+    for field in ('profile_url', 'url', 'channel_url'):
+        parsed = parse_profile_url(lead.get(field))
+        if parsed:
+            return f"{parsed[0]}:{parsed[1]}"
+
+    platform = str(platform or lead.get('platform') or '').strip().lower()
+    if platform in HANDLE_PLATFORMS:
+        account_id = _handle_identity(str(lead.get('handle') or ''), platform)
+        if account_id:
+            return f"{platform}:{account_id}"
+    return None
@@ -6,6 +6,22 @@ import glob
 from collections import defaultdict
 import json
 import hashlib
+import sys
+
+try:
+    from lead_identity import canonical_identity_key
+except ImportError:
+    # Script lives in leads/; the shared modules are one level up
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from lead_identity import canonical_identity_key
+from lead_columnar_store import read_lead_frame
+
+# Fields the duplicate keys, niche and business-target classification look at
+ANALYSIS_COLUMNS = [
+    'name', 'full_name', 'username', 'handle', 'display_name', 'first_name',
+    'email', 'email_address', 'contact_email', 'profile_url', 'url', 'channel_url',
+    'platform', 'bio', 'title', 'search_term', 'customer_type', 'business_target', 'lead_quality',
+]
 
 class OrganizedLeadAnalyzer:
     def __init__(self):
@@ -91,7 +107,12 @@ class OrganizedLeadAnalyzer:
         }
     
     def create_duplicate_key(self, lead_data):
-        """Create a unique key for duplicate detection based on name + email"""
+        """Create a unique key for duplicate detection: platform identity, else name + email"""
+        clean = {k: v for k, v in lead_data.items() if isinstance(v, str)}
+        identity = canonical_identity_key(clean)
+        if identity:
+            return identity
+        
         # Get name field (try multiple possible column names)
         name_fields = ['name', 'full_name', 'username', 'handle', 'display_name', 'first_name']
         email_fields = ['email', 'email_address', 'contact_email']
@@ -147,7 +168,10 @@ class OrganizedLeadAnalyzer:
                 
                 for duplicate in group[1:]:
                     duplicate_entry = duplicate['data'].copy()
-                    duplicate_entry['duplicate_reason'] = f"Duplicate of: {dup_key.split('|')[0]} ({dup_key.split('|')[1]})"
+                    if '|' in dup_key:
+                        duplicate_entry['duplicate_reason'] = f"Duplicate of: {dup_key.split('|')[0]} ({dup_key.split('|')[1]})"
+                    else:
+                        duplicate_entry['duplicate_reason'] = f"Duplicate of: {dup_key}"
                     duplicate_entry['original_index'] = group[0]['index']
                     duplicate_entry['duplicate_index'] = duplicate['index']
                     duplicates.append(duplicate_entry)
@@ -165,7 +189,7 @@ class OrganizedLeadAnalyzer:
         try:
             print(f"\nAnalyzing with duplicate detection: {filepath}")
             
-            df = pd.read_csv(filepath)
+            df = read_lead_frame(filepath, columns=ANALYSIS_COLUMNS)
             original_count = len(df)
             platform = self.identify_platform(filepath)
             
@@ -273,7 +297,8 @@ class OrganizedLeadAnalyzer:
                 print(f"File not found: {filepath}")
                 return None
             
-            df = pd.read_csv(filepath)
+            # Whole rows: this writes a CLEAN copy of the file
+            df = read_lead_frame(filepath)
             original_count = len(df)
             
             # Find duplicates
@@ -10,7 +10,12 @@ import re
 import sys
 import random
 from dm_sequences import generate_dm_with_fallback
-from persistence import save_leads_to_files
+from persistence import save_leads_to_files, open_lead_stream
+from selector_stats import ordered_selectors, record_selector_attempt
+import scraper_result
+from browser_setup import launch_browser, new_scraper_context
+from dom_extract import count_matches
+import scraper_progress
 from pathlib import Path
 
 # Directory where your CSV files are saved
@@ -77,6 +82,20 @@ if excluded_accounts:
 else:
     print(f"  🚫 No accounts excluded (configured via frontend)")
 
+# Leads and excluded accounts across every page extracted in this run
+run_counts = {"leads": 0, "excluded": 0}
+
+# Multiple strategies to find profiles
+PROFILE_SELECTORS = [
+    'div.entity-result__content',
+    'div.reusable-search__result-container',
+    'li.reusable-search__result-container', 
+    'div[data-chameleon-result-urn]',
+    'div.search-result__info',
+    'article[data-chameleon-result-urn]',
+    'div[class*="result"][class*="container"]'
+]
+
 def human_delay(min_sec=1, max_sec=3):
     """Add human-like delays"""
     time.sleep(random.uniform(min_sec, max_sec))
@@ -165,25 +184,33 @@ def is_relevant_to_search_term(name, headline, location):
     # Consider relevant if score >= 3
     return relevance_score >= 3, relevance_score
 
-def extract_profiles_from_page(page):
+def record_extraction(started, dm_seconds, leads_count, excluded_count):
+    """Add one page's leads, exclusions and extraction/inline DM time to the run totals"""
+    run_counts["leads"] += leads_count
+    run_counts["excluded"] += excluded_count
+    scraper_result.record_phase("dm_generation", dm_seconds)
+    scraper_result.record_phase("extraction", time.time() - started - dm_seconds)
+    scraper_result.report(excluded=run_counts["excluded"])
+    # DMs are generated inline, one per lead
+    scraper_progress.counts(final=True, leads_extracted=run_counts["leads"], excluded=run_counts["excluded"],
+                            dms_generated=run_counts["leads"])
+
+def report_page(page_num, page):
+    """Search result pages stand in for scrolls on LinkedIn"""
+    scraper_progress.scroll(page_num, MAX_PAGES, count_matches(page, PROFILE_SELECTORS))
+
+def extract_profiles_from_page(page, stream=None):
     """Extract profile data from current page"""
     results = []
     excluded_count = 0  # ✅ ADD THIS
-    
-    # Multiple strategies to find profiles
-    selectors = [
-        'div.entity-result__content',
-        'div.reusable-search__result-container',
-        'li.reusable-search__result-container', 
-        'div[data-chameleon-result-urn]',
-        'div.search-result__info',
-        'article[data-chameleon-result-urn]',
-        'div[class*="result"][class*="container"]'
-    ]
+    extraction_start = time.time()
+    dm_seconds = 0.0
     
     profile_elements = []
     working_selector = None
     
+    # Known-good selector first; the rest only if it stops matching
+    selectors = ordered_selectors(PLATFORM_NAME, "profiles", PROFILE_SELECTORS)
     for selector in selectors:
         try:
             elements = page.query_selector_all(selector)
@@ -194,6 +221,7 @@ def extract_profiles_from_page(page):
                 break
         except:
             continue
+    record_selector_attempt(PLATFORM_NAME, "profiles", selectors, working_selector, len(profile_elements))
     
     if not profile_elements:
         print("❌ No profile elements found with standard selectors")
@@ -245,11 +273,13 @@ def extract_profiles_from_page(page):
                     }
                     # Add platform and DM
                     lead["platform"] = "linkedin"
+                    dm_start = time.time()
                     lead["dm"] = generate_dm_with_fallback(
                         name=lead["name"],
                         bio=lead["bio"],
                         platform=lead["platform"]
                     )
+                    dm_seconds += time.time() - dm_start
                     
                     # Add additional LinkedIn-specific fields
                     lead.update({
@@ -265,6 +295,7 @@ def extract_profiles_from_page(page):
             # Take first 10 reasonable looking profiles
             if potential_profiles:
                 print(f"🎯 Found {len(potential_profiles)} potential profiles via text parsing")
+                record_extraction(extraction_start, dm_seconds, len(potential_profiles[:10]), excluded_count)
                 return potential_profiles[:10]
         except:
             pass
@@ -327,11 +358,13 @@ def extract_profiles_from_page(page):
                 }
                 # Add platform and DM
                 lead["platform"] = "linkedin"
+                dm_start = time.time()
                 lead["dm"] = generate_dm_with_fallback(
                     name=lead["name"],
                     bio=lead["bio"],
                     platform=lead["platform"]
                 )
+                dm_seconds += time.time() - dm_start
                 
                 # Add additional LinkedIn-specific fields
                 lead.update({
@@ -343,12 +376,18 @@ def extract_profiles_from_page(page):
                 })
                 
                 results.append(lead)
+                if stream:
+                    stream.write(lead)
+                scraper_progress.counts(leads_extracted=run_counts["leads"] + len(results),
+                                        excluded=run_counts["excluded"] + excluded_count,
+                                        dms_generated=run_counts["leads"] + len(results))
                 print(f"✅ {name} | Score: {relevance_score} | {headline[:30]}...")
             
         except Exception as e:
             print(f"⚠️ Error processing profile {i+1}: {e}")
             continue
     
+    record_extraction(extraction_start, dm_seconds, len(results), excluded_count)
     return results
 
 def create_lead(name, handle, bio, platform, tweet_text=None):
@@ -402,19 +441,16 @@ def handle_linkedin_simple():
     with sync_playwright() as p:
         print("🔐 Launching LinkedIn scraper with simple welcome handling...")
         
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-first-run',
-                '--disable-default-apps'
-            ]
-        )
+        browser = launch_browser(p, [
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+            '--no-first-run',
+            '--disable-default-apps'
+        ])
         
-        context = browser.new_context(
+        context = new_scraper_context(
+            browser, PLATFORM_NAME,
             storage_state=AUTH_FILE,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
             viewport={'width': 1366, 'height': 768},
             locale='en-US'
         )
@@ -431,6 +467,8 @@ def handle_linkedin_simple():
         
         page = context.new_page()
         all_raw_results = []
+        # Raw profiles are streamed to disk as they are extracted, page by page
+        lead_stream = open_lead_stream(PLATFORM_NAME, username, date_str, CSV_DIR)
         
         try:
             # Step 1: Navigate to LinkedIn and handle welcome page simply
@@ -656,8 +694,9 @@ def handle_linkedin_simple():
             print("📋 Extracting profiles from search results...")
             page.screenshot(path="linkedin_search_page.png")
             print("📸 Search page screenshot: linkedin_search_page.png")
+            report_page(1, page)
             
-            results = extract_profiles_from_page(page)
+            results = extract_profiles_from_page(page, stream=lead_stream)
             all_raw_results.extend(results)
             
             if not results:
@@ -666,7 +705,7 @@ def handle_linkedin_simple():
                 
                 if manual_intervention_mode(page, "Navigate to search results and scroll to see all profiles"):
                     # Try extraction again after manual intervention
-                    results = extract_profiles_from_page(page)
+                    results = extract_profiles_from_page(page, stream=lead_stream)
                     all_raw_results.extend(results)
             
             print(f"📊 Page 1 profiles found: {len(results)}")
@@ -686,6 +725,7 @@ def handle_linkedin_simple():
                         ]
                         
                         page_found = False
+                        phase_start = time.time()
                         for selector in next_selectors:
                             try:
                                 next_button = page.query_selector(selector)
@@ -697,13 +737,16 @@ def handle_linkedin_simple():
                                     break
                             except:
                                 continue
+                        # LinkedIn paginates instead of scrolling; page turns are its scrolling phase
+                        scraper_result.record_phase("scrolling", time.time() - phase_start)
                         
                         if not page_found:
                             print(f"❌ Could not find page {page_num} automatically")
                             try_manual = input(f"🤔 Try manual navigation to page {page_num}? (y/n): ")
                             if try_manual.lower() == 'y':
                                 if manual_intervention_mode(page, f"Navigate to page {page_num} of search results manually"):
-                                    page_results = extract_profiles_from_page(page)
+                                    report_page(page_num, page)
+                                    page_results = extract_profiles_from_page(page, stream=lead_stream)
                                     if page_results:
                                         all_raw_results.extend(page_results)
                                         print(f"✅ Added {len(page_results)} results from manual page {page_num}")
@@ -711,7 +754,8 @@ def handle_linkedin_simple():
                             break
                         
                         # Extract from new page
-                        page_results = extract_profiles_from_page(page)
+                        report_page(page_num, page)
+                        page_results = extract_profiles_from_page(page, stream=lead_stream)
                         if page_results:
                             all_raw_results.extend(page_results)
                             print(f"✅ Added {len(page_results)} results from page {page_num}")
@@ -727,9 +771,13 @@ def handle_linkedin_simple():
             
             if not all_raw_results:
                 print("❌ No raw results extracted")
+                if lead_stream:
+                    lead_stream.abort("no raw results")
                 browser.close()
                 return []
             
+            phase_start = time.time()
+            
             # 🚀 APPLY SMART USER-AWARE DEDUPLICATION
             print(f"\n🧠 Applying deduplication strategy: {DEDUP_MODE}")
             print(f"👤 User-specific deduplication for: {username}")
@@ -763,6 +811,7 @@ def handle_linkedin_simple():
                         unique_results.append(result)
                         seen_names.add(name_key)
                 dedup_stats = {"basic": True, "kept": len(unique_results)}
+            scraper_result.record_phase("dedup", time.time() - phase_start)
             
             # Final results summary
             print(f"\n📊 FINAL RESULTS SUMMARY:")
@@ -788,7 +837,7 @@ def handle_linkedin_simple():
             print(f"🚨 Unexpected error: {e}")
             print("🔄 Switching to full manual mode...")
             if manual_intervention_mode(page, "Handle the error and navigate to where you want to extract profiles"):
-                results = extract_profiles_from_page(page)
+                results = extract_profiles_from_page(page, stream=lead_stream)
                 all_raw_results.extend(results)
                 
                 # Apply deduplication even on manual results
@@ -835,6 +884,7 @@ def handle_linkedin_simple():
                 platform_name=PLATFORM_NAME,
                 csv_dir=CSV_DIR,          # uses your existing location
                 save_raw=SAVE_RAW_LEADS,  # if you have this flag
+                stream=lead_stream,
 )
             
             # Save processed results to main CSV
@@ -903,6 +953,8 @@ def handle_linkedin_simple():
                 print(f"\n📋 Raw profiles preserved: {len(all_raw_results)} total")
         else:
             print("⚠️ No profiles extracted")
+            if lead_stream:
+                lead_stream.complete(keep_raw=False, leads=0, raw_leads=len(all_raw_results))
             all_results = []
         
         # Keep browser open for additional manual work if desired
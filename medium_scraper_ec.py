@@ -8,8 +8,13 @@ import csv
 import re
 import random
 from dm_sequences import generate_dm_with_fallback
+import scraper_progress
+import scraper_result
+from browser_setup import launch_browser, new_scraper_context
+from dom_extract import collect_cards, count_matches, first_probe, probe_matches
 import os
-from persistence import save_leads_to_files
+from persistence import save_leads_to_files, open_lead_stream
+from keyword_matcher import score_medium_end_customer
 from pathlib import Path
 
 # Directory where your CSV files are saved
@@ -247,108 +252,9 @@ def is_niche_end_customer_medium(name, bio, article_titles="", reading_patterns=
         
     analysis_text = f"{name} {bio} {article_titles} {reading_patterns}".lower()
     
-    # 🚫 EXCLUDE PROFESSIONALS (More permissive - only clear business language)
-    professional_indicators = [
-        # Only exclude clear business/service language
-        'coaching services', 'personal training', 'nutrition plans',
-        'transformation programs', 'coaching programs', 'wellness programs',
-        'book a consultation', 'dm for coaching', 'custom plans',
-        'coaching business', 'my course', 'my program', 'my method',
-        'contact me for', 'services available', 'consultation available',
-        'hire me', 'work with me', 'dm for services'
-    ]
-    
-    for indicator in professional_indicators:
-        if indicator in analysis_text:
-            return False, 0, "professional"
-    
-    # 🎯 UNIVERSAL END CUSTOMER SIGNALS
-    end_customer_signals = {
-        # Premium Leads ($80-250 each) - High intent/transformation
-        'transformation_sharing': [
-            'my journey', 'my transformation', 'my story', 'my experience',
-            'lost weight', 'gained muscle', 'changed my life', 'transformation',
-            'before and after', 'progress update', 'documenting my',
-            'sharing my experience', 'this is my story', 'my recovery',
-            'my healing', 'my success', 'my failure', 'learned from'
-        ],
-        
-        # Premium Leads - Problem/struggle documentation
-        'struggle_documentation': [
-            'struggling with', 'can\'t lose weight', 'plateau', 'stuck',
-            'not seeing results', 'frustrated with', 'tired of',
-            'nothing works', 'tried everything', 'desperate for help',
-            'at my wit\'s end', 'need help', 'seeking advice',
-            'overwhelmed', 'confused', 'lost', 'failed'
-        ],
-        
-        # Premium Leads - Medical/urgent motivation
-        'health_motivated': [
-            'doctor told me', 'health scare', 'medical advice', 'diagnosis',
-            'prescribed', 'treatment', 'therapy', 'recovery',
-            'medical condition', 'health concerns', 'doctor recommended',
-            'urgent', 'emergency', 'crisis', 'breaking point'
-        ],
-        
-        # Standard Leads ($40-100 each) - Goal-oriented content
-        'goal_oriented': [
-            'my goal is', 'trying to', 'want to', 'working towards',
-            'new year resolution', 'target', 'objective', 'plan to',
-            'hoping to', 'aiming for', 'striving to', 'dream of',
-            'aspire to', 'desire to', 'wish to'
-        ],
-        
-        # Standard Leads - Beginner seeking guidance
-        'beginner_guidance': [
-            'new to', 'beginner', 'just started', 'where to start',
-            'complete beginner', 'never done', 'first time',
-            'don\'t know how', 'need guidance', 'learning about',
-            'trying to understand', 'researching', 'exploring'
-        ],
-        
-        # Volume Leads ($30-80 each) - Product/service research
-        'product_research': [
-            'best apps', 'equipment review', 'worth the money',
-            'should i buy', 'recommendations', 'anyone tried',
-            'thinking of getting', 'looking for', 'shopping for',
-            'comparing', 'reviews', 'experiences with',
-            'worth it', 'good investment', 'value for money'
-        ],
-        
-        # Volume Leads - Lifestyle integration
-        'lifestyle_focus': [
-            'busy mom', 'working parent', 'busy professional', 'no time',
-            'work life balance', 'fitting in', 'quick solutions',
-            'efficient', 'time-saving', 'busy schedule',
-            'juggling', 'multitasking', 'overwhelmed'
-        ]
-    }
-    
-    # Score customer signals with Medium-specific weighting
-    total_score = 0
-    customer_type = "volume"
-    matched_categories = []
-    
-    for signal_type, signals in end_customer_signals.items():
-        category_score = 0
-        for signal in signals:
-            if signal in analysis_text:
-                category_score += 1
-        
-        if category_score > 0:
-            matched_categories.append(signal_type)
-            
-            if signal_type in ['transformation_sharing', 'struggle_documentation', 'health_motivated']:
-                total_score += category_score * 4  # High value signals
-                customer_type = "premium"
-            elif signal_type in ['goal_oriented', 'beginner_guidance']:
-                total_score += category_score * 2
-                if customer_type != "premium":
-                    customer_type = "standard"
-            else:  # product_research, lifestyle_focus
-                total_score += category_score
-    
-    is_customer = total_score >= 0.3  # Lower threshold for Medium (was 0.5)
+    # Keyword tables live in keyword_matcher and are compiled once, so each
+    # profile is scored in a single pass over the text
+    is_customer, total_score, customer_type, matched_categories = score_medium_end_customer(analysis_text)
     # Debug output
     if total_score > 0:
         print(f"    🔍 Analysis: '{analysis_text[:50]}...' | Score: {total_score} | Categories: {matched_categories}")
@@ -522,57 +428,53 @@ def extract_end_customers_from_search_results(page):
             '[class*="story"]'
         ]
         
-        article_elements = []
-        for selector in article_selectors:
-            try:
-                elements = page.query_selector_all(selector)
-                if elements and len(elements) > 0:
-                    article_elements = elements
-                    print(f"  ✅ Found {len(elements)} article elements using: {selector}")
-                    break
-            except:
-                continue
+        title_selectors = ['h2', 'h3', '[data-testid="storyTitle"]', '.title', 'a[data-testid="story-title"]']
+        preview_selectors = ['p', '.story-excerpt', '[data-testid="storyPreview"]', '.description', '.subtitle']
+        author_selectors = [
+            'a[href*="/@"]',
+            '[data-testid="authorName"]',
+            '.author-name',
+            '[class*="author"] a'
+        ]
+        
+        # One evaluate returns every card with its title/preview/author probes (first 3 matches each)
+        found = collect_cards(page, article_selectors, limit=MAX_ARTICLES_TO_CHECK,
+                              probes=title_selectors + preview_selectors + author_selectors, probe_limit=3,
+                              platform=PLATFORM_NAME, scope="articles")
+        article_elements = found["cards"]
+        if article_elements:
+            print(f"  ✅ Found {found['count']} article elements using: {found['selector']}")
         
+        scraper_progress.counts(final=True, elements_found=found["count"])
         if not article_elements:
             print("  ⚠️ No article elements found in search results")
             return customers_data
         
         # Process each article element in search results
-        for i, article_element in enumerate(article_elements[:MAX_ARTICLES_TO_CHECK]):
+        for i, article_element in enumerate(article_elements):
             try:
                 # Extract article title
                 article_title = ""
-                title_selectors = ['h2', 'h3', '[data-testid="storyTitle"]', '.title', 'a[data-testid="story-title"]']
-                
                 for title_selector in title_selectors:
-                    try:
-                        title_el = article_element.query_selector(title_selector)
-                        if title_el:
-                            article_title = title_el.inner_text().strip()
-                            if article_title and len(article_title) > 5:
-                                break
-                    except:
-                        continue
+                    title_el = first_probe(article_element, title_selector)
+                    if title_el:
+                        article_title = title_el["text"].strip()
+                        if article_title and len(article_title) > 5:
+                            break
                 
                 # Extract article preview/snippet with better debugging
                 article_preview = ""
-                preview_selectors = ['p', '.story-excerpt', '[data-testid="storyPreview"]', '.description', '.subtitle']
-                
                 for preview_selector in preview_selectors:
-                    try:
-                        preview_elements = article_element.query_selector_all(preview_selector)
-                        for preview_el in preview_elements[:3]:  # Check first 3 elements
-                            preview_text = preview_el.inner_text().strip()
-                            if (preview_text and len(preview_text) > 20 and len(preview_text) < 500 and
-                                preview_text != article_title and
-                                not preview_text.startswith('Follow') and
-                                not preview_text.startswith('Subscribe')):
-                                article_preview = preview_text
-                                break
-                        if article_preview:
+                    for preview_el in probe_matches(article_element, preview_selector):  # First 3 elements
+                        preview_text = preview_el["text"].strip()
+                        if (preview_text and len(preview_text) > 20 and len(preview_text) < 500 and
+                            preview_text != article_title and
+                            not preview_text.startswith('Follow') and
+                            not preview_text.startswith('Subscribe')):
+                            article_preview = preview_text
                             break
-                    except:
-                        continue
+                    if article_preview:
+                        break
                 
                 print(f"      📄 Preview found: {len(article_preview)} chars")
                 if article_preview:
@@ -582,27 +484,17 @@ def extract_end_customers_from_search_results(page):
                 author_name = ""
                 author_url = ""
                 
-                author_selectors = [
-                    'a[href*="/@"]',
-                    '[data-testid="authorName"]',
-                    '.author-name',
-                    '[class*="author"] a'
-                ]
-                
                 for author_selector in author_selectors:
-                    try:
-                        author_el = article_element.query_selector(author_selector)
-                        if author_el:
-                            author_name = author_el.inner_text().strip()
-                            author_href = author_el.get_attribute('href')
-                            if author_href and '/@' in author_href:
-                                if author_href.startswith('/'):
-                                    author_url = 'https://medium.com' + author_href
-                                else:
-                                    author_url = author_href
-                                break
-                    except:
-                        continue
+                    author_el = first_probe(article_element, author_selector)
+                    if author_el:
+                        author_name = author_el["text"].strip()
+                        author_href = author_el["href"]
+                        if author_href and '/@' in author_href:
+                            if author_href.startswith('/'):
+                                author_url = 'https://medium.com' + author_href
+                            else:
+                                author_url = author_href
+                            break
                 
                 # Skip if no key information found (more permissive)
                 if not article_title and not article_preview:
@@ -742,7 +634,7 @@ def extract_end_customers_from_search_results(page):
     
     return customers_data
 
-def extract_medium_niche_customers(page):
+def extract_medium_niche_customers(page, stream=None):
     """Extract END CUSTOMERS from Medium search results without navigating away - Universal version"""
     print(f"🎯 Extracting {NICHE} end customers from Medium search results...")
     
@@ -833,12 +725,17 @@ def extract_medium_niche_customers(page):
             }
             
             all_leads.append(lead)
+            if stream:
+                stream.write(lead)
+            scraper_progress.counts(leads_extracted=len(all_leads), excluded=excluded_count)
             print(f"✅ {name[:20]}... | {customer_type} | {intelligence['content_focus']} | Score: {score}")
             
         except Exception as e:
             print(f"⚠️ Error processing customer: {e}")
             continue
     
+    scraper_result.report(excluded=excluded_count)
+    
     # Remove duplicates and provide analytics
     if all_leads:
         unique_results = []
@@ -870,9 +767,11 @@ def extract_medium_niche_customers(page):
         for focus_type, count in focus_counts.items():
             print(f"  📖 {focus_type}: {count}")
         
+        scraper_progress.counts(final=True, leads_extracted=len(unique_results), excluded=excluded_count)
         return unique_results
     else:
         print(f"\n❌ No {NICHE} end customers extracted")
+        scraper_progress.counts(final=True, leads_extracted=0, excluded=excluded_count)
         return []
 
 def main():
@@ -889,25 +788,15 @@ def main():
     print(f"👤 Running as: {username}")
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    lead_stream = None
 
     with sync_playwright() as p:
         print(f"🎯 Launching Medium {NICHE.upper()} END CUSTOMER scraper...")
         
-        browser = p.chromium.launch(
-            headless=True,
-            args=['--disable-blink-features=AutomationControlled']
-        )
+        browser = launch_browser(p, ['--disable-blink-features=AutomationControlled'])
         
         # Create context with or without authentication
-        if storage_state:
-            context = browser.new_context(
-                storage_state=storage_state,
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
-        else:
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
+        context = new_scraper_context(browser, PLATFORM_NAME, storage_state=storage_state)
         
         page = context.new_page()
         
@@ -924,11 +813,13 @@ def main():
             
             # Enhanced scrolling for article results
             print(f"📜 Scrolling {MAX_SCROLLS} times to load more articles...")
+            phase_start = time.time()
             for i in range(MAX_SCROLLS):
                 print(f"  🔄 Scroll {i + 1}/{MAX_SCROLLS}")
                 
                 page.mouse.wheel(0, 1200)
                 time.sleep(random.uniform(DELAY_BETWEEN_SCROLLS, DELAY_BETWEEN_SCROLLS + 1))
+                scraper_progress.scroll(i + 1, MAX_SCROLLS, count_matches(page, ['article', '[data-testid="story"]']))
                 
                 # Extended pause every 3 scrolls
                 if (i + 1) % 3 == 0:
@@ -937,15 +828,22 @@ def main():
             
             print("⏳ Final content stabilization...")
             time.sleep(3)
+            scraper_result.record_phase("scrolling", time.time() - phase_start)
             
-            # Extract niche end customers from search results (raw leads)
-            raw_leads = extract_medium_niche_customers(page)
+            # Extract niche end customers from search results (raw leads, streamed to disk as they are found)
+            lead_stream = open_lead_stream(PLATFORM_NAME, username, timestamp, CSV_DIR)
+            with scraper_result.phase("extraction"):
+                raw_leads = extract_medium_niche_customers(page, stream=lead_stream)
             
             if not raw_leads:
                 print("❌ No raw leads extracted")
+                if lead_stream:
+                    lead_stream.abort("no raw leads")
                 browser.close()
                 return []
 
+            phase_start = time.time()
+
             # 🚀 APPLY SMART USER-AWARE DEDUPLICATION
             print(f"\n🧠 Applying deduplication strategy: {DEDUP_MODE}")
             print(f"👤 User-specific deduplication for: {username}")
@@ -979,6 +877,7 @@ def main():
                         unique_leads.append(lead)
                         seen_names.add(name_key)
                 dedup_stats = {"basic": True, "kept": len(unique_leads)}
+            scraper_result.record_phase("dedup", time.time() - phase_start)
             
             # Final results summary
             print(f"\n📊 FINAL RESULTS SUMMARY:")
@@ -1032,6 +931,7 @@ def main():
                     platform_name="medium",
                     csv_dir=CSV_DIR,          # uses your existing location
                     save_raw=SAVE_RAW_LEADS,  # if you have this flag
+                    stream=lead_stream,
                 )
                 
                 # Save processed results to main CSV
@@ -1105,10 +1005,14 @@ def main():
                     
             else:
                 print(f"⚠️ No Medium {NICHE} customers extracted")
+                if lead_stream:
+                    lead_stream.complete(keep_raw=False, leads=0, raw_leads=len(raw_leads))
                 leads = []
                 
         except Exception as e:
             print(f"🚨 Medium scraper error: {e}")
+            if lead_stream and not lead_stream.closed:
+                lead_stream.abort(e)
             import traceback
             traceback.print_exc()
             leads = []
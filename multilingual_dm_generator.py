@@ -298,7 +298,8 @@ Requirements:
     return f"{base_prompt}\n\nSpecific instructions: {multilingual_modifier}"
 
 # Enhanced version of your existing generate_dm_with_fallback function
-def generate_multilingual_dm(name: str, bio: str, platform: str, language: str = None, persona: str = None) -> dict:
+def generate_multilingual_dm(name: str, bio: str, platform: str, language: str = None, persona: str = None,
+                             client=None, version: str = None) -> dict:
     """
     Generate multilingual DM - enhanced version of your generate_dm_with_fallback
     
@@ -311,7 +312,7 @@ def generate_multilingual_dm(name: str, bio: str, platform: str, language: str =
     
     # Import your existing functions (avoiding circular imports)
     try:
-        from dm_sequences import match_persona, PERSONAS, initialize_openai_client, generate_dm_with_openai_v1, generate_dm_with_openai_v0
+        from dm_sequences import match_persona, PERSONAS, get_shared_openai_client, generate_dm_completion
         from personas import PERSONAS as PERSONAS_DATA
     except ImportError:
         # Fallback if imports fail
@@ -334,8 +335,9 @@ def generate_multilingual_dm(name: str, bio: str, platform: str, language: str =
     # Create multilingual prompt
     multilingual_prompt = create_multilingual_dm_prompt(name, bio, platform, persona, language)
     
-    # Try OpenAI API (your existing logic)
-    client, version = initialize_openai_client()
+    # Try OpenAI API (shared client unless the caller passes one)
+    if client is None:
+        client, version = get_shared_openai_client()
     
     if client is None:
         print("⚠️ OpenAI not available, using multilingual fallback")
@@ -348,26 +350,33 @@ def generate_multilingual_dm(name: str, bio: str, platform: str, language: str =
             "method": "fallback"
         }
     
+    # Reuse cached bodies for identical persona/platform/language/bio
+    from dm_cache import get_dm_cache, cache_lock_for
+    cache = get_dm_cache()
+    cache_key = cache.make_key(persona, platform, language, bio, variant="multilingual") if cache else None
+    
     try:
-        messages = [
-            {"role": "system", "content": f"You're a multilingual social media outreach assistant. You can write natural, culturally appropriate DMs in {language} for {platform}."},
-            {"role": "user", "content": multilingual_prompt}
-        ]
-        
-        if version == "v1":
-            dm_text = generate_dm_with_openai_v1(client, messages)
-        elif version == "v0":
-            dm_text = generate_dm_with_openai_v0(client, messages)
-        else:
-            raise Exception("Unknown OpenAI version")
+        with cache_lock_for(cache, cache_key):
+            cached = cache.get(cache_key, name) if cache_key else None
+            if cached:
+                dm_text, method = cached, "cache"
+            else:
+                messages = [
+                    {"role": "system", "content": f"You're a multilingual social media outreach assistant. You can write natural, culturally appropriate DMs in {language} for {platform}."},
+                    {"role": "user", "content": multilingual_prompt}
+                ]
+                
+                dm_text, method = generate_dm_completion(client, version, messages).strip(), "openai"
+                if cache_key:
+                    cache.put(cache_key, dm_text, name, persona, platform, language)
         
         return {
-            "dm": dm_text.strip(),
+            "dm": dm_text,
             "language": language,
             "persona": persona,
             "platform": platform,
             "detected_language": language,
-            "method": "openai"
+            "method": method
         }
             
     except Exception as e:
@@ -383,7 +392,8 @@ def generate_multilingual_dm(name: str, bio: str, platform: str, language: str =
             "error": str(e)
         }
 
-def generate_multilingual_batch(contacts: List[Dict], platform: str = "twitter", target_language: str = None) -> List[Dict]:
+def generate_multilingual_batch(contacts: List[Dict], platform: str = "twitter", target_language: str = None,
+                                max_workers: int = None) -> List[Dict]:
     """
     Generate multilingual DMs for multiple contacts
     
@@ -391,19 +401,23 @@ def generate_multilingual_batch(contacts: List[Dict], platform: str = "twitter",
         contacts: List of dicts with 'name' and 'bio' keys
         platform: Target platform
         target_language: Force specific language (None for auto-detection)
+        max_workers: Concurrent OpenAI requests (defaults to DM_MAX_CONCURRENCY)
     """
     
-    results = []
-    
     print(f"🌍 Generating multilingual DMs for {platform}...")
     
-    for contact in contacts:
+    from dm_sequences import get_shared_openai_client, map_dm_jobs
+    client, version = get_shared_openai_client()
+    
+    def _generate(contact):
         try:
             result = generate_multilingual_dm(
                 name=contact.get("name", ""),
                 bio=contact.get("bio", ""),
                 platform=platform,
-                language=target_language
+                language=target_language,
+                client=client,
+                version=version
             )
             
             # Add original contact info
@@ -413,11 +427,11 @@ def generate_multilingual_batch(contacts: List[Dict], platform: str = "twitter",
                 "length": len(result["dm"])
             })
             
-            results.append(result)
+            return result
             
         except Exception as e:
             print(f"⚠️ Error generating multilingual DM for {contact.get('name')}: {e}")
-            results.append({
+            return {
                 "original_name": contact.get("name"),
                 "original_bio": contact.get("bio"),
                 "dm": get_multilingual_fallback(contact.get("name", ""), platform, target_language or "english"),
@@ -428,9 +442,9 @@ def generate_multilingual_batch(contacts: List[Dict], platform: str = "twitter",
                 "method": "error_fallback",
                 "error": str(e),
                 "length": 0
-            })
+            }
     
-    return results
+    return map_dm_jobs(_generate, contacts, max_workers)
 
 def test_multilingual_generation():
     """Test multilingual DM generation"""
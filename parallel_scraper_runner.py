@@ -7,22 +7,41 @@ import os
 import json
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from lead_file_stats import count_csv_rows
+from scraper_progress import ProgressState, ProgressTail, snapshot_fraction
+
+# Same default as the scrapers' CSV_DIR, where lead files and manifests land
+SCRAPER_CSV_DIR = os.getenv("CSV_DIR", "/app/client_configs")
+
+SCRAPER_TIMEOUT_SECONDS = 600  # 10 minutes per scraper
+PROGRESS_POLL_SECONDS = 1.0
+# Stop a scraper early when its progress stream shows it is going nowhere
+KILL_UNPRODUCTIVE = os.getenv("SCRAPER_KILL_UNPRODUCTIVE", "1").lower() not in ("0", "false", "no")
+KILL_MIN_SCROLLS = int(os.getenv("SCRAPER_KILL_MIN_SCROLLS", "3"))
+PROGRESS_STALL_SECONDS = float(os.getenv("SCRAPER_PROGRESS_STALL_SECONDS", "300"))
 
 class ParallelScraperRunner:
-    def __init__(self, username, user_plan, search_term, max_scrolls):
+    def __init__(self, username, user_plan, search_term, max_scrolls, use_worker_pool=None):
         self.username = username
         self.user_plan = user_plan
         self.search_term = search_term
         self.max_scrolls = max_scrolls
+        if use_worker_pool is None:
+            from scraper_worker_pool import worker_pool_enabled
+            use_worker_pool = worker_pool_enabled()
+        self.use_worker_pool = use_worker_pool
         self.results = {}
         self.start_time = None
         self.total_duration_sec = 0
+        self.platforms = []
+        self.live_progress = {}  # platform -> scraper_progress snapshot
+        self._progress_lock = threading.Lock()
+        self._last_job_report = 0.0
         print(f"[PLAN_PROBE] runner.init user={self.username} plan={self.user_plan}")
         
-    def setup_environment(self):
-        """Setup environment variables for all scrapers"""
-        env = os.environ.copy()
-        env.update({
+    def scraper_env_overrides(self):
+        """Environment variables every scraper run needs for this session"""
+        return {
             'SCRAPER_USERNAME': self.username,
             'USER_PLAN': self.user_plan,
             'FRONTEND_SEARCH_TERM': self.search_term,
@@ -31,15 +50,107 @@ class ParallelScraperRunner:
             'BYPASS_INDIVIDUAL_AUTH': 'true',
             'PYTHONIOENCODING': 'utf-8',
             'PYTHONUTF8': '1'
-        })
+        }
+
+    def setup_environment(self):
+        """Setup environment variables for all scrapers"""
+        env = os.environ.copy()
+        env.update(self.scraper_env_overrides())
         return env
     
+    def new_result_path(self, platform):
+        """Per-run JSON file the scraper reports into (scraper_result / SCRAPER_RESULT_FILE)"""
+        import tempfile
+        import uuid
+        safe_user = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(self.username))
+        return os.path.join(tempfile.gettempdir(), f"scraper_result_{safe_user}_{platform}_{uuid.uuid4().hex[:8]}.json")
+
+    def new_progress_path(self, result_path):
+        """NDJSON progress stream (scraper_progress / SCRAPER_PROGRESS_FILE) for the same run"""
+        return result_path[:-len('.json')] + '.progress.ndjson'
+
+    def poll_progress(self, platform, tail, state):
+        """Fold new progress events into live_progress and pass them on to the job; True if changed"""
+        if not state.apply(tail.read()):
+            return False
+        with self._progress_lock:
+            self.live_progress[platform] = state.snapshot()
+        self.report_job_progress(self.platforms or [platform])
+        return True
+
+    def apply_scraper_result(self, result, result_path):
+        """Fill a run result from the scraper's structured report; False if it never reported"""
+        from scraper_result import read_result
+
+        report = read_result(result_path)
+        try:
+            os.remove(result_path)
+        except OSError:
+            pass
+        if not report:
+            return False
+
+        if report.get('leads') is not None:
+            result['leads'] = report['leads']
+        for key in ('file', 'files', 'raw_leads', 'excluded', 'phases'):
+            if key in report:
+                result[key] = report[key]
+        if 'duration' in report:
+            result['scraper_duration'] = report['duration']
+        return report.get('leads') is not None
+
+    def run_in_worker_pool(self, platform):
+        """Run a platform scrape on a warm worker instead of a fresh subprocess"""
+        from scraper_worker_pool import get_worker_pool
+
+        print(f"🚀 Starting {platform.title()} scraper (warm worker)...")
+        result_path = self.new_result_path(platform)
+        progress_path = self.new_progress_path(result_path)
+        tail, state = ProgressTail(progress_path), ProgressState(platform, self.max_scrolls)
+        finished = threading.Event()
+
+        def _watch():
+            while not finished.wait(PROGRESS_POLL_SECONDS):
+                self.poll_progress(platform, tail, state)
+
+        watcher = threading.Thread(target=_watch, daemon=True)
+        watcher.start()
+        try:
+            result = get_worker_pool().run_job(
+                platform=platform,
+                search_term=self.search_term,
+                max_scrolls=self.max_scrolls,
+                username=self.username,
+                env={**self.scraper_env_overrides(), 'SCRAPER_RESULT_FILE': result_path,
+                     'SCRAPER_PROGRESS_FILE': progress_path},
+            )
+        finally:
+            finished.set()
+            watcher.join()
+            self.poll_progress(platform, tail, state)
+            self._remove(progress_path)
+
+        reported = self.apply_scraper_result(result, result_path)
+        if result.get('success') and result.get('leads') is None and not reported:
+            result['leads'] = self.count_recent_leads(platform)
+
+        if result.get('success'):
+            print(f"✅ {platform.title()} completed in {result['duration']:.1f}s - {result['leads']} leads")
+        else:
+            print(f"❌ {platform.title()} failed after {result.get('duration', 0):.1f}s")
+        return result
+
     def run_single_scraper(self, platform):
         """Run a single platform scraper"""
+        if self.use_worker_pool:
+            return self.run_in_worker_pool(platform)
+
         print(f"🚀 Starting {platform.title()} scraper...")
         
         start_time = time.time()
         env = self.setup_environment()
+        result_path = self.new_result_path(platform)
+        env['SCRAPER_RESULT_FILE'] = result_path
         
         # Map platform names to scraper files
         scraper_files = {
@@ -72,57 +183,63 @@ class ParallelScraperRunner:
                 'leads': 0
             }
         
+        progress_path = self.new_progress_path(result_path)
+        env['SCRAPER_PROGRESS_FILE'] = progress_path
         try:
-            # Run the scraper
-            result = subprocess.run(
-                ['python', scraper_file],
-                capture_output=True,
-                text=True,
-                env=env,
-                timeout=600  # 10 minutes per scraper
-            )
-            
+            # Output goes to a temp file (no pipe buffering); progress arrives on the NDJSON stream
+            returncode, output, stop_reason = self._run_with_progress(platform, scraper_file, env, progress_path)
             duration = time.time() - start_time
-            
-            if result.returncode == 0:
-                # Try to count leads from output files
-                leads_count = self.count_recent_leads(platform)
-                
-                print(f"✅ {platform.title()} completed in {duration:.1f}s - {leads_count} leads")
-                
-                return {
+            tail_text = output[-500:] if output else ''  # Last 500 chars
+
+            if stop_reason:
+                # Stopped early: timed out, or clearly unproductive
+                manifest = self.read_manifest(platform) or {}
+                partial_rows = manifest.get('rows', 0)
+                print(f"⏹️ {platform.title()} stopped after {duration:.1f}s: {stop_reason} ({partial_rows} rows streamed)")
+                run_result = {
+                    'platform': platform,
+                    'success': False,
+                    'duration': duration,
+                    'leads': 0,
+                    'partial_rows': partial_rows,
+                    'partial_file': manifest.get('partial'),
+                    'error': stop_reason,
+                    'stdout': tail_text,
+                }
+                self.apply_scraper_result(run_result, result_path)
+                return run_result
+
+            if returncode == 0:
+                run_result = {
                     'platform': platform,
                     'success': True,
                     'duration': duration,
-                    'leads': leads_count,
-                    'stdout': result.stdout[-500:] if result.stdout else '',  # Last 500 chars
-                    'stderr': result.stderr[-500:] if result.stderr else ''
+                    'leads': 0,
+                    'stdout': tail_text,
+                    'stderr': ''
                 }
+                # Structured report from the scraper; older scrapers fall back to file counting
+                if not self.apply_scraper_result(run_result, result_path):
+                    run_result['leads'] = self.count_recent_leads(platform)
+                
+                print(f"✅ {platform.title()} completed in {duration:.1f}s - {run_result['leads']} leads")
+                
+                return run_result
             else:
                 print(f"❌ {platform.title()} failed after {duration:.1f}s")
                 
-                return {
+                run_result = {
                     'platform': platform,
                     'success': False,
                     'duration': duration,
                     'leads': 0,
-                    'error': f"Exit code: {result.returncode}",
-                    'stdout': result.stdout[-500:] if result.stdout else '',
-                    'stderr': result.stderr[-500:] if result.stderr else ''
+                    'error': f"Exit code: {returncode}",
+                    'stdout': tail_text,
+                    'stderr': ''
                 }
+                self.apply_scraper_result(run_result, result_path)
+                return run_result
                 
-        except subprocess.TimeoutExpired:
-            duration = time.time() - start_time
-            print(f"⏰ {platform.title()} timed out after {duration:.1f}s")
-            
-            return {
-                'platform': platform,
-                'success': False,
-                'duration': duration,
-                'leads': 0,
-                'error': "Timeout (10 minutes)"
-            }
-            
         except Exception as e:
             duration = time.time() - start_time
             print(f"💥 {platform.title()} crashed after {duration:.1f}s: {e}")
@@ -135,11 +252,115 @@ class ParallelScraperRunner:
                 'error': str(e)
             }
     
+    def report_job_progress(self, platforms, force=False):
+        """
+        Finished platforms and live per-platform progress, for the background
+        job running this session (if any). Live updates go out at most once a second.
+        """
+        from scrape_job_queue import JOB_ID_ENV, report_progress
+        if not os.getenv(JOB_ID_ENV):
+            return
+        with self._progress_lock:
+            now = time.time()
+            if not force and now - self._last_job_report < PROGRESS_POLL_SECONDS:
+                return
+            self._last_job_report = now
+            detail = {p: dict(snap) for p, snap in self.live_progress.items()}
+        done = [p for p in platforms if p in self.results]
+        shares = [1.0 if p in self.results else snapshot_fraction(detail.get(p) or {}) for p in platforms]
+        report_progress(
+            len(done), len(platforms),
+            results={p: self.results[p].get('leads', 0) for p in done},
+            message=f"{len(done)}/{len(platforms)} platforms finished",
+            detail=detail,
+            progress=sum(shares) / len(shares) if shares else None,
+        )
+
+    def _run_with_progress(self, platform, scraper_file, env, progress_path):
+        """
+        Run one scraper process while tailing its progress stream. Stops it at
+        SCRAPER_TIMEOUT_SECONDS, or early when it is clearly unproductive.
+        Returns (returncode, output, stop_reason).
+        """
+        import tempfile
+
+        tail, state = ProgressTail(progress_path), ProgressState(platform, self.max_scrolls)
+        stop_reason = None
+        with tempfile.TemporaryFile() as out:
+            proc = subprocess.Popen(['python', scraper_file], stdout=out, stderr=subprocess.STDOUT, env=env)
+            started = time.time()
+            try:
+                while proc.poll() is None:
+                    time.sleep(PROGRESS_POLL_SECONDS)
+                    self.poll_progress(platform, tail, state)
+                    if time.time() - started > SCRAPER_TIMEOUT_SECONDS:
+                        stop_reason = f"Timeout ({SCRAPER_TIMEOUT_SECONDS / 60:.0f} minutes)"
+                    elif KILL_UNPRODUCTIVE:
+                        stop_reason = state.unproductive_reason(KILL_MIN_SCROLLS, PROGRESS_STALL_SECONDS)
+                    if stop_reason:
+                        proc.terminate()
+                        try:
+                            proc.wait(timeout=15)
+                        except subprocess.TimeoutExpired:
+                            proc.kill()
+                            proc.wait()
+                        break
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                state.status = 'stopped' if stop_reason else ('complete' if proc.returncode == 0 else 'failed')
+                if stop_reason:
+                    state.message = stop_reason
+                state.apply(tail.read())
+                with self._progress_lock:
+                    self.live_progress[platform] = state.snapshot()
+                self._remove(progress_path)
+            out.seek(0)
+            output = out.read().decode('utf-8', errors='replace')
+        return proc.returncode, output, stop_reason
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def read_manifest(self, platform):
+        """Streaming-sink manifest for this user/platform written during this session"""
+        try:
+            from persistence import latest_manifest
+            since = self.start_time - 5 if self.start_time else time.time() - 15 * 60
+            return latest_manifest(platform, self.username, csv_dir=SCRAPER_CSV_DIR, since=since)
+        except Exception:
+            return None
+
+    def get_live_counts(self, platforms=None):
+        """Live per-platform row counts/status from the manifests (no CSV re-reading)"""
+        counts = {}
+        for platform in platforms or self.results.keys():
+            manifest = self.read_manifest(platform)
+            if manifest:
+                counts[platform] = {
+                    'status': manifest.get('status'),
+                    'rows': manifest.get('rows', 0),
+                    'leads': manifest.get('leads'),
+                }
+        return counts
+
     def count_recent_leads(self, platform):
         """Count leads from recent CSV files for this platform"""
         import glob
         from datetime import datetime, timedelta
         
+        # Prefer the manifest kept by persistence.LeadCSVStream
+        manifest = self.read_manifest(platform)
+        if manifest:
+            if manifest.get('status') == 'complete' and manifest.get('leads') is not None:
+                return manifest['leads']
+            return manifest.get('rows', 0)
+        
         # Look for recent CSV files for this platform
         patterns = [
             f"*{platform}*leads*.csv",
@@ -165,9 +386,7 @@ class ParallelScraperRunner:
             latest_file = max(recent_files, key=os.path.getmtime)
             
             try:
-                with open(latest_file, 'r', encoding='utf-8') as f:
-                    line_count = sum(1 for line in f) - 1  # Subtract header
-                return max(0, line_count)
+                return count_csv_rows(latest_file)
             except:
                 return 0
         
@@ -444,12 +663,37 @@ class ParallelScraperRunner:
 
         self.start_time = time.time()
         self.results = {}  # ✅ ensure dict exists
+        self.platforms = list(platforms)
+        self.live_progress = {}
         
+        from async_scraper_engine import async_engine_enabled, run_async_scrapers
+        if async_engine_enabled():
+            # One event loop + one Chromium for every platform (generic link parsing, see async_scraper_engine)
+            print("⚡ SCRAPER_ENGINE=async: generic card parsing, leads differ from the platform scrapers")
+            try:
+                async_results = run_async_scrapers(platforms, self.search_term, self.max_scrolls, self.username)
+            except Exception as e:
+                print(f"💥 Async engine failed: {e}")
+                async_results = {}
+            for platform in platforms:
+                result = async_results.get(platform) or {'success': False, 'error': 'No result from async engine'}
+                self.results[platform] = {
+                    "platform": platform,
+                    "success": bool(result.get("success")),
+                    "leads": int(result.get("leads") or 0),
+                    "duration": float(result.get("duration") or 0.0),
+                    "error": result.get("error"),
+                }
+            platforms_to_thread = []
+            self.report_job_progress(platforms, force=True)
+        else:
+            platforms_to_thread = platforms
+
         from concurrent.futures import ThreadPoolExecutor, as_completed
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_platform = {
                 executor.submit(self.run_single_scraper, platform): platform
-                for platform in platforms
+                for platform in platforms_to_thread
             }
             for future in as_completed(future_to_platform):
                 platform = future_to_platform[future]
@@ -463,6 +707,10 @@ class ParallelScraperRunner:
                         "duration": float(result.get("duration") or 0.0),
                         "error": result.get("error"),
                     }
+                    # Structured scraper report (scraper_result), when the scraper sent one
+                    for key in ("file", "raw_leads", "excluded", "phases"):
+                        if result.get(key) is not None:
+                            norm[key] = result[key]
                     self.results[platform] = norm
                     if norm["success"]:
                         print(f"🎉 {platform.title()}: {norm['leads']} leads in {norm['duration']:.1f}s")
@@ -477,6 +725,7 @@ class ParallelScraperRunner:
                         "duration": 0.0,
                         "leads": 0,
                     }
+                self.report_job_progress(platforms, force=True)
 
         total_duration = time.time() - self.start_time
         successful_platforms = sum(1 for r in self.results.values() if r["success"])
@@ -495,6 +744,9 @@ class ParallelScraperRunner:
             duration = result['duration']
             leads = result['leads']
             print(f"  {status} {platform.title()}: {leads} leads ({duration:.1f}s)")
+            if result.get('phases'):
+                phases = ", ".join(f"{name} {secs:.1f}s" for name, secs in result['phases'].items())
+                print(f"      Phases: {phases}")
             
             if not result['success'] and 'error' in result:
                 print(f"      Error: {result['error']}")
@@ -565,14 +817,16 @@ class ParallelScraperRunner:
                 current_credits = user_info.get('credits', 0) if user_info else 0
                 print(f"Current credits: {current_credits}")
                 
-                # Consume credits
-                success = credit_system.consume_credits(self.username, total_leads, total_leads, "multi")
+                # Consume credits for every platform in one atomic round-trip
+                items = [
+                    {"platform": p, "credits_used": int(r.get("leads", 0)), "leads_downloaded": int(r.get("leads", 0))}
+                    for p, r in (self.results or {}).items() if int(r.get("leads", 0)) > 0
+                ]
+                success, new_credits = credit_system.consume_credits_batch(self.username, items)
                 if success:
                     credit_system.save_data()
                     
-                    # Verify consumption
-                    updated_info = credit_system.get_user_info(self.username)
-                    new_credits = updated_info.get('credits', 0) if updated_info else 0
+                    new_credits = int(new_credits or 0)
                     consumed = current_credits - new_credits
                     
                     print(f"SUCCESS: Consumed {consumed} credits, remaining: {new_credits}")
@@ -586,13 +840,7 @@ class ParallelScraperRunner:
         elif plan_lc == "demo" and total_leads > 0:
             try:
                 from postgres_credit_system import credit_system
-                remaining = credit_system.get_demo_leads_remaining(self.username)
-                to_consume = min(total_leads, int(remaining or 0))
-                for _ in range(to_consume):
-                    if credit_system.consume_demo_lead(self.username):
-                        consumed += 1
-                    else:
-                        break
+                consumed = credit_system.consume_demo_leads(self.username, total_leads)
                 try:
                     credit_system.save_data()
                 except Exception:
@@ -1,6 +1,22 @@
 # persistence.py
 from pathlib import Path
-import os, csv, re  # add re
+from datetime import datetime
+import os, csv, re, json, time  # add re
+import scraper_result
+
+LEAD_FIELDNAMES = [
+    'name','handle','bio','url','platform','dm','title','location',
+    'followers','profile_url','contact_info','search_term',
+    'extraction_method','relevance_score','is_verified','has_email','has_phone', 'subscriber_count', 'description', 'video_count', 'subscribers', 'channel_url', 'username', 'raw_text_sample', 'extracted_at',
+    'transformation_stage', 'content_preview', 'post_title', 'pain_points', 'post_type', 'source_type', 'support_seeking', 'product_interest', 'source_post_url', 'search_source', 'lead_quality', 'customer_type', 'niche_goals',
+    'urgency_level', 'article_context', 'comment_preview', 'source_article_url', 'content_engagement', 'content_focus', 'reading_patterns'
+]
+
+# Running manifests are rewritten at most this often (complete/abort always write)
+MANIFEST_UPDATE_SECONDS = 2.0
+
+# Filename timestamps look like 2024-05-01_13-45
+_TIMESTAMP_RE = r"\d{4}-\d{2}-\d{2}_\d{2}-\d{2}"
 
 def _resolve_csv_dir(csv_dir=None):
     """Prefer caller-provided path; else env; else ./client_configs (NOT /client_configs)."""
@@ -11,6 +27,205 @@ def _resolve_csv_dir(csv_dir=None):
     env_dir = os.getenv("CSV_DIR")
     return Path(env_dir) if env_dir else Path("client_configs")  # was Path("/client_configs")
 
+def _file_keys(platform_name, username):
+    """Normalized (platform_key, safe_username) used in every lead filename"""
+    platform_key  = (platform_name or "platform").strip().lower().replace(" ", "") or "platform"
+    safe_username = re.sub(r"[^A-Za-z0-9_-]+", "_", username or "anon")
+    return platform_key, safe_username
+
+def manifest_path_for(platform_name, username, timestamp, csv_dir=None) -> Path:
+    platform_key, safe_username = _file_keys(platform_name, username)
+    return _resolve_csv_dir(csv_dir) / f"{platform_key}_leads_{safe_username}_{timestamp}.manifest.json"
+
+def _write_json_atomic(path: Path, data: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+class LeadCSVStream:
+    """
+    Streaming sink for leads as they are extracted.
+
+    Rows are appended and flushed to ``<raw file>.partial`` while the scraper
+    runs, and a sidecar manifest (``*.manifest.json``) tracks the live row
+    count and status. ``save_leads_to_files(..., stream=...)`` completes it:
+    the final file appears via atomic rename, so a crash or timeout keeps
+    every row extracted so far instead of losing the whole run.
+    """
+
+    def __init__(self, platform_name, username, timestamp, csv_dir=None, fieldnames=None):
+        self.platform_key, self.safe_username = _file_keys(platform_name, username)
+        self.username = username
+        self.timestamp = timestamp
+        self.out_dir = _resolve_csv_dir(csv_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.fieldnames = fieldnames or LEAD_FIELDNAMES
+        self.final_path = self.out_dir / f"{self.platform_key}_leads_raw_{self.safe_username}_{timestamp}.csv"
+        self.partial_path = self.final_path.with_name(self.final_path.name + ".partial")
+        self.manifest_path = manifest_path_for(platform_name, username, timestamp, self.out_dir)
+        self.rows = 0
+        self.closed = False
+        self.started_at = datetime.now().isoformat()
+        self._manifest_written = 0.0
+
+        self._file = self.partial_path.open('w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        self._writer.writeheader()
+        self._file.flush()
+        self._update_manifest("running")
+
+    def _update_manifest(self, status, **extra):
+        manifest = {
+            "platform": self.platform_key,
+            "username": self.username,
+            "timestamp": self.timestamp,
+            "status": status,
+            "rows": self.rows,
+            "partial": str(self.partial_path),
+            "started_at": self.started_at,
+            "updated_at": datetime.now().isoformat(),
+        }
+        manifest.update(extra)
+        self._manifest_written = time.monotonic()
+        try:
+            _write_json_atomic(self.manifest_path, manifest)
+        except Exception as e:
+            print(f"ℹ️ Could not update manifest {self.manifest_path}: {e}")
+
+    def write(self, lead: dict):
+        self.write_many([lead])
+
+    def write_many(self, leads):
+        """Append rows and flush so they survive a crash"""
+        if self.closed or not leads:
+            return
+        self._writer.writerows(leads)
+        self._file.flush()
+        self.rows += len(leads)
+        if time.monotonic() - self._manifest_written >= MANIFEST_UPDATE_SECONDS:
+            self._update_manifest("running")
+
+    def _close_file(self):
+        if not self._file.closed:
+            self._file.close()
+        self.closed = True
+
+    def complete(self, final_rows=None, keep_raw=True, **result):
+        """
+        Finish the stream. With ``final_rows`` the partial file is rewritten with
+        the final rows (e.g. after DMs were filled in); the raw CSV is then
+        published by atomic rename, or dropped when ``keep_raw`` is False.
+        """
+        self._close_file()
+        final_file = None
+        if keep_raw:
+            if final_rows is not None:
+                tmp = self.partial_path.with_name(self.partial_path.name + ".tmp")
+                with tmp.open('w', newline='', encoding='utf-8') as f:
+                    w = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction='ignore')
+                    w.writeheader()
+                    w.writerows(final_rows)
+                os.replace(tmp, self.partial_path)
+                self.rows = len(final_rows)
+            os.replace(self.partial_path, self.final_path)
+            final_file = str(self.final_path)
+        elif self.partial_path.exists():
+            self.partial_path.unlink()
+        self._update_manifest("complete", raw_file=final_file, completed_at=datetime.now().isoformat(), **result)
+        return final_file
+
+    def abort(self, error=None):
+        """Mark the run failed; the .partial file is kept for recovery"""
+        self._close_file()
+        self._update_manifest("failed", error=str(error) if error else None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.closed:
+            self.abort(exc) if exc_type else self.complete()
+        return False
+
+def open_lead_stream(platform_name, username, timestamp, csv_dir=None):
+    """Open a streaming sink at scrape start; returns None if it can't be created"""
+    try:
+        return LeadCSVStream(platform_name, username, timestamp, csv_dir)
+    except Exception as e:
+        print(f"ℹ️ Streaming CSV sink unavailable: {e}")
+        return None
+
+def read_manifest(path):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+def latest_manifest(platform_name, username, csv_dir=None, since=None):
+    """
+    Newest manifest for a user/platform (optionally modified after ``since``
+    epoch seconds). The glob also matches longer usernames sharing the prefix
+    (bob / bob_smith), so the name must end in a timestamp and the manifest's
+    own username must match.
+    """
+    platform_key, safe_username = _file_keys(platform_name, username)
+    out_dir = _resolve_csv_dir(csv_dir)
+    if not out_dir.exists():
+        return None
+    name_re = re.compile(rf"{re.escape(platform_key)}_leads_{re.escape(safe_username)}_{_TIMESTAMP_RE}\.manifest\.json")
+    candidates = []
+    for path in out_dir.glob(f"{platform_key}_leads_{safe_username}_*.manifest.json"):
+        if not name_re.fullmatch(path.name):
+            continue
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            continue
+        if since is None or mtime >= since:
+            candidates.append((mtime, path))
+    for _, path in sorted(candidates, reverse=True):
+        manifest = read_manifest(path)
+        if manifest and _file_keys(platform_name, manifest.get("username"))[1] == safe_username:
+            return manifest
+    return None
+
+def _catalog_written_files(out_dir, files_saved, leads, raw_leads, username, platform_key):
+    """Record written files (with known row counts) in lead_file_catalog"""
+    try:
+        from collections import Counter
+        from lead_file_catalog import get_catalog
+        catalog = get_catalog(out_dir)
+        if not catalog:
+            return
+        for path in files_saved:
+            is_raw = "_leads_raw_" in os.path.basename(path)
+            rows = (raw_leads if is_raw else leads) or []
+            values = Counter(str(r.get('platform', '')).strip().lower() for r in rows if r.get('platform'))
+            search_term = next((r.get('search_term') for r in rows if r.get('search_term')), None)
+            catalog.record_file(
+                path, username=username, platform=platform_key,
+                search_term=search_term or os.getenv("FRONTEND_SEARCH_TERM"),
+                row_count=len(rows), kind="raw" if is_raw else "leads",
+                platform_value=values.most_common(1)[0][0] if values else None,
+            )
+    except Exception as e:
+        print(f"ℹ️ Could not update lead file catalog: {e}")
+
+def _store_columnar(files_saved, leads, raw_leads, username, platform_key):
+    """Write a Parquet partition for each saved file (no-op without pyarrow)"""
+    try:
+        from lead_columnar_store import columnar_enabled, get_columnar_store
+        if not columnar_enabled():
+            return
+        for path in files_saved:
+            path = Path(path)
+            rows = raw_leads if "_leads_raw_" in path.name else leads
+            get_columnar_store(path.parent).write_partition(
+                rows or [], username, platform_key, path.stem, fieldnames=LEAD_FIELDNAMES
+            )
+    except Exception as e:
+        print(f"ℹ️ Could not write columnar lead partition: {e}")
+
 def save_leads_to_files(
     leads,
     raw_leads,
@@ -20,31 +235,27 @@ def save_leads_to_files(
     csv_dir=None,
     save_raw: bool = False,
     record_to_credit_system: bool = True,
+    stream: "LeadCSVStream" = None,
 ):
     files_saved = []
     out_dir = _resolve_csv_dir(csv_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
     # normalize names so filenames are safe & consistent
-    platform_key  = (platform_name or "platform").strip().lower().replace(" ", "") or "platform"
-    safe_username = re.sub(r"[^A-Za-z0-9_-]+", "_", username or "anon")
+    platform_key, safe_username = _file_keys(platform_name, username)
 
-    fieldnames = [
-        'name','handle','bio','url','platform','dm','title','location',
-        'followers','profile_url','contact_info','search_term',
-        'extraction_method','relevance_score','is_verified','has_email','has_phone', 'subscriber_count', 'description', 'video_count', 'subscribers', 'channel_url', 'username', 'raw_text_sample', 'extracted_at',
-        'transformation_stage', 'content_preview', 'post_title', 'pain_points', 'post_type', 'source_type', 'support_seeking', 'product_interest', 'source_post_url', 'search_source', 'lead_quality', 'customer_type', 'niche_goals',
-        'urgency_level', 'article_context', 'comment_preview', 'source_article_url', 'content_engagement', 'content_focus', 'reading_patterns'
-    ]
+    fieldnames = LEAD_FIELDNAMES
 
     # 1) processed
     if leads:
         out_name = f"{platform_key}_leads_{safe_username}_{timestamp}.csv"
         out_path = out_dir / out_name                               # keep all writes under out_dir
-        with out_path.open('w', newline='', encoding='utf-8') as f:
+        tmp_path = out_path.with_name(out_name + ".tmp")            # readers never see a half-written file
+        with tmp_path.open('w', newline='', encoding='utf-8') as f:
             w = csv.DictWriter(f, fieldnames=fieldnames)
             w.writeheader()
             w.writerows(leads)
+        os.replace(tmp_path, out_path)
         files_saved.append(str(out_path))
         print(f"✅ Saved processed leads → {out_path}")
 
@@ -59,7 +270,21 @@ def save_leads_to_files(
                 print(f"ℹ️ Could not record lead_download: {e}")
 
     # 2) raw (only if different length or no processed)
-    if raw_leads and save_raw and (not leads or len(raw_leads) != len(leads)):
+    keep_raw = bool(raw_leads and save_raw and (not leads or len(raw_leads) != len(leads)))
+    if stream is not None and not stream.closed:
+        # Streaming run: publish the raw file by atomic rename and close the manifest
+        try:
+            raw_file = stream.complete(
+                final_rows=raw_leads or [], keep_raw=keep_raw,
+                leads=len(leads or []), raw_leads=len(raw_leads or []),
+                file=files_saved[0] if leads else None,
+            )
+            if raw_file:
+                files_saved.append(raw_file)
+                print(f"📋 Saved raw leads → {raw_file}")
+        except Exception as e:
+            print(f"⚠️ Could not finalize streamed raw leads: {e}")
+    elif keep_raw:
         raw_name = f"{platform_key}_leads_raw_{safe_username}_{timestamp}.csv"
         raw_path = out_dir / raw_name                               # was Path(csv_dir) / raw_name
         with raw_path.open('w', newline='', encoding='utf-8') as f:
@@ -69,4 +294,11 @@ def save_leads_to_files(
         files_saved.append(str(raw_path))
         print(f"📋 Saved raw leads → {raw_path}")
 
+    # Index what was written so the dashboard never has to glob/parse CSV_DIR
+    _catalog_written_files(out_dir, files_saved, leads, raw_leads, username, platform_key)
+    _store_columnar(files_saved, leads, raw_leads, safe_username, platform_key)
+
+    # Report back to the runner (no-op unless SCRAPER_RESULT_FILE is set)
+    scraper_result.record_files(files_saved, len(leads or []), len(raw_leads or []), platform_key)
+
     return files_saved
@@ -1,12 +1,61 @@
 # postgres_credit_system.py - 100% Compatible PostgreSQL replacement for simple_credit_system.py
 import os
+import re
 import json
 import hashlib
+import functools
+import threading
+import time
 import psycopg2
+from contextlib import contextmanager
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple, List
 
+# Server-side prepared statements (turn off behind a transaction-pooling PgBouncer)
+PG_PREPARED_STATEMENTS = os.getenv("PG_PREPARED_STATEMENTS", "1").lower() not in ("0", "false", "no")
+
+# Hot statements, PREPAREd once per pooled connection: name -> (param types, SQL)
+PREPARED_STATEMENTS = {
+    "user_by_username": ("text", "SELECT * FROM users WHERE username = $1"),
+    "consume_credits": (
+        "integer, integer, text",
+        "UPDATE users SET credits = credits - $1, total_leads_downloaded = total_leads_downloaded + $2 "
+        "WHERE username = $3 AND credits >= $1 RETURNING credits",
+    ),
+    "set_credits_and_plan": ("integer, text, text", "UPDATE users SET credits = $1, plan = $2 WHERE username = $3"),
+}
+
+
+# In-process cache of user rows (Postgres mode); 0 disables it
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+# Cross-process invalidation (Stripe webhook <-> Streamlit) via LISTEN/NOTIFY
+USER_CACHE_LISTEN = os.getenv("USER_CACHE_LISTEN", "0").lower() in ("1", "true", "yes")
+USER_CACHE_CHANNEL = "credit_user_changed"
+
+
+def _writes_user(method):
+    """Write path: drop the cached row before (so the method reads fresh) and after the write"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        username = kwargs.get("username", args[0] if args else None)
+        self.invalidate_user(username, broadcast=False)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.invalidate_user(username)
+    return wrapper
+
+
+class _PreparingConnection(extensions.connection):
+    """Pooled connection that remembers which statements it has PREPAREd"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
 class CreditSystem:
     """PostgreSQL-based credit system - 100% compatible with original"""
     
@@ -17,13 +66,22 @@ class CreditSystem:
         self.database_url = os.getenv('DATABASE_URL')
         self.use_postgres = bool(self.database_url)
         
+        # Per-thread unit of work (see unit_of_work) and pool/query metrics
+        self._local = threading.local()
+        self._metrics_lock = threading.Lock()
+        self.reset_db_metrics()
+        self._user_cache = {}
+        self._user_cache_gen = 0
+        self._user_cache_lock = threading.Lock()
+        
         if self.use_postgres:
             try:
                 # Use connection pool instead of single connection
                 from psycopg2 import pool
                 self.connection_pool = pool.ThreadedConnectionPool(
                     1, 20,  # min=1, max=20 connections
-                    self.database_url
+                    self.database_url,
+                    connection_factory=_PreparingConnection
                 )
                 self._create_tables()
                 print("PostgreSQL credit system initialized with connection pool")
@@ -34,28 +92,178 @@ class CreditSystem:
         else:
             self._init_json_fallback()
         
+        self._load_users_count()
         if self.use_postgres:
-            self._load_users_count()
-        
-        print(f"🔧 Credit system initialized: {len(self.get_all_users_dict())} users loaded")
+            if USER_CACHE_LISTEN and USER_CACHE_TTL_SECONDS > 0:
+                threading.Thread(target=self._listen_for_invalidations, daemon=True,
+                                 name="user-cache-listener").start()
         
-    def get_user_info(self, username):
-        if not self.use_postgres:
-            return self.json_data.get(username)
+        print(f"🔧 Credit system initialized: {self.user_count} users loaded")
         
-        conn = None
+    # === CONNECTION SCOPING, PREPARED STATEMENTS AND METRICS ===
+    def reset_db_metrics(self):
+        with self._metrics_lock:
+            self._metrics = {
+                "checkouts": 0, "pool_wait_total": 0.0, "pool_wait_max": 0.0,
+                "queries": 0, "query_time_total": 0.0, "query_time_max": 0.0,
+                "by_statement": {},
+            }
+    
+    def _record_pool_wait(self, seconds: float):
+        with self._metrics_lock:
+            m = self._metrics
+            m["checkouts"] += 1
+            m["pool_wait_total"] += seconds
+            m["pool_wait_max"] = max(m["pool_wait_max"], seconds)
+    
+    def _record_query(self, label: str, seconds: float):
+        with self._metrics_lock:
+            m = self._metrics
+            m["queries"] += 1
+            m["query_time_total"] += seconds
+            m["query_time_max"] = max(m["query_time_max"], seconds)
+            node = m["by_statement"].setdefault(label, [0, 0.0])
+            node[0] += 1
+            node[1] += seconds
+    
+    def get_db_metrics(self) -> Dict:
+        """Pool wait and query latency so far (milliseconds)"""
+        with self._metrics_lock:
+            m = self._metrics
+            return {
+                "checkouts": m["checkouts"],
+                "pool_wait_avg_ms": round(m["pool_wait_total"] / m["checkouts"] * 1000, 2) if m["checkouts"] else 0.0,
+                "pool_wait_max_ms": round(m["pool_wait_max"] * 1000, 2),
+                "queries": m["queries"],
+                "query_avg_ms": round(m["query_time_total"] / m["queries"] * 1000, 2) if m["queries"] else 0.0,
+                "query_max_ms": round(m["query_time_max"] * 1000, 2),
+                "by_statement": {
+                    label: {"count": n, "avg_ms": round(total / n * 1000, 2)}
+                    for label, (n, total) in m["by_statement"].items()
+                },
+            }
+    
+    def _getconn(self):
+        """(connection, owned): the unit of work's connection, or a fresh one from the pool"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn, False
+        started = time.perf_counter()
+        conn = self.connection_pool.getconn()
+        self._record_pool_wait(time.perf_counter() - started)
+        return conn, True
+    
+    def _putconn(self, conn, owned: bool):
+        if owned:
+            self.connection_pool.putconn(conn)
+    
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Hold one pooled connection for every query made in this block (on this
+        thread), e.g. a whole page render. Nested blocks reuse the outer one.
+        """
+        if not self.use_postgres or getattr(self._local, "conn", None) is not None:
+            yield self
+            return
+        conn, _ = self._getconn()
+        self._local.conn = conn
+        self._local.notifies = []
+        try:
+            yield self
+            conn.commit()
+            # Sent after the block's own commit so listeners never reload pre-commit rows
+            self._send_invalidations(conn, self._local.notifies)
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._local.notifies = []
+            self.connection_pool.putconn(conn)
+    
+    def _run(self, cursor, query, params=None, label: str = "query"):
+        """cursor.execute with latency recorded"""
+        started = time.perf_counter()
+        try:
+            cursor.execute(query, params)
+        finally:
+            self._record_query(label, time.perf_counter() - started)
+    
+    def _run_prepared(self, cursor, name: str, params):
+        """EXECUTE a PREPARED_STATEMENTS entry, preparing it on first use per connection"""
+        types, sql = PREPARED_STATEMENTS[name]
+        conn = cursor.connection
+        if not PG_PREPARED_STATEMENTS or not hasattr(conn, "prepared"):
+            plain = re.sub(r"\$(\d+)", r"%(p\1)s", sql)
+            return self._run(cursor, plain, {f"p{i + 1}": v for i, v in enumerate(params)}, label=name)
+        if name not in conn.prepared:
+            cursor.execute(f"PREPARE {name} ({types}) AS {sql}")
+            conn.prepared.add(name)
+        placeholders = ", ".join(["%s"] * len(params))
+        self._run(cursor, f"EXECUTE {name} ({placeholders})", params, label=name)
+    
+    # === USER ROW CACHE ===
+    def invalidate_user(self, username: Optional[str] = None, broadcast: bool = True):
+        """Forget a cached user (all users when None); tell other processes when listening"""
+        with self._user_cache_lock:
+            self._user_cache_gen += 1
+            if username is None:
+                self._user_cache.clear()
+            else:
+                self._user_cache.pop(username, None)
+        if not (broadcast and USER_CACHE_LISTEN and self.use_postgres):
+            return
+        if getattr(self._local, "conn", None) is not None:
+            # Inside a unit of work: sent once its transaction commits
+            self._local.notifies.append(username or "")
+            return
+        conn, owned = self._getconn()
+        try:
+            self._send_invalidations(conn, [username or ""])
+        finally:
+            self._putconn(conn, owned)
+    
+    def _send_invalidations(self, conn, payloads):
+        """pg_notify each payload and commit on ``conn`` (NOTIFY is only delivered on commit)"""
+        if not payloads:
+            return
         try:
-            conn = self.connection_pool.getconn()
             with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-                result = cursor.fetchone()
-                return dict(result) if result else None
+                for payload in dict.fromkeys(payloads):
+                    self._run(cursor, "SELECT pg_notify(%s, %s)", (USER_CACHE_CHANNEL, payload), label="pg_notify")
+            conn.commit()
         except Exception as e:
-            print(f"Database query error: {e}")
-            return None
-        finally:
-            if conn:
-                self.connection_pool.putconn(conn)
+            print(f"⚠️ Could not broadcast cache invalidation: {e}")
+            if not conn.closed:
+                conn.rollback()
+    
+    def _listen_for_invalidations(self):
+        """Background LISTEN loop on a dedicated connection; reconnects on failure"""
+        import select
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self.database_url)
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {USER_CACHE_CHANNEL}")
+                # Anything may have changed while we weren't listening
+                self.invalidate_user(None, broadcast=False)
+                print(f"👂 User cache listening on {USER_CACHE_CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        note = conn.notifies.pop(0)
+                        self.invalidate_user(note.payload or None, broadcast=False)
+            except Exception as e:
+                print(f"⚠️ User cache listener error, reconnecting: {e}")
+                time.sleep(5)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
     
     def _init_json_fallback(self):
         """Initialize JSON fallback system"""
@@ -116,22 +324,82 @@ class CreditSystem:
             """,
             "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);",
             "CREATE INDEX IF NOT EXISTS idx_users_plan ON users(plan);",
+            """
+            CREATE TABLE IF NOT EXISTS usage_rollup (
+                username VARCHAR(50) REFERENCES users(username) ON DELETE CASCADE,
+                platform VARCHAR(50) NOT NULL,
+                day DATE NOT NULL,
+                leads_downloaded INTEGER DEFAULT 0,
+                credits_used INTEGER DEFAULT 0,
+                downloads INTEGER DEFAULT 0,
+                first_at TIMESTAMP,
+                last_at TIMESTAMP,
+                PRIMARY KEY (username, platform, day)
+            );
+            """,
             "CREATE INDEX IF NOT EXISTS idx_transactions_username ON transactions(username);",
             "CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type);"
         ]
         
         for sql in tables_sql:
             self._execute_query(sql)
+        
+        self._backfill_usage_rollup()
+    
+    def _backfill_usage_rollup(self):
+        """Seed usage_rollup from existing lead_download transactions (first run only)"""
+        existing = self._execute_query("SELECT 1 AS present FROM usage_rollup LIMIT 1", fetch=True)
+        if existing:
+            return
+        self._execute_query("""
+            INSERT INTO usage_rollup
+                (username, platform, day, leads_downloaded, credits_used, downloads, first_at, last_at)
+            SELECT username, LOWER(COALESCE(platform, 'unknown')), timestamp::date,
+                   SUM(COALESCE(leads_downloaded, credits_used, 0)), SUM(COALESCE(credits_used, 0)),
+                   COUNT(*), MIN(timestamp), MAX(timestamp)
+            FROM transactions
+            WHERE type = 'lead_download' AND username IS NOT NULL
+            GROUP BY username, LOWER(COALESCE(platform, 'unknown')), timestamp::date
+            ON CONFLICT (username, platform, day) DO NOTHING
+        """)
+    
+    @contextmanager
+    def _transaction(self):
+        """One pooled connection for several statements, committed (or rolled back) together"""
+        conn, owned = self._getconn()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._putconn(conn, owned)
+    
+    @staticmethod
+    def _bump_usage_rollup(cursor, username: str, platform: str, leads: int, credits: int):
+        """Add one download to the (username, platform, today) rollup row inside the caller's transaction"""
+        cursor.execute("""
+            INSERT INTO usage_rollup
+                (username, platform, day, leads_downloaded, credits_used, downloads, first_at, last_at)
+            VALUES (%s, LOWER(COALESCE(%s, 'unknown')), CURRENT_DATE, %s, %s, 1, NOW(), NOW())
+            ON CONFLICT (username, platform, day) DO UPDATE SET
+                leads_downloaded = usage_rollup.leads_downloaded + EXCLUDED.leads_downloaded,
+                credits_used = usage_rollup.credits_used + EXCLUDED.credits_used,
+                downloads = usage_rollup.downloads + 1,
+                last_at = EXCLUDED.last_at
+        """, (username, platform, int(leads or 0), int(credits or 0)))
     
     def _execute_query(self, query, params=None, fetch=False):
         if not self.use_postgres:
             return None
             
-        conn = None
+        conn, owned = None, False
         try:
-            conn = self.connection_pool.getconn()
-            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute(query, params)
+            conn, owned = self._getconn()
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                self._run(cursor, query, params)
                 
                 if fetch:
                     return cursor.fetchall()
@@ -141,10 +409,12 @@ class CreditSystem:
                     
         except Exception as e:
             print(f"Query error: {e}")
+            if conn is not None and not conn.closed:
+                conn.rollback()
             return None
         finally:
-            if conn:
-                self.connection_pool.putconn(conn)
+            if conn is not None:
+                self._putconn(conn, owned)
     
     def _load_users_count(self):
         """Load user count for initialization"""
@@ -160,64 +430,83 @@ class CreditSystem:
     def record_lead_download(self, username: str, platform: str, leads_count: int):
         """
         Persist a lead download event so dashboards can rebuild history after deploy.
-        Uses the transactions table you already have.
+        The transactions row and the usage_rollup bump commit together.
         """
-        q = """
-        INSERT INTO transactions
-        (username, type, platform, leads_downloaded, credits_used, timestamp)
-        VALUES
-        (%s, 'lead_download', %s, %s, %s, NOW())
-        """
-        with self.conn.cursor() as cur:
-            cur.execute(q, (username, platform, leads_count, leads_count))
-            self.conn.commit()
+        if not self.use_postgres:
+            transaction = {
+                "username": username,
+                "type": "lead_download",
+                "platform": platform,
+                "leads_downloaded": leads_count,
+                "credits_used": leads_count,
+                "timestamp": datetime.now().isoformat(),
+            }
+            self.transactions.append(transaction)
+            self.save_data()
+            return True
+        
+        try:
+            with self._transaction() as cursor:
+                cursor.execute("""
+                    INSERT INTO transactions
+                    (username, type, platform, leads_downloaded, credits_used, timestamp)
+                    VALUES (%s, 'lead_download', %s, %s, %s, NOW())
+                """, (username, platform, leads_count, leads_count))
+                self._bump_usage_rollup(cursor, username, platform, leads_count, leads_count)
+            return True
+        except Exception as e:
+            print(f"❌ Could not record lead download for {username}: {e}")
+            return False
             
-    def get_usage_summary(self, username: str, since_days: int = 180):
+    def get_usage_summary(self, username: str, since_days: Optional[int] = 180):
         """
-        Returns totals + per-platform stats from transactions, not from CSVs.
+        Returns totals + per-platform stats from the usage_rollup table, not from CSVs.
+        ``since_days=None`` covers all time.
         """
+        empty = {"total_leads": 0, "total_campaigns": 0, "first_ts": None, "last_ts": None, "per_platform": {}}
+        
+        if not self.use_postgres:
+            cutoff = (datetime.now() - timedelta(days=since_days)).isoformat() if since_days else ""
+            summary = dict(empty, per_platform={})
+            for tx in self.transactions:
+                if tx.get("username") != username or tx.get("type") != "lead_download":
+                    continue
+                ts = tx.get("timestamp", "")
+                if ts < cutoff:
+                    continue
+                leads = int(tx.get("leads_downloaded") or tx.get("credits_used") or 0)
+                platform = str(tx.get("platform") or "unknown").lower()
+                summary["per_platform"][platform] = summary["per_platform"].get(platform, 0) + leads
+                summary["total_leads"] += leads
+                summary["total_campaigns"] += 1
+                summary["first_ts"] = min(filter(None, [summary["first_ts"], ts]))
+                summary["last_ts"] = max(filter(None, [summary["last_ts"], ts]))
+            return summary
+        
         q = """
-        WITH recent_tx AS (
-        SELECT *
-        FROM transactions
+        SELECT platform,
+            SUM(leads_downloaded) AS leads,
+            SUM(downloads) AS downloads,
+            MIN(first_at) AS first_ts,
+            MAX(last_at) AS last_ts
+        FROM usage_rollup
         WHERE username = %s
-            AND timestamp >= NOW() - INTERVAL '%s days'
-        )
-        SELECT
-        COALESCE(SUM(CASE WHEN type='lead_download'
-                            THEN COALESCE(leads_downloaded, credits_used, 0) END), 0) AS total_leads,
-        COALESCE(COUNT(CASE WHEN type='lead_download' THEN 1 END), 0) AS total_campaigns,
-        MIN(timestamp) AS first_ts,
-        MAX(timestamp) AS last_ts
-        FROM recent_tx
-        """
-        q_plat = """
-        SELECT LOWER(COALESCE(platform, 'unknown')) AS platform,
-            COALESCE(SUM(COALESCE(leads_downloaded, credits_used, 0)), 0) AS leads
-        FROM transactions
-        WHERE username=%s
-        AND timestamp >= NOW() - INTERVAL '%s days'
-        AND type='lead_download'
-        GROUP BY LOWER(COALESCE(platform, 'unknown'))
+        AND (%s IS NULL OR day >= CURRENT_DATE - %s)
+        GROUP BY platform
         ORDER BY leads DESC
         """
-        with self.conn.cursor() as cur:
-            cur.execute(q, (username, since_days))
-            row = cur.fetchone()
-            total_leads = int(row[0] or 0)
-            total_campaigns = int(row[1] or 0)
-            first_ts, last_ts = row[2], row[3]
-
-            cur.execute(q_plat, (username, since_days))
-            platform_rows = cur.fetchall()
-            per_platform = {r[0]: int(r[1]) for r in platform_rows}
-
+        rows = self._execute_query(q, (username, since_days, since_days or 0), fetch=True)
+        if not rows:
+            return empty
+        
+        firsts = [r["first_ts"] for r in rows if r["first_ts"]]
+        lasts = [r["last_ts"] for r in rows if r["last_ts"]]
         return {
-            "total_leads": total_leads,
-            "total_campaigns": total_campaigns,
-            "first_ts": first_ts,
-            "last_ts": last_ts,
-            "per_platform": per_platform
+            "total_leads": sum(int(r["leads"] or 0) for r in rows),
+            "total_campaigns": sum(int(r["downloads"] or 0) for r in rows),
+            "first_ts": min(firsts) if firsts else None,
+            "last_ts": max(lasts) if lasts else None,
+            "per_platform": {r["platform"]: int(r["leads"] or 0) for r in rows}
         }
 
     # === JSON FALLBACK METHODS ===
@@ -260,6 +549,81 @@ class CreditSystem:
         else:
             return getattr(self, '_users', {})
 
+    def get_users_page(self, after: Optional[str] = None, limit: int = 500) -> List[Dict]:
+        """One page of users ordered by username (keyset pagination: pass the last username as ``after``)"""
+        if self.use_postgres:
+            rows = self._execute_query("""
+                SELECT * FROM users
+                WHERE (%s IS NULL OR username > %s)
+                ORDER BY username
+                LIMIT %s
+            """, (after, after, int(limit)), fetch=True)
+            return [dict(r) for r in rows] if rows else []
+        users = getattr(self, '_users', {})
+        names = sorted(u for u in users if after is None or u > after)[:int(limit)]
+        return [dict(users[u], username=u) for u in names]
+
+    def iter_users(self, page_size: int = 500):
+        """Yield every user dict, fetching ``page_size`` rows per query"""
+        after = None
+        while True:
+            page = self.get_users_page(after, page_size)
+            if not page:
+                return
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1]["username"]
+
+    def count_users(self) -> int:
+        if self.use_postgres:
+            result = self._execute_query("SELECT COUNT(*) AS count FROM users", fetch=True)
+            return int(result[0]['count']) if result else 0
+        return len(getattr(self, '_users', {}))
+
+    def count_users_by_plan(self) -> Dict[str, int]:
+        """{plan: user count} via GROUP BY"""
+        if self.use_postgres:
+            rows = self._execute_query("""
+                SELECT COALESCE(plan, 'unknown') AS plan, COUNT(*) AS count
+                FROM users GROUP BY COALESCE(plan, 'unknown')
+            """, fetch=True)
+            return {r['plan']: int(r['count']) for r in rows} if rows else {}
+        counts = {}
+        for user in getattr(self, '_users', {}).values():
+            plan = user.get("plan") or "unknown"
+            counts[plan] = counts.get(plan, 0) + 1
+        return counts
+
+    def get_revenue_totals(self) -> Dict:
+        """Revenue, leads served and transaction count in one aggregate query"""
+        if self.use_postgres:
+            result = self._execute_query("""
+                SELECT
+                    COALESCE(SUM(CASE WHEN type = 'credit_purchase' THEN credits_added *
+                        CASE
+                            WHEN plan = 'lead starter' THEN 97
+                            WHEN plan = 'lead pro' THEN 297
+                            WHEN plan = 'lead empire' THEN 897
+                            ELSE 0
+                        END END), 0) AS total_revenue,
+                    COALESCE(SUM(CASE WHEN type = 'lead_download' THEN leads_downloaded END), 0) AS total_leads,
+                    COUNT(*) AS total_transactions
+                FROM transactions
+            """, fetch=True)
+            row = result[0] if result else {}
+            return {
+                "total_revenue": row.get('total_revenue') or 0,
+                "total_leads_served": row.get('total_leads') or 0,
+                "total_transactions": row.get('total_transactions') or 0,
+            }
+        transactions = getattr(self, 'transactions', [])
+        return {
+            "total_revenue": sum(self._get_price_for_plan(t.get("plan", "")) for t in transactions if t.get("type") == "credit_purchase"),
+            "total_leads_served": sum(t.get("leads_downloaded", 0) for t in transactions if t.get("type") == "lead_download"),
+            "total_transactions": len(transactions),
+        }
+
     @property 
     def users(self) -> Dict:
         """Property to maintain compatibility with original users access"""
@@ -269,6 +633,7 @@ class CreditSystem:
         """Simple password hashing"""
         return hashlib.sha256(password.encode()).hexdigest()
 
+    @_writes_user
     def create_user(self, username: str, email: str, password: str) -> Tuple[bool, str]:
         """Create new user with demo mode"""
         if self.use_postgres:
@@ -309,32 +674,25 @@ class CreditSystem:
         return True, "Demo account created with 5 free demo leads"
     
     # In your postgres_credit_system.py, add this method:
+    @_writes_user
     def delete_user(self, username: str) -> bool:
         """Delete user completely from PostgreSQL"""
         try:
-            if not self.conn:  # Changed from self.connection to self.conn
-                return False
-            
-            cursor = self.conn.cursor()  # Changed from self.connection to self.conn
-            
-            # Delete from users table
-            cursor.execute("DELETE FROM users WHERE username = %s", (username,))
-            deleted_count = cursor.rowcount
-            
-            self.conn.commit()  # Changed from self.connection to self.conn
-            cursor.close()
+            if not self.use_postgres:
+                # JSON fallback
+                if self._users.pop(username, None) is None:
+                    return False
+                self.save_data()
+                return True
             
-            # Also remove from memory cache if it exists
-            if hasattr(self, 'users') and username in self.users:
-                del self.users[username]
+            # Delete from users table (transactions cascade)
+            deleted_count = self._execute_query("DELETE FROM users WHERE username = %s", (username,)) or 0
             
             print(f"Deleted user {username} from PostgreSQL (rows affected: {deleted_count})")
             return deleted_count > 0
             
         except Exception as e:
             print(f"PostgreSQL user deletion failed: {e}")
-            if self.conn:  # Changed from self.connection to self.conn
-                self.conn.rollback()
             return False
 
     def get_demo_status(self, username: str) -> Tuple[bool, int, int]:
@@ -361,34 +719,57 @@ class CreditSystem:
         
         return remaining > 0, remaining
 
-    def consume_demo_lead(self, username: str) -> bool:
-        """Consume one demo lead"""
+    def get_demo_leads_remaining(self, username: str) -> int:
+        """Demo leads left for a demo user (0 for everyone else)"""
+        _, _, remaining = self.get_demo_status(username)
+        return remaining
+
+    @_writes_user
+    def consume_demo_leads(self, username: str, n: int) -> int:
+        """Consume up to ``n`` demo leads in one atomic step; returns how many were consumed"""
+        n = int(n or 0)
+        if n <= 0:
+            return 0
+        
         if self.use_postgres:
-            # Check and update in one query
-            rows = self._execute_query("""
-                UPDATE users 
-                SET demo_leads_used = demo_leads_used + 1 
-                WHERE username = %s AND plan = 'demo' AND demo_leads_used < demo_limit
-            """, (username,))
-            return rows > 0
-        else:
-            # JSON fallback
-            if username not in self._users:
-                return False
-            
-            user = self._users[username]
-            if not self.is_demo_user(username):
-                return False
-            
-            used = user.get("demo_leads_used", 0)
-            limit = user.get("demo_limit", 5)
-            
-            if used >= limit:
-                return False
-            
-            user["demo_leads_used"] = used + 1
+            try:
+                # Lock the row, then cap the increment at the demo limit
+                with self._transaction() as cursor:
+                    self._run(cursor, """
+                        WITH current AS (
+                            SELECT username, COALESCE(demo_leads_used, 0) AS used
+                            FROM users
+                            WHERE username = %s AND plan = 'demo'
+                            FOR UPDATE
+                        )
+                        UPDATE users u
+                        SET demo_leads_used = LEAST(COALESCE(u.demo_limit, 5), c.used + %s)
+                        FROM current c
+                        WHERE u.username = c.username AND c.used < COALESCE(u.demo_limit, 5)
+                        RETURNING u.demo_leads_used - c.used AS consumed
+                    """, (username, n), label="consume_demo_leads")
+                    row = cursor.fetchone()
+                return int(row["consumed"]) if row else 0
+            except Exception as e:
+                print(f"❌ Demo consumption failed for {username}: {e}")
+                return 0
+        
+        # JSON fallback
+        user = self._users.get(username)
+        if not user or user.get("plan", "demo") != "demo":
+            return 0
+        
+        used = user.get("demo_leads_used", 0)
+        limit = user.get("demo_limit", 5)
+        consumed = max(0, min(n, limit - used))
+        if consumed:
+            user["demo_leads_used"] = used + consumed
             self.save_data()
-            return True
+        return consumed
+
+    def consume_demo_lead(self, username: str) -> bool:
+        """Consume one demo lead"""
+        return self.consume_demo_leads(username, 1) == 1
 
     def login_user(self, identifier: str, password: str) -> Tuple[bool, str, Dict]:
         """Authenticate user by username OR email"""
@@ -436,12 +817,38 @@ class CreditSystem:
             return False, f"User not found: {identifier}", {}
 
     def get_user_info(self, username: str) -> Optional[Dict]:
-        """Get user information"""
+        """Get user information (Postgres rows are cached for USER_CACHE_TTL_SECONDS)"""
         if self.use_postgres:
-            user = self._execute_query(
-                "SELECT * FROM users WHERE username = %s", (username,), fetch=True
-            )
-            return dict(user[0]) if user else None
+            now = time.monotonic()
+            with self._user_cache_lock:
+                cached = self._user_cache.get(username)
+                gen = self._user_cache_gen
+            if cached and cached[0] > now:
+                return dict(cached[1])
+            
+            conn, owned = None, False
+            try:
+                conn, owned = self._getconn()
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    self._run_prepared(cursor, "user_by_username", (username,))
+                    user = cursor.fetchone()
+                if not user:
+                    return None
+                user = dict(user)
+                if USER_CACHE_TTL_SECONDS > 0:
+                    with self._user_cache_lock:
+                        # Skip if a write invalidated anything while we were reading
+                        if gen == self._user_cache_gen:
+                            self._user_cache[username] = (now + USER_CACHE_TTL_SECONDS, user)
+                return dict(user)
+            except Exception as e:
+                print(f"Database query error: {e}")
+                if conn is not None and not conn.closed:
+                    conn.rollback()
+                return None
+            finally:
+                if conn is not None:
+                    self._putconn(conn, owned)
         else:
             return self._users.get(username)
 
@@ -463,47 +870,137 @@ class CreditSystem:
         else:
             return False, f"Insufficient credits: {current_credits}/{required_credits}", current_credits
 
+    @_writes_user
     def consume_credits(self, username: str, credits_used: int, leads_downloaded: int, platform: str) -> bool:
         """Consume credits and log the transaction"""
+        if self.use_postgres:
+            try:
+                # Balance check + debit is a single conditional UPDATE (the row lock
+                # serializes concurrent consumers); the log and rollup share its transaction
+                with self._transaction() as cursor:
+                    self._run_prepared(cursor, "consume_credits", (credits_used, leads_downloaded, username))
+                    row = cursor.fetchone()
+                    if not row:
+                        return False
+                    
+                    cursor.execute("""
+                        INSERT INTO transactions (username, type, credits_used, leads_downloaded, platform, credits_remaining)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    """, (username, "lead_download", credits_used, leads_downloaded, platform, row["credits"]))
+                    
+                    self._bump_usage_rollup(cursor, username, platform, leads_downloaded, credits_used)
+            except Exception as e:
+                print(f"❌ Credit consumption failed for {username}: {e}")
+                return False
+            return True
+        
         user = self.get_user_info(username)
         if not user or user.get("credits", 0) < credits_used:
             return False
         
-        if self.use_postgres:
-            # Update user credits
-            self._execute_query("""
-                UPDATE users 
+        # JSON fallback
+        user["credits"] -= credits_used
+        user["total_leads_downloaded"] += leads_downloaded
+        
+        transaction = {
+            "username": username,
+            "type": "lead_download",
+            "credits_used": credits_used,
+            "leads_downloaded": leads_downloaded,
+            "platform": platform,
+            "timestamp": datetime.now().isoformat(),
+            "credits_remaining": user["credits"]
+        }
+        
+        user.setdefault("transactions", []).append(transaction)
+        self.transactions.append(transaction)
+        self.save_data()
+    
+        return True
+
+    @_writes_user
+    def consume_credits_batch(self, username: str, items: List[Dict]) -> Tuple[bool, Optional[int]]:
+        """
+        Consume credits for several platforms at once, all or nothing.
+        items: [{"platform", "credits_used", "leads_downloaded"}, ...]
+        Returns (success, credits_remaining).
+        """
+        merged = {}
+        for item in items or []:
+            platform = str(item.get("platform") or "multi").lower()
+            credits_used = int(item.get("credits_used") or 0)
+            leads = int(item.get("leads_downloaded", credits_used) or 0)
+            node = merged.setdefault(platform, [0, 0])
+            node[0] += credits_used
+            node[1] += leads
+        merged = [(p, c, l) for p, (c, l) in merged.items() if c > 0 or l > 0]
+        if not merged:
+            user = self.get_user_info(username)
+            return bool(user), (user or {}).get("credits")
+        
+        total_credits = sum(c for _, c, _ in merged)
+        total_leads = sum(l for _, _, l in merged)
+        
+        if not self.use_postgres:
+            user = self.get_user_info(username)
+            if not user or user.get("credits", 0) < total_credits:
+                return False, (user or {}).get("credits")
+            for platform, credits_used, leads in merged:
+                self.consume_credits(username, credits_used, leads, platform)
+            return True, user.get("credits")
+        
+        # credits_remaining per row = final balance + credits of the rows logged after it
+        after = [sum(c for _, c, _ in merged[i + 1:]) for i in range(len(merged))]
+        values_sql = ", ".join(["(%s, %s::int, %s::int, %s::int)"] * len(merged))
+        values = [v for (p, c, l), a in zip(merged, after) for v in (p, c, l, a)]
+        
+        # One statement: conditional debit, transaction rows and rollup upserts
+        query = f"""
+            WITH spent AS (
+                UPDATE users
                 SET credits = credits - %s, total_leads_downloaded = total_leads_downloaded + %s
-                WHERE username = %s
-            """, (credits_used, leads_downloaded, username))
-            
-            # Log transaction
-            self._execute_query("""
+                WHERE username = %s AND credits >= %s
+                RETURNING credits
+            ),
+            items (platform, credits_used, leads_downloaded, credits_after) AS (
+                VALUES {values_sql}
+            ),
+            logged AS (
                 INSERT INTO transactions (username, type, credits_used, leads_downloaded, platform, credits_remaining)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (username, "lead_download", credits_used, leads_downloaded, platform, user["credits"] - credits_used))
-            
-        else:
-            # JSON fallback
-            user["credits"] -= credits_used
-            user["total_leads_downloaded"] += leads_downloaded
-            
-            transaction = {
-                "username": username,
-                "type": "lead_download",
-                "credits_used": credits_used,
-                "leads_downloaded": leads_downloaded,
-                "platform": platform,
-                "timestamp": datetime.now().isoformat(),
-                "credits_remaining": user["credits"]
-            }
-            
-            user.setdefault("transactions", []).append(transaction)
-            self.transactions.append(transaction)
-            self.save_data()
+                SELECT %s, 'lead_download', i.credits_used, i.leads_downloaded, i.platform, s.credits + i.credits_after
+                FROM items i CROSS JOIN spent s
+                RETURNING 1
+            ),
+            rolled AS (
+                INSERT INTO usage_rollup
+                    (username, platform, day, leads_downloaded, credits_used, downloads, first_at, last_at)
+                SELECT %s, i.platform, CURRENT_DATE, i.leads_downloaded, i.credits_used, 1, NOW(), NOW()
+                FROM items i CROSS JOIN spent s
+                ON CONFLICT (username, platform, day) DO UPDATE SET
+                    leads_downloaded = usage_rollup.leads_downloaded + EXCLUDED.leads_downloaded,
+                    credits_used = usage_rollup.credits_used + EXCLUDED.credits_used,
+                    downloads = usage_rollup.downloads + 1,
+                    last_at = EXCLUDED.last_at
+                RETURNING 1
+            )
+            SELECT credits FROM spent
+        """
+        params = [total_credits, total_leads, username, total_credits] + values + [username, username]
         
-        return True
+        try:
+            with self._transaction() as cursor:
+                self._run(cursor, query, params, label="consume_credits_batch")
+                row = cursor.fetchone()
+        except Exception as e:
+            print(f"❌ Batch credit consumption failed for {username}: {e}")
+            return False, None
+        
+        if not row:
+            return False, (self.get_user_info(username) or {}).get("credits")
+        print(f"💎 Consumed {total_credits} credits for {username} across {len(merged)} platforms")
+        return True, int(row["credits"])
 
+    @_writes_user
     def add_credits(self, username: str, credits: int, plan: str, stripe_session_id: str = None) -> bool:
         """Add credits to user account (from purchase) with proper plan handling"""
         user = self.get_user_info(username)
@@ -540,17 +1037,19 @@ class CreditSystem:
         print(f"💎 Credits: {old_credits} → {new_credits}")
 
         if self.use_postgres:
-            # Update user
-            self._execute_query("""
-                UPDATE users SET credits = %s, plan = %s WHERE username = %s
-            """, (new_credits, new_plan, username))
-            
-            # Log transaction
-            self._execute_query("""
-                INSERT INTO transactions (username, type, credits_added, plan, stripe_session_id, credits_after)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (username, "credit_purchase" if plan == "credit_purchase" else "plan_upgrade", 
-                  credits, new_plan, stripe_session_id or "unknown", new_credits))
+            try:
+                # Update user and log the transaction on one connection, committed together
+                with self._transaction() as cursor:
+                    self._run_prepared(cursor, "set_credits_and_plan", (new_credits, new_plan, username))
+                    
+                    self._run(cursor, """
+                        INSERT INTO transactions (username, type, credits_added, plan, stripe_session_id, credits_after)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    """, (username, "credit_purchase" if plan == "credit_purchase" else "plan_upgrade", 
+                          credits, new_plan, stripe_session_id or "unknown", new_credits))
+            except Exception as e:
+                print(f"❌ Could not add credits for {username}: {e}")
+                return False
         else:
             # JSON fallback
             user["credits"] = new_credits
@@ -574,6 +1073,7 @@ class CreditSystem:
     
     # --- Add these methods inside CreditSystem ------------------------------
 
+    @_writes_user
     def save_user_info(self, username: str, info: dict):
         """
         Compatibility shim for legacy callers.
@@ -634,6 +1134,7 @@ class CreditSystem:
     # -----------------------------------------------------------------------
 
 
+    @_writes_user
     def activate_subscription(self, username: str, plan: str, monthly_credits: int, stripe_session_id: str) -> bool:
         """Activate a monthly subscription plan"""
         user = self.get_user_info(username)
@@ -686,6 +1187,7 @@ class CreditSystem:
 
         return True
     
+    @_writes_user
     def set_stripe_billing(self, username: str, customer_id: str | None,
                        subscription_id: str | None, current_period_end_epoch: int = 0) -> bool:
         """Persist Stripe identifiers and (optionally) the current period end."""
@@ -712,6 +1214,7 @@ class CreditSystem:
             return False
 
 
+    @_writes_user
     def check_subscription_status(self, username: str) -> tuple[bool, str]:
         """
         Return (active, status_string). If Stripe says the sub is canceled/past_due,
@@ -893,6 +1396,7 @@ class CreditSystem:
         }
         return pricing.get(plan.lower(), 0)
 
+    @_writes_user
     def agree_to_terms(self, username: str) -> bool:
         """Record that user agreed to terms"""
         if self.use_postgres:
@@ -911,6 +1415,7 @@ class CreditSystem:
             self.save_data()
             return True
 
+    @_writes_user
     def update_user_plan(self, username: str, new_plan: str) -> bool:
         """Update user's plan and add appropriate credits"""
         user = self.get_user_info(username)
@@ -973,6 +1478,7 @@ class CreditSystem:
         print(f"✅ Plan updated: {username} {old_plan} → {new_plan}")
         return True
 
+    @_writes_user
     def fix_user_credits(self, username: str) -> bool:
         """Fix user credits to match their plan"""
         user = self.get_user_info(username)
@@ -1027,6 +1533,7 @@ class CreditSystem:
         
         return False
 
+    @_writes_user
     def update_user_password(self, username: str, new_password: str) -> bool:
         """Update user password in credit system"""
         user = self.get_user_info(username)
@@ -1058,6 +1565,7 @@ class CreditSystem:
         print("🔄 Reloading credit system data...")
         
         if self.use_postgres:
+            self.invalidate_user(None)
             self._load_users_count()
             new_user_count = self.user_count
             print(f"✅ PostgreSQL data reloaded: {new_user_count} users")
@@ -1074,17 +1582,15 @@ class CreditSystem:
 
     def debug_user_password(self, username: str, password: str) -> Dict:
         """Debug password checking in credit system"""
-        all_users = self.get_all_users_dict()
+        user = self.get_user_info(username)
         
-        if username not in all_users:
-            available_users = list(all_users.keys())
+        if not user:
             return {
                 "error": "User not found in credit system",
-                "available_users": available_users[:10],
-                "total_users": len(available_users)
+                "available_users": [u["username"] for u in self.get_users_page(limit=10)],
+                "total_users": self.count_users()
             }
         
-        user = all_users[username]
         stored_hash = user.get("password_hash", "")
         test_hash = self.hash_password(password)
         
@@ -1100,6 +1606,7 @@ class CreditSystem:
             "password_updated_at": user.get("password_updated_at", "never")
         }
 
+    @_writes_user
     def force_user_sync(self, username: str, email: str, password: str, plan: str = "demo", credits: int = 5) -> bool:
         """Force create/update user with specific data (for fixing sync issues)"""
         password_hash = self.hash_password(password)
@@ -1165,8 +1672,45 @@ class CreditSystem:
                     return username, user_data
             return None, None
 
-    def verify_system_integrity(self) -> Dict:
+    def verify_system_integrity(self, max_issues: int = 200) -> Dict:
         """Verify the integrity of the credit system"""
+        if self.use_postgres:
+            result = self._execute_query("""
+                SELECT
+                    COUNT(*) AS total_users,
+                    COUNT(NULLIF(email, '')) AS users_with_emails,
+                    COUNT(NULLIF(password_hash, '')) AS users_with_passwords,
+                    COUNT(*) FILTER (WHERE COALESCE(plan, 'unknown') = 'demo') AS demo_users
+                FROM users
+            """, fetch=True)
+            row = dict(result[0]) if result else {}
+            stats = {
+                "total_users": int(row.get("total_users") or 0),
+                "users_with_emails": int(row.get("users_with_emails") or 0),
+                "users_with_passwords": int(row.get("users_with_passwords") or 0),
+                "demo_users": int(row.get("demo_users") or 0),
+            }
+            stats["paid_users"] = stats["total_users"] - stats["demo_users"]
+            
+            # Only the offending rows come back, capped
+            broken = self._execute_query("""
+                SELECT username,
+                    COALESCE(email, '') = '' AS no_email,
+                    COALESCE(password_hash, '') = '' AS no_hash
+                FROM users
+                WHERE COALESCE(email, '') = '' OR COALESCE(password_hash, '') = ''
+                ORDER BY username
+                LIMIT %s
+            """, (int(max_issues),), fetch=True) or []
+            issues = []
+            for r in broken:
+                if r["no_email"]:
+                    issues.append(f"❌ {r['username']}: No email")
+                if r["no_hash"]:
+                    issues.append(f"❌ {r['username']}: No password hash")
+            stats["issues"] = issues
+            return stats
+        
         all_users = self.get_all_users_dict()
         
         issues = []
@@ -1204,46 +1748,21 @@ class CreditSystem:
 
     def get_admin_stats(self) -> Dict:
         """Get admin statistics"""
-        all_users = self.get_all_users_dict()
+        plans = self.count_users_by_plan()
         
-        total_users = len(all_users)
-        starter_users = len([u for u in all_users.values() if u.get("plan") == "starter"])
+        total_users = sum(plans.values())
+        starter_users = plans.get("starter", 0)
         paid_users = total_users - starter_users
         
-        if self.use_postgres:
-            # Calculate from database
-            revenue_result = self._execute_query("""
-                SELECT SUM(credits_added * 
-                    CASE 
-                        WHEN plan = 'lead starter' THEN 97
-                        WHEN plan = 'lead pro' THEN 297
-                        WHEN plan = 'lead empire' THEN 897
-                        ELSE 0
-                    END) as total_revenue
-                FROM transactions WHERE type = 'credit_purchase'
-            """, fetch=True)
-            
-            leads_result = self._execute_query("""
-                SELECT SUM(leads_downloaded) as total_leads
-                FROM transactions WHERE type = 'lead_download'
-            """, fetch=True)
-            
-            total_revenue = revenue_result[0]['total_revenue'] or 0 if revenue_result else 0
-            total_leads_served = leads_result[0]['total_leads'] or 0 if leads_result else 0
-            total_transactions = self._execute_query("SELECT COUNT(*) as count FROM transactions", fetch=True)[0]['count']
-        else:
-            # Calculate from JSON
-            total_revenue = sum(self._get_price_for_plan(t.get("plan", "")) for t in self.transactions if t.get("type") == "credit_purchase")
-            total_leads_served = sum(t.get("leads_downloaded", 0) for t in self.transactions if t.get("type") == "lead_download")
-            total_transactions = len(self.transactions)
+        totals = self.get_revenue_totals()
         
         return {
             "total_users": total_users,
             "starter_users": starter_users,
             "paid_users": paid_users,
-            "total_revenue": total_revenue,
-            "total_leads_served": total_leads_served,
-            "total_transactions": total_transactions
+            "total_revenue": totals["total_revenue"],
+            "total_leads_served": totals["total_leads_served"],
+            "total_transactions": totals["total_transactions"]
         }
 
 # Global instance
@@ -8,8 +8,13 @@ import csv
 import re
 import random
 from dm_sequences import generate_dm_with_fallback
+import scraper_progress
+import scraper_result
+from browser_setup import launch_browser, new_scraper_context
 import os
-from persistence import save_leads_to_files
+from persistence import save_leads_to_files, open_lead_stream
+from keyword_matcher import score_reddit_end_customer
+from selector_stats import ordered_selectors, record_selector_attempt
 from pathlib import Path
 
 # Directory where your CSV files are saved
@@ -287,6 +292,9 @@ if excluded_accounts:
 else:
     print(f"  🚫 No accounts excluded (configured via frontend)")
 
+# Excluded post authors and commenters across every post analysed in this run
+run_counts = {"excluded": 0}
+
 def update_last_run_time():
     """Update the last run time for Reddit scraper"""
     data = {"last_run": datetime.now().isoformat()}
@@ -305,137 +313,9 @@ def is_niche_end_customer_reddit(username, post_title, post_content, comment_tex
         
     analysis_text = f"{username} {post_title} {post_content} {comment_text}".lower()
     
-    # 🚫 EXCLUDE PROFESSIONALS (stricter criteria but niche-aware)
-    professional_indicators = [
-        f'{niche} coach', f'{niche} trainer', f'{niche} consultant',
-        'personal trainer', 'certified trainer', 'coaching services',
-        'dm for coaching', 'trainer here', 'professional', 'expert',
-        'check out my program', 'my coaching business', 'offering training',
-        'i coach', 'i train clients', 'as a trainer', 'as a coach',
-        'my services', 'contact me for', 'consultation available'
-    ]
-    
-    professional_count = 0
-    for indicator in professional_indicators:
-        if indicator in analysis_text:
-            professional_count += 1
-    
-    # Only exclude if multiple professional indicators (be less strict)
-    if professional_count >= 2:
-        return False, 0, "professional"
-    
-    # 🎯 UNIVERSAL END CUSTOMER SIGNALS (more inclusive)
-    end_customer_signals = {
-        # Premium Leads ($50-200 each) - High intent help seeking
-        'help_seeking': [
-            'need help', 'please help', 'advice needed', 'what should i do',
-            'how do i', 'can someone help', 'desperate', 'stuck', 'lost',
-            'dont know', 'confused', 'guidance', 'suggestions', 'tips'
-        ],
-        
-        # Premium Leads - Transformation sharing/documenting
-        'transformation_sharing': [
-            'progress', 'before and after', 'transformation', 'lost',
-            'finally', 'achievement', 'goal', 'success', 'journey',
-            'update', 'pics', 'photo', 'my story', 'my experience'
-        ],
-        
-        # Premium Leads - Struggle/plateau content
-        'struggle_plateau': [
-            'plateau', 'stuck', 'not losing', 'not working', 'frustrated',
-            'tried everything', 'months', 'nothing works', 'same',
-            'discouraged', 'giving up', 'failed', 'struggling'
-        ],
-        
-        # Standard Leads ($20-50 each) - Beginner questions
-        'beginner_questions': [
-            'beginner', 'new to', 'first time', 'never done', 'start',
-            'where to begin', 'newbie', 'noob', 'just started', 'day 1',
-            'week 1', 'complete beginner', 'total beginner'
-        ],
-        
-        # Standard Leads - Goal setting
-        'goal_oriented': [
-            'goal', 'trying to', 'want to', 'hoping to', 'plan to',
-            'working towards', 'target', 'aiming for', 'my plan'
-        ],
-        
-        # Volume Leads ($10-30 each) - Product/equipment questions
-        'product_interest': [
-            'recommend', 'best', 'should i buy', 'worth it', 'review',
-            'equipment', 'app', 'supplement', 'product', 'gear',
-            'what do you think', 'opinions', 'experiences'
-        ],
-        
-        # Volume Leads - General motivation/support
-        'motivation_support': [
-            'motivation', 'support', 'accountability', 'encourage',
-            'keep going', 'anyone else', 'same boat', 'relate',
-            'similar experience', 'community'
-        ],
-        
-        # NEW: Common Reddit customer language
-        'reddit_language': [
-            'guys', 'everyone', 'people', 'anyone', 'somebody',
-            'this sub', 'reddit', 'community', 'posted', 'sharing',
-            'update', 'rant', 'confession', 'honest', 'real talk'
-        ]
-    }
-    
-    # Score customer signals with LOWER thresholds for better capture
-    total_score = 0
-    customer_type = "volume"
-    matched_categories = []
-    
-    for signal_type, signals in end_customer_signals.items():
-        category_score = 0
-        for signal in signals:
-            if signal in analysis_text:
-                category_score += 1
-        
-        if category_score > 0:
-            matched_categories.append(signal_type)
-            
-            if signal_type in ['help_seeking', 'transformation_sharing', 'struggle_plateau']:
-                total_score += category_score * 3  # Reduced from 4
-                customer_type = "premium"
-            elif signal_type in ['beginner_questions', 'goal_oriented']:
-                total_score += category_score * 2
-                if customer_type != "premium":
-                    customer_type = "standard"
-            else:  # product_interest, motivation_support, reddit_language
-                total_score += category_score
-    
-    # LOWERED THRESHOLD: Accept with score >= 1
-    is_customer = total_score >= 1
-    
-    # BONUS: Extra points for niche-related content context
-    niche_keywords = {
-        'fitness': ['weight', 'lose', 'gain', 'muscle', 'gym', 'workout', 'exercise', 'diet', 'fitness', 'health'],
-        'health': ['health', 'anxiety', 'depression', 'chronic', 'pain', 'recovery', 'healing', 'wellness'],
-        'business': ['business', 'startup', 'entrepreneur', 'money', 'income', 'career', 'job', 'freelance'],
-        'tech': ['coding', 'programming', 'tech', 'software', 'development', 'career', 'job', 'bootcamp'],
-        'beauty': ['skin', 'makeup', 'beauty', 'hair', 'acne', 'skincare', 'cosmetics', 'appearance'],
-        'finance': ['money', 'debt', 'budget', 'invest', 'financial', 'save', 'credit', 'income'],
-        'real_estate': ['house', 'home', 'property', 'real estate', 'mortgage', 'rent', 'buy', 'invest'],
-        'relationships': ['relationship', 'dating', 'marriage', 'love', 'partner', 'boyfriend', 'girlfriend']
-    }
-    
-    current_keywords = niche_keywords.get(niche, niche_keywords['fitness'])
-    niche_context_bonus = 0
-    for keyword in current_keywords:
-        if keyword in analysis_text:
-            niche_context_bonus += 0.5
-    
-    total_score += niche_context_bonus
-    
-    # If we have niche context but low score, still consider as end customer
-    if niche_context_bonus >= 2 and total_score >= 1:
-        is_customer = True
-        if customer_type == "volume" and total_score < 3:
-            customer_type = "standard"
-    
-    return is_customer, total_score, customer_type
+    # Keyword tables live in keyword_matcher and are compiled once per niche,
+    # so every post is scored in a single pass over the text
+    return score_reddit_end_customer(analysis_text, niche)
 
 def extract_reddit_customer_intelligence(username, post_title, post_content, comment_text="", niche=None):
     """
@@ -958,6 +838,7 @@ def analyze_post_for_end_customers(page, post_data):
                 # Check for exclusion
                 if should_exclude_account(author, PLATFORM_NAME, config_loader):
                     excluded_count += 1
+                    run_counts["excluded"] += 1
                     print(f"    🚫 Excluded: u/{author}")
                 else:
                     # Extract intelligence
@@ -1070,6 +951,8 @@ def extract_comments_from_post(page, post_data):
         comment_elements = []
         working_selector = None
         
+        # Known-good selector first; each fallback costs a query plus inner_text per element
+        comment_selectors = ordered_selectors(PLATFORM_NAME, "comments", comment_selectors)
         for selector in comment_selectors:
             try:
                 elements = page.query_selector_all(selector)
@@ -1095,6 +978,7 @@ def extract_comments_from_post(page, post_data):
                         break
             except Exception as e:
                 continue
+        record_selector_attempt(PLATFORM_NAME, "comments", comment_selectors, working_selector, len(comment_elements))
         
         if not comment_elements:
             print(f"        ❌ No comment elements found with any selector")
@@ -1175,6 +1059,7 @@ def extract_comments_from_post(page, post_data):
                         # Check for exclusion
                         if should_exclude_account(comment_author, PLATFORM_NAME, config_loader):
                             excluded_count += 1
+                            run_counts["excluded"] += 1
                             print(f"            🚫 Excluded: u/{comment_author}")
                             continue
                         
@@ -1275,7 +1160,7 @@ def create_reddit_end_customer_lead(username, post_title, post_content, comment_
         print(f"    ❌ Error creating lead: {e}")
         return None
 
-def extract_reddit_niche_customers(page):
+def extract_reddit_niche_customers(page, stream=None):
     """Main function to extract niche end customers from Reddit - Universal version"""
     print(f"🎯 Extracting {NICHE} end customers from Reddit...")
     
@@ -1285,8 +1170,9 @@ def extract_reddit_niche_customers(page):
     # Handle any initial access issues
     handle_reddit_access_issues(page)
     
-    # Search for relevant posts
-    posts = search_reddit_end_customers(page, CURRENT_SEARCH)
+    # Search for relevant posts (subreddit listings are scrolled here)
+    with scraper_result.phase("scrolling"):
+        posts = search_reddit_end_customers(page, CURRENT_SEARCH)
     
     if not posts:
         print("❌ No relevant posts found")
@@ -1295,9 +1181,12 @@ def extract_reddit_niche_customers(page):
         print("   • Try running with reddit_auth.json for better access")
         print("   • Reddit may be rate limiting - try again later")
         print("   • Search term may be too specific")
+        scraper_progress.counts(final=True, elements_found=0)
         return []
     
     print(f"📝 Analyzing {len(posts)} posts for {NICHE} end customers...")
+    scraper_progress.counts(final=True, elements_found=len(posts))
+    extraction_start = time.time()
     
     for i, post_data in enumerate(posts):
         print(f"\n📖 Post {i+1}/{len(posts)}")
@@ -1308,6 +1197,11 @@ def extract_reddit_niche_customers(page):
         # Analyze this post for end customers
         post_leads = analyze_post_for_end_customers(page, post_data)
         all_leads.extend(post_leads)
+        if stream:
+            stream.write_many(post_leads)
+        # Posts analysed stand in for scrolls on Reddit
+        scraper_progress.scroll(i + 1, len(posts))
+        scraper_progress.counts(final=True, leads_extracted=len(all_leads), excluded=run_counts["excluded"])
         
         print(f"    📊 Found {len(post_leads)} leads from this post")
         
@@ -1317,6 +1211,10 @@ def extract_reddit_niche_customers(page):
             print(f"    ⏳ Waiting {delay_time:.1f}s before next post...")
             time.sleep(delay_time)
     
+    excluded_count = run_counts["excluded"]
+    scraper_result.record_phase("extraction", time.time() - extraction_start)
+    scraper_result.report(excluded=excluded_count)
+    
     # Remove duplicates
     if all_leads:
         unique_results = []
@@ -1444,28 +1342,18 @@ def main():
     update_last_run_time()
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    lead_stream = None
 
     with sync_playwright() as p:
         print(f"🎯 Launching Reddit {NICHE.upper()} END CUSTOMER scraper...")
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox'
-            ]
-        )
+        browser = launch_browser(p, [
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+            '--no-sandbox'
+        ])
         
         # Create context
-        if storage_state:
-            context = browser.new_context(
-                storage_state=storage_state,
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
-        else:
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
+        context = new_scraper_context(browser, PLATFORM_NAME, storage_state=storage_state)
         
         page = context.new_page()
         
@@ -1485,14 +1373,19 @@ def main():
             if 'reddit' not in page_title.lower():
                 print("⚠️ May not have proper Reddit access")
             
-            # Extract niche end customers from Reddit (raw leads)
-            raw_leads = extract_reddit_niche_customers(page)
+            # Extract niche end customers from Reddit (raw leads, streamed to disk post by post)
+            lead_stream = open_lead_stream(PLATFORM_NAME, username, timestamp, CSV_DIR)
+            raw_leads = extract_reddit_niche_customers(page, stream=lead_stream)
             
             if not raw_leads:
                 print("❌ No raw leads extracted")
+                if lead_stream:
+                    lead_stream.abort("no raw leads")
                 browser.close()
                 return []
 
+            phase_start = time.time()
+
             # 🚀 APPLY SMART USER-AWARE DEDUPLICATION
             print(f"\n🧠 Applying deduplication strategy: {DEDUP_MODE}")
             print(f"👤 User-specific deduplication for: {username}")
@@ -1526,6 +1419,7 @@ def main():
                         unique_leads.append(lead)
                         seen_handles.add(handle_key)
                 dedup_stats = {"basic": True, "kept": len(unique_leads)}
+            scraper_result.record_phase("dedup", time.time() - phase_start)
             
             # Final results summary
             print(f"\n📊 FINAL RESULTS SUMMARY:")
@@ -1580,6 +1474,7 @@ def main():
                     platform_name="reddit",
                     csv_dir=CSV_DIR,          # uses your existing location
                     save_raw=SAVE_RAW_LEADS,  # if you have this flag
+                    stream=lead_stream,
 )
                 
                 # Save processed results to main CSV
@@ -1653,10 +1548,14 @@ def main():
                     
             else:
                 print(f"⚠️ No Reddit {NICHE} customers extracted")
+                if lead_stream:
+                    lead_stream.complete(keep_raw=False, leads=0, raw_leads=len(raw_leads))
                 leads = []
                 
         except Exception as e:
             print(f"🚨 Reddit scraper error: {e}")
+            if lead_stream and not lead_stream.closed:
+                lead_stream.abort(e)
             import traceback
             traceback.print_exc()
             leads = []
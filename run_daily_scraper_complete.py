@@ -634,12 +634,7 @@ def consume_user_resources(username, leads_generated, platform):
         print(f"[CONSUME] BEFORE: credits={credits_before}, plan={plan}, consuming={leads_count}")
         
         if plan == 'demo':
-            consumed = 0
-            for _ in range(leads_count):
-                if credit_system.consume_demo_lead(username):
-                    consumed += 1
-                else:
-                    break
+            consumed = credit_system.consume_demo_leads(username, leads_count)
             success = consumed > 0
         else:
             success = credit_system.consume_credits(username, leads_count, leads_count, platform)
@@ -1223,7 +1218,7 @@ def main():
             all_results = run_parallel_scrapers(
                 platforms=platforms,
                 search_term=search_term,
-                max_scrolls=9,
+                max_scrolls=env_max_scrolls() if os.getenv("MAX_SCROLLS") else 9,
                 username=username,
                 user_plan=user_plan
             )
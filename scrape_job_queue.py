@@ -0,0 +1,686 @@
+# scrape_job_queue.py - Background scrape jobs for the Streamlit frontend
+
+"""
+Persistent queue of scrape jobs that run outside the Streamlit process.
+
+The frontend calls enqueue_job() and gets a job id back immediately; a worker
+process (``python scrape_job_queue.py worker``, or one spawned on demand by
+ensure_worker()) claims queued jobs, runs each scrape as a child process with
+its output going to a per-job log file, and records status, progress and the
+per-platform results. The UI polls get_job() for status/progress/ETA instead
+of blocking a Streamlit thread on subprocess.run().
+
+The queue is a SQLite file (SCRAPE_JOB_DB) so every Streamlit session and the
+worker share it. Limits: SCRAPE_JOB_MAX_PER_USER active (queued or running)
+jobs per user, SCRAPE_JOB_WORKER_CONCURRENCY jobs running at once per worker,
+SCRAPE_JOB_TIMEOUT_SECONDS per job.
+"""
+
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+SCRAPE_JOB_DB = os.getenv("SCRAPE_JOB_DB", "scrape_jobs.db")
+SCRAPE_JOB_LOG_DIR = os.getenv("SCRAPE_JOB_LOG_DIR", "scrape_job_logs")
+SCRAPE_JOB_MAX_PER_USER = int(os.getenv("SCRAPE_JOB_MAX_PER_USER", "1"))
+SCRAPE_JOB_WORKER_CONCURRENCY = int(os.getenv("SCRAPE_JOB_WORKER_CONCURRENCY", "2"))
+SCRAPE_JOB_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_JOB_TIMEOUT_SECONDS", "1800"))
+SCRAPE_JOB_AUTOSTART_WORKER = os.getenv("SCRAPE_JOB_AUTOSTART_WORKER", "1").lower() not in ("0", "false", "no")
+
+JOB_ID_ENV = "SCRAPE_JOB_ID"
+POLL_INTERVAL = 2.0
+WORKER_STALE_SECONDS = 60
+
+ACTIVE_STATUSES = ("queued", "running")
+FINAL_STATUSES = ("done", "failed", "cancelled")
+
+# What a job runs: the full daily pipeline (plan filtering, summary files) or
+# just the parallel runner, as the paid launch path did in-process
+ENTRYPOINTS = ("daily", "parallel")
+
+# Used for ETAs until a few jobs have finished
+DEFAULT_SECONDS_PER_PLATFORM = 120
+
+
+class JobLimitExceeded(Exception):
+    """The user already has SCRAPE_JOB_MAX_PER_USER active jobs"""
+
+
+def _now() -> float:
+    return time.time()
+
+
+class ScrapeJobQueue:
+    """SQLite-backed job table shared by the frontend and the worker"""
+
+    def __init__(self, db_path: str = None, max_per_user: int = None):
+        self.db_path = db_path or SCRAPE_JOB_DB
+        self.max_per_user = SCRAPE_JOB_MAX_PER_USER if max_per_user is None else max_per_user
+        self._init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scrape_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    plan TEXT,
+                    platforms TEXT NOT NULL,
+                    search_term TEXT,
+                    max_scrolls INTEGER,
+                    entrypoint TEXT NOT NULL DEFAULT 'daily',
+                    env TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    progress REAL NOT NULL DEFAULT 0,
+                    platforms_done INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    detail TEXT,
+                    result TEXT,
+                    error TEXT,
+                    returncode INTEGER,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    pid INTEGER,
+                    log_path TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    updated_at REAL
+                )
+            ''')
+            # Live per-platform progress (scraper_progress snapshots) arrived after the first release
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(scrape_jobs)")}
+            if "detail" not in columns:
+                conn.execute("ALTER TABLE scrape_jobs ADD COLUMN detail TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scrape_jobs_user_status ON scrape_jobs(username, status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_scrape_jobs_status_created ON scrape_jobs(status, created_at)")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scrape_workers (
+                    worker_id TEXT PRIMARY KEY,
+                    pid INTEGER,
+                    host TEXT,
+                    started_at REAL,
+                    heartbeat REAL NOT NULL
+                )
+            ''')
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------- frontend
+
+    def enqueue(self, username: str, platforms: List[str], search_term: str, max_scrolls: int,
+                plan: str = "demo", entrypoint: str = "daily", env: Dict[str, str] = None) -> str:
+        """Queue a scrape and return its job id; raises JobLimitExceeded over the per-user limit"""
+        if entrypoint not in ENTRYPOINTS:
+            raise ValueError(f"Unknown entrypoint: {entrypoint}")
+        job_id = uuid.uuid4().hex[:12]
+        now = _now()
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock first, so two tabs can't both pass the limit check
+            conn.execute("BEGIN IMMEDIATE")
+            active = conn.execute(
+                f"SELECT COUNT(*) FROM scrape_jobs WHERE username = ? AND status IN {ACTIVE_STATUSES}",
+                (username,)
+            ).fetchone()[0]
+            if active >= self.max_per_user:
+                conn.execute("ROLLBACK")
+                raise JobLimitExceeded(
+                    f"{username} already has {active} scrape job(s) in progress (limit {self.max_per_user})"
+                )
+            conn.execute(
+                '''INSERT INTO scrape_jobs (job_id, username, plan, platforms, search_term, max_scrolls,
+                                            entrypoint, env, status, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)''',
+                (job_id, username, plan, ",".join(platforms or []), search_term, int(max_scrolls or 0),
+                 entrypoint, json.dumps(env or {}), now, now)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        print(f"📥 Queued scrape job {job_id} for {username}: {', '.join(platforms or [])} '{search_term}'")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Job as a dict with ``eta_seconds`` and ``queue_position`` filled in"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM scrape_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if not row:
+                return None
+            job = self._to_dict(row)
+            self._add_eta(conn, job)
+            return job
+        finally:
+            conn.close()
+
+    def list_for_user(self, username: str, limit: int = 10, active_only: bool = False) -> List[Dict]:
+        """Newest jobs for a user"""
+        sql = "SELECT * FROM scrape_jobs WHERE username = ?"
+        if active_only:
+            sql += f" AND status IN {ACTIVE_STATUSES}"
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        conn = self._connect()
+        try:
+            jobs = [self._to_dict(r) for r in conn.execute(sql, (username, limit))]
+            for job in jobs:
+                self._add_eta(conn, job)
+            return jobs
+        finally:
+            conn.close()
+
+    def cancel(self, job_id: str, username: str = None) -> bool:
+        """Cancel a queued job now, or ask the worker to stop a running one"""
+        owner_sql, params = ("", []) if username is None else (" AND username = ?", [username])
+        now = _now()
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                f"UPDATE scrape_jobs SET status = 'cancelled', finished_at = ?, updated_at = ?, "
+                f"message = 'Cancelled before start' WHERE job_id = ? AND status = 'queued'{owner_sql}",
+                [now, now, job_id] + params
+            )
+            if cur.rowcount:
+                return True
+            cur = conn.execute(
+                f"UPDATE scrape_jobs SET cancel_requested = 1, updated_at = ? "
+                f"WHERE job_id = ? AND status = 'running'{owner_sql}",
+                [now, job_id] + params
+            )
+            return cur.rowcount > 0
+        finally:
+            conn.close()
+
+    # --------------------------------------------------------------- worker
+
+    def claim_next(self, worker_id: str) -> Optional[Dict]:
+        """Atomically move the oldest queued job to running for this worker"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM scrape_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            now = _now()
+            conn.execute(
+                "UPDATE scrape_jobs SET status = 'running', worker_id = ?, started_at = ?, updated_at = ?, "
+                "message = 'Starting scrapers' WHERE job_id = ?",
+                (worker_id, now, now, row["job_id"])
+            )
+            conn.execute("COMMIT")
+            job = self._to_dict(row)
+            job.update(status="running", worker_id=worker_id, started_at=now)
+            return job
+        finally:
+            conn.close()
+
+    def mark_started(self, job_id: str, pid: int, log_path: str):
+        self._update(job_id, pid=pid, log_path=log_path)
+
+    def update_progress(self, job_id: str, platforms_done: int, platforms_total: int,
+                        results: Dict[str, int] = None, message: str = None,
+                        detail: Dict[str, Dict] = None, progress: float = None):
+        """
+        Called from the job's child process as scrapers report in. ``progress``
+        (0-1) overrides the finished-platform share when live progress is known.
+        """
+        if progress is None:
+            progress = platforms_done / platforms_total if platforms_total else 0.0
+        fields = {
+            "platforms_done": platforms_done,
+            "progress": round(min(1.0, progress), 3),
+        }
+        if results is not None:
+            fields["result"] = json.dumps(results)
+        if message is not None:
+            fields["message"] = message
+        if detail is not None:
+            fields["detail"] = json.dumps(detail)
+        self._update(job_id, **fields)
+
+    def finish(self, job_id: str, status: str, returncode: int = None, error: str = None, message: str = None):
+        fields = {"status": status, "returncode": returncode, "finished_at": _now()}
+        if status == "done":
+            fields["progress"] = 1.0
+        if error is not None:
+            fields["error"] = error
+        if message is not None:
+            fields["message"] = message
+        self._update(job_id, **fields)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT cancel_requested FROM scrape_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            return bool(row and row[0])
+        finally:
+            conn.close()
+
+    def heartbeat(self, worker_id: str, pid: int = None, started_at: float = None):
+        now = _now()
+        conn = self._connect()
+        try:
+            conn.execute(
+                '''INSERT INTO scrape_workers VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(worker_id) DO UPDATE SET heartbeat = excluded.heartbeat''',
+                (worker_id, pid, socket.gethostname(), started_at or now, now)
+            )
+        finally:
+            conn.close()
+
+    def remove_worker(self, worker_id: str):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM scrape_workers WHERE worker_id = ?", (worker_id,))
+        finally:
+            conn.close()
+
+    def has_live_worker(self) -> bool:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM scrape_workers WHERE heartbeat >= ? LIMIT 1", (_now() - WORKER_STALE_SECONDS,)
+            ).fetchone()
+            return row is not None
+        finally:
+            conn.close()
+
+    def claim_worker_spawn(self) -> bool:
+        """
+        True if the caller should start a worker: no live heartbeat, and no other
+        session started one in the last WORKER_STALE_SECONDS (placeholder row).
+        """
+        now = _now()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            live = conn.execute(
+                "SELECT 1 FROM scrape_workers WHERE heartbeat >= ? LIMIT 1", (now - WORKER_STALE_SECONDS,)
+            ).fetchone()
+            if live:
+                conn.execute("COMMIT")
+                return False
+            conn.execute("DELETE FROM scrape_workers WHERE heartbeat < ?", (now - WORKER_STALE_SECONDS,))
+            conn.execute("INSERT INTO scrape_workers VALUES (?, NULL, ?, ?, ?)",
+                         (f"spawn-{uuid.uuid4().hex[:8]}", socket.gethostname(), now, now))
+            conn.execute("COMMIT")
+            return True
+        finally:
+            conn.close()
+
+    def fail_orphaned_jobs(self) -> int:
+        """Running jobs whose worker stopped heartbeating are marked failed (never re-run: credits may be spent)"""
+        now = _now()
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                '''UPDATE scrape_jobs SET status = 'failed', finished_at = ?, updated_at = ?,
+                          error = 'Worker stopped while the job was running'
+                   WHERE status = 'running' AND (worker_id IS NULL OR worker_id NOT IN (
+                       SELECT worker_id FROM scrape_workers WHERE heartbeat >= ?))''',
+                (now, now, now - WORKER_STALE_SECONDS)
+            )
+            return cur.rowcount
+        finally:
+            conn.close()
+
+    # -------------------------------------------------------------- helpers
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = _now()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE scrape_jobs SET {assignments} WHERE job_id = ?", list(fields.values()) + [job_id])
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        job = dict(row)
+        job["platforms"] = [p for p in (job.get("platforms") or "").split(",") if p]
+        for key in ("env", "result", "detail"):
+            try:
+                job[key] = json.loads(job[key]) if job.get(key) else {}
+            except ValueError:
+                job[key] = {}
+        return job
+
+    def _seconds_per_platform(self, conn) -> float:
+        """Average wall time per platform over recent finished jobs"""
+        rows = conn.execute(
+            '''SELECT finished_at - started_at, platforms FROM scrape_jobs
+               WHERE status = 'done' AND started_at IS NOT NULL
+               ORDER BY finished_at DESC LIMIT 20'''
+        ).fetchall()
+        samples = [r[0] / max(1, len((r[1] or "").split(","))) for r in rows if r[0]]
+        return sum(samples) / len(samples) if samples else DEFAULT_SECONDS_PER_PLATFORM
+
+    def _add_eta(self, conn, job: Dict):
+        job["eta_seconds"] = None
+        job["queue_position"] = None
+        total = len(job["platforms"]) or 1
+        if job["status"] == "queued":
+            job["queue_position"] = conn.execute(
+                "SELECT COUNT(*) FROM scrape_jobs WHERE status = 'queued' AND created_at <= ?",
+                (job["created_at"],)
+            ).fetchone()[0]
+            job["eta_seconds"] = round(self._seconds_per_platform(conn) * total)
+        elif job["status"] == "running" and job.get("started_at"):
+            elapsed = _now() - job["started_at"]
+            if job["progress"] > 0:
+                remaining = elapsed * (1 - job["progress"]) / job["progress"]
+            else:
+                remaining = self._seconds_per_platform(conn) * total - elapsed
+            job["eta_seconds"] = max(0, round(remaining))
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> ScrapeJobQueue:
+    """Process-wide queue instance"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ScrapeJobQueue()
+        return _queue
+
+
+# ---------------------------------------------------------------------------
+# Frontend helpers
+# ---------------------------------------------------------------------------
+
+def enqueue_job(username, platforms, search_term, max_scrolls, plan="demo", entrypoint="daily", env=None,
+                start_worker=None) -> str:
+    """Queue a scrape and make sure a worker will pick it up"""
+    job_id = get_job_queue().enqueue(username, platforms, search_term, max_scrolls,
+                                     plan=plan, entrypoint=entrypoint, env=env)
+    if SCRAPE_JOB_AUTOSTART_WORKER if start_worker is None else start_worker:
+        ensure_worker()
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    return get_job_queue().get(job_id)
+
+
+def cancel_job(job_id: str, username: str = None) -> bool:
+    return get_job_queue().cancel(job_id, username)
+
+
+def tail_job_log(job: Dict, lines: int = 80) -> str:
+    """Last ``lines`` lines of a job's output log"""
+    path = (job or {}).get("log_path")
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 64 * 1024))
+        data = f.read().decode("utf-8", errors="replace")
+    return "\n".join(data.splitlines()[-lines:])
+
+
+def ensure_worker() -> bool:
+    """Start a detached worker process if none is heartbeating; True if one was started"""
+    queue = get_job_queue()
+    try:
+        if not queue.claim_worker_spawn():
+            return False
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not check scrape worker: {e}")
+        return False
+
+    os.makedirs(SCRAPE_JOB_LOG_DIR, exist_ok=True)
+    log = open(os.path.join(SCRAPE_JOB_LOG_DIR, "worker.log"), "ab")
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "worker"],
+            cwd=os.getcwd(), stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"}, **kwargs
+        )
+        print("👷 Started scrape job worker")
+        return True
+    except Exception as e:
+        print(f"❌ Could not start scrape worker: {e}")
+        return False
+    finally:
+        log.close()
+
+
+# ---------------------------------------------------------------------------
+# Child process side
+# ---------------------------------------------------------------------------
+
+def report_progress(platforms_done: int, platforms_total: int, results: Dict[str, int] = None,
+                    message: str = None, detail: Dict[str, Dict] = None, progress: float = None):
+    """Record progress for the job this process runs; no-op outside a queued job"""
+    job_id = os.getenv(JOB_ID_ENV)
+    if not job_id:
+        return
+    try:
+        get_job_queue().update_progress(job_id, platforms_done, platforms_total, results, message,
+                                        detail, progress)
+    except Exception as e:
+        print(f"ℹ️ Could not record job progress: {e}")
+
+
+def run_parallel_job(job_id: str) -> int:
+    """``parallel`` entrypoint: run the parallel runner for a job, as the paid launch path did"""
+    job = get_job(job_id)
+    if not job:
+        print(f"❌ Unknown scrape job {job_id}")
+        return 2
+    from parallel_scraper_runner import run_parallel_scrapers
+
+    results = run_parallel_scrapers(
+        platforms=job["platforms"],
+        search_term=job["search_term"],
+        max_scrolls=job["max_scrolls"],
+        username=job["username"],
+        user_plan=job["plan"],
+    )
+    counts = {platform: len(leads or []) for platform, leads in (results or {}).items()}
+    report_progress(len(job["platforms"]), len(job["platforms"]), counts, "Complete")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def build_job_env(job: Dict) -> Dict[str, str]:
+    """Environment for a job's child process (same contract the frontend used)"""
+    cwd = os.getcwd()
+    pythonpath = os.environ.get("PYTHONPATH", "")
+    env = os.environ.copy()
+    env.update({
+        "SCRAPER_USERNAME": job["username"],
+        "USER_PLAN": job.get("plan") or "demo",
+        "SELECTED_PLATFORMS": ",".join(job["platforms"]),
+        "FRONTEND_SEARCH_TERM": job.get("search_term") or "",
+        "MAX_SCROLLS": str(job.get("max_scrolls") or 10),
+        "PYTHONPATH": f"{cwd}{os.pathsep}{pythonpath}" if pythonpath else cwd,
+        "PYTHONIOENCODING": "utf-8",
+        "PYTHONUTF8": "1",
+        "PYTHONLEGACYWINDOWSSTDIO": "0",
+        "PYTHONUNBUFFERED": "1",
+        JOB_ID_ENV: job["job_id"],
+    })
+    env.update({k: str(v) for k, v in (job.get("env") or {}).items()})
+    return env
+
+
+def _job_command(job: Dict) -> List[str]:
+    if job.get("entrypoint") == "parallel":
+        return [sys.executable, os.path.abspath(__file__), "run", job["job_id"]]
+    return [sys.executable, "run_daily_scraper_complete.py"]
+
+
+def _stop_process(proc):
+    """Terminate a job and the scrapers it started"""
+    try:
+        if os.name != "nt":
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+        proc.wait(timeout=15)
+    except Exception:
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+
+class ScrapeJobWorker:
+    """Claims queued jobs and runs up to ``concurrency`` of them as child processes"""
+
+    def __init__(self, queue: ScrapeJobQueue = None, concurrency: int = None, poll_interval: float = POLL_INTERVAL):
+        self.queue = queue or get_job_queue()
+        self.concurrency = concurrency or SCRAPE_JOB_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.started_at = _now()
+        self.running = {}  # job_id -> (Popen, started, log file)
+        self._stopping = False
+
+    def start_job(self, job: Dict):
+        os.makedirs(SCRAPE_JOB_LOG_DIR, exist_ok=True)
+        log_path = os.path.join(SCRAPE_JOB_LOG_DIR, f"{job['job_id']}.log")
+        log = open(log_path, "ab")
+        kwargs = {"start_new_session": True} if os.name != "nt" else {}
+        try:
+            proc = subprocess.Popen(
+                _job_command(job), cwd=os.getcwd(), env=build_job_env(job),
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **kwargs
+            )
+        except Exception as e:
+            log.close()
+            print(f"❌ Job {job['job_id']} failed to start: {e}")
+            self.queue.finish(job["job_id"], "failed", error=f"Could not start: {e}")
+            return
+        self.queue.mark_started(job["job_id"], proc.pid, log_path)
+        self.running[job["job_id"]] = (proc, _now(), log)
+        print(f"🚀 Job {job['job_id']} started for {job['username']} (pid {proc.pid})")
+
+    def reap(self):
+        """Record finished jobs; stop cancelled or timed-out ones"""
+        for job_id, (proc, started, log) in list(self.running.items()):
+            returncode = proc.poll()
+            if returncode is None:
+                if self.queue.is_cancel_requested(job_id):
+                    _stop_process(proc)
+                    self.queue.finish(job_id, "cancelled", proc.returncode, message="Cancelled by user")
+                elif _now() - started > SCRAPE_JOB_TIMEOUT_SECONDS:
+                    _stop_process(proc)
+                    self.queue.finish(job_id, "failed", proc.returncode,
+                                      error=f"Timed out after {SCRAPE_JOB_TIMEOUT_SECONDS:.0f}s")
+                else:
+                    continue
+            elif returncode == 0:
+                self.queue.finish(job_id, "done", returncode, message="Complete")
+            else:
+                self.queue.finish(job_id, "failed", returncode, error=f"Exit code {returncode}")
+            log.close()
+            del self.running[job_id]
+            print(f"🏁 Job {job_id} finished (exit {proc.returncode})")
+
+    def fill(self):
+        while len(self.running) < self.concurrency and not self._stopping:
+            job = self.queue.claim_next(self.worker_id)
+            if not job:
+                break
+            self.start_job(job)
+
+    def run(self, once: bool = False):
+        """Main loop; ``once`` drains the queue and returns"""
+        print(f"👷 Scrape worker {self.worker_id} (concurrency {self.concurrency})")
+        self.queue.heartbeat(self.worker_id, os.getpid(), self.started_at)
+        orphaned = self.queue.fail_orphaned_jobs()
+        if orphaned:
+            print(f"⚠️ Marked {orphaned} orphaned job(s) failed")
+
+        def _stop(_signum, _frame):
+            self._stopping = True
+        try:
+            signal.signal(signal.SIGTERM, _stop)
+        except ValueError:
+            pass  # not the main thread
+
+        try:
+            while not self._stopping:
+                self.queue.heartbeat(self.worker_id, os.getpid(), self.started_at)
+                self.reap()
+                self.fill()
+                if once and not self.running:
+                    break
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for job_id, (proc, _started, log) in list(self.running.items()):
+                _stop_process(proc)
+                self.queue.finish(job_id, "failed", proc.returncode, error="Worker shut down")
+                log.close()
+            self.queue.remove_worker(self.worker_id)
+
+
+def run_worker(concurrency: int = None, once: bool = False):
+    ScrapeJobWorker(concurrency=concurrency).run(once=once)
+
+
+def _print_jobs(jobs):
+    for job in jobs:
+        eta = f" eta {job['eta_seconds']}s" if job.get("eta_seconds") is not None else ""
+        print(f"{job['job_id']}  {job['username']:<16} {job['status']:<9} {job['progress'] * 100:5.1f}%"
+              f"{eta}  {','.join(job['platforms'])}  '{job.get('search_term') or ''}'")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Background scrape job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker_cmd = sub.add_parser("worker", help="Run queued scrape jobs")
+    worker_cmd.add_argument("--concurrency", type=int, default=None)
+    worker_cmd.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    run_cmd = sub.add_parser("run", help="Run one job's parallel scrape in this process")
+    run_cmd.add_argument("job_id")
+    list_cmd = sub.add_parser("list", help="Show a user's recent jobs")
+    list_cmd.add_argument("username")
+    cancel_cmd = sub.add_parser("cancel", help="Cancel a job")
+    cancel_cmd.add_argument("job_id")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        run_worker(args.concurrency, args.once)
+    elif args.command == "run":
+        sys.exit(run_parallel_job(args.job_id))
+    elif args.command == "list":
+        _print_jobs(get_job_queue().list_for_user(args.username, limit=20))
+    elif args.command == "cancel":
+        print("Cancelled" if cancel_job(args.job_id) else "Nothing to cancel")
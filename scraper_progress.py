@@ -0,0 +1,174 @@
+"""
+Live progress events from a scraper run.
+
+The runner passes a per-run path in SCRAPER_PROGRESS_FILE and scrapers append
+one JSON object per line as they go:
+
+    {"ts": 1718000000.1, "event": "scroll", "scroll": 4, "max_scrolls": 10, "elements_found": 48}
+    {"ts": ..., "event": "counts", "elements_found": 120, "leads_extracted": 35,
+     "excluded": 3, "dms_generated": 20}
+    {"ts": ..., "event": "status", "status": "blocked", "message": "..."}
+
+ProgressTail reads only the lines added since the last call, and
+ProgressState folds them into the latest snapshot the runner reports to the
+UI and uses to stop runs that are clearly going nowhere. Without
+SCRAPER_PROGRESS_FILE every emit is a no-op.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+PROGRESS_FILE_ENV = "SCRAPER_PROGRESS_FILE"
+COUNT_FIELDS = ("elements_found", "leads_extracted", "excluded", "dms_generated")
+
+# Per-lead count updates are coalesced to at most one line per interval
+THROTTLE_SECONDS = 0.5
+
+_lock = threading.Lock()
+_last_emit = {}
+
+
+def emit(event: str, throttle: bool = False, **fields):
+    """Append one event line; with ``throttle`` drop it if the same event was written very recently"""
+    path = os.getenv(PROGRESS_FILE_ENV)
+    if not path:
+        return
+    now = time.time()
+    with _lock:
+        key = (path, event)
+        if throttle and now - _last_emit.get(key, 0) < THROTTLE_SECONDS:
+            return
+        _last_emit[key] = now
+        line = json.dumps({"ts": round(now, 3), "event": event, **fields}, default=str)
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            print(f"ℹ️ Could not write progress event {path}: {e}")
+
+
+def scroll(n: int, total: int, elements: int = None):
+    """Scroll ``n`` of ``total`` done (``elements``: cards visible so far, when known)"""
+    fields = {"scroll": n, "max_scrolls": total}
+    if elements is not None:
+        fields["elements_found"] = elements
+    emit("scroll", **fields)
+
+
+def counts(final: bool = False, **fields):
+    """Running totals: elements_found, leads_extracted, excluded, dms_generated"""
+    emit("counts", throttle=not final, **{k: v for k, v in fields.items() if v is not None})
+
+
+def status(state: str, message: str = None):
+    emit("status", status=state, message=message)
+
+
+class ProgressTail:
+    """Incremental reader of a progress file (keeps its offset, ignores a half-written last line)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+
+    def read(self) -> List[Dict]:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read()
+        except OSError:
+            return []
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return []
+        self.offset += end
+        events = []
+        for raw in data[:end].splitlines():
+            try:
+                events.append(json.loads(raw))
+            except ValueError:
+                continue
+        return events
+
+
+class ProgressState:
+    """Latest known progress of one scraper run"""
+
+    def __init__(self, platform: str = None, max_scrolls: int = None):
+        self.platform = platform
+        self.scroll = 0
+        self.max_scrolls = max_scrolls or 0
+        self.counts = {}
+        self.scroll_elements = None
+        self.status = "running"
+        self.message = None
+        self.started = time.time()
+        self.last_event = None
+
+    def apply(self, events: List[Dict]) -> bool:
+        """Fold new events in; True if anything changed"""
+        for event in events:
+            self.last_event = event.get("ts") or time.time()
+            if event.get("event") == "scroll":
+                self.scroll = max(self.scroll, int(event.get("scroll") or 0))
+                self.max_scrolls = int(event.get("max_scrolls") or self.max_scrolls)
+                if event.get("elements_found") is not None:
+                    self.scroll_elements = max(self.scroll_elements or 0, int(event["elements_found"]))
+            elif event.get("event") == "status":
+                self.status = event.get("status") or self.status
+                self.message = event.get("message")
+            for key in COUNT_FIELDS:
+                if event.get(key) is not None:
+                    self.counts[key] = event[key]
+        return bool(events)
+
+    def unproductive_reason(self, min_scrolls: int = 3, stall_seconds: float = 300) -> Optional[str]:
+        """
+        Why this run should be stopped early, or None. Only element counts
+        sent with scroll events count here: the extraction phase reports
+        per-selector attempts that may legitimately be zero.
+        """
+        if self.last_event and time.time() - self.last_event > stall_seconds:
+            return f"no progress for {time.time() - self.last_event:.0f}s"
+        threshold = max(min_scrolls, self.max_scrolls // 2)
+        if (min_scrolls and self.scroll >= threshold and self.scroll_elements == 0
+                and not self.counts.get("leads_extracted")):
+            return f"nothing found after {self.scroll}/{self.max_scrolls} scrolls"
+        return None
+
+    def snapshot(self) -> Dict:
+        return {
+            "status": self.status,
+            "scroll": self.scroll,
+            "max_scrolls": self.max_scrolls,
+            "message": self.message,
+            "elapsed": round(time.time() - self.started, 1),
+            **self.counts,
+        }
+
+
+def snapshot_fraction(snap: Dict) -> float:
+    """Rough share of a run that is done: scrolling is most of it, extraction/DMs the rest"""
+    if snap.get("status") in ("complete", "failed", "stopped"):
+        return 1.0
+    max_scrolls = snap.get("max_scrolls") or 0
+    done = 0.8 * snap.get("scroll", 0) / max_scrolls if max_scrolls else 0.0
+    if snap.get("leads_extracted") is not None:
+        done = max(done, 0.85)
+    if snap.get("dms_generated") is not None:
+        done = max(done, 0.95)
+    return min(done, 0.99)
+
+
+def format_snapshot(platform: str, snap: Dict) -> str:
+    """One UI/log line: 'Twitter: scroll 4/10 • 120 found • 35 leads • 3 excluded • 20 DMs'"""
+    parts = [f"{platform.title()}: {snap.get('status', 'running')}"]
+    if snap.get("max_scrolls"):
+        parts.append(f"scroll {snap.get('scroll', 0)}/{snap['max_scrolls']}")
+    labels = (("elements_found", "found"), ("leads_extracted", "leads"), ("excluded", "excluded"),
+              ("dms_generated", "DMs"))
+    parts += [f"{snap[key]} {label}" for key, label in labels if snap.get(key) is not None]
+    return " • ".join(parts)
@@ -0,0 +1,105 @@
+"""
+Structured result channel from a scraper run back to ParallelScraperRunner.
+
+The runner passes a per-run JSON path in SCRAPER_RESULT_FILE. Scrapers (and
+persistence.save_leads_to_files) record what they produced here, and the file
+is rewritten atomically after every update:
+
+    {"platform", "file", "files", "leads", "raw_leads", "excluded",
+     "duration", "phases": {name: seconds}, "status"}
+
+so the runner reads exact counts instead of globbing and counting CSV lines.
+Without SCRAPER_RESULT_FILE every call is a no-op.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+RESULT_FILE_ENV = "SCRAPER_RESULT_FILE"
+
+_lock = threading.Lock()
+_state = {"path": None, "started": time.time(), "result": {}}
+
+
+def _current_state():
+    """Reset the report whenever a new result path is assigned (warm workers reuse the process)"""
+    path = os.getenv(RESULT_FILE_ENV)
+    if path != _state["path"]:
+        _state.update(path=path, started=time.time(), result={"phases": {}, "status": "running"})
+    return _state
+
+
+def _flush(state):
+    path = state["path"]
+    if not path:
+        return
+    result = dict(state["result"])
+    result["duration"] = round(time.time() - state["started"], 3)
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, default=str)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"ℹ️ Could not write scraper result {path}: {e}")
+
+
+def report(**fields):
+    """Merge fields (leads, raw_leads, excluded, file, ...) into the run's result"""
+    with _lock:
+        state = _current_state()
+        if not state["path"]:
+            return
+        state["result"].update(fields)
+        _flush(state)
+
+
+def record_files(files, leads_count: int, raw_count: int, platform: str = None):
+    """Called from save_leads_to_files with what was written"""
+    with _lock:
+        state = _current_state()
+        if not state["path"]:
+            return
+        result = state["result"]
+        result["files"] = list(dict.fromkeys(result.get("files", []) + [str(f) for f in files]))
+        if files:
+            result.setdefault("file", str(files[0]))
+        result["leads"] = leads_count
+        result["raw_leads"] = raw_count
+        result["status"] = "complete"
+        if platform:
+            result["platform"] = platform
+        _flush(state)
+
+
+def record_phase(name: str, seconds: float):
+    """Add ``seconds`` to a named phase (scrolling, extraction, dm, dedup, save...)"""
+    with _lock:
+        state = _current_state()
+        if not state["path"]:
+            return
+        phases = state["result"].setdefault("phases", {})
+        phases[name] = round(phases.get(name, 0) + seconds, 3)
+        _flush(state)
+
+
+@contextmanager
+def phase(name: str):
+    """Time a scraper phase: ``with phase("extraction"): ...``"""
+    started = time.time()
+    try:
+        yield
+    finally:
+        record_phase(name, time.time() - started)
+
+
+def read_result(path):
+    """Runner side: parsed result dict, or None if the scraper never reported"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
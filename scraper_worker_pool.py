@@ -0,0 +1,424 @@
+# scraper_worker_pool.py - Long-lived scraper workers with a warm browser
+
+"""
+Persistent worker pool for the platform scrapers.
+
+Every worker is a separate Python process that imports pandas, Playwright and
+the shared scraper modules once, keeps a single Chromium instance running, and
+then accepts jobs (platform, search term, max_scrolls, username) from a local
+queue. Each job reloads only the scraper module itself (so its module-level
+config is re-read for the new user/search) and hands it the warm browser
+instead of letting it launch a fresh one.
+"""
+
+import importlib
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+
+# platform -> (module name, entry function)
+SCRAPER_ENTRYPOINTS = {
+    'twitter': ('twitter_scraper', 'login_and_scrape'),
+    'facebook': ('facebook_scraper', 'main'),
+    'linkedin': ('linkedin_scraper', 'handle_linkedin_simple'),
+    'youtube': ('youtube_scraper', 'main'),
+    'tiktok': ('tiktok_scraper', 'main'),
+    'instagram': ('instagram_scraper', 'main'),
+    'medium': ('medium_scraper_ec', 'main'),
+    'reddit': ('reddit_scraper_ec', 'main'),
+}
+
+DEFAULT_POOL_SIZE = int(os.getenv("SCRAPER_POOL_WORKERS", "2"))
+DEFAULT_JOB_TIMEOUT = 600  # same budget as the subprocess runner
+
+# Heavy modules every scraper imports; loaded once per worker by _warm_up()
+WARM_MODULES = ('pandas', 'config_loader')
+
+WARM_BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-extensions',
+    '--no-first-run',
+]
+
+
+# ---------------------------------------------------------------------------
+# Warm browser facades (used inside the worker process)
+# ---------------------------------------------------------------------------
+
+class _JobBrowser:
+    """Browser handed to a scraper; close() only tears down this job's contexts"""
+
+    def __init__(self, browser):
+        self._browser = browser
+        self._contexts = []
+
+    def new_context(self, **kwargs):
+        context = self._browser.new_context(**kwargs)
+        self._contexts.append(context)
+        return context
+
+    def new_page(self, **kwargs):
+        page = self._browser.new_page(**kwargs)
+        self._contexts.append(page.context)
+        return page
+
+    def close(self):
+        for context in self._contexts:
+            try:
+                context.close()
+            except Exception:
+                pass
+        self._contexts = []
+
+    def __getattr__(self, name):
+        return getattr(self._browser, name)
+
+
+class _WarmChromium:
+    """Stands in for playwright.chromium; launch() reuses the running browser"""
+
+    def __init__(self, chromium, browser):
+        self._chromium = chromium
+        self._browser = browser
+        self.job_browsers = []
+
+    def launch(self, *args, **kwargs):
+        job_browser = _JobBrowser(self._browser)
+        self.job_browsers.append(job_browser)
+        return job_browser
+
+    def __getattr__(self, name):
+        return getattr(self._chromium, name)
+
+
+class _WarmPlaywright:
+    """Context manager returned in place of sync_playwright() for one job"""
+
+    def __init__(self, playwright, browser):
+        self._playwright = playwright
+        self.chromium = _WarmChromium(playwright.chromium, browser)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def release(self):
+        for job_browser in self.chromium.job_browsers:
+            job_browser.close()
+        self.chromium.job_browsers = []
+
+    def __getattr__(self, name):
+        return getattr(self._playwright, name)
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+def _apply_job_env(job_env):
+    """Apply job env vars, returning the previous values for restore"""
+    previous = {key: os.environ.get(key) for key in job_env}
+    os.environ.update({key: str(value) for key, value in job_env.items()})
+    return previous
+
+
+def _restore_env(previous):
+    for key, value in previous.items():
+        if value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
+
+
+def _load_scraper_module(module_name):
+    """Import the scraper once, then reload it so module-level config is fresh"""
+    module = sys.modules.get(module_name)
+    if module is None:
+        return importlib.import_module(module_name)
+    return importlib.reload(module)
+
+
+def _run_job(job, playwright, browser):
+    """Execute one scrape job inside the worker and return a result dict"""
+    platform = job['platform']
+    start_time = time.time()
+    module_name, entry_name = SCRAPER_ENTRYPOINTS[platform]
+    previous_env = _apply_job_env(job.get('env') or {})
+    warm = _WarmPlaywright(playwright, browser)
+
+    try:
+        module = _load_scraper_module(module_name)
+        module.sync_playwright = lambda: warm
+
+        if job.get('max_scrolls'):
+            module.MAX_SCROLLS = int(job['max_scrolls'])
+
+        results = getattr(module, entry_name)()
+        leads = len(results) if isinstance(results, list) else None
+
+        return {
+            'platform': platform,
+            'success': True,
+            'duration': time.time() - start_time,
+            'leads': leads,
+        }
+    except Exception as e:
+        traceback.print_exc()
+        return {
+            'platform': platform,
+            'success': False,
+            'duration': time.time() - start_time,
+            'leads': 0,
+            'error': str(e),
+        }
+    finally:
+        warm.release()
+        _restore_env(previous_env)
+
+
+def _warm_up(worker_id):
+    """Pay the heavy imports once per worker, not once per scrape"""
+    for module_name in WARM_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            print(f"⚠️ Worker {worker_id} could not preload {module_name}: {e}")
+
+
+def _abandon_job(worker_id, job):
+    """Watchdog: the job ran past its deadline, so exit and let the pool start a fresh worker"""
+    print(f"⏰ Worker {worker_id}: {job['platform']} job {job['job_id']} passed its deadline, exiting")
+    sys.stdout.flush()
+    os._exit(1)
+
+
+def _worker_main(worker_id, job_queue, result_queue):
+    """Worker loop: warm imports + one Chromium, then serve jobs until None"""
+    _warm_up(worker_id)
+    from playwright.sync_api import sync_playwright
+
+    playwright = sync_playwright().start()
+    browser = None
+    print(f"🔥 Scraper worker {worker_id} ready (pid {os.getpid()})")
+
+    try:
+        while True:
+            job = job_queue.get()
+            if job is None:
+                break
+
+            if job.get('deadline') and time.time() > job['deadline']:
+                # Caller already gave up on this job while it sat in the queue
+                continue
+
+            result_queue.put({'type': 'started', 'job_id': job['job_id'], 'worker_id': worker_id})
+
+            # The deadline runs from submission; a job still going then takes the worker down with it
+            watchdog = None
+            if job.get('deadline'):
+                watchdog = threading.Timer(max(0, job['deadline'] - time.time()), _abandon_job, (worker_id, job))
+                watchdog.daemon = True
+                watchdog.start()
+            try:
+                if browser is None or not browser.is_connected():
+                    browser = playwright.chromium.launch(headless=True, args=WARM_BROWSER_ARGS)
+
+                result = _run_job(job, playwright, browser)
+            finally:
+                if watchdog:
+                    watchdog.cancel()
+            result_queue.put({'type': 'result', 'job_id': job['job_id'], 'worker_id': worker_id, 'result': result})
+    finally:
+        try:
+            if browser:
+                browser.close()
+        finally:
+            playwright.stop()
+
+
+# ---------------------------------------------------------------------------
+# Pool (used in the runner / frontend process)
+# ---------------------------------------------------------------------------
+
+class ScraperWorkerPool:
+    """Pool of warm scraper workers fed through a local job queue"""
+
+    def __init__(self, size=None, job_timeout=DEFAULT_JOB_TIMEOUT):
+        self.size = max(1, int(size or DEFAULT_POOL_SIZE))
+        self.job_timeout = job_timeout
+        self._ctx = mp.get_context("spawn")
+        self._job_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._workers = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._worker_ids = itertools.count(1)
+        self._dispatcher = None
+        self._running = False
+
+    def start(self):
+        """Spawn the workers and the result dispatcher thread"""
+        if self._running:
+            return self
+        self._running = True
+        for _ in range(self.size):
+            self._spawn_worker()
+        self._dispatcher = threading.Thread(target=self._dispatch_results, daemon=True)
+        self._dispatcher.start()
+        print(f"🚀 Scraper worker pool started with {self.size} workers")
+        return self
+
+    def _spawn_worker(self):
+        worker_id = next(self._worker_ids)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._job_queue, self._result_queue),
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = process
+        return worker_id
+
+    def _replace_worker(self, worker_id):
+        """Kill a stuck worker (e.g. timed-out job) and start a fresh one"""
+        with self._lock:
+            process = self._workers.pop(worker_id, None)
+            if process is not None and process.is_alive():
+                process.terminate()
+                process.join(timeout=10)
+            if self._running:
+                self._spawn_worker()
+
+    def _reap_workers(self):
+        """Replace workers that exited (e.g. a job watchdog fired) and fail the job they held"""
+        with self._lock:
+            if not self._running:
+                return
+            dead = [worker_id for worker_id, process in self._workers.items() if not process.is_alive()]
+            for worker_id in dead:
+                self._workers.pop(worker_id).join(timeout=1)
+                print(f"♻️ Scraper worker {worker_id} exited, starting a replacement")
+                self._spawn_worker()
+                for pending in self._pending.values():
+                    if pending['worker_id'] == worker_id and not pending['done'].is_set():
+                        pending['result'] = {'platform': pending['platform'], 'success': False,
+                                             'duration': time.time() - pending['submitted'], 'leads': 0,
+                                             'error': "Worker exited before finishing the job"}
+                        pending['done'].set()
+
+    def _dispatch_results(self):
+        while self._running:
+            self._reap_workers()
+            try:
+                message = self._result_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                pending = self._pending.get(message['job_id'])
+                if pending is None:
+                    continue
+                pending['worker_id'] = message['worker_id']
+                if message['type'] == 'result':
+                    pending['result'] = message['result']
+                    pending['done'].set()
+
+    def run_job(self, platform, search_term, max_scrolls, username, env=None, timeout=None):
+        """Submit a job and block until a worker finishes it (or its deadline, counted from submission, passes)"""
+        if platform not in SCRAPER_ENTRYPOINTS:
+            return {'platform': platform, 'success': False, 'duration': 0, 'leads': 0,
+                    'error': f"Unknown platform: {platform}"}
+
+        if not self._running:
+            self.start()
+
+        timeout = timeout or self.job_timeout
+        job_id = next(self._job_ids)
+        job_env = dict(env or {})
+        job_env.setdefault('SCRAPER_USERNAME', username)
+        job_env.setdefault('FRONTEND_SEARCH_TERM', search_term)
+
+        start_time = time.time()
+        pending = {'done': threading.Event(), 'result': None, 'worker_id': None,
+                   'platform': platform, 'submitted': start_time}
+        with self._lock:
+            self._pending[job_id] = pending
+
+        self._job_queue.put({
+            'job_id': job_id,
+            'platform': platform,
+            'search_term': search_term,
+            'max_scrolls': max_scrolls,
+            'username': username,
+            'env': job_env,
+            'deadline': start_time + timeout,
+        })
+
+        finished = pending['done'].wait(timeout)
+        with self._lock:
+            self._pending.pop(job_id, None)
+
+        if finished:
+            return pending['result']
+
+        # A worker that picked the job up is recycled now; one that hasn't reported
+        # in yet exits on its own deadline watchdog and is replaced by _reap_workers
+        if pending['worker_id'] is not None:
+            self._replace_worker(pending['worker_id'])
+        return {
+            'platform': platform,
+            'success': False,
+            'duration': time.time() - start_time,
+            'leads': 0,
+            'error': f"Timeout ({timeout // 60} minutes)",
+        }
+
+    def shutdown(self):
+        """Stop all workers"""
+        if not self._running:
+            return
+        # Stop reaping first so workers exiting on the sentinel aren't replaced
+        with self._lock:
+            self._running = False
+        for _ in self._workers:
+            self._job_queue.put(None)
+        for process in list(self._workers.values()):
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        self._workers = {}
+        print("🛑 Scraper worker pool stopped")
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_worker_pool(size=None):
+    """Return the process-wide worker pool, starting it on first use"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ScraperWorkerPool(size=size).start()
+        return _shared_pool
+
+
+def worker_pool_enabled():
+    return os.getenv("SCRAPER_WORKER_POOL", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,252 @@
+# selector_stats.py - Remember which selectors work per platform
+
+"""
+Per-platform record of which selector in each fallback list actually worked.
+
+Scrapers keep their ordered selector lists, but ask ordered_selectors() for
+them first. The list keeps its priority order; a selector only drops to the
+back once it has failed DEMOTE_AFTER_FAILURES times in a row, so the next one
+down gets probed first. A demoted selector is probed again at its original
+position every REPROBE_EVERY_RUNS runs of the scope, or once its last failure
+is older than REPROBE_SECONDS, so a transient miss never lets a generic
+fallback win for good. After probing, record_selector_attempt() stores the
+outcome (selectors tried before the winner count as failures).
+
+Every selector keeps lifetime attempts/successes plus its last RECENT_WINDOW
+outcomes, which is what the decay report compares:
+
+    python selector_stats.py report            # decaying/dead selectors
+    python selector_stats.py report --all      # everything, per platform
+
+The stats live in a SQLite file (SELECTOR_STATS_DB) shared by all scraper
+processes. Any failure here is printed and ignored; scraping never depends
+on it.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+SELECTOR_STATS_DB = os.getenv("SELECTOR_STATS_DB", "selector_stats.db")
+
+RECENT_WINDOW = 20
+MIN_ATTEMPTS = 5
+DECAY_MARGIN = 0.25
+
+DEMOTE_AFTER_FAILURES = int(os.getenv("SELECTOR_DEMOTE_AFTER", "3"))
+REPROBE_EVERY_RUNS = int(os.getenv("SELECTOR_REPROBE_EVERY", "10"))
+REPROBE_SECONDS = float(os.getenv("SELECTOR_REPROBE_SECONDS", str(6 * 3600)))
+
+# Report order, worst first
+STATUSES = ("dead", "decaying", "new", "healthy")
+
+
+class SelectorStats:
+    """SQLite-backed success statistics per (platform, scope, selector)"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or SELECTOR_STATS_DB
+        self._init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS selector_stats (
+                    platform TEXT NOT NULL,
+                    scope TEXT NOT NULL,
+                    selector TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    recent TEXT NOT NULL DEFAULT '',
+                    last_matches INTEGER,
+                    last_success_at REAL,
+                    last_failure_at REAL,
+                    PRIMARY KEY (platform, scope, selector)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def rows(self, platform: str = None, scope: str = None) -> List[Dict]:
+        sql = "SELECT * FROM selector_stats WHERE 1=1"
+        params = []
+        if platform:
+            sql += " AND platform = ?"
+            params.append(platform)
+        if scope:
+            sql += " AND scope = ?"
+            params.append(scope)
+        conn = self._connect()
+        try:
+            return [dict(r) for r in conn.execute(sql + " ORDER BY platform, scope, selector", params)]
+        finally:
+            conn.close()
+
+    def ordered(self, platform: str, scope: str, selectors: Sequence[str]) -> List[str]:
+        """``selectors`` in priority order, with currently demoted ones moved to the back"""
+        selectors = list(selectors)
+        rows = self.rows(platform, scope)
+        known = {r["selector"]: r for r in rows if r["selector"] in selectors}
+        # Every run records at most one success, so this counts the scope's runs closely enough
+        runs = sum(r["successes"] for r in rows)
+        if REPROBE_EVERY_RUNS and runs % REPROBE_EVERY_RUNS == 0:
+            return selectors
+        now = time.time()
+        demoted = [s for s in selectors if s in known and is_demoted(known[s], now)]
+        return [s for s in selectors if s not in demoted] + demoted
+
+    def record(self, platform: str, scope: str, outcomes: Sequence[tuple]):
+        """Store ``(selector, success, matches)`` outcomes in one transaction"""
+        now = time.time()
+        params = [
+            (platform, scope, selector, int(bool(ok)), "1" if ok else "0", matches,
+             now if ok else None, None if ok else now)
+            for selector, ok, matches in outcomes
+        ]
+        if not params:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(f'''
+                    INSERT INTO selector_stats
+                        (platform, scope, selector, attempts, successes, recent, last_matches,
+                         last_success_at, last_failure_at)
+                    VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+                    ON CONFLICT(platform, scope, selector) DO UPDATE SET
+                        attempts = attempts + 1,
+                        successes = successes + excluded.successes,
+                        recent = substr(recent || excluded.recent, -{RECENT_WINDOW}),
+                        last_matches = excluded.last_matches,
+                        last_success_at = COALESCE(excluded.last_success_at, last_success_at),
+                        last_failure_at = COALESCE(excluded.last_failure_at, last_failure_at)
+                ''', params)
+        finally:
+            conn.close()
+
+    def report(self, platform: str = None) -> List[Dict]:
+        """Every selector with its rates and status, worst first"""
+        out = []
+        for row in self.rows(platform):
+            row["success_rate"] = row["successes"] / row["attempts"] if row["attempts"] else 0.0
+            recent = row["recent"]
+            row["recent_rate"] = recent.count("1") / len(recent) if recent else 0.0
+            row["status"] = classify(row)
+            out.append(row)
+        out.sort(key=lambda r: (STATUSES.index(r["status"]), r["platform"], r["scope"], r["recent_rate"]))
+        return out
+
+
+def failure_streak(row: Dict) -> int:
+    """Consecutive failures at the end of the recent outcomes"""
+    recent = row["recent"]
+    return len(recent) - len(recent.rstrip("0"))
+
+
+def is_demoted(row: Dict, now: float = None) -> bool:
+    """Failed DEMOTE_AFTER_FAILURES times in a row and not yet due for a re-probe"""
+    if failure_streak(row) < DEMOTE_AFTER_FAILURES:
+        return False
+    now = now or time.time()
+    return not (row["last_failure_at"] and now - row["last_failure_at"] > REPROBE_SECONDS)
+
+
+def classify(row: Dict) -> str:
+    """healthy / new (too few attempts) / decaying (last two failed, or recent rate well below lifetime) / dead"""
+    if row["attempts"] < MIN_ATTEMPTS:
+        return "new"
+    if not row["successes"]:
+        return "dead"
+    recent = row["recent"]
+    if recent.endswith("00") or row["recent_rate"] < row["success_rate"] - DECAY_MARGIN:
+        return "decaying"
+    return "healthy"
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_selector_stats() -> Optional[SelectorStats]:
+    """Shared store, or None if the database can't be opened"""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            try:
+                _stats = SelectorStats()
+            except Exception as e:
+                print(f"⚠️ Selector stats unavailable: {e}")
+                return None
+        return _stats
+
+
+def ordered_selectors(platform: str, scope: str, selectors: Sequence[str]) -> List[str]:
+    """Selectors to try, known-good first (unchanged order if the store is unavailable)"""
+    stats = get_selector_stats()
+    if stats is None:
+        return list(selectors)
+    try:
+        return stats.ordered(platform, scope, selectors)
+    except Exception as e:
+        print(f"⚠️ Could not read selector stats: {e}")
+        return list(selectors)
+
+
+def record_selector_attempt(platform: str, scope: str, tried: Sequence[str], chosen: Optional[str],
+                            matches: int = 0):
+    """
+    Record one probe pass over ``tried`` (in the order they were tried): every
+    selector before ``chosen`` failed, ``chosen`` worked with ``matches``
+    elements. ``chosen=None`` means all of them failed.
+    """
+    outcomes = []
+    for selector in tried:
+        if selector == chosen:
+            outcomes.append((selector, True, matches))
+            break
+        outcomes.append((selector, False, 0))
+    stats = get_selector_stats()
+    if stats is None:
+        return
+    try:
+        stats.record(platform, scope, outcomes)
+    except Exception as e:
+        print(f"⚠️ Could not record selector stats: {e}")
+
+
+def _print_report(rows: List[Dict]):
+    if not rows:
+        print("No selectors to report")
+        return
+    for r in rows:
+        last_ok = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["last_success_at"])) if r["last_success_at"] else "never"
+        print(f"{r['status']:<9} {r['platform']:<10} {r['scope']:<10} "
+              f"{r['success_rate']:>4.0%} all / {r['recent_rate']:>4.0%} recent  "
+              f"{r['attempts']:>4} tries  last ok {last_ok}  {r['selector']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Selector success statistics per platform")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report_cmd = sub.add_parser("report", help="Show decaying selectors")
+    report_cmd.add_argument("--platform")
+    report_cmd.add_argument("--all", action="store_true", help="Include healthy and new selectors")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        rows = SelectorStats().report(args.platform)
+        if not args.all:
+            rows = [r for r in rows if r["status"] in ("dead", "decaying")]
+        _print_report(rows)
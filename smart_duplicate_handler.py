@@ -1,9 +1,14 @@
 
 import hashlib
-import json
-import os
-from datetime import datetime
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Tuple
+
+import pandas as pd
+
+from lead_history_store import LeadHistoryStore
+from lead_identity import canonical_identity_key
+
+# Lists at least this long go through the vectorized batch path
+BATCH_DEDUP_THRESHOLD = 200
 
 class SmartDuplicateHandler:
     """
@@ -14,38 +19,29 @@ class SmartDuplicateHandler:
     def __init__(self, username: str, platform: str):
         self.username = username
         self.platform = platform
-        self.user_leads_file = f"user_leads_{username}_{platform}.json"
-        self.historical_leads = self._load_historical_leads()
+        self.history = LeadHistoryStore(username, platform)
     
-    def _load_historical_leads(self) -> Dict:
-        """Load user's historical leads for duplicate checking"""
-        try:
-            if os.path.exists(self.user_leads_file):
-                with open(self.user_leads_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {"leads": [], "lead_hashes": set()}
-        except Exception as e:
-            print(f"⚠️ Error loading historical leads: {e}")
-            return {"leads": [], "lead_hashes": set()}
+    def _create_lead_hash(self, lead: Dict) -> str:
+        """
+        Create a unique hash for a lead.
+        Leads with a recognisable profile URL/handle hash their canonical
+        platform identity, so a changed name or bio is still the same person.
+        Everything else falls back to the multi-factor legacy hash.
+        """
+        identity = canonical_identity_key(lead, self.platform)
+        if identity:
+            return self._identity_hash(identity)
+        return self._legacy_lead_hash(lead)
     
-    def _save_historical_leads(self):
-        """Save updated historical leads"""
-        try:
-            # Convert set to list for JSON serialization
-            data_to_save = {
-                "leads": self.historical_leads["leads"],
-                "lead_hashes": list(self.historical_leads["lead_hashes"]),
-                "last_updated": datetime.now().isoformat()
-            }
-            with open(self.user_leads_file, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"⚠️ Error saving historical leads: {e}")
+    @staticmethod
+    def _identity_hash(identity: str) -> str:
+        return hashlib.md5(f"id:{identity}".encode()).hexdigest()
     
-    def _create_lead_hash(self, lead: Dict) -> str:
+    def _legacy_lead_hash(self, lead: Dict) -> str:
         """
         Create a unique hash for a lead based on multiple factors.
         This helps identify the SAME PERSON, not just people with similar names.
+        Still used to recognise history written before identity keys existed.
         """
         # Use multiple identifying factors
         identifying_factors = []
@@ -71,7 +67,7 @@ class SmartDuplicateHandler:
         
         # Bio keywords (for additional context)
         bio = lead.get('bio', '').lower()[:100]  # First 100 chars for context
-        if bio and bio != f"facebook user interested in":  # Skip generic bios
+        if bio and bio != "facebook user interested in":  # Skip generic bios
             identifying_factors.append(f"bio_start:{bio}")
         
         # Create hash from all factors
@@ -82,6 +78,13 @@ class SmartDuplicateHandler:
         # Fallback: just use name if nothing else available
         return hashlib.md5(name.encode()).hexdigest() if name else ""
     
+    def _safe_lead_hash(self, lead: Dict, legacy: bool = False) -> str:
+        """_create_lead_hash that treats malformed leads as invalid instead of raising"""
+        try:
+            return self._legacy_lead_hash(lead) if legacy else self._create_lead_hash(lead)
+        except Exception:
+            return ""
+    
     def remove_duplicates(self, raw_leads: List[Dict], 
                          current_session_only: bool = False) -> Tuple[List[Dict], Dict]:
         """
@@ -101,7 +104,7 @@ class SmartDuplicateHandler:
         if current_session_only:
             print("📋 Mode: Current session only (ignoring historical leads)")
         else:
-            print(f"📋 Mode: Cross-session (checking against {len(self.historical_leads.get('lead_hashes', []))} historical leads)")
+            print(f"📋 Mode: Cross-session (checking against {self.history.count()} historical leads)")
         
         unique_leads = []
         session_hashes = set()
@@ -114,9 +117,16 @@ class SmartDuplicateHandler:
             'invalid_leads': 0
         }
         
-        # Convert historical hashes to set if needed
-        if isinstance(self.historical_leads.get("lead_hashes", []), list):
-            self.historical_leads["lead_hashes"] = set(self.historical_leads["lead_hashes"])
+        # Hash everything once, then look up all of them in the index in one pass
+        lead_hashes = [self._safe_lead_hash(lead) for lead in raw_leads]
+        if current_session_only:
+            historical_hashes = set()
+            legacy_hashes = lead_hashes
+        else:
+            # History written before identity keys holds legacy hashes; match either
+            legacy_hashes = [self._safe_lead_hash(lead, legacy=True) for lead in raw_leads]
+            historical_hashes = self.history.contains_many(lead_hashes + legacy_hashes)
+        new_history = []
         
         for i, lead in enumerate(raw_leads):
             try:
@@ -126,8 +136,7 @@ class SmartDuplicateHandler:
                     stats['invalid_leads'] += 1
                     continue
                 
-                # Create unique hash for this lead
-                lead_hash = self._create_lead_hash(lead)
+                lead_hash = lead_hashes[i]
                 if not lead_hash:
                     stats['invalid_leads'] += 1
                     continue
@@ -139,7 +148,7 @@ class SmartDuplicateHandler:
                     continue
                 
                 # Check for duplicates in historical data (if enabled)
-                if not current_session_only and lead_hash in self.historical_leads.get("lead_hashes", set()):
+                if lead_hash in historical_hashes or legacy_hashes[i] in historical_hashes:
                     stats['historical_duplicates'] += 1
                     print(f"  📚 Historical duplicate: {name}")
                     continue
@@ -155,6 +164,12 @@ class SmartDuplicateHandler:
                 unique_leads.append(lead)
                 session_hashes.add(lead_hash)
                 stats['unique_leads'] += 1
+                new_history.append({
+                    'hash': lead_hash,
+                    'name': lead.get('name'),
+                    'profile_url': lead.get('profile_url', lead.get('url')),
+                    'search_term': lead.get('search_term', ''),
+                })
                 
                 # Progress update
                 if (i + 1) % 50 == 0:
@@ -165,29 +180,141 @@ class SmartDuplicateHandler:
                 stats['invalid_leads'] += 1
                 continue
         
-        # Update historical leads with new unique leads (if not current_session_only)
+        # Append new unique leads to the user's history (if not current_session_only)
         if not current_session_only:
             print("💾 Updating historical leads database...")
-            for lead in unique_leads:
-                lead_hash = self._create_lead_hash(lead)
-                if lead_hash:
-                    self.historical_leads["lead_hashes"].add(lead_hash)
-                    
-                    # Also store a simplified version of the lead for reference
-                    simplified_lead = {
-                        'name': lead.get('name'),
-                        'profile_url': lead.get('profile_url', lead.get('url')),
-                        'platform': self.platform,
-                        'date_added': datetime.now().isoformat(),
-                        'search_term': lead.get('search_term', ''),
-                        'hash': lead_hash
-                    }
-                    self.historical_leads["leads"].append(simplified_lead)
-            
-            self._save_historical_leads()
+            self.history.add_many(new_history)
         
         # Print comprehensive stats
-        print(f"\n📊 Duplicate Detection Results:")
+        print("\n📊 Duplicate Detection Results:")
+        print(f"  📥 Raw leads: {stats['raw_leads']}")
+        print(f"  ✅ Unique leads: {stats['unique_leads']}")
+        print(f"  📎 Current session dupes: {stats['current_session_duplicates']}")
+        if not current_session_only:
+            print(f"  📚 Historical dupes: {stats['historical_duplicates']}")
+        print(f"  👥 Same name, diff person: {stats['same_name_different_person']}")
+        print(f"  ❌ Invalid leads: {stats['invalid_leads']}")
+        print(f"  📈 Efficiency: {(stats['unique_leads'] / stats['raw_leads'] * 100):.1f}% kept")
+        
+        return unique_leads, stats
+    
+    def _batch_lead_hashes(self, df: pd.DataFrame, legacy_hashes: pd.Series) -> pd.Series:
+        """Vectorized _create_lead_hash: identity hash where available, else legacy"""
+        records = df[['profile_url', 'url', 'channel_url', 'handle']].to_dict('records')
+        return pd.Series(
+            [
+                self._identity_hash(identity) if identity else legacy
+                for identity, legacy in zip(
+                    (canonical_identity_key(r, self.platform) for r in records), legacy_hashes
+                )
+            ],
+            index=df.index,
+        )
+    
+    def _batch_legacy_hashes(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Vectorized equivalent of _legacy_lead_hash for a whole frame.
+        Factors are joined in sorted-prefix order (bio_start, handle, name, url),
+        which is exactly what sorted() produces in the per-lead version.
+        """
+        name = df['name'].str.lower().str.strip()
+        
+        profile_url = df['profile_url'].where(df['profile_url'] != '', df['url'])
+        is_fb = (profile_url != 'URL not found') & profile_url.str.contains('facebook.com', regex=False)
+        url_id = profile_url.str.split('facebook.com/').str[-1].str.split('?').str[0]
+        
+        handle = df['handle'].str.lower().str.strip()
+        bio = df['bio'].str.lower().str[:100]
+        
+        factors = [
+            ('bio_start:' + bio).where((bio != '') & (bio != 'facebook user interested in'), ''),
+            ('handle:' + handle).where((handle != '') & (handle != name), ''),
+            ('name:' + name).where(name != '', ''),
+            ('url:' + url_id).where(is_fb, ''),
+        ]
+        hash_strings = [
+            '|'.join(part for part in parts if part)
+            for parts in zip(*(f.tolist() for f in factors))
+        ]
+        return pd.Series(
+            [hashlib.md5(h.encode()).hexdigest() if h else "" for h in hash_strings],
+            index=df.index,
+        )
+    
+    def remove_duplicates_batch(self, raw_leads: List[Dict],
+                                current_session_only: bool = False) -> Tuple[List[Dict], Dict]:
+        """
+        Batch version of remove_duplicates for large lead lists.
+        
+        Normalizes and hashes the whole list in one pass, counts same-name
+        collisions with a groupby instead of rescanning kept leads, and only
+        prints a summary. Returns the same (unique_leads, stats) as
+        remove_duplicates.
+        """
+        print(f"🔍 Smart duplicate detection (batch) for {self.username} on {self.platform}")
+        print(f"📊 Processing {len(raw_leads)} raw leads...")
+        
+        stats = {
+            'raw_leads': len(raw_leads),
+            'current_session_duplicates': 0,
+            'historical_duplicates': 0,
+            'unique_leads': 0,
+            'same_name_different_person': 0,
+            'invalid_leads': 0
+        }
+        if not raw_leads:
+            return [], stats
+        
+        columns = ['name', 'profile_url', 'url', 'channel_url', 'handle', 'bio', 'search_term']
+        df = pd.DataFrame.from_records(
+            [{col: lead.get(col) for col in columns} if isinstance(lead, dict) else {} for lead in raw_leads],
+            columns=columns,
+        )
+        for col in columns:
+            df[col] = df[col].map(lambda v: v if isinstance(v, str) else '')
+        
+        valid = df['name'].str.strip().str.len() >= 2
+        df['legacy_hash'] = ''
+        df.loc[valid, 'legacy_hash'] = self._batch_legacy_hashes(df[valid])
+        df['hash'] = ''
+        df.loc[valid, 'hash'] = self._batch_lead_hashes(df[valid], df.loc[valid, 'legacy_hash'])
+        valid &= df['hash'] != ''
+        stats['invalid_leads'] = int((~valid).sum())
+        
+        if current_session_only:
+            historical = pd.Series(False, index=df.index)
+        else:
+            known = self.history.contains_many(df.loc[valid, 'hash'].tolist() + df.loc[valid, 'legacy_hash'].tolist())
+            historical = valid & (df['hash'].isin(known) | df['legacy_hash'].isin(known))
+        
+        # Same order as remove_duplicates: a lead is a session duplicate if an
+        # earlier lead with its hash was kept (checked before history), and
+        # the first kept lead per hash is the first non-historical one
+        candidates = valid & ~historical
+        position = pd.Series(range(len(df)), index=df.index)
+        first_kept = position[candidates].groupby(df.loc[candidates, 'hash']).min()
+        session_dupes = valid & (df['hash'].map(first_kept) < position)
+        historical &= ~session_dupes
+        stats['current_session_duplicates'] = int(session_dupes.sum())
+        stats['historical_duplicates'] = int(historical.sum())
+        
+        keep = candidates & ~session_dupes
+        kept = df[keep]
+        same_name_rank = kept['name'].str.strip().str.lower().groupby(kept['name'].str.strip().str.lower()).cumcount()
+        stats['same_name_different_person'] = int((same_name_rank > 0).sum())
+        stats['unique_leads'] = int(keep.sum())
+        
+        unique_leads = [raw_leads[i] for i in kept.index]
+        
+        if not current_session_only:
+            print("💾 Updating historical leads database...")
+            profile_urls = kept['profile_url'].where(kept['profile_url'] != '', kept['url'])
+            self.history.add_many([
+                {'hash': h, 'name': raw_leads[i].get('name'), 'profile_url': u, 'search_term': t}
+                for i, h, u, t in zip(kept.index, kept['hash'], profile_urls, kept['search_term'])
+            ])
+        
+        print("\n📊 Duplicate Detection Results (batch):")
         print(f"  📥 Raw leads: {stats['raw_leads']}")
         print(f"  ✅ Unique leads: {stats['unique_leads']}")
         print(f"  📎 Current session dupes: {stats['current_session_duplicates']}")
@@ -201,20 +328,19 @@ class SmartDuplicateHandler:
     
     def get_user_lead_count(self) -> int:
         """Get total number of leads for this user"""
-        return len(self.historical_leads.get("leads", []))
+        return self.history.count()
     
     def clear_user_history(self):
         """Clear historical leads for this user (admin function)"""
-        self.historical_leads = {"leads": [], "lead_hashes": set()}
-        if os.path.exists(self.user_leads_file):
-            os.remove(self.user_leads_file)
+        self.history.clear()
         print(f"🗑️ Cleared lead history for {self.username}")
 
 # Integration function for the Facebook scraper
 def process_leads_with_smart_deduplication(raw_leads: List[Dict], 
                                          username: str, 
                                          platform: str = "facebook",
-                                         keep_all_raw: bool = False) -> Tuple[List[Dict], List[Dict]]:
+                                         keep_all_raw: bool = False,
+                                         batch: bool = None) -> Tuple[List[Dict], List[Dict]]:
     """
     Process leads with smart deduplication.
     
@@ -223,6 +349,8 @@ def process_leads_with_smart_deduplication(raw_leads: List[Dict],
         username: Username for user-specific deduplication
         platform: Platform name
         keep_all_raw: If True, also return raw leads alongside unique leads
+        batch: Force (True) or disable (False) the vectorized batch path;
+               None picks it automatically for lists >= BATCH_DEDUP_THRESHOLD
     
     Returns:
         Tuple of (unique_leads, raw_leads) if keep_all_raw=True
@@ -230,8 +358,14 @@ def process_leads_with_smart_deduplication(raw_leads: List[Dict],
     """
     handler = SmartDuplicateHandler(username, platform)
     
+    if batch is None:
+        batch = len(raw_leads) >= BATCH_DEDUP_THRESHOLD
+    
     # Use cross-session deduplication by default
-    unique_leads, stats = handler.remove_duplicates(raw_leads, current_session_only=False)
+    if batch:
+        unique_leads, stats = handler.remove_duplicates_batch(raw_leads, current_session_only=False)
+    else:
+        unique_leads, stats = handler.remove_duplicates(raw_leads, current_session_only=False)
     
     if keep_all_raw:
         return unique_leads, raw_leads
@@ -0,0 +1,254 @@
+"""Credit consumption paths of postgres_credit_system.CreditSystem (JSON fallback and Postgres)"""
+
+import json
+
+import pytest
+
+import postgres_credit_system
+from postgres_credit_system import CreditSystem
+
+
+@pytest.fixture
+def json_system(tmp_path, monkeypatch):
+    """CreditSystem in JSON fallback mode, with its files in a temp dir"""
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.chdir(tmp_path)
+    system = CreditSystem()
+    assert not system.use_postgres
+    system.create_user("alice", "alice@example.com", "pw")
+    system._users["alice"].update(plan="pro", credits=10)
+    system.save_data()
+    return system
+
+
+# --- JSON fallback ---------------------------------------------------------
+
+def test_json_consume_credits_debits_and_logs(json_system):
+    assert json_system.consume_credits("alice", 4, 4, "twitter") is True
+
+    user = json_system.get_user_info("alice")
+    assert user["credits"] == 6
+    assert user["total_leads_downloaded"] == 4
+    assert json_system.transactions[-1]["credits_remaining"] == 6
+    assert json_system.transactions[-1]["platform"] == "twitter"
+
+    # Persisted, not just in memory
+    with open(json_system.users_file) as f:
+        assert json.load(f)["alice"]["credits"] == 6
+
+
+def test_json_consume_credits_insufficient_balance(json_system):
+    assert json_system.consume_credits("alice", 11, 11, "twitter") is False
+
+    assert json_system.get_user_info("alice")["credits"] == 10
+    assert json_system.transactions == []
+
+
+def test_json_consume_credits_unknown_user(json_system):
+    assert json_system.consume_credits("nobody", 1, 1, "twitter") is False
+
+
+def test_json_batch_is_all_or_nothing(json_system):
+    ok, remaining = json_system.consume_credits_batch("alice", [
+        {"platform": "twitter", "credits_used": 6},
+        {"platform": "reddit", "credits_used": 5},
+    ])
+
+    assert (ok, remaining) == (False, 10)
+    assert json_system.get_user_info("alice")["credits"] == 10
+    assert json_system.transactions == []
+
+
+def test_json_batch_logs_running_balance_per_row(json_system):
+    ok, remaining = json_system.consume_credits_batch("alice", [
+        {"platform": "twitter", "credits_used": 3},
+        {"platform": "Reddit", "credits_used": 2, "leads_downloaded": 4},
+        {"platform": "twitter", "credits_used": 1},
+    ])
+
+    assert (ok, remaining) == (True, 4)
+    # Same platform merged; each row records the balance right after it
+    rows = [(t["platform"], t["credits_used"], t["leads_downloaded"], t["credits_remaining"])
+            for t in json_system.transactions]
+    assert rows == [("twitter", 4, 4, 6), ("reddit", 2, 4, 4)]
+    assert json_system.get_user_info("alice")["total_leads_downloaded"] == 8
+
+
+def test_json_empty_batch_is_a_no_op(json_system):
+    assert json_system.consume_credits_batch("alice", []) == (True, 10)
+    assert json_system.consume_credits_batch("nobody", []) == (False, None)
+
+
+def test_json_demo_leads_are_capped_at_the_limit(json_system):
+    json_system.create_user("demo", "demo@example.com", "pw")
+
+    assert json_system.consume_demo_leads("demo", 3) == 3
+    assert json_system.consume_demo_leads("demo", 5) == 2
+    assert json_system.consume_demo_leads("demo", 1) == 0
+    assert json_system.consume_demo_lead("demo") is False
+    assert json_system.get_demo_status("demo") == (True, 5, 0)
+
+
+def test_json_demo_leads_only_for_demo_users(json_system):
+    assert json_system.consume_demo_leads("alice", 2) == 0
+    assert json_system.consume_demo_leads("nobody", 2) == 0
+    assert json_system.consume_demo_leads("alice", 0) == 0
+
+
+def test_json_fallback_reloads_saved_state(json_system):
+    json_system.consume_credits("alice", 2, 2, "medium")
+
+    reloaded = CreditSystem()
+    assert reloaded.get_user_info("alice")["credits"] == 8
+    assert reloaded.transactions[-1]["credits_remaining"] == 8
+
+
+# --- Postgres path (scripted connection, no server) -------------------------
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.connection = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((" ".join(query.split()), params))
+        if self.conn.fail_on and self.conn.fail_on in query:
+            raise RuntimeError("boom")
+
+    def fetchone(self):
+        return self.conn.rows.pop(0) if self.conn.rows else None
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self, rows=None, fail_on=None):
+        self.rows = list(rows or [])
+        self.fail_on = fail_on
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.out = 0
+
+    def getconn(self):
+        self.out += 1
+        return self.conn
+
+    def putconn(self, conn):
+        self.out -= 1
+
+
+@pytest.fixture
+def pg_system(json_system, monkeypatch):
+    """Switch the JSON-mode system over to the Postgres code path on a fake pool"""
+    monkeypatch.setattr(postgres_credit_system, "USER_CACHE_TTL_SECONDS", 0)
+    json_system.use_postgres = True
+
+    def attach(conn):
+        json_system.connection_pool = FakePool(conn)
+        return json_system
+    return attach
+
+
+def test_pg_consume_credits_logs_remaining_in_one_transaction(pg_system):
+    conn = FakeConnection(rows=[{"credits": 6}])
+    system = pg_system(conn)
+
+    assert system.consume_credits("alice", 4, 4, "twitter") is True
+
+    update, insert, rollup = conn.executed
+    assert "credits >= %(p1)s" in update[0]
+    assert update[1] == {"p1": 4, "p2": 4, "p3": "alice"}
+    assert insert[0].startswith("INSERT INTO transactions")
+    assert insert[1] == ("alice", "lead_download", 4, 4, "twitter", 6)
+    assert rollup[0].startswith("INSERT INTO usage_rollup")
+    assert (conn.commits, conn.rollbacks) == (1, 0)
+    assert system.connection_pool.out == 0
+
+
+def test_pg_consume_credits_insufficient_balance(pg_system):
+    # The conditional UPDATE matches no row
+    conn = FakeConnection(rows=[])
+    system = pg_system(conn)
+
+    assert system.consume_credits("alice", 50, 50, "twitter") is False
+    assert len(conn.executed) == 1
+    assert system.connection_pool.out == 0
+
+
+def test_pg_consume_credits_rolls_back_on_error(pg_system):
+    conn = FakeConnection(rows=[{"credits": 6}], fail_on="INSERT INTO transactions")
+    system = pg_system(conn)
+
+    assert system.consume_credits("alice", 4, 4, "twitter") is False
+    assert (conn.commits, conn.rollbacks) == (0, 1)
+    assert system.connection_pool.out == 0
+
+
+def test_pg_batch_is_one_conditional_statement(pg_system):
+    conn = FakeConnection(rows=[{"credits": 4}])
+    system = pg_system(conn)
+
+    ok, remaining = system.consume_credits_batch("alice", [
+        {"platform": "twitter", "credits_used": 3},
+        {"platform": "reddit", "credits_used": 2, "leads_downloaded": 4},
+        {"platform": "twitter", "credits_used": 1},
+    ])
+
+    assert (ok, remaining) == (True, 4)
+    [(query, params)] = conn.executed
+    assert "WHERE username = %s AND credits >= %s" in query
+    assert "s.credits + i.credits_after" in query
+    # total credits, total leads, user, required balance
+    assert params[:4] == [6, 8, "alice", 6]
+    # (platform, credits, leads, credits of later rows): rows log 4 + 2 = 6 and 4 + 0 = 4
+    assert params[4:12] == ["twitter", 4, 4, 2, "reddit", 2, 4, 0]
+    assert params[12:] == ["alice", "alice"]
+    assert conn.commits == 1
+
+
+def test_pg_batch_insufficient_balance_reports_current_credits(pg_system):
+    # The debit CTE returns nothing, so no rows are logged; then the balance is read back
+    conn = FakeConnection(rows=[None, {"username": "alice", "credits": 3}])
+    system = pg_system(conn)
+
+    assert system.consume_credits_batch("alice", [{"platform": "twitter", "credits_used": 5}]) == (False, 3)
+
+
+def test_pg_demo_consumption_returns_capped_count(pg_system):
+    conn = FakeConnection(rows=[{"consumed": 2}])
+    system = pg_system(conn)
+
+    assert system.consume_demo_leads("demo", 5) == 2
+    [(query, params)] = conn.executed
+    assert "LEAST(COALESCE(u.demo_limit, 5), c.used + %s)" in query
+    assert params == ("demo", 5)
+
+
+def test_pg_demo_consumption_exhausted(pg_system):
+    conn = FakeConnection(rows=[])
+    system = pg_system(conn)
+
+    assert system.consume_demo_leads("demo", 1) == 0
+    assert system.consume_demo_lead("demo") is False
@@ -8,8 +8,12 @@ import csv
 import re
 import random
 from dm_sequences import generate_dm_with_fallback
+import scraper_progress
+import scraper_result
+from dom_extract import collect_cards, count_matches
+from browser_setup import launch_browser, new_scraper_context
 import os
-from persistence import save_leads_to_files
+from persistence import save_leads_to_files, open_lead_stream
 from pathlib import Path
 
 # Directory where your CSV files are saved
@@ -140,12 +144,15 @@ def handle_tiktok_simple(page):
 
 
 
-def extract_tiktok_profiles(page):
+def extract_tiktok_profiles(page, stream=None):
     """Extract TikTok profiles - FIXED: No unnecessary bot detection checks"""
     print("📋 Extracting TikTok profiles...")
     
     results = []
     excluded_count = 0  # ✅ ADD THIS
+    elements_seen = 0
+    extraction_start = time.time()
+    dm_seconds = 0.0
     
     # REMOVED: Unnecessary bot detection check - if we're here, we're ready to extract
     # Wait for content to load
@@ -186,19 +193,21 @@ def extract_tiktok_profiles(page):
         print(f"\n🔍 Trying: {approach['name']}")
         
         try:
-            elements = page.query_selector_all(approach['selector'])
-            print(f"  Found {len(elements)} elements")
+            # One evaluate returns the text and href of up to 200 cards (conservative limit for TikTok)
+            found = collect_cards(page, approach['selector'], limit=200, attrs=['href'])
+            elements = found["cards"]
+            print(f"  Found {found['count']} elements")
+            elements_seen += found["count"]
             
             if len(elements) == 0:
                 continue
             
             approach_results = []
-            max_elements = min(200, len(elements))  # Conservative limit for TikTok
             
-            for i, element in enumerate(elements[:max_elements]):
+            for i, element in enumerate(elements):
                 try:
                     # Get text content
-                    text_content = element.inner_text()
+                    text_content = element["text"]
                     if not text_content or len(text_content.strip()) < 3:
                         continue
                     
@@ -209,16 +218,13 @@ def extract_tiktok_profiles(page):
                     profile_url = ""
                     
                     # Try to get href first
-                    try:
-                        href = element.get_attribute('href')
-                        if href and '/@' in href:
-                            # Extract username from TikTok URL
-                            match = re.search(r'/@([a-zA-Z0-9_.]{1,24})', href)
-                            if match:
-                                username = match.group(1)
-                                profile_url = href
-                    except:
-                        pass
+                    href = element["attrs"].get('href')
+                    if href and '/@' in href:
+                        # Extract username from TikTok URL
+                        match = re.search(r'/@([a-zA-Z0-9_.]{1,24})', href)
+                        if match:
+                            username = match.group(1)
+                            profile_url = href
                     
                     # If no username from URL, try from text
                     if not username:
@@ -273,13 +279,20 @@ def extract_tiktok_profiles(page):
                         "extraction_method": approach['name']
                     }
                     
+                    dm_start = time.time()
                     lead["dm"] = generate_dm_with_fallback(
                         name=lead["name"],
                         bio=lead["bio"],
                         platform=lead["platform"]
                     )
+                    dm_seconds += time.time() - dm_start
                     
                     approach_results.append(lead)
+                    if stream:
+                        stream.write(lead)
+                    # DMs are generated inline here, one per lead
+                    scraper_progress.counts(leads_extracted=len(results) + len(approach_results),
+                                            excluded=excluded_count, dms_generated=len(results) + len(approach_results))
                     print(f"  ✅ {name} | {handle}")
                     
                 except Exception as e:
@@ -295,6 +308,12 @@ def extract_tiktok_profiles(page):
             print(f"⚠️ Error with {approach['name']}: {str(e)[:100]}...")
             continue
     
+    scraper_progress.counts(final=True, elements_found=elements_seen)
+    # DMs are generated inline, so their time is split out of the extraction phase
+    scraper_result.record_phase("dm_generation", dm_seconds)
+    scraper_result.record_phase("extraction", time.time() - extraction_start - dm_seconds)
+    scraper_result.report(excluded=excluded_count)
+    
     # Remove duplicates
     if results:
         unique_results = []
@@ -306,9 +325,12 @@ def extract_tiktok_profiles(page):
                 seen_handles.add(handle_key)
         
         print(f"\n📊 Total unique profiles: {len(unique_results)}")
+        scraper_progress.counts(final=True, leads_extracted=len(unique_results), excluded=excluded_count,
+                                dms_generated=len(results))
         return unique_results
     else:
         print(f"\n❌ No profiles extracted")
+        scraper_progress.counts(final=True, leads_extracted=0, excluded=excluded_count)
         return []
 
 def main():
@@ -328,29 +350,18 @@ def main():
     update_last_run_time()
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    lead_stream = None
 
     with sync_playwright() as p:
         print("🔐 Launching TikTok scraper with smart bot detection...")
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox'
-            ]
-        )
+        browser = launch_browser(p, [
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+            '--no-sandbox'
+        ])
         
-        # Handle storage state
-        if isinstance(storage_state, list):
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
-            context.add_cookies(storage_state)
-        else:
-            context = browser.new_context(
-                storage_state=storage_state,
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
+        # Handle storage state (cookie lists too) and media/font blocking
+        context = new_scraper_context(browser, PLATFORM_NAME, storage_state=storage_state)
         
         page = context.new_page()
         
@@ -368,12 +379,16 @@ def main():
             
             # FIXED: Simplified scrolling - no bot detection checks during scrolling
             print(f"📜 Scrolling {MAX_SCROLLS} times...")
+            phase_start = time.time()
             for i in range(MAX_SCROLLS):
                 print(f"  🔄 Scroll {i + 1}/{MAX_SCROLLS}")
                 
                 # Slow, human-like scrolling
                 page.mouse.wheel(0, 300)
                 time.sleep(random.uniform(DELAY_MIN, DELAY_MAX))
+                scraper_progress.scroll(i + 1, MAX_SCROLLS,
+                                        count_matches(page, ['[data-e2e="search-user-item"], [data-e2e="user-item"]',
+                                                             'a[href*="/@"]']))
                 
                 # Extended pause every 5 scrolls for content loading
                 if (i + 1) % 5 == 0:
@@ -382,15 +397,21 @@ def main():
             
             print("⏳ Final content stabilization...")
             time.sleep(8)
+            scraper_result.record_phase("scrolling", time.time() - phase_start)
             
-            # Extract profiles (raw leads)
-            raw_leads = extract_tiktok_profiles(page)
+            # Extract profiles (raw leads, streamed to disk as they are found)
+            lead_stream = open_lead_stream(PLATFORM_NAME, username, timestamp, CSV_DIR)
+            raw_leads = extract_tiktok_profiles(page, stream=lead_stream)
             
             if not raw_leads:
                 print("❌ No raw leads extracted")
+                if lead_stream:
+                    lead_stream.abort("no raw leads")
                 browser.close()
                 return []
             
+            phase_start = time.time()
+            
             # 🚀 APPLY SMART USER-AWARE DEDUPLICATION
             print(f"\n🧠 Applying deduplication strategy: {DEDUP_MODE}")
             print(f"👤 User-specific deduplication for: {username}")
@@ -424,6 +445,7 @@ def main():
                         unique_leads.append(lead)
                         seen_handles.add(handle_key)
                 dedup_stats = {"basic": True, "kept": len(unique_leads)}
+            scraper_result.record_phase("dedup", time.time() - phase_start)
             
             # Final results summary
             print(f"\n📊 FINAL RESULTS SUMMARY:")
@@ -467,6 +489,7 @@ def main():
                     platform_name=PLATFORM_NAME,
                     csv_dir=CSV_DIR,          # uses your existing location
                     save_raw=SAVE_RAW_LEADS,  # if you have this flag
+                    stream=lead_stream,
 )
                 
                 # Save processed results to main CSV
@@ -534,10 +557,14 @@ def main():
                     
             else:
                 print("⚠️ No TikTok profiles extracted")
+                if lead_stream:
+                    lead_stream.complete(keep_raw=False, leads=0, raw_leads=len(raw_leads))
                 leads = []
                 
         except Exception as e:
             print(f"🚨 TikTok scraper error: {e}")
+            if lead_stream and not lead_stream.closed:
+                lead_stream.abort(e)
             leads = []
         finally:
             print("🔍 Keeping browser open for 3 seconds...")
@@ -0,0 +1,122 @@
+"""
+Micro-benchmark: KeywordMatcher vs the old per-keyword `in` scans.
+
+Run from the repo root:  python tools/bench_keyword_matcher.py
+Checks both implementations return identical tuples before timing them.
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import keyword_matcher
+from keyword_matcher import (
+    MEDIUM_END_CUSTOMER_SIGNALS, MEDIUM_PREMIUM_CATEGORIES, MEDIUM_PROFESSIONAL_INDICATORS,
+    MEDIUM_STANDARD_CATEGORIES, REDDIT_END_CUSTOMER_SIGNALS, REDDIT_NICHE_KEYWORDS,
+    REDDIT_PREMIUM_CATEGORIES, REDDIT_STANDARD_CATEGORIES, reddit_professional_indicators,
+    score_medium_end_customer, score_reddit_end_customer,
+)
+
+NICHES = list(REDDIT_NICHE_KEYWORDS)
+FILLER = ("the a and i my was so really today week after before with for it this that "
+          "about just some more than when what how why our they them").split()
+
+
+def naive_reddit(text, niche):
+    """Scoring as the scraper did it: one substring scan per keyword"""
+    if sum(1 for ind in reddit_professional_indicators(niche) if ind in text) >= 2:
+        return False, 0, "professional"
+    total, ctype = 0, "volume"
+    for signal_type, signals in REDDIT_END_CUSTOMER_SIGNALS.items():
+        score = sum(1 for s in signals if s in text)
+        if score > 0:
+            if signal_type in REDDIT_PREMIUM_CATEGORIES:
+                total += score * 3
+                ctype = "premium"
+            elif signal_type in REDDIT_STANDARD_CATEGORIES:
+                total += score * 2
+                if ctype != "premium":
+                    ctype = "standard"
+            else:
+                total += score
+    is_customer = total >= 1
+    bonus = 0
+    for kw in REDDIT_NICHE_KEYWORDS.get(niche, REDDIT_NICHE_KEYWORDS['fitness']):
+        if kw in text:
+            bonus += 0.5
+    total += bonus
+    if bonus >= 2 and total >= 1:
+        is_customer = True
+        if ctype == "volume" and total < 3:
+            ctype = "standard"
+    return is_customer, total, ctype
+
+
+def naive_medium(text):
+    for ind in MEDIUM_PROFESSIONAL_INDICATORS:
+        if ind in text:
+            return False, 0, "professional", []
+    total, ctype, matched = 0, "volume", []
+    for signal_type, signals in MEDIUM_END_CUSTOMER_SIGNALS.items():
+        score = sum(1 for s in signals if s in text)
+        if score > 0:
+            matched.append(signal_type)
+            if signal_type in MEDIUM_PREMIUM_CATEGORIES:
+                total += score * 4
+                ctype = "premium"
+            elif signal_type in MEDIUM_STANDARD_CATEGORIES:
+                total += score * 2
+                if ctype != "premium":
+                    ctype = "standard"
+            else:
+                total += score
+    return total >= 0.3, total, ctype, matched
+
+
+def make_corpus(n, seed=7):
+    rng = random.Random(seed)
+    vocab = [w for words in REDDIT_END_CUSTOMER_SIGNALS.values() for w in words]
+    vocab += [w for words in MEDIUM_END_CUSTOMER_SIGNALS.values() for w in words]
+    vocab += [w for words in REDDIT_NICHE_KEYWORDS.values() for w in words]
+    vocab += MEDIUM_PROFESSIONAL_INDICATORS + reddit_professional_indicators('fitness')
+    texts = []
+    for _ in range(n):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(20, 120))]
+        for _ in range(rng.randint(0, 6)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(vocab))
+        texts.append(" ".join(words).lower())
+    return texts
+
+
+def timed(fn, texts):
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return time.perf_counter() - start
+
+
+def main(n=5000):
+    texts = make_corpus(n)
+    niche = 'fitness'
+
+    for text in texts:
+        assert naive_reddit(text, niche) == score_reddit_end_customer(text, niche), text
+        assert naive_medium(text) == score_medium_end_customer(text), text
+    print(f"✅ Identical results on {n} synthetic posts")
+    backend = "pyahocorasick automaton" if keyword_matcher.ahocorasick else "per-keyword scan (pyahocorasick not installed)"
+    print(f"🔧 Matcher backend: {backend}")
+
+    for label, old, new in (
+        ("reddit", lambda t: naive_reddit(t, niche), lambda t: score_reddit_end_customer(t, niche)),
+        ("medium", naive_medium, score_medium_end_customer),
+    ):
+        old_s, new_s = timed(old, texts), timed(new, texts)
+        print(f"📊 {label:6}: naive {old_s * 1e6 / n:7.1f} µs/post | compiled {new_s * 1e6 / n:7.1f} µs/post "
+              f"| {old_s / new_s:4.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -8,8 +8,12 @@ from datetime import datetime
 import sys
 import json
 import random
-from dm_sequences import generate_dm_with_fallback
-from persistence import save_leads_to_files
+from dm_sequences import generate_dms_for_leads
+from persistence import save_leads_to_files, open_lead_stream
+import scraper_result
+import scraper_progress
+from dom_extract import collect_cards, count_matches
+from browser_setup import launch_browser, new_scraper_context
 from pathlib import Path
 
 # Directory where your CSV files are saved
@@ -151,15 +155,16 @@ def create_stealth_browser(p):
     
     try:
         # Your existing browser creation code...
-        browser = p.chromium.launch(headless=True, args=browser_args)
-        context = browser.new_context(
-        user_agent=user_agent,
-        viewport=viewport,
-        locale='en-US',
-        timezone_id='America/New_York',
-        permissions=['geolocation'],
-        storage_state="twitter_auth.json" if os.path.exists("twitter_auth.json") else None
-    )
+        browser = launch_browser(p, browser_args)
+        context = new_scraper_context(
+            browser, PLATFORM_NAME,
+            storage_state="twitter_auth.json" if os.path.exists("twitter_auth.json") else None,
+            user_agent=user_agent,
+            viewport=viewport,
+            locale='en-US',
+            timezone_id='America/New_York',
+            permissions=['geolocation']
+        )
         
        
         # Test that everything works
@@ -329,8 +334,8 @@ def stealth_scroll(page, scroll_number, total_scrolls):
         print(f"❌ Scroll {scroll_number} failed: {e}")
         return False
 
-def stealth_extraction(page):
-    """Extract with stealth timing"""
+def stealth_extraction(page, stream=None):
+    """Extract with stealth timing; rows are also appended to ``stream`` as they are found"""
     print("📋 Stealth extraction starting...")
     
     stealth_delay(5, 10, "before extraction")
@@ -349,31 +354,25 @@ def stealth_extraction(page):
             'div[role="article"]'
         ]
         
-        elements = []
-        for selector in selectors:
-            try:
-                found = page.query_selector_all(selector)
-                if len(found) > 5:
-                    elements = found
-                    print(f"✅ Using {selector}: {len(found)} elements")
-                    break
-            except:
-                continue
+        # One evaluate for every card's text; parsing below never touches the page
+        found = collect_cards(page, selectors, min_count=5, platform=PLATFORM_NAME)
+        elements = found["cards"]
+        if elements:
+            print(f"✅ Using {found['selector']}: {len(elements)} elements")
         
+        scraper_progress.counts(final=True, elements_found=len(elements))
         if not elements:
             print("❌ No elements found")
             return []
         
-        print(f"🎯 Processing {len(elements)} elements with stealth...")
+        print(f"🎯 Processing {len(elements)} elements...")
         
         for i, element in enumerate(elements):
             try:
-                # Progress with stealth pauses
                 if i > 0 and i % 20 == 0:
-                    print(f"  📊 Progress: {i}/{len(elements)} (pausing for stealth)")
-                    stealth_delay(2, 5, "stealth processing pause")
+                    print(f"  📊 Progress: {i}/{len(elements)}")
                 
-                text = element.inner_text().strip()
+                text = element["text"].strip()
                 
                 if '@' not in text or len(text) < 10:
                     continue
@@ -420,13 +419,11 @@ def stealth_extraction(page):
                     "extraction_method": "Twitter Stealth"
                 }
                 
-                lead["dm"] = generate_dm_with_fallback(
-                    name=lead["name"],
-                    bio=lead["bio"],
-                    platform=lead["platform"]
-                )
-                
+                # DMs are generated in bulk after extraction (generate_dms_for_leads)
                 results.append(lead)
+                if stream:
+                    stream.write(lead)
+                scraper_progress.counts(leads_extracted=len(results), excluded=excluded_count)
                 
                 if len(results) % 10 == 0:
                     print(f"  ✅ Extracted {len(results)} leads...")
@@ -435,6 +432,8 @@ def stealth_extraction(page):
                 continue
         
         print(f"📊 Stealth extraction complete: {len(results)} leads, {excluded_count} excluded")
+        scraper_result.report(excluded=excluded_count)
+        scraper_progress.counts(final=True, leads_extracted=len(results), excluded=excluded_count)
         return results
         
     except Exception as e:
@@ -624,6 +623,7 @@ def login_and_scrape():
     
     date_str = datetime.now().strftime("%Y-%m-%d_%H-%M")
     csv_filename = f"twitter_leads_{username}_{date_str}.csv"
+    lead_stream = None
     
     with sync_playwright() as p:
         browser, context = create_stealth_browser(p)
@@ -664,26 +664,38 @@ def login_and_scrape():
             # Stealth scrolling
             print(f"📜 Starting stealth scrolling ({MAX_SCROLLS} scrolls)...")
             successful_scrolls = 0
+            phase_start = time.time()
             
             for i in range(MAX_SCROLLS):
                 if stealth_scroll(page, i + 1, MAX_SCROLLS):
                     successful_scrolls += 1
+                    scraper_progress.scroll(i + 1, MAX_SCROLLS,
+                                            count_matches(page, ['div[data-testid="cellInnerDiv"]',
+                                                                 'article[data-testid="tweet"]']))
                 else:
                     print(f"❌ Scroll {i + 1} failed")
                     if detect_blocking(page):
                         print("🚨 Blocking detected during scroll")
+                        scraper_progress.status("blocked", f"Blocked at scroll {i + 1}/{MAX_SCROLLS}")
                         break
             
             print(f"📊 Scrolling complete: {successful_scrolls}/{MAX_SCROLLS}")
+            scraper_result.record_phase("scrolling", time.time() - phase_start)
             
-            # Final extraction
-            raw_results = stealth_extraction(page)
+            # Final extraction (streamed to disk row by row)
+            lead_stream = open_lead_stream(PLATFORM_NAME, username, date_str, CSV_DIR)
+            with scraper_result.phase("extraction"):
+                raw_results = stealth_extraction(page, stream=lead_stream)
             
             if not raw_results:
                 print("❌ No raw results extracted")
+                if lead_stream:
+                    lead_stream.abort("no raw results")
                 browser.close()
                 return []
             
+            phase_start = time.time()
+            
             # 🚀 APPLY SMART USER-AWARE DEDUPLICATION
             print(f"\n🧠 Applying deduplication strategy: {DEDUP_MODE}")
             print(f"👤 User-specific deduplication for: {username}")
@@ -717,6 +729,7 @@ def login_and_scrape():
                         unique_results.append(result)
                         seen_usernames.add(username_key)
                 dedup_stats = {"basic": True, "kept": len(unique_results)}
+            scraper_result.record_phase("dedup", time.time() - phase_start)
             
             # Final results summary
             print(f"\n📊 FINAL RESULTS SUMMARY:")
@@ -747,6 +760,11 @@ def login_and_scrape():
                 except Exception as e:
                     print(f"⚠️ Error finalizing results: {e}")
             
+            # 💬 Batched DM generation for the leads that survived dedup and limits
+            # (concurrent, one shared OpenAI client)
+            with scraper_result.phase("dm_generation"):
+                generate_dms_for_leads(results, platform=PLATFORM_NAME)
+            
             # Save results to multiple files
             if results or (raw_results and SAVE_RAW_LEADS):
                 output_file = f"twitter_leads_{username}_{date_str}.csv"
@@ -760,7 +778,8 @@ def login_and_scrape():
                     platform_name="twitter",    # Explicit string
                     csv_dir=CSV_DIR,            # Now guaranteed to be Path object
                     save_raw=SAVE_RAW_LEADS,
-                    record_to_credit_system=True
+                    record_to_credit_system=True,
+                    stream=lead_stream
                 )
                 
                 # Save processed results to main CSV
@@ -841,11 +860,15 @@ def login_and_scrape():
                 return results
             else:
                 print("⚠️ No results to save")
+                if lead_stream:
+                    lead_stream.complete(keep_raw=False, leads=0, raw_leads=len(raw_results))
                 browser.close()
                 return []
                 
         except Exception as e:
             print(f"🚨 Critical stealth error: {e}")
+            if lead_stream and not lead_stream.closed:
+                lead_stream.abort(e)
             try:
                 page.screenshot(path="stealth_error.png")
             except:
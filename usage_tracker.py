@@ -75,8 +75,9 @@ class UsageTracker:
                 try:
                     from postgres_credit_system import credit_system
                     
-                    # Check demo system specifically
-                    can_demo, remaining = credit_system.can_use_demo(username)
+                    # Check demo system specifically (same counter consume_demo_leads draws from)
+                    remaining = credit_system.get_demo_leads_remaining(username)
+                    can_demo = remaining > 0
                     
                     print(f"📊 Demo system status:")
                     print(f"   Can use demo: {can_demo}")
@@ -464,8 +465,9 @@ class UsageTracker:
                 try:
                     from postgres_credit_system import credit_system
                     
-                    # Check how many demo leads are available
-                    can_demo, remaining = credit_system.can_use_demo(username)
+                    # Check how many demo leads are available (consumed later via consume_demo_leads)
+                    remaining = credit_system.get_demo_leads_remaining(username)
+                    can_demo = remaining > 0
                     
                     print(f"📊 Demo limits:")
                     print(f"   Demo remaining: {remaining}")
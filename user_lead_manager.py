@@ -24,6 +24,18 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Any
 import json
 
+from lead_columnar_store import read_lead_frame
+from lead_file_stats import read_csv_head
+
+# What the dashboard shows, cleans and filters by; full files download through export_csv_bytes
+DASHBOARD_COLUMNS = [
+    'name', 'handle', 'bio', 'url', 'platform', 'dm', 'title', 'location',
+    'followers', 'following', 'posts', 'engagement_rate', 'subscribers', 'videos',
+    'likes', 'connections', 'karma', 'verified', 'demo_mode',
+    'profile_url', 'search_term', 'relevance_score', 'lead_quality', 'customer_type',
+    'username', 'generated_by', 'user_id', 'scraper_user', 'generated_at', 'extracted_at',
+]
+
 
 class UserLeadManager:
     """Standalone manager for user-specific lead results"""
@@ -176,9 +188,9 @@ class UserLeadManager:
                 ]
                 
                 for user_pattern in user_patterns:
-                    files = glob.glob(user_pattern)
+                    files = self._matching_files(user_pattern)
                     if files:
-                        found_file = max(files, key=os.path.getmtime)
+                        found_file = files[0][0]
                         break
                 
                 if found_file:
@@ -187,10 +199,9 @@ class UserLeadManager:
             # Method 2: Recent general files that belong to user
             if not found_file:
                 for pattern in patterns:
-                    files = glob.glob(pattern)
-                    for filepath in files:
+                    for filepath, mtime in self._matching_files(pattern):
                         try:
-                            file_time = datetime.fromtimestamp(os.path.getmtime(filepath))
+                            file_time = datetime.fromtimestamp(mtime)
                             if file_time > cutoff_time and self._file_belongs_to_user(filepath, username):
                                 found_file = filepath
                                 break
@@ -204,17 +215,29 @@ class UserLeadManager:
         
         return user_files
     
+    def _matching_files(self, pattern: str) -> List[Tuple[str, float]]:
+        """(path, mtime) newest first; indexed via lead_file_catalog, glob as fallback"""
+        try:
+            from lead_file_catalog import get_catalog
+            catalog = get_catalog()
+            if catalog:
+                return [(r["path"], r["mtime"]) for r in catalog.find(pattern, root=os.getcwd())]
+        except Exception as e:
+            print(f"[catalog] falling back to glob: {e}")
+        files = [(f, os.path.getmtime(f)) for f in glob.glob(pattern)]
+        return sorted(files, key=lambda item: item[1], reverse=True)
+    
     def _file_belongs_to_user(self, filepath: str, username: str) -> bool:
         """Check if file belongs to user"""
         try:
-            # Quick check of first few rows
-            df_sample = pd.read_csv(filepath, nrows=5)
+            # Quick check of first few rows (csv module, cached per mtime/size)
+            header, sample_rows = read_csv_head(filepath, 5)
             
             # Check user-identifying columns
             user_cols = ['username', 'generated_by', 'user_id', 'scraper_user']
             for col in user_cols:
-                if col in df_sample.columns:
-                    return username in df_sample[col].astype(str).values
+                if col in header:
+                    return username in [row.get(col, '') for row in sample_rows]
             
             # If very recent (last 30 minutes), assume it's theirs
             mod_time = os.path.getmtime(filepath)
@@ -225,9 +248,9 @@ class UserLeadManager:
             return False
     
     def _load_and_clean_csv(self, filepath: str) -> pd.DataFrame:
-        """Load and clean CSV data"""
+        """Load and clean lead data (Parquet partition when available, else the CSV)"""
         try:
-            df = pd.read_csv(filepath)
+            df = read_lead_frame(filepath, columns=DASHBOARD_COLUMNS)
             return self._clean_dataframe(df)
         except Exception as e:
             print(f"Error loading {filepath}: {e}")
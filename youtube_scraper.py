@@ -8,8 +8,13 @@ import csv
 import re
 import random
 from dm_sequences import generate_dm_with_fallback
+import scraper_progress
+import scraper_result
+from browser_setup import launch_browser, new_scraper_context
+from dom_extract import collect_cards, count_matches, first_probe
+from selector_stats import ordered_selectors, record_selector_attempt
 import os
-from persistence import save_leads_to_files
+from persistence import save_leads_to_files, open_lead_stream
 
 # Directory where your CSV files are saved
 CSV_DIR = os.path.join(os.getcwd(), "csv_exports")
@@ -156,12 +161,14 @@ def get_search_url_for_term(search_term):
     
     return search_url
 
-def extract_youtube_channels(page):
+def extract_youtube_channels(page, stream=None):
     """Extract channel information from YouTube search results with relevance filtering"""
     print("📋 Extracting YouTube channels...")
     
     results = []
     excluded_count = 0  # ✅ ADD THIS LINE
+    extraction_start = time.time()
+    dm_seconds = 0.0
     
     # Wait for content to load
     time.sleep(DELAY_BETWEEN_SCROLLS)
@@ -221,12 +228,44 @@ def extract_youtube_channels(page):
         }
     ]
     
+    name_selectors = [
+        '#text.ytd-channel-name',
+        '.ytd-channel-name #text',
+        'yt-formatted-string#text',
+        '.yt-simple-endpoint.style-scope.yt-formatted-string',
+        '#channel-title',
+        'a#main-link'
+    ]
+    link_selectors = [
+        'a[href*="/channel/"]',
+        'a[href*="/@"]',
+        'yt-simple-endpoint[href*="/channel/"]',
+        'yt-simple-endpoint[href*="/@"]'
+    ]
+    desc_selectors = [
+        '#description-text',
+        '.ytd-channel-about-metadata-renderer',
+        'yt-formatted-string#description-text',
+        '.metadata-snippet-text',
+        '#snippet'
+    ]
+    
+    # Last approach that produced channels goes first
+    order = ordered_selectors(PLATFORM_NAME, "channels", [a['selector'] for a in approaches])
+    approaches.sort(key=lambda a: order.index(a['selector']))
+    tried = []
+    elements_seen = 0
+    
     for approach in approaches:
         print(f"\n🔍 Trying approach: {approach['name']}")
+        tried.append(approach['selector'])
         
         try:
-            elements = page.query_selector_all(approach['selector'])
+            # One evaluate per approach collects every card with its nested probes
+            elements = collect_cards(page, approach['selector'],
+                                     probes=name_selectors + link_selectors + desc_selectors)["cards"]
             print(f"  Found {len(elements)} elements")
+            elements_seen = max(elements_seen, len(elements))
             
             if len(elements) == 0:
                 continue
@@ -244,32 +283,17 @@ def extract_youtube_channels(page):
                     channel_handle = ""
                     
                     # Get all text content for analysis
-                    try:
-                        element_text = element.inner_text().strip()
-                        if len(element_text) < 10:
-                            continue
-                    except:
+                    element_text = element["text"].strip()
+                    if len(element_text) < 10:
                         continue
                     
                     # Extract channel name
-                    name_selectors = [
-                        '#text.ytd-channel-name',
-                        '.ytd-channel-name #text',
-                        'yt-formatted-string#text',
-                        '.yt-simple-endpoint.style-scope.yt-formatted-string',
-                        '#channel-title',
-                        'a#main-link'
-                    ]
-                    
                     for selector in name_selectors:
-                        try:
-                            name_elem = element.query_selector(selector)
-                            if name_elem:
-                                channel_name = name_elem.inner_text().strip()
-                                if channel_name:
-                                    break
-                        except:
-                            continue
+                        name_elem = first_probe(element, selector)
+                        if name_elem:
+                            channel_name = name_elem["text"].strip()
+                            if channel_name:
+                                break
                     
                     # If no name found in sub-elements, parse from text
                     if not channel_name:
@@ -284,30 +308,20 @@ def extract_youtube_channels(page):
                         continue
                     
                     # Extract channel URL and handle
-                    link_selectors = [
-                        'a[href*="/channel/"]',
-                        'a[href*="/@"]',
-                        'yt-simple-endpoint[href*="/channel/"]',
-                        'yt-simple-endpoint[href*="/@"]'
-                    ]
-                    
                     for selector in link_selectors:
-                        try:
-                            link_elem = element.query_selector(selector)
-                            if link_elem:
-                                href = link_elem.get_attribute('href')
-                                if href:
-                                    if href.startswith('/'):
-                                        channel_url = 'https://www.youtube.com' + href
-                                    else:
-                                        channel_url = href
-                                    
-                                    # Extract handle from URL
-                                    if '/@' in channel_url:
-                                        channel_handle = channel_url.split('/@')[-1].split('?')[0]
-                                    break
-                        except:
-                            continue
+                        link_elem = first_probe(element, selector)
+                        if link_elem:
+                            href = link_elem["href"]
+                            if href:
+                                if href.startswith('/'):
+                                    channel_url = 'https://www.youtube.com' + href
+                                else:
+                                    channel_url = href
+                                
+                                # Extract handle from URL
+                                if '/@' in channel_url:
+                                    channel_handle = channel_url.split('/@')[-1].split('?')[0]
+                                break
                     
                     # Extract subscriber count
                     sub_patterns = [
@@ -324,24 +338,13 @@ def extract_youtube_channels(page):
                             break
                     
                     # Extract description
-                    desc_selectors = [
-                        '#description-text',
-                        '.ytd-channel-about-metadata-renderer',
-                        'yt-formatted-string#description-text',
-                        '.metadata-snippet-text',
-                        '#snippet'
-                    ]
-                    
                     for selector in desc_selectors:
-                        try:
-                            desc_elem = element.query_selector(selector)
-                            if desc_elem:
-                                desc_text = desc_elem.inner_text().strip()
-                                if len(desc_text) > 10:
-                                    description = desc_text
-                                    break
-                        except:
-                            continue
+                        desc_elem = first_probe(element, selector)
+                        if desc_elem:
+                            desc_text = desc_elem["text"].strip()
+                            if len(desc_text) > 10:
+                                description = desc_text
+                                break
                     
                     # If no description found, create adaptive one
                     if not description:
@@ -376,11 +379,13 @@ def extract_youtube_channels(page):
                     
                     # Add platform and DM
                     lead["platform"] = "youtube"
+                    dm_start = time.time()
                     lead["dm"] = generate_dm_with_fallback(
                         name=lead["name"],
                         bio=lead["bio"],
                         platform=lead["platform"]
                     )
+                    dm_seconds += time.time() - dm_start
                     
                     # Add YouTube-specific fields
                     lead.update({
@@ -395,6 +400,11 @@ def extract_youtube_channels(page):
                     })
                     
                     approach_results.append(lead)
+                    if stream:
+                        stream.write(lead)
+                    # DMs are generated inline here, one per lead
+                    scraper_progress.counts(leads_extracted=len(results) + len(approach_results),
+                                            excluded=excluded_count, dms_generated=len(results) + len(approach_results))
                     sub_display = subscriber_text if subscriber_text else "No sub count"
                     print(f"  ✅ {channel_name} | {sub_display} | Score: {relevance_score} | {description[:30]}...")
                     
@@ -404,6 +414,7 @@ def extract_youtube_channels(page):
             if approach_results:
                 print(f"✅ Successfully extracted {len(approach_results)} channels using {approach['name']}")
                 results.extend(approach_results)
+                record_selector_attempt(PLATFORM_NAME, "channels", tried, approach['selector'], len(elements))
                 break  # Use the first successful approach
             else:
                 print(f"❌ No valid channels found with {approach['name']}")
@@ -412,6 +423,10 @@ def extract_youtube_channels(page):
             print(f"⚠️ Error with {approach['name']}: {e}")
             continue
     
+    if not results:
+        record_selector_attempt(PLATFORM_NAME, "channels", tried, None)
+    scraper_progress.counts(final=True, elements_found=elements_seen)
+    
     # Remove duplicates from all results
     unique_results = []
     seen_names = set()
@@ -422,6 +437,12 @@ def extract_youtube_channels(page):
             seen_names.add(name_key)
     
     print(f"\n📊 Total unique channels extracted: {len(unique_results)}")
+    # DMs are generated inline, so their time is split out of the extraction phase
+    scraper_result.record_phase("dm_generation", dm_seconds)
+    scraper_result.record_phase("extraction", time.time() - extraction_start - dm_seconds)
+    scraper_result.report(excluded=excluded_count)
+    scraper_progress.counts(final=True, leads_extracted=len(unique_results), excluded=excluded_count,
+                            dms_generated=len(results))
     return unique_results
 
 def main():
@@ -439,18 +460,12 @@ def main():
     print(f"👤 Running as: {username}")
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    lead_stream = None
     
     with sync_playwright() as p:
         print("🔐 Launching YouTube scraper...")
-        browser = p.chromium.launch(
-            headless=True,
-            args=['--disable-blink-features=AutomationControlled']
-        )
-        
-        context = browser.new_context(
-            storage_state=storage_state,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-        )
+        browser = launch_browser(p, ['--disable-blink-features=AutomationControlled'])
+        context = new_scraper_context(browser, PLATFORM_NAME, storage_state=storage_state)
         
         page = context.new_page()
         
@@ -474,10 +489,14 @@ def main():
             
             # Scroll to load more results with config-based delays
             print(f"📜 Scrolling {MAX_SCROLLS} times to load more channels...")
+            phase_start = time.time()
             for i in range(MAX_SCROLLS):
                 print(f"  🔄 Scroll {i + 1}/{MAX_SCROLLS}")
                 page.mouse.wheel(0, 1200)
                 time.sleep(random.uniform(DELAY_BETWEEN_SCROLLS, DELAY_BETWEEN_SCROLLS + 1))
+                scraper_progress.scroll(i + 1, MAX_SCROLLS,
+                                        count_matches(page, ['ytd-channel-renderer', 'ytd-video-owner-renderer',
+                                                             'a[href*="/channel/"], a[href*="/@"]']))
                 
                 # Check if we hit "Show more" button and click it
                 try:
@@ -491,15 +510,21 @@ def main():
             
             print("⏳ Waiting for content to stabilize...")
             time.sleep(3)
+            scraper_result.record_phase("scrolling", time.time() - phase_start)
             
-            # Extract channels (raw leads)
-            raw_leads = extract_youtube_channels(page)
+            # Extract channels (raw leads, streamed to disk as they are found)
+            lead_stream = open_lead_stream(PLATFORM_NAME, username, timestamp, CSV_DIR)
+            raw_leads = extract_youtube_channels(page, stream=lead_stream)
             
             if not raw_leads:
                 print("❌ No raw leads extracted")
+                if lead_stream:
+                    lead_stream.abort("no raw leads")
                 browser.close()
                 return []
 
+            phase_start = time.time()
+
             # 🚀 APPLY SMART USER-AWARE DEDUPLICATION
             print(f"\n🧠 Applying deduplication strategy: {DEDUP_MODE}")
             print(f"👤 User-specific deduplication for: {username}")
@@ -533,6 +558,7 @@ def main():
                         unique_leads.append(lead)
                         seen_handles.add(handle_key)
                 dedup_stats = {"basic": True, "kept": len(unique_leads)}
+            scraper_result.record_phase("dedup", time.time() - phase_start)
             
             # Final results summary
             print(f"\n📊 FINAL RESULTS SUMMARY:")
@@ -578,6 +604,7 @@ def main():
                     csv_dir=CSV_DIR,          # uses your existing location
                     save_raw=SAVE_RAW_LEADS,
                     record_to_credit_system=True,# if you have this flag
+                    stream=lead_stream,
                 )
                 
                 
@@ -639,10 +666,14 @@ def main():
                 print("   - Search term may be too specific")
                 print("   - Need to refresh youtube_auth.json authentication")
                 print("   - Try different search terms")
+                if lead_stream:
+                    lead_stream.complete(keep_raw=False, leads=0, raw_leads=len(raw_leads))
                 leads = []
                 
         except Exception as e:
             print(f"🚨 Error: {e}")
+            if lead_stream and not lead_stream.closed:
+                lead_stream.abort(e)
             import traceback
             traceback.print_exc()
             leads = []